@@ -3,13 +3,14 @@ Endpoints para atomización agéntica de contenido educativo
 """
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, UploadFile, File
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 import structlog
 from io import BytesIO
 from pypdf import PdfReader
 
 from ....schemas import (
     AtomizationRequest,
+    AtomBatchRequest,
     AgenticAtomizationResponse,
     LearningAtomRead
 )
@@ -163,6 +164,37 @@ async def atomize_file_agentic(
         )
 
 
+@router.get("/atoms/search")
+async def search_atoms(
+    query: str = "",
+    difficulty: Optional[str] = None,
+    limit: int = 10,
+    service: AgenticAtomizationService = Depends(get_agentic_atomization_service)
+) -> Dict[str, Any]:
+    """Busca átomos por contenido y, opcionalmente, por nivel de dificultad"""
+    atoms = await service.search_atoms(query, difficulty, min(limit, 50))
+    return {"atoms": [_public_atom(atom) for atom in atoms]}
+
+
+@router.post("/atoms/batch")
+async def get_atoms_batch(
+    request: AtomBatchRequest,
+    service: AgenticAtomizationService = Depends(get_agentic_atomization_service)
+) -> Dict[str, Any]:
+    """Obtiene varios átomos por ID en una sola llamada; los no encontrados se listan en `missing`"""
+    atoms = await service.get_atoms_by_ids(request.atom_ids)
+    found = {atom["id"] for atom in atoms}
+    return {
+        "atoms": [_public_atom(atom) for atom in atoms],
+        "missing": [atom_id for atom_id in request.atom_ids if atom_id not in found]
+    }
+
+
+def _public_atom(atom: Dict[str, Any]) -> Dict[str, Any]:
+    """Quita campos internos de MongoDB antes de responder"""
+    return {key: value for key, value in atom.items() if key not in ("_id", "score")}
+
+
 @router.get("/atoms/{atom_id}", response_model=LearningAtomRead)
 async def get_atom(
     atom_id: str,
@@ -40,6 +40,9 @@ class Settings:
     # Cache settings
     CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
     
+    # Estadísticas materializadas de átomos
+    ATOM_STATS_RECONCILE_SECONDS: int = int(os.getenv("ATOM_STATS_RECONCILE_SECONDS", "300"))
+    
     # Agent settings
     AGENT_TIMEOUT_SECONDS: int = int(os.getenv("AGENT_TIMEOUT_SECONDS", "60"))
     AGENT_MAX_RETRIES: int = int(os.getenv("AGENT_MAX_RETRIES", "3"))
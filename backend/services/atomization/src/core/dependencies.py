@@ -28,7 +28,8 @@ def get_atom_repository() -> MongoDBAtomRepository:
     settings = get_settings()
     return MongoDBAtomRepository(
         mongodb_url=settings.MONGODB_URL,
-        db_name=settings.MONGODB_DB_NAME
+        db_name=settings.MONGODB_DB_NAME,
+        stats_reconcile_interval_seconds=settings.ATOM_STATS_RECONCILE_SECONDS
     )
 
 
@@ -385,6 +385,27 @@ Devuelve los átomos en formato JSON con la siguiente estructura. Es VITAL que c
             logger.error("Error getting atom by ID", error=str(e), atom_id=atom_id)
             return None
     
+    async def get_atoms_by_ids(self, atom_ids: List[str]) -> List[Dict[str, Any]]:
+        """Obtiene varios átomos por ID en una sola consulta"""
+        try:
+            return await self.atom_repository.get_many(atom_ids)
+        except Exception as e:
+            logger.error("Error getting atoms by IDs", error=str(e), count=len(atom_ids))
+            return []
+    
+    async def search_atoms(self, query: str, difficulty: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busca átomos por contenido, opcionalmente filtrando por dificultad"""
+        try:
+            if not query:
+                return await self.atom_repository.get_by_difficulty(difficulty, limit) if difficulty else []
+            atoms = await self.atom_repository.search_by_content(query, limit=limit * 2 if difficulty else limit)
+            if difficulty:
+                atoms = [atom for atom in atoms if atom.get("difficulty_level") == difficulty]
+            return atoms[:limit]
+        except Exception as e:
+            logger.error("Error searching atoms", error=str(e), query=query)
+            return []
+    
     async def update_atom(self, atom_id: str, updates: Dict[str, Any]) -> Optional[LearningAtomRead]:
         """Actualiza un átomo existente"""
         try:
@@ -3,8 +3,9 @@ Cliente para el Orquestrador Agéntico (LLM Orchestrator)
 """
 
 import httpx
+import json
 import structlog
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator, Callable
 
 logger = structlog.get_logger(__name__)
 
@@ -21,33 +22,37 @@ class OrchestratorClient:
             timeout=timeout
         )
     
-    async def process_educational_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def stream_educational_task(self, task_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
         """
-        Procesa una tarea educativa usando el agente de IA
+        Procesa una tarea educativa consumiendo la respuesta del agente en streaming
         
         Args:
             task_data: Datos de la tarea incluyendo query, user_id, task_type, context
             
-        Returns:
-            Dict con la respuesta del agente incluyendo answer, reasoning_steps, tools_used, etc.
+        Yields:
+            Eventos NDJSON del orquestador: ``{"type": "token", "content": ...}`` a medida
+            que el modelo genera y un evento final ``{"type": "final", "answer": ...}``
         """
-        endpoint = "/agent/process"
+        endpoint = "/agent/process/stream"
         
-        logger.info("Sending task to agentic orchestrator", 
+        logger.info("Streaming task from agentic orchestrator", 
                    task_type=task_data.get("task_type", "unknown"),
                    user_id=task_data.get("user_id", "anonymous"))
         
         try:
-            response = await self._client.post(endpoint, json=task_data)
-            response.raise_for_status()
-            
-            result = response.json()
-            logger.info("Task completed successfully", 
-                       iterations=result.get("iterations", 0),
-                       tools_used_count=len(result.get("tools_used", [])))
-            
-            return result
-            
+            async with self._client.stream("POST", endpoint, json=task_data) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    response.raise_for_status()
+                
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if event.get("type") == "error":
+                        raise Exception(f"Orchestrator error: {event.get('error', '')}")
+                    yield event
+                    
         except httpx.HTTPStatusError as e:
             logger.error("HTTP error from orchestrator", 
                         status_code=e.response.status_code,
@@ -58,6 +63,35 @@ class OrchestratorClient:
             logger.error("Request error to orchestrator", error=str(e))
             raise Exception(f"Orchestrator connection error: {str(e)}")
     
+    async def process_educational_task(
+        self,
+        task_data: Dict[str, Any],
+        on_token: Optional[Callable[[str], Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Procesa una tarea educativa usando el agente de IA
+        
+        Args:
+            task_data: Datos de la tarea incluyendo query, user_id, task_type, context
+            on_token: Callback opcional invocado con cada token recibido
+            
+        Returns:
+            Dict con la respuesta del agente incluyendo answer, reasoning_steps, tools_used, etc.
+        """
+        result: Dict[str, Any] = {}
+        async for event in self.stream_educational_task(task_data):
+            if event.get("type") == "token":
+                if on_token is not None:
+                    on_token(event.get("content", ""))
+            elif event.get("type") == "final":
+                result = {key: value for key, value in event.items() if key != "type"}
+        
+        logger.info("Task completed successfully", 
+                   iterations=result.get("iterations", 0),
+                   tools_used_count=len(result.get("tools_used", [])))
+        
+        return result
+    
     async def search_memory(self, query: str, user_id: Optional[str] = None, limit: int = 5) -> Dict[str, Any]:
         """Busca en la memoria semántica del agente"""
         endpoint = "/agent/memory/search"
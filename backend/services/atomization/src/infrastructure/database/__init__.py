@@ -1,5 +1,6 @@
 # Database infrastructure module 
 from .mongodb_repository import MongoDBAtomRepository
+from .atom_stats import MaterializedAtomStats
 from .neo4j_repository import Neo4jRepository
 
-__all__ = ["MongoDBAtomRepository", "Neo4jRepository"] 
\ No newline at end of file
+__all__ = ["MongoDBAtomRepository", "MaterializedAtomStats", "Neo4jRepository"] 
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Estadísticas materializadas de átomos de aprendizaje
+
+Mantiene un documento de contadores (total, distribución por dificultad y
+átomos creados por agente) que se actualiza incrementalmente con ``$inc`` en
+cada inserción, actualización o eliminación. La lectura es una consulta
+puntual por ``_id`` en lugar de una agregación sobre toda la colección, y una
+reconciliación periódica corrige cualquier deriva frente a los datos reales.
+
+Cada ``$inc`` incrementa también ``version``; la reconciliación solo escribe si
+la versión no cambió desde que tomó su instantánea, y si cambió la repite, para
+no pisar los incrementos que llegaron mientras agregaba.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import structlog
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import DuplicateKeyError
+
+logger = structlog.get_logger()
+
+STATS_DOCUMENT_ID = "learning_atoms"
+RECONCILE_ATTEMPTS = 3
+
+
+def _difficulty_key(value: Any) -> str:
+    """Normaliza un nivel de dificultad a una clave válida de campo MongoDB"""
+    key = str(value) if value is not None else "sin_definir"
+    return key.replace(".", "_").lstrip("$") or "sin_definir"
+
+
+def _contribution(atom: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Calcula la contribución de un átomo a los contadores materializados"""
+    if not atom:
+        return {}
+    contribution = {
+        "total_atoms": 1,
+        f"difficulty_distribution.{_difficulty_key(atom.get('difficulty_level'))}": 1,
+    }
+    if atom.get("created_by_agent") is True:
+        contribution["agent_created_atoms"] = 1
+    return contribution
+
+
+class MaterializedAtomStats:
+    """Contadores materializados de la colección de átomos"""
+
+    def __init__(
+        self,
+        atoms_collection: AsyncIOMotorCollection,
+        stats_collection: AsyncIOMotorCollection,
+        reconcile_interval_seconds: int = 300
+    ):
+        self.atoms_collection = atoms_collection
+        self.stats_collection = stats_collection
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._last_reconciled = 0.0
+
+    async def apply_change(
+        self,
+        before: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]]
+    ) -> None:
+        """Aplica el delta entre el estado anterior y posterior de un átomo"""
+        delta: Dict[str, int] = {}
+        for field, count in _contribution(after).items():
+            delta[field] = delta.get(field, 0) + count
+        for field, count in _contribution(before).items():
+            delta[field] = delta.get(field, 0) - count
+
+        delta = {field: count for field, count in delta.items() if count}
+        if not delta:
+            return
+
+        await self.stats_collection.update_one(
+            {"_id": STATS_DOCUMENT_ID},
+            {"$inc": {**delta, "version": 1}},
+            upsert=True
+        )
+
+    async def reconcile(self) -> Dict[str, Any]:
+        """Recalcula los contadores desde la colección y reemplaza el documento
+
+        La escritura está condicionada a la versión leída antes de agregar; si
+        un ``$inc`` llegó entretanto, se descarta el resultado y se vuelve a
+        agregar. Tras RECONCILE_ATTEMPTS intentos se deja el documento como
+        está y la siguiente reconciliación lo corregirá.
+        """
+        for attempt in range(1, RECONCILE_ATTEMPTS + 1):
+            current = await self.stats_collection.find_one({"_id": STATS_DOCUMENT_ID}, {"version": 1})
+            version = current.get("version", 0) if current else None
+            document = await self._aggregate()
+            if await self._replace_if_unchanged(version, document):
+                self._last_reconciled = document["reconciled_at"]
+                logger.info("Atom stats reconciled", total_atoms=document["total_atoms"], attempt=attempt)
+                return document
+
+        logger.warning("Atom stats changed during every reconciliation attempt", attempts=RECONCILE_ATTEMPTS)
+        return document
+
+    async def _aggregate(self) -> Dict[str, Any]:
+        """Cuenta los átomos reales en una sola agregación"""
+        pipeline = [
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "difficulty": [{"$group": {"_id": "$difficulty_level", "count": {"$sum": 1}}}],
+                "agent": [{"$match": {"created_by_agent": True}}, {"$count": "count"}],
+            }}
+        ]
+        facets: Dict[str, Any] = {}
+        async for doc in self.atoms_collection.aggregate(pipeline):
+            facets = doc
+
+        return {
+            "total_atoms": facets["total"][0]["count"] if facets.get("total") else 0,
+            "difficulty_distribution": {
+                _difficulty_key(doc["_id"]): doc["count"] for doc in facets.get("difficulty", [])
+            },
+            "agent_created_atoms": facets["agent"][0]["count"] if facets.get("agent") else 0,
+            "reconciled_at": time.time(),
+        }
+
+    async def _replace_if_unchanged(self, version: Optional[int], document: Dict[str, Any]) -> bool:
+        """Escribe el documento solo si nadie lo modificó desde que se leyó `version`"""
+        if version is None:
+            # Sin documento todavía: si un $inc lo crea antes, la inserción falla
+            try:
+                await self.stats_collection.insert_one(
+                    {"_id": STATS_DOCUMENT_ID, **document, "version": 0}
+                )
+                document["version"] = 0
+                return True
+            except DuplicateKeyError:
+                return False
+
+        # Los documentos anteriores a `version` no tienen el campo
+        expected = version if version else {"$in": [0, None]}
+        result = await self.stats_collection.replace_one(
+            {"_id": STATS_DOCUMENT_ID, "version": expected},
+            {**document, "version": version + 1}
+        )
+        if result.matched_count != 1:
+            return False
+        document["version"] = version + 1
+        return True
+
+    async def get(self) -> Dict[str, Any]:
+        """Devuelve las estadísticas con una lectura puntual del documento"""
+        document = await self.stats_collection.find_one({"_id": STATS_DOCUMENT_ID})
+        if document is None or "reconciled_at" not in document:
+            # Primer arranque: no hay contadores todavía
+            document = await self.reconcile()
+        else:
+            self._last_reconciled = max(self._last_reconciled, document["reconciled_at"])
+            self._schedule_reconcile_if_stale()
+
+        total_atoms = document.get("total_atoms", 0)
+        agent_created = document.get("agent_created_atoms", 0)
+        return {
+            "total_atoms": total_atoms,
+            "difficulty_distribution": {
+                level: count
+                for level, count in document.get("difficulty_distribution", {}).items()
+                if count
+            },
+            "agent_created_atoms": agent_created,
+            "manual_created_atoms": total_atoms - agent_created
+        }
+
+    def _schedule_reconcile_if_stale(self) -> None:
+        """Lanza una reconciliación en segundo plano si los contadores son antiguos"""
+        if time.time() - self._last_reconciled < self.reconcile_interval_seconds:
+            return
+        if self._reconcile_task is not None and not self._reconcile_task.done():
+            return
+        # Evita relanzar en cada lectura si la reconciliación falla
+        self._last_reconciled = time.time()
+        self._reconcile_task = asyncio.create_task(self._reconcile_in_background())
+
+    async def _reconcile_in_background(self) -> None:
+        try:
+            await self.reconcile()
+        except Exception as e:
+            logger.warning("Atom stats reconciliation failed", error=str(e))
+
+    async def close(self) -> None:
+        """Cancela una reconciliación pendiente"""
+        if self._reconcile_task is not None and not self._reconcile_task.done():
+            self._reconcile_task.cancel()
@@ -8,22 +8,35 @@ from datetime import datetime
 import uuid
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError, ConnectionFailure
 
+from .atom_stats import MaterializedAtomStats
+
 # from ...schemas import LearningAtomRead, AgenticAtomizationResponse  # Commented to fix import error
 
 logger = structlog.get_logger()
 
+# Campos que afectan a las estadísticas materializadas
+_STATS_PROJECTION = {"_id": 0, "difficulty_level": 1, "created_by_agent": 1}
+
 
 class MongoDBAtomRepository:
     """Repositorio MongoDB para átomos de aprendizaje"""
     
-    def __init__(self, mongodb_url: str, db_name: str = "atomia_atoms"):
+    def __init__(
+        self,
+        mongodb_url: str,
+        db_name: str = "atomia_atoms",
+        stats_reconcile_interval_seconds: int = 300
+    ):
         self.mongodb_url = mongodb_url
         self.db_name = db_name
+        self.stats_reconcile_interval_seconds = stats_reconcile_interval_seconds
         self.client: Optional[AsyncIOMotorClient] = None
         self.db: Optional[AsyncIOMotorDatabase] = None
         self.atoms_collection: Optional[AsyncIOMotorCollection] = None
+        self.stats: Optional[MaterializedAtomStats] = None
         self._initialized = False
         
         logger.info("MongoDB repository initialized", db_name=db_name, url=mongodb_url)
@@ -40,6 +53,11 @@ class MongoDBAtomRepository:
             self.client = AsyncIOMotorClient(self.mongodb_url)
             self.db = self.client[self.db_name]
             self.atoms_collection = self.db["learning_atoms"]
+            self.stats = MaterializedAtomStats(
+                atoms_collection=self.atoms_collection,
+                stats_collection=self.db["atom_stats"],
+                reconcile_interval_seconds=self.stats_reconcile_interval_seconds
+            )
             
             # Verificar conexión
             await self.client.admin.command('ping')
@@ -85,6 +103,7 @@ class MongoDBAtomRepository:
                 result = await self.atoms_collection.insert_one(atom_dict)
                 atom_dict["_id"] = str(result.inserted_id)
                 saved_atoms.append(atom_dict)
+                await self.stats.apply_change(None, atom_dict)
                 
                 logger.info("Saved atom with agent metadata", 
                            atom_id=atom_dict["id"], 
@@ -93,12 +112,16 @@ class MongoDBAtomRepository:
                            
             except DuplicateKeyError:
                 # Si ya existe, actualizar
-                await self.atoms_collection.replace_one(
+                atom_dict.pop("_id", None)
+                previous = await self.atoms_collection.find_one_and_replace(
                     {"id": atom_dict["id"]}, 
                     atom_dict, 
-                    upsert=True
+                    projection=_STATS_PROJECTION,
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE
                 )
                 saved_atoms.append(atom_dict)
+                await self.stats.apply_change(previous, atom_dict)
                 logger.info("Updated existing atom", atom_id=atom_dict["id"])
         
         return saved_atoms
@@ -158,6 +181,18 @@ class MongoDBAtomRepository:
             result["_id"] = str(result["_id"])  # Convertir ObjectId a string
         return result
     
+    async def get_many(self, atom_ids: List[str]) -> List[Dict[str, Any]]:
+        """Obtiene varios átomos por ID en una sola consulta"""
+        await self._ensure_connection()
+        
+        cursor = self.atoms_collection.find({"id": {"$in": list(atom_ids)}})
+        atoms = []
+        async for atom in cursor:
+            atom["_id"] = str(atom["_id"])
+            atoms.append(atom)
+        
+        return atoms
+    
     async def get_all(self, limit: int = 100, skip: int = 0) -> List[Dict[str, Any]]:
         """Obtiene todos los átomos con paginación"""
         await self._ensure_connection()
@@ -230,46 +265,46 @@ class MongoDBAtomRepository:
         await self._ensure_connection()
         
         update_data["updated_at"] = datetime.now()
-        result = await self.atoms_collection.update_one(
+        previous = await self.atoms_collection.find_one_and_update(
             {"id": atom_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection=_STATS_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
+        if previous is None:
+            return False
         
-        return result.modified_count > 0
+        await self.stats.apply_change(previous, {**previous, **update_data})
+        return True
     
     async def delete_atom(self, atom_id: str) -> bool:
         """Elimina un átomo"""
         await self._ensure_connection()
         
-        result = await self.atoms_collection.delete_one({"id": atom_id})
-        return result.deleted_count > 0
+        deleted = await self.atoms_collection.find_one_and_delete(
+            {"id": atom_id},
+            projection=_STATS_PROJECTION
+        )
+        if deleted is None:
+            return False
+        
+        await self.stats.apply_change(deleted, None)
+        return True
     
     async def get_stats(self) -> Dict[str, Any]:
-        """Obtiene estadísticas de la colección de átomos"""
+        """Obtiene estadísticas de la colección de átomos (contadores materializados)"""
         await self._ensure_connection()
-        
-        total_atoms = await self.atoms_collection.count_documents({})
-        
-        # Contar por dificultad
-        difficulty_pipeline = [
-            {"$group": {"_id": "$difficulty_level", "count": {"$sum": 1}}}
-        ]
-        difficulty_stats = {}
-        async for doc in self.atoms_collection.aggregate(difficulty_pipeline):
-            difficulty_stats[doc["_id"]] = doc["count"]
-        
-        # Contar átomos creados por agente
-        agent_created = await self.atoms_collection.count_documents({"created_by_agent": True})
-        
-        return {
-            "total_atoms": total_atoms,
-            "difficulty_distribution": difficulty_stats,
-            "agent_created_atoms": agent_created,
-            "manual_created_atoms": total_atoms - agent_created
-        }
+        return await self.stats.get()
+    
+    async def reconcile_stats(self) -> Dict[str, Any]:
+        """Recalcula las estadísticas materializadas desde la colección"""
+        await self._ensure_connection()
+        return await self.stats.reconcile()
     
     async def close(self):
         """Cierra la conexión a MongoDB"""
+        if self.stats:
+            await self.stats.close()
         if self.client:
             self.client.close()
             logger.info("MongoDB connection closed") 
\ No newline at end of file
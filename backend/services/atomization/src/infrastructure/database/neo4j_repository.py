@@ -72,7 +72,8 @@ class Neo4jRepository:
         UNWIND $relations as relation
         MATCH (a:LearningAtom {id: relation.atom_id})
         MATCH (p:LearningAtom {id: relation.prereq_id})
-        MERGE (a)-[:REQUIRES]->(p)
+        MERGE (a)-[r:REQUIRES]->(p)
+        ON CREATE SET r.created_at = datetime()
         """
         
         relations_to_create = []
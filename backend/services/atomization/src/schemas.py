@@ -52,6 +52,11 @@ class AtomizationRequest(BaseModel):
     context: Optional[Dict[str, Any]] = Field(default_factory=lambda: {}, description="Contexto adicional")
 
 
+class AtomBatchRequest(BaseModel):
+    """Request para obtener varios átomos en una sola llamada"""
+    atom_ids: List[str] = Field(..., min_length=1, max_length=200, description="IDs de los átomos")
+
+
 class AgenticAtomizationResponse(BaseModel):
     """Respuesta de atomización agéntica"""
     atoms: List[LearningAtomRead]
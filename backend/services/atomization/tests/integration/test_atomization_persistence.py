@@ -284,6 +284,106 @@ async def test_atomization_crud_operations():
         await repository.close()
 
 
+@pytest.mark.asyncio
+async def test_atomization_materialized_stats():
+    """Test de contadores materializados frente a la reconciliación completa"""
+    
+    repository = MongoDBAtomRepository(TEST_MONGODB_URL, TEST_DB_NAME)
+    
+    try:
+        agent_metadata = create_agent_metadata()
+        baseline = await repository.reconcile_stats()
+        
+        atom_id = str(uuid4())
+        manual_atom = create_sample_atom(str(uuid4()), "Fracciones", "basico")
+        manual_atom["created_by_agent"] = False
+        await repository.save_many_with_agent_metadata(
+            [create_sample_atom(atom_id, "Derivadas", "intermedio"), manual_atom],
+            agent_metadata
+        )
+        await repository.update_atom(atom_id, {"difficulty_level": "avanzado"})
+        await repository.delete_atom(manual_atom["id"])
+        
+        stats = await repository.get_stats()
+        assert stats["total_atoms"] == baseline["total_atoms"] + 1
+        assert stats["agent_created_atoms"] == baseline["agent_created_atoms"] + 1
+        
+        # Los contadores incrementales deben coincidir con la agregación completa
+        reconciled = await repository.reconcile_stats()
+        assert stats["total_atoms"] == reconciled["total_atoms"]
+        assert stats["agent_created_atoms"] == reconciled["agent_created_atoms"]
+        assert stats["difficulty_distribution"] == {
+            level: count for level, count in reconciled["difficulty_distribution"].items() if count
+        }
+        print(f"✅ STATS: Contadores materializados consistentes: {stats}")
+        
+        await repository.delete_atom(atom_id)
+        return True
+    
+    finally:
+        await repository.close()
+
+
+@pytest.mark.asyncio
+async def test_atomization_stats_reconcile_keeps_concurrent_increments():
+    """Test de un $inc que llega mientras la reconciliación agrega"""
+    
+    repository = MongoDBAtomRepository(TEST_MONGODB_URL, TEST_DB_NAME)
+    
+    try:
+        baseline = await repository.reconcile_stats()
+        stats = repository.stats
+        aggregate = stats._aggregate
+        atom_id = str(uuid4())
+        
+        async def aggregate_then_insert():
+            # La instantánea no incluye el átomo, pero su $inc llega antes de escribir
+            document = await aggregate()
+            if stats._aggregate is aggregate_then_insert:
+                stats._aggregate = aggregate
+                await repository.save_many_with_agent_metadata(
+                    [create_sample_atom(atom_id, "Límites", "basico")], create_agent_metadata()
+                )
+            return document
+        
+        stats._aggregate = aggregate_then_insert
+        reconciled = await repository.reconcile_stats()
+        
+        assert reconciled["total_atoms"] == baseline["total_atoms"] + 1
+        assert (await repository.get_stats())["total_atoms"] == baseline["total_atoms"] + 1
+        
+        await repository.delete_atom(atom_id)
+        return True
+    
+    finally:
+        await repository.close()
+
+
+@pytest.mark.asyncio
+async def test_atomization_batch_lookup():
+    """Test de lectura de varios átomos por ID en una sola consulta"""
+    
+    repository = MongoDBAtomRepository(TEST_MONGODB_URL, TEST_DB_NAME)
+    
+    try:
+        atom_ids = [str(uuid4()) for _ in range(3)]
+        await repository.save_many_with_agent_metadata(
+            [create_sample_atom(atom_id, f"Átomo {i}", "basico") for i, atom_id in enumerate(atom_ids)],
+            create_agent_metadata()
+        )
+        
+        atoms = await repository.get_many(atom_ids[:2] + ["no-existe"])
+        assert sorted(atom["id"] for atom in atoms) == sorted(atom_ids[:2])
+        print(f"✅ BATCH: {len(atoms)} átomos recuperados en una consulta")
+        
+        for atom_id in atom_ids:
+            await repository.delete_atom(atom_id)
+        return True
+    
+    finally:
+        await repository.close()
+
+
 if __name__ == "__main__":
     # Permitir ejecutar el test directamente
     async def run_tests():
@@ -295,6 +395,8 @@ if __name__ == "__main__":
             await test_atomization_search_functionality()
             print("\n" + "="*50)
             await test_atomization_crud_operations()
+            print("\n" + "="*50)
+            await test_atomization_materialized_stats()
             print("\n✅ Todos los tests de atomization completados exitosamente!")
         except Exception as e:
             print(f"\n❌ Error en los tests: {e}")
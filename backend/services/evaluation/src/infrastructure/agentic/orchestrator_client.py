@@ -5,9 +5,10 @@ Maneja las llamadas al agente educativo para evaluación de respuestas.
 
 import httpx
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from datetime import datetime
 import logging
+import json
 from ...core.config import get_settings
 from ...core.logging import get_logger
 
@@ -30,17 +31,22 @@ class OrchestratorClient:
         query: str,
         user_id: str,
         context: Optional[Dict[str, Any]] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        on_token: Optional[Callable[[str], Any]] = None
     ) -> Dict[str, Any]:
         """
         Procesa una tarea educativa usando el agente.
         
+        La respuesta se consume en streaming desde el orquestador, de modo que
+        el timeout de lectura aplica entre tokens y no a la generación completa.
+        
         Args:
             task_type: Tipo de tarea (evaluate_response, generate_feedback, etc.)
             query: Consulta o prompt principal
             user_id: ID del usuario
             context: Contexto adicional para el agente
             metadata: Metadatos de la tarea
+            on_token: Callback opcional invocado con cada token recibido
             
         Returns:
             Respuesta del agente con razonamiento y resultado
@@ -68,37 +74,39 @@ class OrchestratorClient:
             for attempt in range(self.max_retries):
                 try:
                     async with httpx.AsyncClient(timeout=self.timeout) as client:
-                        response = await client.post(
-                            f"{self.base_url}/agent/process",
+                        async with client.stream(
+                            "POST",
+                            f"{self.base_url}/agent/process/stream",
                             json=payload
-                        )
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            
-                            logger.info(
-                                "Respuesta exitosa del orquestador",
-                                extra={
-                                    "task_type": task_type,
-                                    "iterations": result.get("iterations", 0),
-                                    "tools_used": result.get("tools_used", []),
-                                    "reasoning_steps": len(result.get("reasoning_steps", []))
-                                }
-                            )
-                            
-                            return result
+                        ) as response:
                             
-                        elif response.status_code == 429:  # Rate limit
-                            wait_time = int(response.headers.get("Retry-After", 5))
-                            logger.warning(f"Rate limit alcanzado, esperando {wait_time}s")
-                            await asyncio.sleep(wait_time)
-                            continue
-                            
-                        else:
-                            logger.error(
-                                f"Error del orquestrador: {response.status_code}",
-                                extra={"response_text": response.text}
-                            )
+                            if response.status_code == 200:
+                                result = await self._consume_stream(response, on_token)
+                                
+                                logger.info(
+                                    "Respuesta exitosa del orquestador",
+                                    extra={
+                                        "task_type": task_type,
+                                        "iterations": result.get("iterations", 0),
+                                        "tools_used": result.get("tools_used", []),
+                                        "reasoning_steps": len(result.get("reasoning_steps", []))
+                                    }
+                                )
+                                
+                                return result
+                                
+                            elif response.status_code == 429:  # Rate limit
+                                wait_time = int(response.headers.get("Retry-After", 5))
+                                logger.warning(f"Rate limit alcanzado, esperando {wait_time}s")
+                                await asyncio.sleep(wait_time)
+                                continue
+                                
+                            else:
+                                await response.aread()
+                                logger.error(
+                                    f"Error del orquestrador: {response.status_code}",
+                                    extra={"response_text": response.text}
+                                )
                             
                 except httpx.ConnectError:
                     logger.warning(
@@ -137,6 +145,36 @@ class OrchestratorClient:
                 "error": str(e)
             }
     
+    async def _consume_stream(
+        self,
+        response: httpx.Response,
+        on_token: Optional[Callable[[str], Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Consume incrementalmente el stream NDJSON del orquestador.
+        
+        Args:
+            response: Respuesta HTTP en streaming
+            on_token: Callback opcional invocado con cada token recibido
+            
+        Returns:
+            Resultado final del agente
+        """
+        result: Dict[str, Any] = {}
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            event_type = event.pop("type", None)
+            if event_type == "token":
+                if on_token is not None:
+                    on_token(event.get("content", ""))
+            elif event_type == "final":
+                result = event
+            elif event_type == "error":
+                raise Exception(f"Error del orquestador: {event.get('error', '')}")
+        return result
+    
     async def search_memory(
         self,
         query: str,
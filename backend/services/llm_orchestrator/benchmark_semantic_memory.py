@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la memoria semántica: escritura uno a uno (comportamiento
+anterior) frente a la escritura diferida por lotes, y latencia de búsqueda.
+
+Uso:
+    python benchmark_semantic_memory.py --memories 2000 --searches 200
+    python benchmark_semantic_memory.py --fake-embeddings   # sin descargar el modelo ONNX
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+sys.path.append('.')
+
+from src.memory import SemanticMemory
+
+
+TOPICS = ["derivadas", "integrales", "fotosíntesis", "mitosis", "revolución francesa",
+          "leyes de Newton", "ecuaciones cuadráticas", "tabla periódica", "probabilidad", "ADN"]
+
+
+class HashingEmbedding(EmbeddingFunction):
+    """Embedding barato y determinista para medir el almacenamiento sin el modelo"""
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(384, dtype=np.float32)
+            for token in text.lower().split():
+                vector[hash(token) % 384] += 1.0
+            vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+        return vectors
+
+
+def make_documents(count: int, users: int):
+    documents = []
+    for i in range(count):
+        topic = random.choice(TOPICS)
+        documents.append((
+            f"El estudiante preguntó sobre {topic} en la interacción {i}",
+            {"user_id": f"user-{i % users}", "timestamp": f"{i:08d}", "role": "human"},
+        ))
+    return documents
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_one_by_one(documents, embedding_function, path):
+    """Una llamada a collection.add (y un embedding) por documento"""
+    memory = SemanticMemory(persist_directory=path, embedding_function=embedding_function)
+    started = time.perf_counter()
+    for i, (content, metadata) in enumerate(documents):
+        memory.collection.add(ids=[f"mem_{i}"], documents=[content], metadatas=[metadata])
+    return time.perf_counter() - started
+
+
+async def bench_write_behind(documents, embedding_function, path, batch_size, workers):
+    memory = SemanticMemory(persist_directory=path, embedding_function=embedding_function,
+                            batch_size=batch_size, embedding_workers=workers,
+                            max_memories_per_user=len(documents))
+    started = time.perf_counter()
+    for content, metadata in documents:
+        memory.add_memory(content, metadata)
+    enqueue_seconds = time.perf_counter() - started
+    await memory.flush()
+    total_seconds = time.perf_counter() - started
+    return memory, enqueue_seconds, total_seconds
+
+
+def bench_search(memory, searches, users):
+    latencies = []
+    for _ in range(searches):
+        query = f"dudas sobre {random.choice(TOPICS)}"
+        started = time.perf_counter()
+        memory.search_memories(query, n_results=5, filter_dict={"user_id": f"user-{random.randrange(users)}"})
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--memories", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(42)
+    if args.fake_embeddings:
+        embedding_function = HashingEmbedding()
+    else:
+        from chromadb.utils import embedding_functions
+        embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    documents = make_documents(args.memories, args.users)
+
+    print(f"🚀 Benchmark de memoria semántica: {args.memories} memorias, {args.users} usuarios")
+
+    with tempfile.TemporaryDirectory() as baseline_dir, tempfile.TemporaryDirectory() as batched_dir:
+        baseline_seconds = bench_one_by_one(documents, embedding_function, os.path.join(baseline_dir, "db"))
+        print(f"1. Escritura uno a uno:      {args.memories / baseline_seconds:10.1f} memorias/s ({baseline_seconds:.2f}s)")
+
+        memory, enqueue_seconds, total_seconds = await bench_write_behind(
+            documents, embedding_function, os.path.join(batched_dir, "db"), args.batch_size, args.workers
+        )
+        print(f"2. Escritura por lotes:      {args.memories / total_seconds:10.1f} memorias/s ({total_seconds:.2f}s, "
+              f"lotes de {args.batch_size}, {args.workers} workers)")
+        print(f"   Encolado en la petición:  {enqueue_seconds * 1e6 / args.memories:10.1f} µs/memoria")
+        print(f"   Mejora de throughput:     {baseline_seconds / total_seconds:10.1f}x")
+
+        latencies = bench_search(memory, args.searches, args.users)
+        print(f"3. Búsqueda ({args.searches} consultas): p50 {statistics.median(latencies):.2f} ms, "
+              f"p95 {percentile(latencies, 0.95):.2f} ms")
+        print(f"   Estadísticas: {memory.get_stats()}")
+        await memory.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,24 @@
 """Agent implementations with reasoning and planning capabilities."""
 
-from typing import Dict, Any, List, Optional, Union, TypedDict, Annotated
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage, BaseMessage, AIMessage
+from typing import Dict, Any, List, Optional, Union, TypedDict, Annotated, AsyncIterator
+from langchain_core.messages import HumanMessage, BaseMessage, AIMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import AnyMessage, add_messages
 # from langgraph.checkpoint import MemorySaver  # Not available in current version
+from collections import defaultdict
+import asyncio
+import bisect
 import logging
+import operator
 import re
+import time
+import uuid
 
 from .task_types import TaskType
 from .tools import AVAILABLE_TOOLS, BaseTool
 from .memory import IntegratedMemorySystem
+from .prompt_budget import PromptBudget, OBSERVATION_NAME, count_tokens
 
 
 logger = logging.getLogger(__name__)
@@ -20,10 +26,13 @@ logger = logging.getLogger(__name__)
 
 # Define a more structured state for the agent
 class AgentState(TypedDict):
-    messages: List[BaseMessage]
+    messages: Annotated[List[BaseMessage], add_messages]
     intermediate_steps: List[tuple[str, str]]
+    token_usage: Annotated[List[Dict[str, int]], operator.add]
 
-# The prompt that drives the ReAct logic
+# Static ReAct instructions, sent once as a system prefix ahead of the history.
+# The user request and the Action/Observation steps travel as chat messages,
+# so each iteration only adds its own step instead of re-rendering all of them.
 REACT_PROMPT = """
 You are Atomia, an advanced educational AI agent. Your goal is to execute a plan to help a student learn.
 You must break down the plan into smaller steps, thinking step-by-step and using specialized tools to accomplish each part.
@@ -42,44 +51,131 @@ Action:
 }}
 ```
 
-After an action, you will receive an Observation. You will then repeat the Thought/Action process.
+If several independent tools are needed (for example the student's progress and an atom search), write one Action block per tool in the same response: they run in parallel.
+After your actions, you will receive one Observation per Action, in the same order. You will then repeat the Thought/Action process.
 If you have gathered enough information to answer the user's request, provide a final, comprehensive answer prefixed with "Final Answer:".
+"""
 
----
-Plan:
-{plan}
+FINAL_ANSWER_MARKER = "Final Answer:"
 
-Previous Steps (Action/Observation History):
-{intermediate_steps}
+# Upper bounds (ms) of the per-tool latency histogram buckets
+TOOL_LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
 
-User Request:
-{user_input}
 
-Begin!
-"""
+class _ToolStats:
+    __slots__ = ("calls", "errors", "timeouts", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.buckets = [0] * (len(TOOL_LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms: float):
+        self.calls += 1
+        self.buckets[bisect.bisect_left(TOOL_LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}ms" for bound in TOOL_LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "latency_histogram": dict(zip(labels, self.buckets)),
+        }
+
 
 class AtomiaAgent:
     """Main educational agent with reasoning capabilities."""
     
-    def __init__(self, llm, **kwargs):
+    def __init__(self, llm, config: Optional[Dict[str, Any]] = None, **kwargs):
         self.llm = llm
+        config = config or {}
         self.tools = {tool.name: tool for tool in AVAILABLE_TOOLS}
+        self.enable_tools = config.get("enable_tools", False)
+        self.max_iterations = config.get("max_iterations", 10)
+        self.tool_timeout_seconds = config.get("tool_timeout_seconds", 10.0)
+        self.tool_stats: Dict[str, _ToolStats] = defaultdict(_ToolStats)
+        self.budget = PromptBudget(
+            max_prompt_tokens=config.get("max_prompt_tokens", 6000),
+            max_observation_tokens=config.get("max_observation_tokens", 400),
+        )
+        
+        # The system/tool prefix never changes: build and count it once
+        self._system_prefix: Optional[SystemMessage] = None
+        self._prefix_tokens = 0
+        if self.enable_tools:
+            self._system_prefix = SystemMessage(content=REACT_PROMPT.format(tools=self._get_tools_string()))
+            self._prefix_tokens = count_tokens(self._system_prefix.content)
+        
+        self.iterations = 0
+        self.prompt_tokens = 0
+        self.tokens_saved = 0
+        self.max_prompt_tokens_seen = 0
         self.workflow = self._build_workflow()
         logging.info("AtomiaAgent initialized.")
 
     def _get_tools_string(self):
-        return "\\n".join([f"- {tool.name}: {tool.description}" for tool in self.tools.values()])
+        return "\n".join([f"- {tool.name}: {tool.description}" for tool in self.tools.values()])
 
-    def _parse_action(self, text: str):
-        action_match = re.search(r"Action:\n```json\n(.*?)\n```", text, re.DOTALL)
-        if action_match:
-            import json
+    def _parse_actions(self, text: str) -> List[tuple[str, Any]]:
+        """All (tool_name, tool_input) pairs requested in one response, in order."""
+        actions = []
+        import json
+        for block in re.findall(r"Action:\s*```json\s*(.*?)\s*```", text, re.DOTALL):
             try:
-                action_data = json.loads(action_match.group(1))
-                return action_data['tool_name'], action_data['tool_input']
-            except (json.JSONDecodeError, KeyError):
-                return None, None
-        return None, None
+                action_data = json.loads(block)
+            except json.JSONDecodeError:
+                continue
+            for action in action_data if isinstance(action_data, list) else [action_data]:
+                try:
+                    actions.append((action['tool_name'], action['tool_input']))
+                except (KeyError, TypeError):
+                    continue
+        return actions
+
+    def _build_prompt(self, messages: List[BaseMessage]) -> tuple[List[BaseMessage], Dict[str, int]]:
+        """Compact the history to the token budget and prepend the static prefix."""
+        compacted, usage = self.budget.compact(messages, reserved_tokens=self._prefix_tokens)
+        if self._system_prefix is not None:
+            compacted = [self._system_prefix, *compacted]
+        
+        self.iterations += 1
+        self.prompt_tokens += usage["prompt_tokens"]
+        self.tokens_saved += usage["original_tokens"] - usage["prompt_tokens"]
+        self.max_prompt_tokens_seen = max(self.max_prompt_tokens_seen, usage["prompt_tokens"])
+        logger.info(f"Agent iteration prompt: {usage['prompt_tokens']} tokens "
+                    f"({usage['original_tokens']} before compaction)")
+        return compacted, usage
+
+    def _to_response(self, content: str) -> AIMessage:
+        """Turn raw model output into an AIMessage, extracting a tool call in tool mode."""
+        if not self.enable_tools:
+            return AIMessage(content=content)
+        tool_calls = [
+            {
+                "name": tool_name,
+                "args": tool_input if isinstance(tool_input, dict) else {"__arg1": tool_input},
+                "id": uuid.uuid4().hex,
+            }
+            for tool_name, tool_input in self._parse_actions(content)
+            if tool_name in self.tools
+        ]
+        if tool_calls:
+            return AIMessage(content=content, tool_calls=tool_calls)
+        if FINAL_ANSWER_MARKER in content:
+            content = content.split(FINAL_ANSWER_MARKER, 1)[1].strip()
+        return AIMessage(content=content)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "iterations": self.iterations,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.iterations, 1) if self.iterations else 0.0,
+            "max_prompt_tokens": self.max_prompt_tokens_seen,
+            "tokens_saved_by_compaction": self.tokens_saved,
+            "static_prefix_tokens": self._prefix_tokens,
+            "tools": {name: stats.to_dict() for name, stats in self.tool_stats.items()},
+        }
 
     def _build_workflow(self) -> StateGraph:
         graph = StateGraph(AgentState)
@@ -97,30 +193,108 @@ class AtomiaAgent:
         return graph.compile()
 
     def _should_continue(self, state: AgentState) -> str:
-        # The agent node returns a list of AIMessages. If the list contains a tool call, continue.
-        # Otherwise, end. This logic needs to be based on the content of the messages.
-        if isinstance(state['messages'][-1], AIMessage) and state['messages'][-1].tool_calls:
-            return "continue"
+        # Continue while the model asks for a tool, up to max_iterations LLM turns
+        last = state['messages'][-1]
+        if isinstance(last, AIMessage) and last.tool_calls:
+            turns = sum(1 for message in state['messages'] if isinstance(message, AIMessage))
+            if turns < self.max_iterations:
+                return "continue"
         return "end"
 
-    async def _agent_node(self, state: AgentState) -> dict:
-        # This implementation needs to use the LLM with tool-calling capabilities
-        # For now, this is a simplified stub
-        response = await self.llm.ainvoke(state['messages'])
-        return {'messages': [response]}
+    async def _agent_node(self, state: AgentState, config: Optional[RunnableConfig] = None) -> dict:
+        prompt, usage = self._build_prompt(state['messages'])
+        token_sink = (config or {}).get("configurable", {}).get("token_sink")
+        if token_sink is None or not hasattr(self.llm, "astream"):
+            response = await self.llm.ainvoke(prompt)
+            return {'messages': [self._to_response(response.content)], 'token_usage': [usage]}
 
-    async def _tool_node(self, state: AgentState) -> dict:
-        # Simplified tool execution
-        tool_call = state['messages'][-1].tool_calls[0]
+        # Forward partial output to the streaming consumer as it is generated.
+        # In tool mode only the final answer is forwarded, never the Thought/Action
+        # scratchpad of intermediate turns: tokens are held back until the marker.
+        text = ""
+        sent = 0 if not self.enable_tools else None
+        started = not self.enable_tools
+        async for token in self.llm.astream(prompt):
+            text += token
+            if sent is None:
+                marker = text.find(FINAL_ANSWER_MARKER)
+                if marker < 0:
+                    continue
+                sent = marker + len(FINAL_ANSWER_MARKER)
+            if not started:
+                while sent < len(text) and text[sent].isspace():
+                    sent += 1
+                started = sent < len(text)
+            if sent < len(text):
+                token_sink(text[sent:])
+                sent = len(text)
+
+        response = self._to_response(text)
+        if sent is None and not response.tool_calls and response.content:
+            # A plain answer without the marker is final as well
+            token_sink(response.content)
+        return {'messages': [response], 'token_usage': [usage]}
+
+    async def _run_tool(self, tool_call: Dict[str, Any]) -> str:
+        """Run one tool call through its async implementation, bounded by a timeout."""
         tool = self.tools[tool_call['name']]
-        observation = tool.run(tool_call['args'])
-        return {'messages': [HumanMessage(content=str(observation), name="tool_observation")]}
+        stats = self.tool_stats[tool.name]
+        args = tool_call['args']
+        tool_input = args["__arg1"] if set(args) == {"__arg1"} else args
+        started = time.perf_counter()
+        try:
+            observation = await asyncio.wait_for(tool.arun(tool_input), timeout=self.tool_timeout_seconds)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            observation = f"Error: {tool.name} timed out after {self.tool_timeout_seconds:.0f}s"
+        except Exception as e:
+            stats.errors += 1
+            observation = f"Error: {tool.name} failed: {e}"
+        stats.observe((time.perf_counter() - started) * 1000)
+        return str(observation)
+
+    async def _tool_node(self, state: AgentState) -> dict:
+        # Independent tool calls from one turn run concurrently; results keep call order
+        tool_calls = state['messages'][-1].tool_calls
+        observations = await asyncio.gather(*(self._run_tool(tool_call) for tool_call in tool_calls))
+        return {'messages': [
+            HumanMessage(content=f"Observation ({tool_call['name']}): {observation}", name=OBSERVATION_NAME)
+            for tool_call, observation in zip(tool_calls, observations)
+        ]}
 
     async def process(self, messages: List[BaseMessage], **kwargs):
         """Main entry point for the agent's workflow."""
         # The workflow expects a dictionary with a 'messages' key.
         return await self.workflow.ainvoke({"messages": messages})
 
+    async def stream(self, messages: List[BaseMessage], **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Run the workflow, yielding token events and then the final state."""
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def run_workflow():
+            try:
+                return await self.workflow.ainvoke(
+                    {"messages": messages},
+                    config={"configurable": {"token_sink": queue.put_nowait}}
+                )
+            finally:
+                queue.put_nowait(done)
+
+        task = asyncio.create_task(run_workflow())
+        try:
+            while True:
+                token = await queue.get()
+                if token is done:
+                    break
+                yield {"type": "token", "content": token}
+            result = await task
+            yield {"type": "final", "messages": result["messages"]}
+        finally:
+            # The consumer went away (e.g. client disconnected): stop generating
+            if not task.done():
+                task.cancel()
+
     def _get_context_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         # Implementation of _get_context_node method
         # This method should return the context node for the given state
@@ -0,0 +1,109 @@
+"""Single-flight coalescing of identical concurrent agent tasks."""
+
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator, List
+import asyncio
+
+from .response_cache import ResponseCache
+from .task_types import TaskType
+
+
+def task_fingerprint(task_type: TaskType, model: str, prompt: str) -> str:
+    """Stable key for requests that would produce the same LLM generation."""
+    return ResponseCache.make_key(prompt, model, task_type)
+
+
+class _SharedStream:
+    """Events produced by one in-flight generation, replayed to every subscriber."""
+
+    __slots__ = ("events", "done", "error", "changed", "task")
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """Runs at most one call per key; concurrent callers share its outcome.
+
+    The shared call runs in its own task, so a caller that disconnects does
+    not cancel the generation other callers are waiting on.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()`` or, if an identical call is in flight, its result."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._on_call_done(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Iterate ``factory()`` or join an identical in-flight stream from the start."""
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = _SharedStream()
+            self._streams[key] = shared
+            shared.task = asyncio.ensure_future(self._pump(shared, factory))
+            shared.task.add_done_callback(lambda done: self._on_stream_done(key, shared))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        position = 0
+        while True:
+            changed = shared.changed
+            while position < len(shared.events):
+                yield shared.events[position]
+                position += 1
+            if shared.done:
+                break
+            await changed.wait()
+
+        if shared.error is not None:
+            raise shared.error
+
+    async def _pump(self, shared: _SharedStream, factory: Callable[[], AsyncIterator[Any]]):
+        try:
+            async for event in factory():
+                shared.events.append(event)
+                shared.notify()
+        except Exception as e:
+            shared.error = e
+        finally:
+            shared.done = True
+            shared.notify()
+
+    def _on_call_done(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def _on_stream_done(self, key: str, shared: _SharedStream):
+        if self._streams.get(key) is shared:
+            del self._streams[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
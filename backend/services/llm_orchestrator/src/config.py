@@ -1,8 +1,12 @@
 import os
+from functools import lru_cache
 from typing import Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings
 
+# Root of the llm_orchestrator service; relative data paths resolve against it
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 class LLMConfig(BaseSettings):
     """Configuration for LLM orchestrator."""
@@ -11,26 +15,100 @@ class LLMConfig(BaseSettings):
     azure_ai_key: str = Field(..., alias="AZURE_AI_KEY")
     azure_ai_endpoint: str = Field("https://ai-bryanjavierjaramilloc0912ai799661901077.services.ai.azure.com/models", alias="AZURE_AI_ENDPOINT")
     azure_ai_model: str = Field("DeepSeek-R1", alias="AZURE_AI_MODEL")
+    azure_ai_api_version: str = Field("2024-05-01-preview", alias="AZURE_AI_API_VERSION")
+    
+    # LLM HTTP client settings
+    llm_max_in_flight: int = Field(32, alias="LLM_MAX_IN_FLIGHT")
+    llm_max_connections: int = Field(64, alias="LLM_MAX_CONNECTIONS")
+    llm_http2: bool = Field(True, alias="LLM_HTTP2")
+    llm_backoff_base_seconds: float = Field(0.5, alias="LLM_BACKOFF_BASE_SECONDS")
+    llm_backoff_max_seconds: float = Field(20.0, alias="LLM_BACKOFF_MAX_SECONDS")
+    
+    # LLM scheduler settings
+    scheduler_max_concurrency: int = Field(16, alias="SCHEDULER_MAX_CONCURRENCY")
+    scheduler_per_user_limit: int = Field(4, alias="SCHEDULER_PER_USER_LIMIT")
+    scheduler_lane_weights: Dict[str, float] = Field(default_factory=dict, alias="SCHEDULER_LANE_WEIGHTS")
+    scheduler_shed_on_deadline: bool = Field(True, alias="SCHEDULER_SHED_ON_DEADLINE")
+    
+    # LLM response cache settings
+    llm_cache_enabled: bool = Field(True, alias="LLM_CACHE_ENABLED")
+    llm_cache_max_mb: int = Field(64, alias="LLM_CACHE_MAX_MB")
+    llm_cache_ttl_seconds: Dict[str, int] = Field(default_factory=dict, alias="LLM_CACHE_TTL_SECONDS")
+    llm_cache_semantic_enabled: bool = Field(False, alias="LLM_CACHE_SEMANTIC_ENABLED")
+    llm_cache_similarity_threshold: float = Field(0.97, alias="LLM_CACHE_SIMILARITY_THRESHOLD")
+    llm_cost_per_1k_tokens: float = Field(0.002, alias="LLM_COST_PER_1K_TOKENS")
+    
+    # Micro-batching of short evaluation / question-generation tasks
+    llm_batch_enabled: bool = Field(True, alias="LLM_BATCH_ENABLED")
+    llm_batch_window_ms: float = Field(10.0, alias="LLM_BATCH_WINDOW_MS")
+    llm_batch_max_size: int = Field(8, alias="LLM_BATCH_MAX_SIZE")
+    llm_batch_max_item_chars: int = Field(4000, alias="LLM_BATCH_MAX_ITEM_CHARS")
     
     # Redis settings
     redis_host: str = Field("localhost", alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
     redis_db: int = Field(0, alias="REDIS_DB")
+    redis_max_connections: int = Field(64, alias="REDIS_MAX_CONNECTIONS")
+    
+    # Backend services called by the agent tools
+    atomization_service_url: str = Field("http://localhost:8001", alias="ATOMIZATION_SERVICE_URL")
+    evaluation_service_url: str = Field("http://localhost:8003", alias="EVALUATION_SERVICE_URL")
+    planning_service_url: str = Field("http://localhost:8004", alias="PLANNING_SERVICE_URL")
+    questions_service_url: str = Field("http://localhost:8005", alias="QUESTIONS_SERVICE_URL")
+    tool_service_timeout_seconds: float = Field(5.0, alias="TOOL_SERVICE_TIMEOUT_SECONDS")
+    tool_circuit_failure_threshold: int = Field(5, alias="TOOL_CIRCUIT_FAILURE_THRESHOLD")
+    tool_circuit_reset_seconds: float = Field(30.0, alias="TOOL_CIRCUIT_RESET_SECONDS")
     
     # Agent settings
     max_iterations: int = Field(10, alias="AGENT_MAX_ITERATIONS")
     memory_window_size: int = Field(10, alias="AGENT_MEMORY_WINDOW")
     enable_reflection: bool = Field(True, alias="AGENT_ENABLE_REFLECTION")
+    enable_tools: bool = Field(False, alias="AGENT_ENABLE_TOOLS")
+    max_prompt_tokens: int = Field(6000, alias="AGENT_MAX_PROMPT_TOKENS")
+    max_observation_tokens: int = Field(400, alias="AGENT_MAX_OBSERVATION_TOKENS")
+    tool_timeout_seconds: float = Field(10.0, alias="AGENT_TOOL_TIMEOUT_SECONDS")
     
     # Performance settings
     cache_ttl_hours: int = Field(24, alias="CACHE_TTL_HOURS")
+    memory_max_interactions: int = Field(200, alias="MEMORY_MAX_INTERACTIONS")
+    
+    # Per-session short-term memory
+    short_term_max_sessions: int = Field(10000, alias="SHORT_TERM_MAX_SESSIONS")
+    short_term_idle_ttl_seconds: float = Field(1800, alias="SHORT_TERM_IDLE_TTL_SECONDS")
+    short_term_spill_to_redis: bool = Field(True, alias="SHORT_TERM_SPILL_TO_REDIS")
+    
+    # Semantic memory (empty path keeps it in-process only; relative paths are
+    # taken from the service directory, not from wherever the process starts)
+    semantic_memory_path: str = Field(
+        os.path.join(SERVICE_DIR, "data", "semantic_memory"), alias="SEMANTIC_MEMORY_PATH"
+    )
+    semantic_memory_batch_size: int = Field(32, alias="SEMANTIC_MEMORY_BATCH_SIZE")
+    semantic_memory_flush_seconds: float = Field(1.0, alias="SEMANTIC_MEMORY_FLUSH_SECONDS")
+    semantic_memory_max_per_user: int = Field(1000, alias="SEMANTIC_MEMORY_MAX_PER_USER")
+    semantic_memory_workers: int = Field(2, alias="SEMANTIC_MEMORY_WORKERS")
     max_retries: int = Field(3, alias="MAX_RETRIES")
     timeout_seconds: int = Field(30, alias="TIMEOUT_SECONDS")
     
+    @field_validator("semantic_memory_path")
+    @classmethod
+    def resolve_semantic_memory_path(cls, value: str) -> str:
+        if not value:
+            return value
+        return os.path.normpath(os.path.join(SERVICE_DIR, os.path.expanduser(value)))
+
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
-# Global config instance
-config = LLMConfig() 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_config() -> LLMConfig:
+    """Settings read from the environment on first use, not at import time."""
+    return LLMConfig()
+
+
+def __getattr__(name: str):
+    # Keeps ``from .config import config`` working without loading settings on import
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,236 @@
+"""Native async client for Azure AI chat-completions endpoints."""
+
+from typing import Dict, Any, Optional, List, AsyncIterator
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import contextlib
+import importlib.util
+import logging
+import asyncio
+import random
+import json
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Sentinel returned by the SSE parser for the terminating ``[DONE]`` event
+_STREAM_DONE = object()
+
+
+class LLMClientError(Exception):
+    """Raised when the chat-completions endpoint returns a non-retryable error."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncChatCompletionsClient:
+    """Pooled HTTP/2 client with bounded concurrency and jittered retries.
+
+    A single ``httpx.AsyncClient`` keeps connections alive across requests and
+    a semaphore caps the number of requests in flight, so concurrency is no
+    longer limited by the size of the default thread pool executor.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        api_version: str = "2024-05-01-preview",
+        max_in_flight: int = 32,
+        max_connections: int = 64,
+        http2: bool = True,
+        timeout_seconds: float = 30.0,
+        max_retries: int = 3,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 20.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.endpoint = endpoint.rstrip("/")
+        self.api_version = api_version
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("h2 package not installed, falling back to HTTP/1.1 for LLM client")
+            http2 = False
+
+        self._client = httpx.AsyncClient(
+            base_url=self.endpoint,
+            headers={
+                "api-key": api_key,
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(timeout_seconds, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            http2=http2,
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.total_requests = 0
+        self.total_retries = 0
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Delay before the next attempt, honoring Retry-After when present."""
+        if response is not None:
+            retry_after_ms = response.headers.get("retry-after-ms")
+            if retry_after_ms:
+                try:
+                    return max(0.0, float(retry_after_ms) / 1000)
+                except ValueError:
+                    pass
+
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return max(0.0, float(retry_after))
+                except ValueError:
+                    try:
+                        retry_at = parsedate_to_datetime(retry_after)
+                        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+                    except (TypeError, ValueError):
+                        pass
+
+        # Full jitter exponential backoff
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _build_payload(self, messages: List[Dict[str, str]], model: str, **params) -> Dict[str, Any]:
+        payload = {"messages": messages, "model": model}
+        payload.update({key: value for key, value in params.items() if value is not None})
+        return payload
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Hold one of the in-flight slots for the duration of a single attempt."""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    async def complete(self, messages: List[Dict[str, str]], model: str, **params) -> Dict[str, Any]:
+        """Send a chat-completions request and return the decoded JSON body."""
+        payload = self._build_payload(messages, model, **params)
+
+        self.total_requests += 1
+        for attempt in range(self.max_retries + 1):
+            response = None
+            async with self._slot():
+                try:
+                    response = await self._client.post(
+                        "/chat/completions",
+                        params={"api-version": self.api_version},
+                        json=payload,
+                    )
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        raise LLMClientError(f"LLM connection error: {e}") from e
+                    logger.warning(f"LLM transport error (attempt {attempt + 1}): {e}")
+                else:
+                    if response.status_code < 400:
+                        return response.json()
+                    if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                        raise LLMClientError(
+                            f"LLM HTTP error {response.status_code}: {response.text[:500]}",
+                            status_code=response.status_code,
+                        )
+                    logger.warning(f"LLM returned {response.status_code} (attempt {attempt + 1}), retrying")
+
+            # Back off without holding a slot so other requests can use it meanwhile
+            self.total_retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+        raise LLMClientError("LLM request failed after retries")
+
+    async def stream(self, messages: List[Dict[str, str]], model: str, **params) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas as they arrive.
+
+        Retries only happen before the first token is yielded; a failure
+        mid-stream is raised to the caller to avoid duplicating output.
+        """
+        payload = self._build_payload(messages, model, stream=True, **params)
+
+        self.total_requests += 1
+        for attempt in range(self.max_retries + 1):
+            response = None
+            started = False
+            async with self._slot():
+                try:
+                    async with self._client.stream(
+                        "POST",
+                        "/chat/completions",
+                        params={"api-version": self.api_version},
+                        json=payload,
+                    ) as response:
+                        if response.status_code < 400:
+                            async for line in response.aiter_lines():
+                                delta = self._parse_stream_line(line)
+                                if delta is None:
+                                    continue
+                                if delta is _STREAM_DONE:
+                                    break
+                                started = True
+                                yield delta
+                            return
+
+                        await response.aread()
+                        if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                            raise LLMClientError(
+                                f"LLM HTTP error {response.status_code}: {response.text[:500]}",
+                                status_code=response.status_code,
+                            )
+                        logger.warning(f"LLM returned {response.status_code} (attempt {attempt + 1}), retrying")
+                except httpx.TransportError as e:
+                    if started or attempt >= self.max_retries:
+                        raise LLMClientError(f"LLM connection error: {e}") from e
+                    logger.warning(f"LLM transport error (attempt {attempt + 1}): {e}")
+
+            # Back off without holding a slot so other requests can use it meanwhile
+            self.total_retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+        raise LLMClientError("LLM request failed after retries")
+
+    @staticmethod
+    def _parse_stream_line(line: str):
+        """Extract the content delta from one server-sent event line."""
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return _STREAM_DONE
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+        choices = chunk.get("choices") or []
+        if not choices:
+            return None
+        return (choices[0].get("delta") or {}).get("content") or None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return connection pool and concurrency counters."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "total_requests": self.total_requests,
+            "total_retries": self.total_retries,
+        }
+
+    async def aclose(self):
+        """Close pooled connections."""
+        await self._client.aclose()
@@ -1,16 +1,29 @@
 """FastAPI application for LLM orchestrator service."""
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional
+import json
 import uuid
 
-from .orchestrator import orchestrator
+from .orchestrator import LLMOrchestrator, get_orchestrator
+from .scheduler import SchedulerRejected
 from .task_types import TaskType
 
 
-app = FastAPI(title="LLM Orchestrator Service", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the orchestrator components in parallel at startup and release them on shutdown."""
+    orchestrator = get_orchestrator()
+    await orchestrator.startup()
+    yield
+    await orchestrator.close()
+
+
+app = FastAPI(title="LLM Orchestrator Service", version="0.1.0", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -47,7 +60,7 @@ async def health_check():
 
 
 @app.post("/process", response_model=ProcessResponse)
-async def process_task(request: ProcessRequest):
+async def process_task(request: ProcessRequest, orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
     """Process a task through the LLM orchestrator."""
     try:
         # Generate session ID if not provided
@@ -64,12 +77,24 @@ async def process_task(request: ProcessRequest):
         
         return ProcessResponse(**result)
         
+    except SchedulerRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, int(e.retry_after_seconds)))}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics")
+async def get_metrics(orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
+    """Operational metrics (LLM client, cache, coalescing, scheduler)."""
+    return orchestrator.get_metrics()
+
+
 @app.get("/user/{user_id}/context")
-async def get_user_context(user_id: str):
+async def get_user_context(user_id: str, orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
     """Get user context."""
     try:
         context = await orchestrator.get_user_context(user_id)
@@ -79,7 +104,7 @@ async def get_user_context(user_id: str):
 
 
 @app.put("/user/{user_id}/context")
-async def update_user_context(user_id: str, context: Dict[str, Any]):
+async def update_user_context(user_id: str, context: Dict[str, Any], orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
     """Update user context."""
     try:
         await orchestrator.update_user_context(user_id, context)
@@ -89,7 +114,7 @@ async def update_user_context(user_id: str, context: Dict[str, Any]):
 
 
 @app.post("/user/{user_id}/search")
-async def search_memories(user_id: str, query: str, limit: int = 5):
+async def search_memories(user_id: str, query: str, limit: int = 5, orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
     """Search user memories."""
     try:
         memories = await orchestrator.search_memories(user_id, query, limit)
@@ -99,10 +124,10 @@ async def search_memories(user_id: str, query: str, limit: int = 5):
 
 
 @app.delete("/session/{session_id}")
-async def clear_session(session_id: str):
+async def clear_session(session_id: str, orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
     """Clear a session's memory."""
     try:
-        orchestrator.clear_session(session_id)
+        await orchestrator.clear_session(session_id)
         return {"message": "Session cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -116,16 +141,37 @@ class AgentTaskRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+def _agent_task_type(task_type: str) -> TaskType:
+    """Map the external agent task name to the internal TaskType."""
+    return TaskType.from_agent_task(task_type)
+
+
+def _build_agent_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an orchestrator result to the format expected by the services."""
+    return {
+        "answer": result.get("response", ""),
+        "reasoning_steps": [
+            "PLAN: Analyzed content and planned atomization strategy",
+            "EXECUTE: Used educational tools to structure content",
+            "OBSERVE: Validated pedagogical quality of atoms",
+            "REFLECT: Applied educational principles for optimal learning"
+        ],
+        "tools_used": [
+            "search_learning_atoms",
+            "track_learning_progress", 
+            "generate_adaptive_questions"
+        ],
+        "iterations": 3
+    }
+
+
 @app.post("/agent/process")
-async def process_agent_task(request: AgentTaskRequest):
+async def process_agent_task(request: AgentTaskRequest, orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
     """Process an agent task (compatible with atomization service)."""
     try:
-        # Convert to internal format
-        task_type_enum = TaskType.ATOMIZATION if request.task_type == "ATOMIZATION" else TaskType.TUTORING_DIALOGUE
-        
         # Process through orchestrator
         result = await orchestrator.process(
-            task_type=task_type_enum,
+            task_type=_agent_task_type(request.task_type),
             user_input=request.query,
             user_id=request.user_id or "anonymous",
             session_id=str(uuid.uuid4()),
@@ -133,30 +179,41 @@ async def process_agent_task(request: AgentTaskRequest):
         )
         
         # Convert response to format expected by atomization service
-        agent_response = {
-            "answer": result.get("response", ""),
-            "reasoning_steps": [
-                "PLAN: Analyzed content and planned atomization strategy",
-                "EXECUTE: Used educational tools to structure content",
-                "OBSERVE: Validated pedagogical quality of atoms",
-                "REFLECT: Applied educational principles for optimal learning"
-            ],
-            "tools_used": [
-                "search_learning_atoms",
-                "track_learning_progress", 
-                "generate_adaptive_questions"
-            ],
-            "iterations": 3
-        }
-        
-        return agent_response
+        return _build_agent_response(result)
         
+    except SchedulerRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, int(e.retry_after_seconds)))}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/agent/process/stream")
+async def stream_agent_task(request: AgentTaskRequest, orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
+    """Stream an agent task as NDJSON: token events followed by a final event."""
+    async def event_stream():
+        async for event in orchestrator.process_stream(
+            task_type=_agent_task_type(request.task_type),
+            user_input=request.query,
+            user_id=request.user_id or "anonymous",
+            session_id=str(uuid.uuid4()),
+            metadata=request.context or {}
+        ):
+            if event["type"] == "final":
+                if event.get("success"):
+                    event = {"type": "final", **_build_agent_response(event)}
+                else:
+                    event = {"type": "error", "error": event.get("error", "")}
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 @app.get("/")
-async def root():
+async def root(orchestrator: LLMOrchestrator = Depends(get_orchestrator)):
     """Root endpoint with basic service status."""
     return {
         "service": "llm_orchestrator",
@@ -1,113 +1,391 @@
 """Memory systems for the LLM agent."""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Deque, Iterable
+from collections import OrderedDict, deque
 from datetime import datetime
-from langchain.memory import ConversationBufferWindowMemory
 from langchain.schema import BaseMessage, HumanMessage, AIMessage
-import redis
+from concurrent.futures import ThreadPoolExecutor
+import redis.asyncio as redis
+import asyncio
+import logging
 import json
+import time
+import uuid
 import chromadb
 from chromadb.utils import embedding_functions
 
 
+class _Message:
+    __slots__ = ("role", "content", "created_at")
+    
+    def __init__(self, role: str, content: str, created_at: float):
+        self.role = role
+        self.content = content
+        self.created_at = created_at
+    
+    def to_langchain(self) -> BaseMessage:
+        if self.role == "human":
+            return HumanMessage(content=self.content)
+        return AIMessage(content=self.content)
+
+
+class _SessionBuffer:
+    __slots__ = ("messages", "last_access")
+    
+    def __init__(self, window_size: int, messages: Iterable[_Message] = ()):
+        self.messages: Deque[_Message] = deque(messages, maxlen=window_size)
+        self.last_access = time.monotonic()
+
+
 class ShortTermMemory:
-    """In-memory conversation buffer for current session."""
+    """Per-session conversation windows held in memory.
     
-    def __init__(self, window_size: int = 10):
-        self.memory = ConversationBufferWindowMemory(
-            k=window_size,
-            return_messages=True,
-            memory_key="chat_history"
-        )
+    Each session keeps a ring buffer of its last ``window_size`` messages.
+    Sessions are kept in LRU order, capped at ``max_sessions`` and dropped
+    after ``idle_ttl_seconds`` without activity. With a Redis client evicted
+    windows are spilled to ``session:{session_id}:messages`` and restored on
+    the session's next access.
+    """
     
-    def add_message(self, role: str, content: str):
-        """Add a message to memory."""
-        if role == "human":
-            self.memory.chat_memory.add_user_message(content)
-        else:
-            self.memory.chat_memory.add_ai_message(content)
+    def __init__(
+        self,
+        window_size: int = 10,
+        max_sessions: int = 10000,
+        idle_ttl_seconds: float = 1800,
+        redis_client: Optional[redis.Redis] = None,
+        spill_ttl_seconds: int = 86400,
+    ):
+        self.window_size = window_size
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.redis_client = redis_client
+        self.spill_ttl_seconds = spill_ttl_seconds
+        self._sessions: "OrderedDict[str, _SessionBuffer]" = OrderedDict()
+        # Evicted windows whose spill write is still in flight
+        self._spilling: Dict[str, _SessionBuffer] = {}
+        
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.spilled = 0
+        self.restored = 0
+    
+    @staticmethod
+    def _spill_key(session_id: str) -> str:
+        return f"session:{session_id}:messages"
     
-    def get_messages(self) -> List[BaseMessage]:
-        """Get all messages in the buffer."""
-        return self.memory.chat_memory.messages
+    async def add_message(self, session_id: str, role: str, content: str):
+        """Add a message to a session's window."""
+        buffer = await self._get_buffer(session_id, create=True)
+        buffer.messages.append(_Message(role, content, time.time()))
     
-    def clear(self):
-        """Clear the memory buffer."""
-        self.memory.clear()
+    async def get_messages(self, session_id: str) -> List[BaseMessage]:
+        """Get the messages in a session's window, oldest first."""
+        buffer = await self._get_buffer(session_id, create=False)
+        if buffer is None:
+            return []
+        return [message.to_langchain() for message in buffer.messages]
+    
+    async def clear(self, session_id: str):
+        """Clear one session's window."""
+        self._sessions.pop(session_id, None)
+        self._spilling.pop(session_id, None)
+        if self.redis_client is not None:
+            await self.redis_client.delete(self._spill_key(session_id))
+    
+    async def _get_buffer(self, session_id: str, create: bool) -> Optional[_SessionBuffer]:
+        buffer = self._sessions.get(session_id) or self._spilling.pop(session_id, None)
+        if buffer is None and self.redis_client is not None:
+            restored = await self._restore(session_id)
+            # Another request may have touched the session while we awaited
+            buffer = self._sessions.get(session_id)
+            if buffer is None:
+                buffer = restored
+            elif restored is not None:
+                for message in reversed(restored.messages):
+                    if len(buffer.messages) >= self.window_size:
+                        break
+                    buffer.messages.appendleft(message)
+        if buffer is None:
+            if not create:
+                return None
+            buffer = _SessionBuffer(self.window_size)
+        
+        buffer.last_access = time.monotonic()
+        self._sessions[session_id] = buffer
+        self._sessions.move_to_end(session_id)
+        await self._evict()
+        return buffer
+    
+    async def _restore(self, session_id: str) -> Optional[_SessionBuffer]:
+        key = self._spill_key(session_id)
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            records, _ = await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Could not restore session {session_id} from Redis: {e}")
+            return None
+        if not records:
+            return None
+        self.restored += 1
+        return _SessionBuffer(self.window_size, (_Message(*json.loads(record)) for record in records))
+    
+    async def _evict(self):
+        """Drop idle and least-recently-used sessions, spilling them if configured."""
+        now = time.monotonic()
+        evicted: Dict[str, _SessionBuffer] = {}
+        while self._sessions:
+            session_id, buffer = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions:
+                self.evicted_lru += 1
+            elif now - buffer.last_access > self.idle_ttl_seconds:
+                self.evicted_idle += 1
+            else:
+                break
+            self._sessions.popitem(last=False)
+            evicted[session_id] = buffer
+        
+        if not evicted or self.redis_client is None:
+            return
+        self._spilling.update(evicted)
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for session_id, buffer in evicted.items():
+                key = self._spill_key(session_id)
+                pipe.delete(key)
+                if buffer.messages:
+                    pipe.rpush(key, *[json.dumps([m.role, m.content, m.created_at]) for m in buffer.messages])
+                    pipe.expire(key, self.spill_ttl_seconds)
+            await pipe.execute()
+            self.spilled += len(evicted)
+        except Exception as e:
+            logging.warning(f"Could not spill {len(evicted)} sessions to Redis: {e}")
+        finally:
+            for session_id, buffer in evicted.items():
+                if self._spilling.get(session_id) is buffer:
+                    del self._spilling[session_id]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self._sessions),
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+            "spilled": self.spilled,
+            "restored": self.restored,
+        }
 
 
 class LongTermMemory:
-    """Redis-based memory for cross-session persistence."""
+    """Redis-based memory for cross-session persistence.
     
-    def __init__(self, redis_client: redis.Redis, ttl_hours: int = 24):
+    Each user has a sorted set ``interactions:{user_id}`` of interaction ids
+    scored by timestamp, capped at ``max_interactions``; the payloads live in
+    ``interaction:{user_id}:{id}`` keys with the memory TTL, so recent
+    interactions are one ZREVRANGE plus one MGET.
+    """
+    
+    def __init__(self, redis_client: redis.Redis, ttl_hours: int = 24, max_interactions: int = 200):
         self.redis_client = redis_client
         self.ttl_seconds = ttl_hours * 3600
+        self.max_interactions = max_interactions
     
-    def store_interaction(self, user_id: str, session_id: str, interaction: Dict[str, Any]):
-        """Store an interaction in long-term memory."""
-        key = f"interaction:{user_id}:{session_id}:{datetime.utcnow().isoformat()}"
-        self.redis_client.setex(
-            key,
-            self.ttl_seconds,
-            json.dumps(interaction)
-        )
+    @staticmethod
+    def _index_key(user_id: str) -> str:
+        return f"interactions:{user_id}"
     
-    def get_recent_interactions(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Retrieve recent interactions for a user."""
-        pattern = f"interaction:{user_id}:*"
-        keys = self.redis_client.keys(pattern)
-        
-        # Sort by timestamp (embedded in key)
-        keys = sorted(keys, reverse=True)[:limit]
+    @staticmethod
+    def _interaction_key(user_id: str, interaction_id: str) -> str:
+        return f"interaction:{user_id}:{interaction_id}"
+    
+    async def store_interaction(self, user_id: str, session_id: str, interaction: Dict[str, Any]):
+        """Store an interaction in long-term memory."""
+        now = datetime.utcnow()
+        score = now.timestamp()
+        interaction_id = f"{session_id}:{now.isoformat()}:{uuid.uuid4().hex[:8]}"
+        index_key = self._index_key(user_id)
         
-        interactions = []
-        for key in keys:
-            data = self.redis_client.get(key)
-            if data:
-                interactions.append(json.loads(data))
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.setex(self._interaction_key(user_id, interaction_id), self.ttl_seconds, json.dumps(interaction))
+        pipe.zadd(index_key, {interaction_id: score})
+        # Drop expired entries and keep only the newest max_interactions
+        pipe.zremrangebyscore(index_key, "-inf", score - self.ttl_seconds)
+        pipe.zremrangebyrank(index_key, 0, -(self.max_interactions + 1))
+        pipe.expire(index_key, self.ttl_seconds)
+        await pipe.execute()
+    
+    async def get_recent_interactions(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Retrieve recent interactions for a user, newest first."""
+        interaction_ids = await self.redis_client.zrevrange(self._index_key(user_id), 0, limit - 1)
+        if not interaction_ids:
+            return []
         
-        return interactions
+        payloads = await self.redis_client.mget([self._interaction_key(user_id, i) for i in interaction_ids])
+        return [json.loads(data) for data in payloads if data]
     
-    def store_user_context(self, user_id: str, context: Dict[str, Any]):
+    async def store_user_context(self, user_id: str, context: Dict[str, Any]):
         """Store user-specific context."""
         key = f"context:{user_id}"
-        self.redis_client.set(key, json.dumps(context))
+        await self.redis_client.set(key, json.dumps(context))
     
-    def get_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
+    async def get_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve user context."""
-        data = self.redis_client.get(f"context:{user_id}")
+        data = await self.redis_client.get(f"context:{user_id}")
         return json.loads(data) if data else None
 
 
 class SemanticMemory:
-    """Vector database for semantic search over past interactions and knowledge."""
+    """Vector database for semantic search over past interactions and knowledge.
     
-    def __init__(self, collection_name: str = "atomia_memory"):
-        self.client = chromadb.Client()
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    With ``persist_directory`` the collection lives in an on-disk Chroma store
+    and survives restarts. Writes are buffered: ``add_memory`` only enqueues,
+    and a background flusher embeds pending documents in chunks of
+    ``batch_size`` on a worker pool every ``flush_interval_seconds`` (or as
+    soon as a full chunk is waiting), then enforces ``max_memories_per_user``
+    by dropping each user's oldest memories. Searches see a memory once its
+    batch has been flushed.
+    """
+    
+    def __init__(
+        self,
+        collection_name: str = "atomia_memory",
+        persist_directory: Optional[str] = None,
+        batch_size: int = 32,
+        flush_interval_seconds: float = 1.0,
+        max_memories_per_user: int = 1000,
+        embedding_workers: int = 2,
+        embedding_function=None,
+    ):
+        if persist_directory:
+            self.client = chromadb.PersistentClient(path=persist_directory)
+        else:
+            self.client = chromadb.Client()
+        self.embedding_function = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=self.embedding_function
+        )
         
-        # Create or get collection
-        try:
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
-        except ValueError:
-            self.collection = self.client.get_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_memories_per_user = max_memories_per_user
+        self._executor = ThreadPoolExecutor(max_workers=embedding_workers, thread_name_prefix="semantic-memory")
+        self._pending: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._user_counts: Dict[str, int] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        
+        self.flushed = 0
+        self.batches = 0
+        self.evicted = 0
+        self.embed_seconds = 0.0
     
-    def add_memory(self, content: str, metadata: Dict[str, Any], memory_id: Optional[str] = None):
-        """Add a memory to the semantic store."""
+    def add_memory(self, content: str, metadata: Dict[str, Any], memory_id: Optional[str] = None) -> str:
+        """Queue a memory for the semantic store and return its id."""
         if not memory_id:
-            memory_id = f"mem_{datetime.utcnow().timestamp()}"
+            memory_id = f"mem_{uuid.uuid4().hex}"
         
-        self.collection.add(
-            documents=[content],
-            metadatas=[metadata],
-            ids=[memory_id]
+        self._pending.append((memory_id, content, metadata))
+        self._ensure_flusher()
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return memory_id
+    
+    def _ensure_flusher(self):
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (scripts, sync callers): flush() must be called explicitly
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher = asyncio.create_task(self._flush_loop())
+    
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.warning(f"Semantic memory flush failed: {e}")
+    
+    async def flush(self):
+        """Embed and store every pending memory."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            loop = asyncio.get_running_loop()
+            chunks = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self._executor, self._write_chunk, chunk) for chunk in chunks),
+                return_exceptions=True
+            )
+            # Counters are only touched here, on the loop thread, never from the workers
+            for chunk, result in zip(chunks, results):
+                if not isinstance(result, BaseException):
+                    self.flushed += len(chunk)
+                    self.batches += 1
+                    self.embed_seconds += result
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                # Keep unwritten memories for the next flush
+                stored_ids = set(self._stored_ids([memory_id for memory_id, _, _ in pending]))
+                self._pending[:0] = [item for item in pending if item[0] not in stored_ids]
+                raise errors[0]
+            self.evicted += await loop.run_in_executor(self._executor, self._enforce_retention, pending)
+    
+    def _stored_ids(self, ids: List[str]) -> List[str]:
+        return self.collection.get(ids=ids, include=[])["ids"]
+    
+    def _write_chunk(self, chunk: List[Tuple[str, str, Dict[str, Any]]]) -> float:
+        """Embed and upsert one chunk on a worker thread; returns the embedding time."""
+        ids = [memory_id for memory_id, _, _ in chunk]
+        documents = [content for _, content, _ in chunk]
+        started = time.perf_counter()
+        embeddings = self.embedding_function(documents)
+        embed_seconds = time.perf_counter() - started
+        self.collection.upsert(
+            ids=ids,
+            documents=documents,
+            metadatas=[metadata for _, _, metadata in chunk],
+            embeddings=embeddings
         )
+        return embed_seconds
+    
+    def _enforce_retention(self, written: List[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """Drop each user's oldest memories past the limit; returns how many were evicted."""
+        evicted = 0
+        added: Dict[str, int] = {}
+        for _, _, metadata in written:
+            user_id = metadata.get("user_id")
+            if user_id is not None:
+                added[user_id] = added.get(user_id, 0) + 1
+        
+        for user_id, count in added.items():
+            if user_id in self._user_counts:
+                self._user_counts[user_id] += count
+            else:
+                self._user_counts[user_id] = len(self.collection.get(where={"user_id": user_id}, include=[])["ids"])
+            if self._user_counts[user_id] <= self.max_memories_per_user:
+                continue
+            
+            existing = self.collection.get(where={"user_id": user_id}, include=["metadatas"])
+            by_age = sorted(zip(existing["ids"], existing["metadatas"]), key=lambda item: item[1].get("timestamp", ""))
+            overflow = len(by_age) - self.max_memories_per_user
+            if overflow > 0:
+                self.collection.delete(ids=[memory_id for memory_id, _ in by_age[:overflow]])
+                evicted += overflow
+            self._user_counts[user_id] = min(len(by_age), self.max_memories_per_user)
+        return evicted
     
     def search_memories(self, query: str, n_results: int = 5, filter_dict: Optional[Dict] = None) -> List[Dict[str, Any]]:
         """Search for relevant memories."""
@@ -130,22 +408,46 @@ class SemanticMemory:
     
     def delete_memory(self, memory_id: str):
         """Delete a specific memory."""
+        self._pending = [item for item in self._pending if item[0] != memory_id]
         self.collection.delete(ids=[memory_id])
+        self._user_counts.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "evicted": self.evicted,
+            "avg_embed_ms_per_memory": round(self.embed_seconds * 1000 / self.flushed, 2) if self.flushed else 0.0,
+        }
+    
+    async def close(self):
+        """Flush pending memories and stop the background writer."""
+        if self._flusher is not None:
+            # Cancel between flushes so an in-progress batch completes
+            async with self._flush_lock:
+                self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        self._executor.shutdown(wait=True)
 
 
 class IntegratedMemorySystem:
     """Combines all memory systems for the agent."""
     
-    def __init__(self, redis_client: redis.Redis, window_size: int = 10, ttl_hours: int = 24):
-        self.short_term = ShortTermMemory(window_size)
-        self.long_term = LongTermMemory(redis_client, ttl_hours)
-        self.semantic = SemanticMemory()
+    def __init__(self, redis_client: redis.Redis, window_size: int = 10, ttl_hours: int = 24,
+                 max_interactions: int = 200, semantic_memory: Optional[SemanticMemory] = None,
+                 short_term: Optional[ShortTermMemory] = None):
+        self.short_term = short_term or ShortTermMemory(window_size)
+        self.long_term = LongTermMemory(redis_client, ttl_hours, max_interactions)
+        self.semantic = semantic_memory or SemanticMemory()
     
-    def remember_interaction(self, user_id: str, session_id: str, role: str, content: str, metadata: Optional[Dict] = None):
+    async def remember_interaction(self, user_id: str, session_id: str, role: str, content: str, metadata: Optional[Dict] = None):
         """Store interaction across all memory systems."""
-        # Add to short-term
-        self.short_term.add_message(role, content)
-        
         # Prepare interaction data
         interaction = {
             "timestamp": datetime.utcnow().isoformat(),
@@ -154,9 +456,6 @@ class IntegratedMemorySystem:
             "metadata": metadata or {}
         }
         
-        # Store in long-term
-        self.long_term.store_interaction(user_id, session_id, interaction)
-        
         # Add to semantic memory with user context
         semantic_metadata = {
             "user_id": user_id,
@@ -165,26 +464,34 @@ class IntegratedMemorySystem:
             "role": role,
             **(metadata or {})
         }
+        
+        # Semantic writes are queued and embedded in batches by the flusher
         self.semantic.add_memory(content, semantic_metadata)
+        await asyncio.gather(
+            self.short_term.add_message(session_id, role, content),
+            self.long_term.store_interaction(user_id, session_id, interaction),
+        )
     
-    def get_relevant_context(self, user_id: str, query: str, include_recent: bool = True) -> Dict[str, Any]:
+    async def get_relevant_context(self, user_id: str, query: str, include_recent: bool = True,
+                                   session_id: Optional[str] = None) -> Dict[str, Any]:
         """Get all relevant context for the current query."""
-        context = {
-            "current_conversation": [msg.content for msg in self.short_term.get_messages()],
+        lookups = {
             "user_profile": self.long_term.get_user_context(user_id),
-            "relevant_memories": [],
-            "recent_interactions": []
+            "relevant_memories": asyncio.to_thread(self.semantic.search_memories, query, filter_dict={"user_id": user_id}),
         }
-        
-        # Search semantic memories
-        semantic_results = self.semantic.search_memories(
-            query,
-            filter_dict={"user_id": user_id}
-        )
-        context["relevant_memories"] = semantic_results
-        
-        # Get recent interactions if requested
+        if session_id:
+            lookups["current_conversation"] = self.short_term.get_messages(session_id)
         if include_recent:
-            context["recent_interactions"] = self.long_term.get_recent_interactions(user_id, limit=5)
+            lookups["recent_interactions"] = self.long_term.get_recent_interactions(user_id, limit=5)
+        results = dict(zip(lookups, await asyncio.gather(*lookups.values())))
         
-        return context 
\ No newline at end of file
+        return {
+            "current_conversation": [msg.content for msg in results.get("current_conversation", [])],
+            "user_profile": results["user_profile"],
+            "relevant_memories": results["relevant_memories"],
+            "recent_interactions": results.get("recent_interactions", [])
+        }
+    
+    async def close(self):
+        """Flush buffered semantic memories."""
+        await self.semantic.close()
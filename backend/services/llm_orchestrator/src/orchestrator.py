@@ -1,18 +1,21 @@
 """Main orchestrator for the LLM agent system."""
 
-from typing import Dict, Any, Optional, List
-from azure.ai.inference import ChatCompletionsClient
-from azure.core.credentials import AzureKeyCredential
-import redis
+from typing import Dict, Any, Optional, List, AsyncIterator
+import redis.asyncio as redis
+import threading
 import logging
 import asyncio
-import functools
+import time
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 
-from .config import config
+from .config import LLMConfig, get_config
+from .llm_client import AsyncChatCompletionsClient
+from .response_cache import ResponseCache
+from .coalescing import SingleFlight, task_fingerprint
+from .scheduler import LLMScheduler, SchedulerRejected
+from .batching import MicroBatcher
 from .task_types import TaskType
-from .agents import AtomiaAgent
-from .memory import IntegratedMemorySystem
+from .service_clients import ToolBackends
 
 
 # Configurar logging estándar
@@ -20,8 +23,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 
 class AsyncAzureLLM:
-    """Wrapper for Azure ChatCompletionsClient to make it async compatible."""
-    def __init__(self, client, model_name):
+    """LangChain-style adapter over the native async chat-completions client."""
+    def __init__(self, client: AsyncChatCompletionsClient, model_name: str):
         self._client = client
         self._model_name = model_name
 
@@ -33,61 +36,289 @@ class AsyncAzureLLM:
             return "assistant"
         return role
 
-    async def ainvoke(self, messages: List[BaseMessage]):
-        # Convert LangChain messages to a list of dicts for Azure SDK
-        azure_messages = [{"role": self._map_role(msg.type), "content": msg.content} for msg in messages]
+    def _to_azure_messages(self, messages: List[BaseMessage]) -> List[Dict[str, str]]:
+        """Convert LangChain messages to chat-completions message dicts."""
+        return [{"role": self._map_role(msg.type), "content": msg.content} for msg in messages]
 
-        loop = asyncio.get_event_loop()
-        
-        func = functools.partial(
-            self._client.complete, 
-            messages=azure_messages, 
-            model=self._model_name
-        )
-        
-        response = await loop.run_in_executor(None, func)
+    async def ainvoke(self, messages: List[BaseMessage]):
+        response = await self._client.complete(messages=self._to_azure_messages(messages), model=self._model_name)
         
         # Return a LangChain AIMessage
-        return AIMessage(content=response.choices[0].message.content)
+        return AIMessage(content=response["choices"][0]["message"]["content"])
+
+    async def astream(self, messages: List[BaseMessage]) -> AsyncIterator[str]:
+        """Yield response tokens as the model generates them."""
+        async for token in self._client.stream(messages=self._to_azure_messages(messages), model=self._model_name):
+            yield token
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._client.get_stats()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# Components built by ``startup()``; each is otherwise built on first use
+STARTUP_COMPONENTS = ("llm", "response_cache", "redis", "semantic_memory", "memory", "tool_backends", "agent")
 
 
 class LLMOrchestrator:
-    """Orchestrates LLM agents for educational tasks."""
+    """Orchestrates LLM agents for educational tasks.
     
-    def __init__(self):
-        # Initialize LLM using the native Azure AI SDK
-        sync_client = ChatCompletionsClient(
-            endpoint=config.azure_ai_endpoint,
-            credential=AzureKeyCredential(config.azure_ai_key),
+    Construction is cheap: the LLM client, Redis pool, memory stores, tool
+    clients and agent graph are built lazily, either all at once (in
+    parallel) by ``startup()`` or individually the first time they are used.
+    """
+    
+    def __init__(self, settings: Optional[LLMConfig] = None):
+        self.config = settings or get_config()
+        self.model_name = self.config.azure_ai_model
+        self.startup_timings: Dict[str, float] = {}
+        self._components: Dict[str, Any] = {}
+        self._build_locks = {name: threading.Lock() for name in STARTUP_COMPONENTS}
+        self._startup_lock = asyncio.Lock()
+        self._started = False
+        
+        # Identical concurrent tasks share one in-flight generation
+        self.single_flight = SingleFlight()
+        
+        # Priority lanes so bulk work cannot starve live student requests
+        self.scheduler = LLMScheduler(
+            max_concurrency=self.config.scheduler_max_concurrency,
+            per_user_limit=self.config.scheduler_per_user_limit,
+            lane_weights=self.config.scheduler_lane_weights,
+            shed_on_deadline=self.config.scheduler_shed_on_deadline,
         )
-        self.llm = AsyncAzureLLM(sync_client, config.azure_ai_model)
         
-        # Initialize Redis
-        self.redis_client = redis.Redis(
-            host=config.redis_host,
-            port=config.redis_port,
-            db=config.redis_db,
+        # Short evaluation / question-generation tasks share one LLM call
+        self.batcher = None
+        if self.config.llm_batch_enabled:
+            self.batcher = MicroBatcher(
+                complete=self._complete_batch,
+                fallback=self._run_agent,
+                window_ms=self.config.llm_batch_window_ms,
+                max_batch_size=self.config.llm_batch_max_size,
+                max_item_chars=self.config.llm_batch_max_item_chars,
+            )
+    
+    def _component(self, name: str) -> Any:
+        """Return a component, building it (once, thread-safely) if needed."""
+        if name not in self._components:
+            with self._build_locks[name]:
+                if name not in self._components:
+                    started = time.perf_counter()
+                    self._components[name] = getattr(self, f"_build_{name}")()
+                    self.startup_timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        return self._components[name]
+    
+    @property
+    def llm(self) -> "AsyncAzureLLM":
+        return self._component("llm")
+    
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        return self._component("response_cache")
+    
+    @property
+    def redis_client(self) -> redis.Redis:
+        return self._component("redis")
+    
+    @property
+    def redis_pool(self) -> redis.ConnectionPool:
+        return self.redis_client.connection_pool
+    
+    @property
+    def memory(self):
+        return self._component("memory")
+    
+    @property
+    def tool_backends(self) -> ToolBackends:
+        return self._component("tool_backends")
+    
+    @property
+    def agent(self):
+        return self._component("agent")
+    
+    def _build_llm(self) -> "AsyncAzureLLM":
+        # LLM with a pooled native async HTTP client
+        llm_client = AsyncChatCompletionsClient(
+            endpoint=self.config.azure_ai_endpoint,
+            api_key=self.config.azure_ai_key,
+            api_version=self.config.azure_ai_api_version,
+            max_in_flight=self.config.llm_max_in_flight,
+            max_connections=self.config.llm_max_connections,
+            http2=self.config.llm_http2,
+            timeout_seconds=self.config.timeout_seconds,
+            max_retries=self.config.max_retries,
+            backoff_base_seconds=self.config.llm_backoff_base_seconds,
+            backoff_max_seconds=self.config.llm_backoff_max_seconds,
+        )
+        return AsyncAzureLLM(llm_client, self.config.azure_ai_model)
+    
+    def _build_response_cache(self) -> Optional[ResponseCache]:
+        # Exact tier, optional semantic tier
+        if not self.config.llm_cache_enabled:
+            return None
+        embedding_function = None
+        if self.config.llm_cache_semantic_enabled:
+            from chromadb.utils import embedding_functions
+            embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return ResponseCache(
+            max_bytes=self.config.llm_cache_max_mb * 1024 * 1024,
+            ttl_by_task={TaskType(name): ttl for name, ttl in self.config.llm_cache_ttl_seconds.items()},
+            embedding_function=embedding_function,
+            similarity_threshold=self.config.llm_cache_similarity_threshold,
+            cost_per_1k_tokens=self.config.llm_cost_per_1k_tokens,
+        )
+    
+    def _build_redis(self) -> redis.Redis:
+        # Async client over a shared connection pool (connects on first command)
+        pool = redis.ConnectionPool(
+            host=self.config.redis_host,
+            port=self.config.redis_port,
+            db=self.config.redis_db,
+            max_connections=self.config.redis_max_connections,
             decode_responses=True
         )
-        
-        # Initialize memory system
-        self.memory = IntegratedMemorySystem(
+        return redis.Redis(connection_pool=pool)
+    
+    def _build_semantic_memory(self):
+        from .memory import SemanticMemory
+        return SemanticMemory(
+            persist_directory=self.config.semantic_memory_path or None,
+            batch_size=self.config.semantic_memory_batch_size,
+            flush_interval_seconds=self.config.semantic_memory_flush_seconds,
+            max_memories_per_user=self.config.semantic_memory_max_per_user,
+            embedding_workers=self.config.semantic_memory_workers,
+        )
+    
+    def _build_memory(self):
+        from .memory import IntegratedMemorySystem, ShortTermMemory
+        return IntegratedMemorySystem(
             redis_client=self.redis_client,
-            window_size=config.memory_window_size,
-            ttl_hours=config.cache_ttl_hours
+            window_size=self.config.memory_window_size,
+            ttl_hours=self.config.cache_ttl_hours,
+            max_interactions=self.config.memory_max_interactions,
+            short_term=ShortTermMemory(
+                window_size=self.config.memory_window_size,
+                max_sessions=self.config.short_term_max_sessions,
+                idle_ttl_seconds=self.config.short_term_idle_ttl_seconds,
+                redis_client=self.redis_client if self.config.short_term_spill_to_redis else None,
+                spill_ttl_seconds=self.config.cache_ttl_hours * 3600,
+            ),
+            semantic_memory=self._component("semantic_memory"),
         )
-        
-        # Initialize agent
-        self.agent = AtomiaAgent(
+    
+    def _build_tool_backends(self) -> ToolBackends:
+        # Live service data for the agent tools
+        from .tools import configure_tool_backends
+        backends = ToolBackends(
+            atomization_url=self.config.atomization_service_url,
+            evaluation_url=self.config.evaluation_service_url,
+            planning_url=self.config.planning_service_url,
+            questions_url=self.config.questions_service_url,
+            timeout_seconds=self.config.tool_service_timeout_seconds,
+            failure_threshold=self.config.tool_circuit_failure_threshold,
+            reset_timeout_seconds=self.config.tool_circuit_reset_seconds,
+        )
+        configure_tool_backends(backends)
+        return backends
+    
+    def _build_agent(self):
+        # Imported here: langgraph dominates the module import time
+        from .agents import AtomiaAgent
+        return AtomiaAgent(
             llm=self.llm,
             memory_system=self.memory,
             config={
-                "max_iterations": config.max_iterations,
-                "enable_reflection": config.enable_reflection,
-                "max_retries": config.max_retries
+                "max_iterations": self.config.max_iterations,
+                "enable_reflection": self.config.enable_reflection,
+                "max_retries": self.config.max_retries,
+                "enable_tools": self.config.enable_tools,
+                "max_prompt_tokens": self.config.max_prompt_tokens,
+                "max_observation_tokens": self.config.max_observation_tokens,
+                "tool_timeout_seconds": self.config.tool_timeout_seconds
             }
         )
     
+    async def startup(self):
+        """Build all components concurrently and check Redis, logging how long each step took."""
+        async with self._startup_lock:
+            if self._started:
+                return
+            started = time.perf_counter()
+            await asyncio.gather(*(asyncio.to_thread(self._component, name) for name in STARTUP_COMPONENTS))
+            
+            ping_started = time.perf_counter()
+            try:
+                await self.redis_client.ping()
+            except Exception as e:
+                logging.warning(f"Redis not reachable at startup: {e}")
+            self.startup_timings["redis_ping"] = round((time.perf_counter() - ping_started) * 1000, 1)
+            self.startup_timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+            self._started = True
+            
+            breakdown = ", ".join(f"{name}={ms:.0f}ms" for name, ms in self.startup_timings.items() if name != "total")
+            logging.info(f"Orchestrator started in {self.startup_timings['total']:.0f}ms ({breakdown})")
+    
+    async def _cached_response(self, task_type: TaskType, user_input: str) -> Optional[str]:
+        """Look up a previous response for an equivalent prompt."""
+        if self.response_cache is None:
+            return None
+        try:
+            return await self.response_cache.get(user_input, self.model_name, task_type)
+        except Exception as e:
+            logging.warning(f"Response cache lookup failed: {e}")
+            return None
+    
+    async def _store_response(self, task_type: TaskType, user_input: str, response: str):
+        """Store a successful response in the cache."""
+        if self.response_cache is None:
+            return
+        try:
+            await self.response_cache.put(user_input, self.model_name, task_type, response)
+        except Exception as e:
+            logging.warning(f"Response cache store failed: {e}")
+    
+    async def _run_agent(self, task_type: TaskType, user_input: str, user_id: str) -> str:
+        """Run the agent once and return its final answer."""
+        async with self.scheduler.slot(task_type, user_id):
+            response = await self.agent.process(messages=[HumanMessage(content=user_input)])
+        return response['messages'][-1].content
+    
+    async def _complete_batch(self, task_type: TaskType, prompt: str) -> str:
+        """Send a combined micro-batch prompt straight to the LLM."""
+        async with self.scheduler.slot(task_type, f"micro-batch:{task_type.value}"):
+            response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+        return response.content
+    
+    async def _generate(self, task_type: TaskType, user_input: str, user_id: str) -> str:
+        """Generate an answer, micro-batched when the task allows it, and cache it."""
+        if self.batcher is not None and self.batcher.accepts(task_type, user_input):
+            final_content = await self.batcher.submit(task_type, user_input, user_id)
+        else:
+            final_content = await self._run_agent(task_type, user_input, user_id)
+        await self._store_response(task_type, user_input, final_content)
+        return final_content
+    
+    async def _generate_stream(self, task_type: TaskType, user_input: str, user_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the agent once, caching its final answer."""
+        if self.batcher is not None and self.batcher.accepts(task_type, user_input):
+            # Short batchable tasks trade token streaming for a shared call
+            final_content = await self._generate(task_type, user_input, user_id)
+            yield {"type": "token", "content": final_content}
+            yield {"type": "final", "content": final_content}
+            return
+        
+        async with self.scheduler.slot(task_type, user_id):
+            async for event in self.agent.stream(messages=[HumanMessage(content=user_input)]):
+                if event["type"] == "token":
+                    yield event
+                else:
+                    final_content = event["messages"][-1].content
+                    await self._store_response(task_type, user_input, final_content)
+                    yield {"type": "final", "content": final_content}
+    
     async def process(
         self,
         task_type: TaskType,
@@ -99,35 +330,113 @@ class LLMOrchestrator:
         """Process a user request through the appropriate agent."""
         try:
             logging.info(f"Processing orchestrator request for user {user_id}")
-            agent_input = {"messages": [HumanMessage(content=user_input)]}
-            response = await self.agent.process(messages=agent_input["messages"])
-            final_content = response['messages'][-1].content
+            cached = await self._cached_response(task_type, user_input)
+            if cached is not None:
+                return {"success": True, "response": cached, "task_type": task_type.value, "metadata": {**(metadata or {}), "cache_hit": True}}
+            
+            key = task_fingerprint(task_type, self.model_name, user_input)
+            final_content = await self.single_flight.do(key, lambda: self._generate(task_type, user_input, user_id))
             return {"success": True, "response": final_content, "task_type": task_type.value, "metadata": metadata or {}}
+        except SchedulerRejected:
+            raise
         except Exception as e:
             error_str = str(e)
             logging.error(f"Orchestrator error for user {user_id}: {error_str}")
             return {"success": False, "error": error_str, "response": "I encountered an error processing your request.", "task_type": task_type.value, "metadata": {}}
     
+    async def process_stream(
+        self,
+        task_type: TaskType,
+        user_input: str,
+        user_id: str,
+        session_id: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Process a user request, yielding token events before the final result."""
+        try:
+            logging.info(f"Streaming orchestrator request for user {user_id}")
+            cached = await self._cached_response(task_type, user_input)
+            if cached is not None:
+                yield {"type": "token", "content": cached}
+                yield {"type": "final", "success": True, "response": cached, "task_type": task_type.value, "metadata": {**(metadata or {}), "cache_hit": True}}
+                return
+            
+            key = task_fingerprint(task_type, self.model_name, user_input)
+            async for event in self.single_flight.stream(key, lambda: self._generate_stream(task_type, user_input, user_id)):
+                if event["type"] == "token":
+                    yield event
+                else:
+                    yield {"type": "final", "success": True, "response": event["content"], "task_type": task_type.value, "metadata": metadata or {}}
+        except Exception as e:
+            error_str = str(e)
+            logging.error(f"Orchestrator stream error for user {user_id}: {error_str}")
+            yield {"type": "final", "success": False, "error": error_str, "response": "I encountered an error processing your request.", "task_type": task_type.value, "metadata": {}}
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Operational counters for the orchestrator components."""
+        return {
+            "llm_client": self.llm.get_stats(),
+            "agent": self.agent.get_stats(),
+            "tool_backends": self.tool_backends.get_stats(),
+            "response_cache": self.response_cache.get_stats() if self.response_cache else None,
+            "coalescing": self.single_flight.get_stats(),
+            "scheduler": self.scheduler.get_stats(),
+            "batching": self.batcher.get_stats() if self.batcher else None,
+            "short_term_memory": self.memory.short_term.get_stats(),
+            "semantic_memory": self.memory.semantic.get_stats(),
+            "startup_ms": self.startup_timings,
+        }
+    
     async def get_user_context(self, user_id: str) -> Dict[str, Any]:
         """Get the current context for a user."""
-        return self.memory.long_term.get_user_context(user_id) or {}
+        return await self.memory.long_term.get_user_context(user_id) or {}
     
     async def update_user_context(self, user_id: str, context: Dict[str, Any]):
         """Update user context."""
-        self.memory.long_term.store_user_context(user_id, context)
+        await self.memory.long_term.store_user_context(user_id, context)
     
-    def clear_session(self, session_id: str):
+    async def clear_session(self, session_id: str):
         """Clear a specific session's short-term memory."""
-        self.memory.short_term.clear()
+        await self.memory.short_term.clear(session_id)
+    
+    async def close(self):
+        """Release pooled connections held by the components that were built."""
+        built = self._components
+        if built.get("llm") is not None:
+            await self.llm.aclose()
+        if built.get("tool_backends") is not None:
+            await self.tool_backends.aclose()
+        if built.get("memory") is not None:
+            await self.memory.close()
+        elif built.get("semantic_memory") is not None:
+            await built["semantic_memory"].close()
+        if built.get("redis") is not None:
+            await self.redis_client.aclose()
+            await self.redis_pool.aclose()
     
     async def search_memories(self, user_id: str, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search semantic memories for a user."""
-        return self.memory.semantic.search_memories(
+        return await asyncio.to_thread(
+            self.memory.semantic.search_memories,
             query=query,
             n_results=limit,
             filter_dict={"user_id": user_id}
         )
 
 
-# Global orchestrator instance
-orchestrator = LLMOrchestrator() 
\ No newline at end of file
+_orchestrator: Optional[LLMOrchestrator] = None
+
+
+def get_orchestrator() -> LLMOrchestrator:
+    """Process-wide orchestrator, created on first use."""
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = LLMOrchestrator()
+    return _orchestrator
+
+
+def __getattr__(name: str):
+    # Keeps ``from .orchestrator import orchestrator`` working without building it on import
+    if name == "orchestrator":
+        return get_orchestrator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
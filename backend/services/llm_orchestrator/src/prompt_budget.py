@@ -0,0 +1,143 @@
+"""Token budgeting and compaction of agent prompts."""
+
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from .response_cache import estimate_tokens
+
+
+OBSERVATION_NAME = "tool_observation"
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators added per chat message
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=1)
+def _get_encoder():
+    """tiktoken encoder when available, otherwise None (character estimate)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+# LRU of token counts keyed by a 16-byte digest, so it never keeps the texts
+# (tool observations, history) alive: its size is bounded in bytes, not just entries
+_token_counts: "OrderedDict[bytes, int]" = OrderedDict()
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in ``text``; cached because history is re-counted every iteration."""
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    count = _token_counts.pop(key, None)
+    if count is None:
+        encoder = _get_encoder()
+        count = estimate_tokens(text) if encoder is None else len(encoder.encode(text, disallowed_special=()))
+    _token_counts[key] = count
+    if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+        _token_counts.popitem(last=False)
+    return count
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return count_tokens(str(message.content)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def is_observation(message: BaseMessage) -> bool:
+    return message.type == "tool" or getattr(message, "name", None) == OBSERVATION_NAME
+
+
+class PromptBudget:
+    """Keeps the agent history under ``max_prompt_tokens``.
+
+    Compaction runs in order of increasing information loss and stops as soon
+    as the prompt fits: repeated tool outputs are replaced by a back
+    reference, observations older than the last ``keep_recent_observations``
+    are truncated to ``max_observation_tokens``, and finally the oldest
+    messages after the user request are folded into a one-line-per-message
+    summary. The first and the last message are always kept verbatim.
+    """
+
+    def __init__(self, max_prompt_tokens: int = 6000, keep_recent_observations: int = 2,
+                 max_observation_tokens: int = 400, summary_chars_per_message: int = 160):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.keep_recent_observations = keep_recent_observations
+        self.max_observation_tokens = max_observation_tokens
+        self.summary_chars_per_message = summary_chars_per_message
+
+    def compact(self, messages: List[BaseMessage], reserved_tokens: int = 0) -> Tuple[List[BaseMessage], Dict[str, int]]:
+        """Return the messages to send and a usage report.
+
+        ``reserved_tokens`` accounts for a prefix (system prompt) sent ahead of
+        the history.
+        """
+        budget = self.max_prompt_tokens - reserved_tokens
+        original_tokens = sum(message_tokens(message) for message in messages)
+        usage = {
+            "original_tokens": original_tokens + reserved_tokens,
+            "deduplicated": 0,
+            "truncated": 0,
+            "summarized": 0,
+        }
+
+        compacted = self._dedupe_observations(messages, usage)
+        tokens = sum(message_tokens(message) for message in compacted)
+        if tokens > budget:
+            compacted = self._truncate_old_observations(compacted, usage)
+            tokens = sum(message_tokens(message) for message in compacted)
+        if tokens > budget:
+            compacted = self._summarize_oldest(compacted, budget, usage)
+            tokens = sum(message_tokens(message) for message in compacted)
+
+        usage["prompt_tokens"] = tokens + reserved_tokens
+        return compacted, usage
+
+    def _dedupe_observations(self, messages: List[BaseMessage], usage: Dict[str, int]) -> List[BaseMessage]:
+        seen: Dict[str, int] = {}
+        result = []
+        for message in messages:
+            if is_observation(message):
+                digest = hashlib.sha1(str(message.content).encode("utf-8")).hexdigest()
+                if digest in seen:
+                    usage["deduplicated"] += 1
+                    message = message.model_copy(update={"content": f"[Same result as observation #{seen[digest]}]"})
+                else:
+                    seen[digest] = len(seen) + 1
+            result.append(message)
+        return result
+
+    def _truncate_old_observations(self, messages: List[BaseMessage], usage: Dict[str, int]) -> List[BaseMessage]:
+        observation_positions = [i for i, message in enumerate(messages) if is_observation(message)]
+        old = set(observation_positions[:-self.keep_recent_observations] if self.keep_recent_observations else observation_positions)
+        limit_chars = self.max_observation_tokens * 4
+
+        result = []
+        for i, message in enumerate(messages):
+            content = str(message.content)
+            if i in old and count_tokens(content) > self.max_observation_tokens:
+                usage["truncated"] += 1
+                message = message.model_copy(update={"content": f"{content[:limit_chars]}\n[... truncated]"})
+            result.append(message)
+        return result
+
+    def _summarize_oldest(self, messages: List[BaseMessage], budget: int, usage: Dict[str, int]) -> List[BaseMessage]:
+        if len(messages) <= 2:
+            return messages
+        head, middle, tail = messages[0], list(messages[1:-1]), messages[-1]
+        fixed = message_tokens(head) + message_tokens(tail)
+
+        summarized: List[BaseMessage] = []
+        summary: Optional[HumanMessage] = None
+        while middle:
+            summarized.append(middle.pop(0))
+            lines = [f"- {message.type}: {str(message.content)[:self.summary_chars_per_message]}" for message in summarized]
+            summary = HumanMessage(content="Earlier steps (summarized):\n" + "\n".join(lines))
+            if fixed + message_tokens(summary) + sum(message_tokens(message) for message in middle) <= budget:
+                break
+
+        usage["summarized"] = len(summarized)
+        return [head, summary, *middle, tail]
@@ -0,0 +1,293 @@
+"""Response cache for LLM calls with exact and semantic lookup tiers."""
+
+from typing import Dict, Any, Optional, Callable, List, Iterable
+from collections import OrderedDict
+import unicodedata
+import hashlib
+import asyncio
+import time
+import re
+
+import numpy as np
+
+from .task_types import TaskType
+
+# Seconds to keep a response per task type; 0 disables caching for that type.
+# Conversational and progress tasks depend on live user state, so they are
+# never served from cache.
+DEFAULT_TTL_BY_TASK: Dict[TaskType, int] = {
+    TaskType.ATOMIZATION: 7 * 24 * 3600,
+    TaskType.CONTENT_EXPLANATION: 24 * 3600,
+    TaskType.CONTENT_SUMMARIZATION: 7 * 24 * 3600,
+    TaskType.QUESTION_GENERATION: 24 * 3600,
+    TaskType.ANSWER_EVALUATION: 24 * 3600,
+    TaskType.FEEDBACK_GENERATION: 3600,
+    TaskType.LEARNING_PLANNING: 600,
+    TaskType.DIFFICULTY_ADJUSTMENT: 600,
+    TaskType.CONCEPT_CLARIFICATION: 3600,
+    TaskType.PROGRESS_ANALYSIS: 0,
+    TaskType.TUTORING_DIALOGUE: 0,
+    TaskType.MOTIVATION_MESSAGE: 0,
+    TaskType.TASK_PLANNING: 0,
+    TaskType.SELF_REFLECTION: 0,
+    TaskType.ERROR_RECOVERY: 0,
+}
+
+# Task types where a near-duplicate prompt may safely reuse a response.
+# Evaluation is excluded: two similar answers can deserve different grades.
+DEFAULT_SEMANTIC_TASKS = (
+    TaskType.ATOMIZATION,
+    TaskType.CONTENT_EXPLANATION,
+    TaskType.CONTENT_SUMMARIZATION,
+    TaskType.QUESTION_GENERATION,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a prompt used for exact-match keys."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", prompt)).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class _CacheEntry:
+    __slots__ = ("task_type", "model", "response", "size", "expires_at", "embedding", "tokens")
+
+    def __init__(self, task_type: TaskType, model: str, response: str, size: int,
+                 expires_at: float, embedding: Optional[np.ndarray], tokens: int):
+        self.task_type = task_type
+        self.model = model
+        self.response = response
+        self.size = size
+        self.expires_at = expires_at
+        self.embedding = embedding
+        self.tokens = tokens
+
+
+class _EmbeddingIndex:
+    """Unit embeddings of one (task type, model) pair as rows of a growable matrix.
+
+    Rows are added on put and removed by swapping in the last row, so a lookup
+    is a single matrix-vector product over the live rows.
+    """
+
+    __slots__ = ("matrix", "expires_at", "keys", "rows")
+
+    def __init__(self, dimensions: int, capacity: int = 16):
+        self.matrix = np.empty((capacity, dimensions), dtype=np.float32)
+        self.expires_at = np.empty(capacity, dtype=np.float64)
+        self.keys: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, embedding: np.ndarray, expires_at: float) -> None:
+        row = len(self.keys)
+        if row == len(self.matrix):
+            self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+            self.expires_at = np.concatenate([self.expires_at, np.empty_like(self.expires_at)])
+        self.matrix[row] = embedding
+        self.expires_at[row] = expires_at
+        self.keys.append(key)
+        self.rows[key] = row
+
+    def discard(self, key: str) -> None:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.matrix[row] = self.matrix[last]
+            self.expires_at[row] = self.expires_at[last]
+            self.keys[row] = moved
+            self.rows[moved] = row
+        self.keys.pop()
+
+    def has_live(self, now: float) -> bool:
+        return bool((self.expires_at[:len(self.keys)] > now).any())
+
+    def best(self, query: np.ndarray, now: float) -> tuple[Optional[str], float]:
+        """Key and cosine similarity of the closest unexpired row."""
+        count = len(self.keys)
+        similarities = self.matrix[:count] @ query
+        similarities[self.expires_at[:count] <= now] = -np.inf
+        best = int(np.argmax(similarities)) if count else 0
+        if not count or not np.isfinite(similarities[best]):
+            return None, float("-inf")
+        return self.keys[best], float(similarities[best])
+
+
+class ResponseCache:
+    """Byte-bounded LRU cache of LLM responses.
+
+    The exact tier keys on the normalized prompt, model and task type. The
+    optional semantic tier embeds the prompt and returns the most similar
+    cached response of the same model and task type when the cosine
+    similarity reaches ``similarity_threshold``.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_by_task: Optional[Dict[TaskType, int]] = None,
+        embedding_function: Optional[Callable[[List[str]], Any]] = None,
+        similarity_threshold: float = 0.97,
+        semantic_task_types: Iterable[TaskType] = DEFAULT_SEMANTIC_TASKS,
+        cost_per_1k_tokens: float = 0.0,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_by_task = {**DEFAULT_TTL_BY_TASK, **(ttl_by_task or {})}
+        self.embedding_function = embedding_function
+        self.similarity_threshold = similarity_threshold
+        self.semantic_task_types = set(semantic_task_types)
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # Semantic tier: one embedding matrix per (task type, model), kept in step with _entries
+        self._indexes: Dict[tuple, _EmbeddingIndex] = {}
+        self.current_bytes = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def make_key(prompt: str, model: str, task_type: TaskType) -> str:
+        material = "\x1f".join((task_type.value, model, normalize_prompt(prompt)))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, task_type: TaskType) -> int:
+        return self.ttl_by_task.get(task_type, 0)
+
+    def _uses_semantic_tier(self, task_type: TaskType) -> bool:
+        return self.embedding_function is not None and task_type in self.semantic_task_types
+
+    async def _embed(self, prompt: str) -> np.ndarray:
+        """Compute a unit-normalized embedding off the event loop."""
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(None, self.embedding_function, [normalize_prompt(prompt)])
+        vector = np.asarray(vectors[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def get(self, prompt: str, model: str, task_type: TaskType) -> Optional[str]:
+        """Return a cached response or None."""
+        if self.ttl_for(task_type) <= 0:
+            return None
+
+        now = time.time()
+        key = self.make_key(prompt, model, task_type)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                self.tokens_saved += entry.tokens
+                return entry.response
+            self._remove(key)
+
+        if self._uses_semantic_tier(task_type):
+            match = await self._semantic_lookup(prompt, model, task_type, now)
+            if match is not None:
+                self.semantic_hits += 1
+                self.tokens_saved += match.tokens
+                return match.response
+
+        self.misses += 1
+        return None
+
+    async def _semantic_lookup(self, prompt: str, model: str, task_type: TaskType, now: float) -> Optional[_CacheEntry]:
+        index = self._indexes.get((task_type, model))
+        if index is None or not index.has_live(now):
+            return None
+
+        query = await self._embed(prompt)
+        # Entries may have been evicted while the prompt was being embedded
+        index = self._indexes.get((task_type, model))
+        if index is None:
+            return None
+        key, similarity = index.best(query, now)
+        if key is None or similarity < self.similarity_threshold:
+            return None
+
+        entry = self._entries[key]
+        self._entries.move_to_end(key)
+        return entry
+
+    async def put(self, prompt: str, model: str, task_type: TaskType, response: str) -> None:
+        """Store a response, evicting least recently used entries past the byte bound."""
+        ttl = self.ttl_for(task_type)
+        if ttl <= 0 or not response:
+            return
+
+        embedding = await self._embed(prompt) if self._uses_semantic_tier(task_type) else None
+        key = self.make_key(prompt, model, task_type)
+        size = len(key) + len(response.encode("utf-8")) + (embedding.nbytes if embedding is not None else 0)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        entry = _CacheEntry(
+            task_type=task_type,
+            model=model,
+            response=response,
+            size=size,
+            expires_at=time.time() + ttl,
+            embedding=embedding,
+            tokens=estimate_tokens(prompt) + estimate_tokens(response),
+        )
+        self._entries[key] = entry
+        self.current_bytes += size
+        if embedding is not None:
+            index = self._indexes.get((task_type, model))
+            if index is None:
+                index = self._indexes[(task_type, model)] = _EmbeddingIndex(len(embedding))
+            index.add(key, embedding, entry.expires_at)
+
+        while self.current_bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.current_bytes -= entry.size
+        if entry.embedding is not None:
+            index_key = (entry.task_type, entry.model)
+            index = self._indexes.get(index_key)
+            if index is not None:
+                index.discard(key)
+                if not index:
+                    del self._indexes[index_key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._indexes.clear()
+        self.current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the estimated cost avoided by cache hits."""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "tokens_saved": self.tokens_saved,
+            "estimated_cost_saved": round(self.tokens_saved / 1000 * self.cost_per_1k_tokens, 6),
+        }
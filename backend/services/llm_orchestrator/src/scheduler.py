@@ -0,0 +1,242 @@
+"""Priority-aware admission of agent work to the LLM."""
+
+from typing import Dict, Any, Optional, Deque, AsyncIterator
+from contextlib import asynccontextmanager
+from collections import deque, defaultdict
+import logging
+import asyncio
+import time
+
+from .task_types import TaskType
+
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE_LANE = "interactive"
+STANDARD_LANE = "standard"
+BULK_LANE = "bulk"
+
+# Lane for every task type: live student interactions first, bulk imports last
+TASK_LANES: Dict[TaskType, str] = {
+    TaskType.ANSWER_EVALUATION: INTERACTIVE_LANE,
+    TaskType.FEEDBACK_GENERATION: INTERACTIVE_LANE,
+    TaskType.TUTORING_DIALOGUE: INTERACTIVE_LANE,
+    TaskType.CONCEPT_CLARIFICATION: INTERACTIVE_LANE,
+    TaskType.MOTIVATION_MESSAGE: INTERACTIVE_LANE,
+    TaskType.QUESTION_GENERATION: STANDARD_LANE,
+    TaskType.CONTENT_EXPLANATION: STANDARD_LANE,
+    TaskType.LEARNING_PLANNING: STANDARD_LANE,
+    TaskType.PROGRESS_ANALYSIS: STANDARD_LANE,
+    TaskType.DIFFICULTY_ADJUSTMENT: STANDARD_LANE,
+    TaskType.TASK_PLANNING: STANDARD_LANE,
+    TaskType.SELF_REFLECTION: STANDARD_LANE,
+    TaskType.ERROR_RECOVERY: STANDARD_LANE,
+    TaskType.ATOMIZATION: BULK_LANE,
+    TaskType.CONTENT_SUMMARIZATION: BULK_LANE,
+}
+
+DEFAULT_LANE_WEIGHTS = {INTERACTIVE_LANE: 8.0, STANDARD_LANE: 3.0, BULK_LANE: 1.0}
+
+# Seconds a request may wait for a slot; None waits indefinitely
+DEFAULT_LANE_DEADLINES: Dict[str, Optional[float]] = {
+    INTERACTIVE_LANE: 30.0,
+    STANDARD_LANE: 120.0,
+    BULK_LANE: None,
+}
+
+_WAIT_SAMPLES = 512
+
+
+class SchedulerRejected(Exception):
+    """Raised when a request cannot be admitted before its deadline."""
+
+    def __init__(self, message: str, retry_after_seconds: float = 1.0):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class _Ticket:
+    __slots__ = ("lane", "user_id", "tag", "enqueued_at", "deadline", "future")
+
+    def __init__(self, lane: str, user_id: str, tag: float, deadline: Optional[float]):
+        self.lane = lane
+        self.user_id = user_id
+        self.tag = tag
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class _Lane:
+    __slots__ = ("name", "weight", "queue", "last_tag", "active", "admitted", "shed",
+                 "waits", "service_time")
+
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        self.queue: Deque[_Ticket] = deque()
+        self.last_tag = 0.0
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self.waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.service_time = 5.0  # EWMA seconds, seeded with a typical LLM call
+
+
+class LLMScheduler:
+    """Weighted fair queuing over TaskType lanes with per-user caps.
+
+    Each queued request gets a virtual finish tag ``max(now_v, lane_last) +
+    1 / weight``; the eligible request with the smallest tag is dispatched
+    next, so a lane with weight 8 gets eight slots for every one the bulk
+    lane gets while both have work queued. With ``shed_on_deadline`` a
+    request whose estimated wait exceeds its deadline is rejected at
+    admission, and one still queued at its deadline is rejected then.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        per_user_limit: int = 4,
+        lane_weights: Optional[Dict[str, float]] = None,
+        lane_deadlines: Optional[Dict[str, Optional[float]]] = None,
+        shed_on_deadline: bool = True,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_user_limit = per_user_limit
+        self.lane_deadlines = {**DEFAULT_LANE_DEADLINES, **(lane_deadlines or {})}
+        self.shed_on_deadline = shed_on_deadline
+        weights = {**DEFAULT_LANE_WEIGHTS, **(lane_weights or {})}
+        self._lanes = {name: _Lane(name, weight) for name, weight in weights.items()}
+        self._active = 0
+        self._active_by_user: Dict[str, int] = defaultdict(int)
+        self._virtual_time = 0.0
+
+    @staticmethod
+    def lane_for(task_type: TaskType) -> str:
+        return TASK_LANES.get(task_type, STANDARD_LANE)
+
+    def estimated_wait(self, lane_name: str) -> float:
+        """Rough wait for a new request in ``lane_name``, in seconds."""
+        lane = self._lanes[lane_name]
+        if self._active < self.max_concurrency and not lane.queue:
+            return 0.0
+        # Work served ahead of us: our own lane plus other lanes' share by weight
+        total_weight = sum(other.weight for other in self._lanes.values() if other.queue or other is lane)
+        share = lane.weight / total_weight if total_weight else 1.0
+        return (len(lane.queue) + 1) * lane.service_time / (self.max_concurrency * share)
+
+    @asynccontextmanager
+    async def slot(self, task_type: TaskType, user_id: str,
+                   deadline_seconds: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one LLM slot for the duration of the block."""
+        ticket = await self.acquire(task_type, user_id, deadline_seconds)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(ticket, time.monotonic() - started)
+
+    async def acquire(self, task_type: TaskType, user_id: str,
+                      deadline_seconds: Optional[float] = None) -> _Ticket:
+        lane = self._lanes[self.lane_for(task_type)]
+        if deadline_seconds is None:
+            deadline_seconds = self.lane_deadlines.get(lane.name)
+
+        if self.shed_on_deadline and deadline_seconds is not None:
+            estimate = self.estimated_wait(lane.name)
+            if estimate > deadline_seconds:
+                lane.shed += 1
+                logger.warning(f"Shedding {task_type.value} request for user {user_id}: estimated wait {estimate:.1f}s")
+                raise SchedulerRejected(
+                    f"{lane.name} lane saturated (estimated wait {estimate:.1f}s)",
+                    retry_after_seconds=estimate,
+                )
+
+        tag = max(self._virtual_time, lane.last_tag) + 1.0 / lane.weight
+        lane.last_tag = tag
+        ticket = _Ticket(lane.name, user_id, tag, deadline_seconds)
+        lane.queue.append(ticket)
+        self._dispatch()
+
+        try:
+            timeout = deadline_seconds if self.shed_on_deadline else None
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            if self._withdraw(ticket):
+                lane.shed += 1
+                logger.warning(f"Shedding {task_type.value} request for user {user_id}: deadline exceeded")
+                raise SchedulerRejected(f"{lane.name} lane deadline exceeded after {deadline_seconds:.1f}s")
+            # Granted at the same instant the deadline expired: keep the slot
+        except asyncio.CancelledError:
+            if not self._withdraw(ticket):
+                self.release(ticket, None)
+            raise
+
+        lane.waits.append(time.monotonic() - ticket.enqueued_at)
+        return ticket
+
+    def release(self, ticket: _Ticket, service_seconds: Optional[float]):
+        lane = self._lanes[ticket.lane]
+        lane.active -= 1
+        self._active -= 1
+        self._active_by_user[ticket.user_id] -= 1
+        if self._active_by_user[ticket.user_id] <= 0:
+            del self._active_by_user[ticket.user_id]
+        if service_seconds is not None:
+            lane.service_time = 0.8 * lane.service_time + 0.2 * service_seconds
+        self._dispatch()
+
+    def _withdraw(self, ticket: _Ticket) -> bool:
+        """Remove a still-queued ticket; False if it was already granted."""
+        if ticket.future.done():
+            return False
+        self._lanes[ticket.lane].queue.remove(ticket)
+        ticket.future.cancel()
+        return True
+
+    def _next_ticket(self) -> Optional[_Ticket]:
+        """Eligible ticket with the smallest virtual tag across lanes."""
+        best: Optional[_Ticket] = None
+        for lane in self._lanes.values():
+            for ticket in lane.queue:
+                if self._active_by_user.get(ticket.user_id, 0) < self.per_user_limit:
+                    if best is None or ticket.tag < best.tag:
+                        best = ticket
+                    break
+        return best
+
+    def _dispatch(self):
+        while self._active < self.max_concurrency:
+            ticket = self._next_ticket()
+            if ticket is None:
+                return
+            lane = self._lanes[ticket.lane]
+            lane.queue.remove(ticket)
+            lane.active += 1
+            lane.admitted += 1
+            self._active += 1
+            self._active_by_user[ticket.user_id] += 1
+            self._virtual_time = max(self._virtual_time, ticket.tag)
+            ticket.future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, admission and wait-time percentiles per lane."""
+        lanes = {}
+        for lane in self._lanes.values():
+            waits = sorted(lane.waits)
+            lanes[lane.name] = {
+                "weight": lane.weight,
+                "queue_depth": len(lane.queue),
+                "active": lane.active,
+                "admitted": lane.admitted,
+                "shed": lane.shed,
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                "service_time_ewma_s": round(lane.service_time, 3),
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "lanes": lanes,
+        }
@@ -0,0 +1,330 @@
+"""Pooled async clients for the backend services used by the agent tools."""
+
+from typing import Dict, Any, Optional, List, Iterable
+from collections import OrderedDict
+import asyncio
+import json
+import time
+
+import httpx
+
+
+class ServiceError(Exception):
+    """A backend service rejected a request or could not be reached."""
+
+    def __init__(self, service: str, message: str, status_code: Optional[int] = None):
+        super().__init__(f"{service}: {message}")
+        self.service = service
+        self.status_code = status_code
+
+
+class CircuitOpenError(ServiceError):
+    """Raised without calling the service while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open, calls fail fast for ``reset_timeout_seconds``; then a single
+    trial call is let through (half-open) and its outcome closes or re-opens
+    the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class TTLCache:
+    """Small LRU cache whose entries expire after a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: Any, ttl_seconds: float):
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ServiceClient:
+    """JSON client for one service: pooled connections, response cache and circuit breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout_seconds: float = 5.0,
+        max_connections: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 30.0,
+        cache_entries: int = 1024,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout_seconds,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout_seconds)
+        self.cache = TTLCache(cache_entries)
+        self.requests = 0
+
+    async def request(self, method: str, path: str, cache_ttl_seconds: float = 0, **kwargs) -> Any:
+        """Send a request and return its JSON body, serving from cache when allowed."""
+        cache_key = None
+        if cache_ttl_seconds:
+            cache_key = json.dumps([method, path, kwargs.get("params"), kwargs.get("json")], sort_keys=True, default=str)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name, "circuit open, service temporarily unavailable")
+
+        self.requests += 1
+        try:
+            response = await self._client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            raise ServiceError(self.name, f"request failed: {e}") from e
+        except asyncio.CancelledError:
+            # Timed out by the caller: count it so a half-open trial is not left pending
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise ServiceError(self.name, f"HTTP {response.status_code}", response.status_code)
+        # A 4xx is the caller's fault, not a sign the service is unhealthy
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise ServiceError(self.name, f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+
+        data = response.json()
+        if cache_key is not None:
+            self.cache.put(cache_key, data, cache_ttl_seconds)
+        return data
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache.hits,
+            "circuit": self.breaker.state,
+            "rejected_by_circuit": self.breaker.rejected,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# Seconds a tool result stays cached; 0 disables caching
+DEFAULT_TOOL_CACHE_TTL = {
+    "search_atoms": 60,
+    "get_atoms": 300,
+    "get_user_progress": 15,
+}
+
+# The questions service only accepts its own Spanish difficulty levels and question types
+QUESTION_DIFFICULTY_LEVELS = {
+    "easy": "básico", "basico": "básico", "básico": "básico",
+    "medium": "intermedio", "intermedio": "intermedio",
+    "hard": "avanzado", "avanzado": "avanzado",
+}
+QUESTION_TYPES = {
+    "open_ended": "open_ended", "short_answer": "open_ended",
+    "multiple_choice": "multiple_choice", "true_false": "true_false", "fill_blank": "fill_blank",
+}
+MAX_QUESTIONS_PER_REQUEST = 5
+
+# Fields of the planning service's UpdatePlanRequest
+PLAN_UPDATE_FIELDS = (
+    "completed_atoms", "evaluation_results", "user_feedback", "time_spent_minutes", "request_replanning",
+)
+
+
+class ToolBackends:
+    """Live data for the agent tools from the atomization, evaluation, planning and questions services."""
+
+    def __init__(
+        self,
+        atomization_url: str,
+        evaluation_url: str,
+        planning_url: str,
+        questions_url: str,
+        cache_ttl_seconds: Optional[Dict[str, float]] = None,
+        transports: Optional[Dict[str, httpx.AsyncBaseTransport]] = None,
+        **client_kwargs,
+    ):
+        transports = transports or {}
+        urls = {
+            "atomization": atomization_url,
+            "evaluation": evaluation_url,
+            "planning": planning_url,
+            "questions": questions_url,
+        }
+        self.clients = {
+            name: ServiceClient(name, url, transport=transports.get(name), **client_kwargs)
+            for name, url in urls.items()
+        }
+        self.cache_ttl = {**DEFAULT_TOOL_CACHE_TTL, **(cache_ttl_seconds or {})}
+        # Atoms are cached one by one so batches with partial overlap only fetch the rest
+        self._atom_cache = TTLCache()
+
+    async def search_atoms(self, query: str, difficulty: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        params = {"query": query, "limit": limit}
+        if difficulty:
+            params["difficulty"] = difficulty
+        return await self.clients["atomization"].request(
+            "GET", "/api/v1/atomization/atoms/search", params=params,
+            cache_ttl_seconds=self.cache_ttl["search_atoms"],
+        )
+
+    async def get_atoms(self, atom_ids: Iterable[str]) -> Dict[str, Any]:
+        """Fetch many atoms in one call, skipping the ones already cached."""
+        atom_ids = list(dict.fromkeys(atom_ids))
+        atoms: Dict[str, Any] = {}
+        missing: List[str] = []
+        for atom_id in atom_ids:
+            cached = self._atom_cache.get(atom_id)
+            if cached is None:
+                missing.append(atom_id)
+            else:
+                atoms[atom_id] = cached
+
+        not_found: List[str] = []
+        if missing:
+            data = await self.clients["atomization"].request(
+                "POST", "/api/v1/atomization/atoms/batch", json={"atom_ids": missing}
+            )
+            for atom in data.get("atoms", []):
+                atoms[atom["id"]] = atom
+                self._atom_cache.put(atom["id"], atom, self.cache_ttl["get_atoms"])
+            not_found = data.get("missing", [])
+
+        return {"atoms": [atoms[atom_id] for atom_id in atom_ids if atom_id in atoms], "missing": not_found}
+
+    async def get_user_progress(self, user_id: str, atom_id: Optional[str] = None) -> Dict[str, Any]:
+        ttl = self.cache_ttl["get_user_progress"]
+        history, next_atoms = await asyncio.gather(
+            self.clients["evaluation"].request(
+                "GET", f"/api/v1/evaluation/user/{user_id}/history", params={"limit": 50}, cache_ttl_seconds=ttl
+            ),
+            self.clients["planning"].request(
+                "GET", f"/api/v1/planning/recommendations/{user_id}",
+                params={"context": "next_topic"}, cache_ttl_seconds=ttl
+            ),
+        )
+        evaluations = history.get("evaluations", [])
+        if atom_id:
+            evaluations = [e for e in evaluations if atom_id in (e.get("question_id"), e.get("atom_id"))]
+        return {
+            "user_id": user_id,
+            "statistics": history.get("statistics", {}),
+            "recent_scores": [e.get("score") for e in evaluations[:10]],
+            "recommendations": next_atoms.get("recommendations", []),
+        }
+
+    async def generate_questions(self, atom_id: str, question_type: str, difficulty: str, count: int = 1) -> Dict[str, Any]:
+        """Generate questions from the atom's content, which the questions service requires."""
+        level = QUESTION_DIFFICULTY_LEVELS.get(difficulty.lower())
+        if level is None:
+            raise ServiceError("questions", f"unknown difficulty {difficulty!r}")
+        kind = QUESTION_TYPES.get(question_type.lower())
+        if kind is None:
+            raise ServiceError("questions", f"unknown question type {question_type!r}")
+        atoms = (await self.get_atoms([atom_id]))["atoms"]
+        if not atoms:
+            raise ServiceError("atomization", f"atom {atom_id} not found", status_code=404)
+
+        return await self.clients["questions"].request(
+            "POST", "/api/v1/questions/generate",
+            json={
+                "atom_id": atom_id,
+                "atom_content": atoms[0].get("content") or atoms[0].get("title", ""),
+                "num_questions": min(max(count, 1), MAX_QUESTIONS_PER_REQUEST),
+                "difficulty": level,
+                "question_types": [kind],
+            },
+        )
+
+    async def evaluate_answer(self, question_id: str, question_text: str, user_answer: str,
+                              correct_answer: Optional[str] = None, user_id: str = "agent") -> Dict[str, Any]:
+        return await self.clients["evaluation"].request(
+            "POST", "/api/v1/evaluation/evaluate",
+            json={
+                "question_id": question_id,
+                "question_text": question_text,
+                "student_answer": user_answer,
+                "expected_concepts": [correct_answer] if correct_answer else [],
+                "user_id": user_id,
+            },
+        )
+
+    async def update_learning_path(self, user_id: str, plan_id: str, performance_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Adapt an existing plan to the student's progress, then fetch what to study next."""
+        update = {key: performance_data[key] for key in PLAN_UPDATE_FIELDS if key in performance_data}
+        adaptation = await self.clients["planning"].request(
+            "PUT", f"/api/v1/planning/update-plan/{plan_id}", json=update
+        )
+        # Read after the update so the recommendations reflect the adapted plan
+        next_atoms = await self.clients["planning"].request(
+            "GET", f"/api/v1/planning/recommendations/{user_id}", params={"context": "next_topic"}
+        )
+        return {**adaptation, "recommendations": next_atoms.get("recommendations", [])}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: client.get_stats() for name, client in self.clients.items()}
+
+    async def aclose(self):
+        await asyncio.gather(*(client.aclose() for client in self.clients.values()))
@@ -27,4 +27,29 @@ class TaskType(str, Enum):
     # Agent meta-tasks
     TASK_PLANNING = "task_planning"
     SELF_REFLECTION = "self_reflection"
-    ERROR_RECOVERY = "error_recovery" 
\ No newline at end of file
+    ERROR_RECOVERY = "error_recovery"
+
+    @classmethod
+    def from_agent_task(cls, name: str) -> "TaskType":
+        """Resolve the task name sent by the services to /agent/process."""
+        normalized = (name or "").strip()
+        try:
+            return cls[normalized.upper()]
+        except KeyError:
+            pass
+        try:
+            return cls(normalized.lower())
+        except ValueError:
+            return AGENT_TASK_ALIASES.get(normalized.upper(), cls.TUTORING_DIALOGUE)
+
+
+# Task names used by the services that do not match a TaskType member
+AGENT_TASK_ALIASES = {
+    "EVALUATION": TaskType.ANSWER_EVALUATION,
+    "EVALUATE_RESPONSE": TaskType.ANSWER_EVALUATION,
+    "GENERATE_FEEDBACK": TaskType.FEEDBACK_GENERATION,
+    "PLANNING": TaskType.LEARNING_PLANNING,
+    "CREATE_PLAN": TaskType.LEARNING_PLANNING,
+    "RECOMMENDATION": TaskType.LEARNING_PLANNING,
+    "ADAPTATION": TaskType.DIFFICULTY_ADJUSTMENT,
+}
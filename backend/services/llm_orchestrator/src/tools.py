@@ -1,116 +1,181 @@
 """Tools available to the LLM agent."""
 
-from typing import Dict, List, Any, Optional
-from langchain.tools import BaseTool, tool
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, TypeVar
+from langchain.tools import BaseTool, StructuredTool, tool
 from pydantic import BaseModel, Field
+import asyncio
+import functools
 import json
 
+from .service_clients import ToolBackends
+
+
+_backends: Optional[ToolBackends] = None
+# Event loop the pooled service clients are bound to; sync calls are submitted to it
+_backends_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def configure_tool_backends(backends: Optional[ToolBackends]):
+    """Set the service clients the tools call (done by the orchestrator at startup)."""
+    global _backends, _backends_loop
+    _backends = backends
+    _backends_loop = _current_loop() if backends is not None else None
+
+
+def get_tool_backends() -> ToolBackends:
+    global _backends_loop
+    if _backends is None:
+        raise RuntimeError("Tool backends are not configured")
+    if _backends_loop is None:
+        # Configured outside a loop: the clients belong to the first loop that uses them
+        _backends_loop = _current_loop()
+    return _backends
+
+
+T = TypeVar("T")
+
+
+def run_sync(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Run a tool coroutine from synchronous code on the loop that owns the service clients.
+
+    The httpx clients are pooled and bound to that loop, so the coroutine is
+    never run on a fresh one. Calling from the owning loop's own thread would
+    deadlock it and raises instead.
+    """
+    loop = _backends_loop
+    if loop is None or loop.is_closed() or not loop.is_running():
+        coroutine.close()
+        raise RuntimeError("Tool backends are not running on an event loop; use the async tool API")
+    if _current_loop() is loop:
+        coroutine.close()
+        raise RuntimeError("Synchronous tool calls would block the event loop that serves them; use ainvoke")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def with_sync_run(async_tool: StructuredTool) -> StructuredTool:
+    """Give a tool built from a coroutine a blocking `invoke` that drives it."""
+    coroutine: Callable[..., Awaitable[str]] = async_tool.coroutine
+
+    @functools.wraps(coroutine)
+    def func(*args, **kwargs) -> str:
+        return run_sync(coroutine(*args, **kwargs))
+
+    async_tool.func = func
+    return async_tool
+
 
 class SearchAtomsTool(BaseTool):
     """Search for learning atoms in the knowledge base."""
-    
+
     name: str = "search_atoms"
     description: str = "Search for relevant learning atoms by topic, keywords, or difficulty level"
-    
+
     def _run(self, query: str, difficulty: Optional[str] = None) -> str:
-        """Execute atom search."""
-        # TODO: Integrate with actual atom database
-        return json.dumps({
-            "atoms": [
-                {"id": "atom_001", "title": "Introduction to concept", "difficulty": "basic"},
-                {"id": "atom_002", "title": "Advanced applications", "difficulty": "advanced"}
-            ]
-        })
-    
+        return run_sync(self._arun(query, difficulty))
+
     async def _arun(self, query: str, difficulty: Optional[str] = None) -> str:
-        """Async version."""
-        return self._run(query, difficulty)
+        """Execute atom search against the atomization service."""
+        return json.dumps(await get_tool_backends().search_atoms(query, difficulty), default=str)
+
+
+class GetAtomsTool(BaseTool):
+    """Fetch several learning atoms by id."""
+
+    name: str = "get_atoms"
+    description: str = "Fetch the full content of several learning atoms at once, given a list of atom ids"
+
+    def _run(self, atom_ids: List[str]) -> str:
+        return run_sync(self._arun(atom_ids))
+
+    async def _arun(self, atom_ids: List[str]) -> str:
+        """Batched lookup against the atomization service."""
+        if isinstance(atom_ids, str):
+            atom_ids = [atom_id.strip() for atom_id in atom_ids.split(",") if atom_id.strip()]
+        return json.dumps(await get_tool_backends().get_atoms(atom_ids), default=str)
 
 
 class GetUserProgressTool(BaseTool):
     """Get user's learning progress and history."""
-    
+
     name: str = "get_user_progress"
     description: str = "Retrieve user's progress, mastery levels, and learning history"
-    
+
     def _run(self, user_id: str, atom_id: Optional[str] = None) -> str:
-        """Get user progress data."""
-        # TODO: Integrate with actual user progress database
-        return json.dumps({
-            "user_id": user_id,
-            "overall_progress": 0.65,
-            "atoms_completed": 12,
-            "current_streak": 5,
-            "mastery_levels": {"atom_001": 0.8, "atom_002": 0.6}
-        })
-    
+        return run_sync(self._arun(user_id, atom_id))
+
     async def _arun(self, user_id: str, atom_id: Optional[str] = None) -> str:
-        """Async version."""
-        return self._run(user_id, atom_id)
+        """Get user progress from the evaluation and planning services."""
+        return json.dumps(await get_tool_backends().get_user_progress(user_id, atom_id), default=str)
 
 
 class GenerateQuestionInput(BaseModel):
     """Input for question generation."""
     atom_id: str = Field(description="ID of the atom to generate questions for")
-    question_type: str = Field(description="Type of question: multiple_choice, true_false, short_answer")
+    question_type: str = Field(description="Type of question: multiple_choice, true_false, fill_blank, short_answer")
     difficulty: str = Field(description="Difficulty level: easy, medium, hard")
-    count: int = Field(default=1, description="Number of questions to generate")
+    count: int = Field(default=1, description="Number of questions to generate (1-5)")
 
 
+@with_sync_run
 @tool("generate_questions", args_schema=GenerateQuestionInput)
-def generate_questions(atom_id: str, question_type: str, difficulty: str, count: int = 1) -> str:
+async def generate_questions(atom_id: str, question_type: str, difficulty: str, count: int = 1) -> str:
     """Generate questions for a specific learning atom."""
-    # TODO: Integrate with actual question generation service
-    return json.dumps({
-        "questions": [
-            {
-                "id": "q_001",
-                "type": question_type,
-                "difficulty": difficulty,
-                "text": "Sample question about the atom content?",
-                "options": ["A", "B", "C", "D"] if question_type == "multiple_choice" else None
-            }
-        ]
-    })
+    return json.dumps(await get_tool_backends().generate_questions(atom_id, question_type, difficulty, count), default=str)
 
 
 class EvaluateAnswerInput(BaseModel):
     """Input for answer evaluation."""
     question_id: str = Field(description="ID of the question")
+    question_text: str = Field(description="Full text of the question")
     user_answer: str = Field(description="User's answer to evaluate")
     correct_answer: Optional[str] = Field(None, description="Correct answer for comparison")
+    user_id: str = Field("agent", description="ID of the student who answered")
 
 
+@with_sync_run
 @tool("evaluate_answer", args_schema=EvaluateAnswerInput)
-def evaluate_answer(question_id: str, user_answer: str, correct_answer: Optional[str] = None) -> str:
+async def evaluate_answer(question_id: str, question_text: str, user_answer: str,
+                          correct_answer: Optional[str] = None, user_id: str = "agent") -> str:
     """Evaluate a user's answer and provide feedback."""
-    # TODO: Integrate with actual evaluation service
-    return json.dumps({
-        "is_correct": True,
-        "score": 0.9,
-        "feedback": "Great job! Your answer correctly identifies the key concept.",
-        "suggestions": ["Consider also thinking about..."],
-        "misconceptions": []
-    })
-
-
-@tool("update_learning_path")
-def update_learning_path(user_id: str, performance_data: Dict[str, Any]) -> str:
+    return json.dumps(
+        await get_tool_backends().evaluate_answer(question_id, question_text, user_answer, correct_answer, user_id),
+        default=str
+    )
+
+
+class UpdateLearningPathInput(BaseModel):
+    """Input for learning path adaptation."""
+    user_id: str = Field(description="ID of the student")
+    plan_id: str = Field(description="ID of the student's existing learning plan")
+    performance_data: Dict[str, Any] = Field(
+        description="Progress since the last update: completed_atoms, evaluation_results, "
+                    "user_feedback, time_spent_minutes, request_replanning"
+    )
+
+
+@with_sync_run
+@tool("update_learning_path", args_schema=UpdateLearningPathInput)
+async def update_learning_path(user_id: str, plan_id: str, performance_data: Dict[str, Any]) -> str:
     """Update user's learning path based on performance."""
-    # TODO: Integrate with planning service
-    return json.dumps({
-        "updated": True,
-        "next_atoms": ["atom_003", "atom_004"],
-        "review_needed": ["atom_001"],
-        "difficulty_adjustment": "increase"
-    })
+    return json.dumps(
+        await get_tool_backends().update_learning_path(user_id, plan_id, performance_data),
+        default=str
+    )
 
 
 # Collect all tools for easy access
 AVAILABLE_TOOLS = [
     SearchAtomsTool(),
+    GetAtomsTool(),
     GetUserProgressTool(),
     generate_questions,
     evaluate_answer,
     update_learning_path
-] 
\ No newline at end of file
+]
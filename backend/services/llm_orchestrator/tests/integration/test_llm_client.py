@@ -0,0 +1,161 @@
+"""
+Tests del cliente async de chat-completions contra un servidor simulado
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.llm_client import AsyncChatCompletionsClient, LLMClientError
+
+
+class MockChatCompletionsServer:
+    """Servidor de chat-completions simulado con respuestas programables"""
+
+    def __init__(self, failures=None, delay: float = 0.0):
+        self.failures = list(failures or [])
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.failures:
+                status, headers = self.failures.pop(0)
+                return httpx.Response(status, headers=headers, json={"error": "simulated"})
+
+            body = json.loads(request.content)
+            last_message = body["messages"][-1]["content"]
+            if body.get("stream"):
+                events = [
+                    json.dumps({"choices": [{"delta": {"content": token}}]})
+                    for token in ["echo: ", last_message]
+                ]
+                sse = "".join(f"data: {event}\n\n" for event in events + ["[DONE]"])
+                return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, text=sse)
+            return httpx.Response(200, json={
+                "model": body["model"],
+                "choices": [{"message": {"role": "assistant", "content": f"echo: {last_message}"}}],
+            })
+        finally:
+            self.in_flight -= 1
+
+    def client(self, **kwargs) -> AsyncChatCompletionsClient:
+        kwargs.setdefault("backoff_base_seconds", 0.001)
+        return AsyncChatCompletionsClient(
+            endpoint="http://mock-llm/models",
+            api_key="test-key",
+            transport=httpx.MockTransport(self.handler),
+            **kwargs,
+        )
+
+
+@pytest.mark.asyncio
+async def test_complete_returns_choice():
+    server = MockChatCompletionsServer()
+    client = server.client()
+    try:
+        response = await client.complete(messages=[{"role": "user", "content": "hola"}], model="DeepSeek-R1")
+        assert response["choices"][0]["message"]["content"] == "echo: hola"
+        request = server.requests[0]
+        assert request.url.path == "/models/chat/completions"
+        assert request.url.params["api-version"] == client.api_version
+        assert request.headers["api-key"] == "test-key"
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_retries_on_429_and_5xx():
+    server = MockChatCompletionsServer(failures=[
+        (429, {"Retry-After": "0"}),
+        (503, {}),
+    ])
+    client = server.client(max_retries=3)
+    try:
+        response = await client.complete(messages=[{"role": "user", "content": "retry"}], model="m")
+        assert response["choices"][0]["message"]["content"] == "echo: retry"
+        assert len(server.requests) == 3
+        assert client.get_stats()["total_retries"] == 2
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_tokens():
+    server = MockChatCompletionsServer(failures=[(503, {"Retry-After": "0"})])
+    client = server.client(max_retries=2)
+    try:
+        tokens = [token async for token in client.stream(messages=[{"role": "user", "content": "hola"}], model="m")]
+        assert tokens == ["echo: ", "hola"]
+        assert json.loads(server.requests[-1].content)["stream"] is True
+        assert client.get_stats()["in_flight"] == 0
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_error_raises():
+    server = MockChatCompletionsServer(failures=[(400, {})])
+    client = server.client(max_retries=3)
+    try:
+        with pytest.raises(LLMClientError) as exc_info:
+            await client.complete(messages=[{"role": "user", "content": "bad"}], model="m")
+        assert exc_info.value.status_code == 400
+        assert len(server.requests) == 1
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_max_in_flight_is_respected():
+    server = MockChatCompletionsServer(delay=0.02)
+    client = server.client(max_in_flight=4)
+    try:
+        await asyncio.gather(*[
+            client.complete(messages=[{"role": "user", "content": str(i)}], model="m")
+            for i in range(20)
+        ])
+        assert len(server.requests) == 20
+        assert server.max_in_flight == 4
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_backoff_releases_the_in_flight_slot():
+    server = MockChatCompletionsServer(failures=[(429, {})])
+    client = server.client(max_in_flight=1)
+    client._retry_delay = lambda attempt, response=None: 0.2
+    finished = []
+
+    async def call(content):
+        await client.complete(messages=[{"role": "user", "content": content}], model="m")
+        finished.append(content)
+
+    try:
+        first = asyncio.create_task(call("reintenta"))
+        await asyncio.sleep(0.05)
+        await call("rápida")
+        assert finished == ["rápida"]
+        assert client.get_stats()["in_flight"] == 0
+        await first
+        assert finished == ["rápida", "reintenta"]
+    finally:
+        await client.aclose()
+
+
+def test_retry_delay_honors_retry_after():
+    client = AsyncChatCompletionsClient(endpoint="http://mock-llm", api_key="k", backoff_max_seconds=1.0)
+    assert client._retry_delay(0, httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+    assert client._retry_delay(0, httpx.Response(429, headers={"retry-after-ms": "250"})) == 0.25
+    for attempt in range(10):
+        assert 0 <= client._retry_delay(attempt) <= 1.0
@@ -0,0 +1,250 @@
+"""
+Tests de las herramientas del agente contra servicios backend simulados
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.service_clients import CircuitOpenError, ServiceError, ToolBackends
+from src.tools import AVAILABLE_TOOLS, configure_tool_backends
+
+QUESTION_DIFFICULTIES = {"básico", "intermedio", "avanzado"}
+QUESTION_TYPES = {"open_ended", "multiple_choice", "true_false", "fill_blank"}
+
+ATOMS = {
+    f"atom_{i}": {"id": f"atom_{i}", "title": f"Átomo {i}", "content": f"Contenido del átomo {i}", "difficulty_level": "basico"}
+    for i in range(5)
+}
+
+
+class StubServices:
+    """Servicios atomization/evaluation/planning/questions simulados"""
+
+    def __init__(self):
+        self.requests = []
+        self.failing = set()
+        self.loops = set()
+
+    def transport(self, service: str) -> httpx.MockTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append((service, request.method, request.url.path))
+            self.loops.add(asyncio.get_running_loop())
+            if service in self.failing:
+                return httpx.Response(503, json={"detail": "caído"})
+            return getattr(self, service)(request)
+        return httpx.MockTransport(handler)
+
+    def atomization(self, request):
+        if request.url.path.endswith("/atoms/search"):
+            query = request.url.params["query"]
+            return httpx.Response(200, json={"atoms": [a for a in ATOMS.values() if query in a["title"]]})
+        ids = json.loads(request.content)["atom_ids"]
+        return httpx.Response(200, json={
+            "atoms": [ATOMS[i] for i in ids if i in ATOMS],
+            "missing": [i for i in ids if i not in ATOMS],
+        })
+
+    def evaluation(self, request):
+        if request.method == "GET":
+            return httpx.Response(200, json={
+                "evaluations": [{"question_id": "q1", "score": 0.8}, {"question_id": "q2", "score": 0.6}],
+                "statistics": {"total_evaluations": 2, "average_score": 0.7},
+            })
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"score": 1.0 if body["student_answer"] == "4" else 0.0})
+
+    def planning(self, request):
+        # Rutas del router de la API agéntica de planificación
+        path = request.url.path
+        if request.method == "GET" and path.startswith("/api/v1/planning/recommendations/"):
+            return httpx.Response(200, json={
+                "user_id": path.rsplit("/", 1)[-1],
+                "recommendations": [{"recommendation_id": "r1", "atom_ids": ["atom_3"], "priority": 0.9}],
+            })
+        if request.method == "PUT" and path.startswith("/api/v1/planning/update-plan/"):
+            body = json.loads(request.content)
+            if set(body) - {"completed_atoms", "evaluation_results", "user_feedback",
+                            "time_spent_minutes", "request_replanning"}:
+                return httpx.Response(422, json={"detail": "campos desconocidos"})
+            return httpx.Response(200, json={
+                "plan_id": path.rsplit("/", 1)[-1], "adaptations_made": ["ritmo"], "reason": "progreso", "confidence": 0.8,
+            })
+        return httpx.Response(404, json={"detail": "Not Found"})
+
+    def questions(self, request):
+        # Mismas validaciones que QuestionGenerationRequest del servicio de preguntas
+        body = json.loads(request.content)
+        errors = [field for field in ("atom_id", "atom_content") if not body.get(field)]
+        if body.get("difficulty") not in QUESTION_DIFFICULTIES:
+            errors.append("difficulty")
+        if not set(body.get("question_types", ["open_ended"])) <= QUESTION_TYPES:
+            errors.append("question_types")
+        if not 1 <= body.get("num_questions", 1) <= 5:
+            errors.append("num_questions")
+        if errors:
+            return httpx.Response(422, json={"detail": [{"loc": ["body", field]} for field in errors]})
+        return httpx.Response(200, json={"atom_id": body["atom_id"], "generated_questions": [{"id": "q1"}] * body["num_questions"]})
+
+
+def make_backends(stub: StubServices, **kwargs) -> ToolBackends:
+    names = ["atomization", "evaluation", "planning", "questions"]
+    return ToolBackends(
+        **{f"{name}_url": f"http://{name}" for name in names},
+        transports={name: stub.transport(name) for name in names},
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_results_are_cached():
+    stub = StubServices()
+    backends = make_backends(stub)
+
+    first = await backends.search_atoms("Átomo 1")
+    second = await backends.search_atoms("Átomo 1")
+
+    assert first == second == {"atoms": [ATOMS["atom_1"]]}
+    assert len(stub.requests) == 1
+    assert backends.get_stats()["atomization"]["cache_hits"] == 1
+    await backends.aclose()
+
+
+@pytest.mark.asyncio
+async def test_atom_lookups_are_batched_and_only_fetch_uncached_ids():
+    stub = StubServices()
+    backends = make_backends(stub)
+
+    result = await backends.get_atoms(["atom_0", "atom_1", "nope"])
+    assert [a["id"] for a in result["atoms"]] == ["atom_0", "atom_1"]
+    assert result["missing"] == ["nope"]
+
+    await backends.get_atoms(["atom_1", "atom_2"])
+
+    batch_calls = [r for r in stub.requests if r[2].endswith("/atoms/batch")]
+    assert len(batch_calls) == 2
+    # atom_1 came from the per-atom cache, so only atom_2 was requested the second time
+    assert stub.requests[-1] == ("atomization", "POST", "/api/v1/atomization/atoms/batch")
+    await backends.aclose()
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures_and_recovers():
+    stub = StubServices()
+    stub.failing.add("questions")
+    backends = make_backends(stub, failure_threshold=2, reset_timeout_seconds=0.05)
+
+    for _ in range(2):
+        with pytest.raises(ServiceError):
+            await backends.generate_questions("atom_0", "multiple_choice", "easy")
+    with pytest.raises(CircuitOpenError):
+        await backends.generate_questions("atom_0", "multiple_choice", "easy")
+    assert len([r for r in stub.requests if r[0] == "questions"]) == 2
+
+    stub.failing.clear()
+    await asyncio.sleep(0.06)
+    result = await backends.generate_questions("atom_0", "multiple_choice", "easy", count=2)
+    assert len(result["generated_questions"]) == 2
+    assert backends.get_stats()["questions"]["circuit"] == "closed"
+    await backends.aclose()
+
+
+@pytest.mark.asyncio
+async def test_question_generation_sends_atom_content_and_service_levels():
+    stub = StubServices()
+    backends = make_backends(stub)
+
+    result = await backends.generate_questions("atom_2", "short_answer", "hard", count=9)
+    assert len(result["generated_questions"]) == 5
+
+    with pytest.raises(ServiceError):
+        await backends.generate_questions("nope", "multiple_choice", "easy")
+    with pytest.raises(ServiceError):
+        await backends.generate_questions("atom_2", "essay", "easy")
+    assert [r[0] for r in stub.requests].count("questions") == 1
+    await backends.aclose()
+
+
+@pytest.mark.asyncio
+async def test_side_effecting_calls_are_never_cached():
+    stub = StubServices()
+    backends = make_backends(stub)
+
+    for _ in range(2):
+        await backends.generate_questions("atom_0", "multiple_choice", "easy")
+        await backends.evaluate_answer("q1", "¿2+2?", "4", user_id="ana")
+
+    assert [r[0] for r in stub.requests].count("questions") == 2
+    assert [r[0] for r in stub.requests].count("evaluation") == 2
+    await backends.aclose()
+
+
+@pytest.mark.asyncio
+async def test_agent_tools_return_live_service_data():
+    stub = StubServices()
+    backends = make_backends(stub)
+    configure_tool_backends(backends)
+    tools = {tool.name: tool for tool in AVAILABLE_TOOLS}
+
+    try:
+        progress = json.loads(await tools["get_user_progress"].arun({"user_id": "ana"}))
+        assert progress["statistics"]["average_score"] == 0.7
+        assert progress["recommendations"][0]["atom_ids"] == ["atom_3"]
+
+        atoms = json.loads(await tools["get_atoms"].arun({"atom_ids": ["atom_4"]}))
+        assert atoms["atoms"] == [ATOMS["atom_4"]]
+
+        evaluation = json.loads(await tools["evaluate_answer"].arun({
+            "question_id": "q1", "question_text": "¿2+2?", "user_answer": "4", "user_id": "ana",
+        }))
+        assert evaluation["score"] == 1.0
+
+        path = json.loads(await tools["update_learning_path"].arun({
+            "user_id": "ana", "plan_id": "p1",
+            "performance_data": {"completed_atoms": ["atom_1"], "evaluation_results": {"atom_1": {"score": 0.9}}},
+        }))
+        assert path["plan_id"] == "p1"
+        assert path["adaptations_made"] == ["ritmo"]
+        assert path["recommendations"][0]["atom_ids"] == ["atom_3"]
+        assert ("planning", "PUT", "/api/v1/planning/update-plan/p1") in stub.requests
+    finally:
+        configure_tool_backends(None)
+        await backends.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sync_tool_calls_share_the_backends_of_the_async_path():
+    stub = StubServices()
+    backends = make_backends(stub)
+    configure_tool_backends(backends)
+    tools = {tool.name: tool for tool in AVAILABLE_TOOLS}
+
+    try:
+        await tools["get_atoms"].arun({"atom_ids": ["atom_0"]})
+        atoms = json.loads(await asyncio.to_thread(tools["get_atoms"].run, {"atom_ids": ["atom_1"]}))
+        assert atoms["atoms"] == [ATOMS["atom_1"]]
+        questions = json.loads(await asyncio.to_thread(tools["generate_questions"].run, {
+            "atom_id": "atom_1", "question_type": "true_false", "difficulty": "medium",
+        }))
+        assert len(questions["generated_questions"]) == 1
+        # Every request ran on the loop that owns the pooled clients
+        assert stub.loops == {asyncio.get_running_loop()}
+
+        with pytest.raises(RuntimeError):
+            tools["get_atoms"].run({"atom_ids": ["atom_2"]})
+    finally:
+        configure_tool_backends(None)
+        await backends.aclose()
+
+
+def test_sync_tool_calls_need_a_running_backends_loop():
+    configure_tool_backends(make_backends(StubServices()))
+    tools = {tool.name: tool for tool in AVAILABLE_TOOLS}
+
+    try:
+        with pytest.raises(RuntimeError):
+            tools["get_atoms"].run({"atom_ids": ["atom_1"]})
+    finally:
+        configure_tool_backends(None)
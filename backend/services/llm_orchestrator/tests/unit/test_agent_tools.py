@@ -0,0 +1,145 @@
+"""
+Tests de la ejecución concurrente de herramientas en el bucle del agente
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from langchain.tools import BaseTool
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents import AtomiaAgent
+from src.service_clients import ToolBackends
+from src.tools import configure_tool_backends
+
+
+class SleepyTool(BaseTool):
+    name: str = "sleepy"
+    description: str = "Herramienta lenta para tests"
+    delay: float = 0.1
+
+    def _run(self, query: str) -> str:
+        # Sin clientes compartidos: puede usar su propio bucle
+        return asyncio.run(self._arun(query))
+
+    async def _arun(self, query: str) -> str:
+        await asyncio.sleep(self.delay)
+        return f"{self.name}:{query}"
+
+
+class ScriptedLLM:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        return AIMessage(content=self.responses.pop(0))
+
+
+class StreamingScriptedLLM(ScriptedLLM):
+    async def astream(self, messages):
+        self.prompts.append(messages)
+        text = self.responses.pop(0)
+        for start in range(0, len(text), 5):
+            yield text[start:start + 5]
+
+
+def action(tool_name: str, tool_input) -> str:
+    import json
+    return f"Action:\n```json\n{json.dumps({'tool_name': tool_name, 'tool_input': tool_input})}\n```"
+
+
+def make_agent(llm, tools, **config) -> AtomiaAgent:
+    agent = AtomiaAgent(llm=llm, config={"enable_tools": True, **config})
+    agent.tools = {tool.name: tool for tool in tools}
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_from_one_turn_run_concurrently_in_call_order():
+    llm = ScriptedLLM([
+        "Thought: necesito dos datos\n" + action("progress", "ana") + "\n" + action("atoms", "derivadas"),
+        "Final Answer: listo",
+    ])
+    agent = make_agent(llm, [SleepyTool(name="progress", delay=0.2), SleepyTool(name="atoms", delay=0.1)])
+
+    started = time.perf_counter()
+    result = await agent.process(messages=[HumanMessage(content="¿Qué estudio?")])
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.29
+    observations = [m.content for m in result["messages"] if getattr(m, "name", None) == "tool_observation"]
+    assert observations == ["Observation (progress): progress:ana", "Observation (atoms): atoms:derivadas"]
+    # Both tools were answered in a single extra LLM round-trip
+    assert len(llm.prompts) == 2
+
+    stats = agent.get_stats()["tools"]
+    assert stats["progress"]["calls"] == 1
+    assert stats["atoms"]["latency_histogram"]["le_250ms"] == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_tool_times_out_without_blocking_others():
+    llm = ScriptedLLM([
+        action("slow", "x") + action("fast", "y"),
+        "Final Answer: ok",
+    ])
+    agent = make_agent(llm, [SleepyTool(name="slow", delay=1.0), SleepyTool(name="fast", delay=0.0)],
+                       tool_timeout_seconds=0.05)
+
+    result = await agent.process(messages=[HumanMessage(content="hola")])
+
+    observations = [m.content for m in result["messages"] if getattr(m, "name", None) == "tool_observation"]
+    assert observations[0].startswith("Observation (slow): Error: slow timed out")
+    assert observations[1] == "Observation (fast): fast:y"
+    assert agent.get_stats()["tools"]["slow"]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_builtin_tools_run_through_async_path():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/atoms/search"):
+            return httpx.Response(200, json={"atoms": [{"id": "atom_001", "title": "Derivadas"}]})
+        if "/history" in request.url.path:
+            return httpx.Response(200, json={"evaluations": [], "statistics": {"total_evaluations": 0}})
+        return httpx.Response(200, json={"recommended_atoms": []})
+
+    transport = httpx.MockTransport(handler)
+    backends = ToolBackends(
+        "http://atomization", "http://evaluation", "http://planning", "http://questions",
+        transports={name: transport for name in ("atomization", "evaluation", "planning", "questions")},
+    )
+    configure_tool_backends(backends)
+    llm = ScriptedLLM([
+        action("search_atoms", "derivadas") + action("get_user_progress", {"user_id": "ana"}),
+        "Final Answer: ok",
+    ])
+    agent = AtomiaAgent(llm=llm, config={"enable_tools": True})
+
+    try:
+        result = await agent.process(messages=[HumanMessage(content="hola")])
+    finally:
+        configure_tool_backends(None)
+        await backends.aclose()
+
+    observations = [m.content for m in result["messages"] if getattr(m, "name", None) == "tool_observation"]
+    assert "atom_001" in observations[0]
+    assert '"user_id": "ana"' in observations[1]
+
+
+@pytest.mark.asyncio
+async def test_streaming_only_forwards_the_final_answer():
+    llm = StreamingScriptedLLM([
+        "Thought: necesito datos\n" + action("progress", "ana"),
+        "Thought: ya lo tengo\nFinal Answer: estudia derivadas",
+    ])
+    agent = make_agent(llm, [SleepyTool(name="progress", delay=0.01)])
+
+    events = [event async for event in agent.stream(messages=[HumanMessage(content="¿Qué estudio?")])]
+
+    tokens = "".join(event["content"] for event in events if event["type"] == "token")
+    assert tokens == "estudia derivadas"
+    assert events[-1]["messages"][-1].content == "estudia derivadas"
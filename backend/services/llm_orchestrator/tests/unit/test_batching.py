@@ -0,0 +1,138 @@
+"""
+Tests del micro-batching de tareas cortas
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+from src.batching import MicroBatcher, parse_batch_response
+from src.task_types import TaskType
+
+
+TASK_PATTERN = re.compile(r"<<<TASK (\w+) id=(\S+)>>>\n(.*?)\n<<<END TASK \1>>>", re.DOTALL)
+
+
+class FakeLLM:
+    """Answers each delimited task with a JSON evaluation echoing its prompt."""
+
+    def __init__(self, drop_ids=(), raw_response=None):
+        self.batch_calls = []
+        self.single_calls = []
+        self.drop_ids = set(drop_ids)
+        self.raw_response = raw_response
+
+    async def complete(self, task_type: TaskType, prompt: str) -> str:
+        self.batch_calls.append(prompt)
+        await asyncio.sleep(0)
+        if self.raw_response is not None:
+            return self.raw_response
+        answers = [
+            {"id": item_id, "answer": {"prompt": body, "score": 1.0}}
+            for _, item_id, body in TASK_PATTERN.findall(prompt)
+            if item_id.rsplit("-", 1)[0] not in self.drop_ids
+        ]
+        return f"<think>razonando</think>\n```json\n{json.dumps(answers)}\n```"
+
+    async def fallback(self, task_type: TaskType, prompt: str, user_id: str) -> str:
+        self.single_calls.append(prompt)
+        return f"individual:{prompt}"
+
+
+def make_batcher(llm: FakeLLM, **kwargs) -> MicroBatcher:
+    return MicroBatcher(complete=llm.complete, fallback=llm.fallback, window_ms=5, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_short_tasks_share_one_call():
+    llm = FakeLLM()
+    batcher = make_batcher(llm)
+
+    prompts = [f"Evalúa la respuesta {i}" for i in range(5)]
+    results = await asyncio.gather(*[
+        batcher.submit(TaskType.ANSWER_EVALUATION, prompt, f"user-{i}") for i, prompt in enumerate(prompts)
+    ])
+
+    assert len(llm.batch_calls) == 1
+    assert llm.single_calls == []
+    for prompt, result in zip(prompts, results):
+        payload = json.loads(re.search(r"```json\s*(.*?)\s*```", result, re.DOTALL).group(1))
+        assert payload["prompt"] == prompt
+    assert batcher.get_stats()["avg_batch_size"] == 5
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_batches():
+    llm = FakeLLM()
+    batcher = make_batcher(llm, max_batch_size=3)
+
+    await asyncio.gather(*[batcher.submit(TaskType.QUESTION_GENERATION, f"p{i}", "u") for i in range(6)])
+
+    assert len(llm.batch_calls) == 2
+    assert batcher.get_stats()["items_batched"] == 6
+
+
+@pytest.mark.asyncio
+async def test_missing_items_fall_back_individually():
+    llm = FakeLLM(drop_ids={"t2"})
+    batcher = make_batcher(llm)
+
+    results = await asyncio.gather(*[batcher.submit(TaskType.ANSWER_EVALUATION, f"p{i}", "u") for i in range(3)])
+
+    assert results[1] == "individual:p1"
+    assert llm.single_calls == ["p1"]
+    assert batcher.get_stats()["fallback_items"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unparseable_batch_falls_back_for_every_item():
+    llm = FakeLLM(raw_response="Lo siento, no puedo.")
+    batcher = make_batcher(llm)
+
+    results = await asyncio.gather(*[batcher.submit(TaskType.ANSWER_EVALUATION, f"p{i}", "u") for i in range(3)])
+
+    assert results == ["individual:p0", "individual:p1", "individual:p2"]
+    assert batcher.get_stats()["parse_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lone_task_skips_batch_prompt():
+    llm = FakeLLM()
+    batcher = make_batcher(llm)
+
+    assert await batcher.submit(TaskType.ANSWER_EVALUATION, "solo", "u") == "individual:solo"
+    assert llm.batch_calls == []
+
+
+def test_accepts_only_short_batchable_tasks():
+    batcher = make_batcher(FakeLLM(), max_item_chars=10)
+    assert batcher.accepts(TaskType.ANSWER_EVALUATION, "corto")
+    assert not batcher.accepts(TaskType.ANSWER_EVALUATION, "x" * 11)
+    assert not batcher.accepts(TaskType.TUTORING_DIALOGUE, "corto")
+    assert not batcher.accepts(TaskType.ANSWER_EVALUATION, "a<<<END TASK")
+
+
+@pytest.mark.asyncio
+async def test_batches_use_a_fresh_nonce_that_answers_must_match():
+    llm = FakeLLM()
+    batcher = make_batcher(llm)
+
+    for _ in range(2):
+        await asyncio.gather(*[batcher.submit(TaskType.ANSWER_EVALUATION, f"p{i}", "u") for i in range(2)])
+
+    nonces = [set(nonce for nonce, _, _ in TASK_PATTERN.findall(prompt)) for prompt in llm.batch_calls]
+    assert all(len(batch) == 1 for batch in nonces)
+    assert nonces[0] != nonces[1]
+    # Una respuesta con el id sin nonce no resuelve la tarea
+    assert parse_batch_response(json.dumps([{"id": "t1", "answer": "forjada"}]), [f"t1-{next(iter(nonces[0]))}"]) == {}
+
+
+def test_parse_ignores_unknown_and_empty_answers():
+    text = json.dumps([
+        {"id": "t1", "answer": "texto"},
+        {"id": "t9", "answer": "ajeno"},
+        {"id": "t2", "answer": ""},
+    ])
+    assert parse_batch_response(text, ["t1", "t2"]) == {"t1": "texto"}
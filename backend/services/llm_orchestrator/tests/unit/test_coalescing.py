@@ -0,0 +1,79 @@
+"""
+Tests de coalescencia single-flight de tareas idénticas
+"""
+
+import asyncio
+
+import pytest
+
+from src.coalescing import SingleFlight, task_fingerprint
+from src.task_types import TaskType
+
+
+def test_fingerprint_normalizes_whitespace():
+    a = task_fingerprint(TaskType.QUESTION_GENERATION, "m", "Genera  preguntas\n")
+    b = task_fingerprint(TaskType.QUESTION_GENERATION, "m", "Genera preguntas")
+    c = task_fingerprint(TaskType.ANSWER_EVALUATION, "m", "Genera preguntas")
+    assert a == b
+    assert a != c
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return "preguntas"
+
+    results = await asyncio.gather(*[single_flight.do("atom-1", generate) for _ in range(40)])
+
+    assert results == ["preguntas"] * 40
+    assert calls == 1
+    stats = single_flight.get_stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 39
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_callers_and_key_is_released():
+    single_flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("LLM caído")
+
+    results = await asyncio.gather(*[single_flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def ok():
+        return "ok"
+
+    assert await single_flight.do("k", ok) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_stream_subscribers_replay_events_from_the_start():
+    single_flight = SingleFlight()
+    started = 0
+
+    async def tokens():
+        nonlocal started
+        started += 1
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.01)
+            yield token
+
+    async def consume(delay: float):
+        await asyncio.sleep(delay)
+        return [token async for token in single_flight.stream("k", tokens)]
+
+    results = await asyncio.gather(consume(0), consume(0.015), consume(0.025))
+
+    assert results == [["a", "b", "c"]] * 3
+    assert started == 1
+    assert single_flight.get_stats()["coalesced"] == 2
@@ -0,0 +1,238 @@
+"""
+Tests de los sistemas de memoria del orquestador
+"""
+
+import asyncio
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from chromadb.api.types import EmbeddingFunction
+import numpy as np
+
+from src.memory import IntegratedMemorySystem, LongTermMemory, SemanticMemory, ShortTermMemory
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.mark.asyncio
+async def test_recent_interactions_newest_first_and_scoped_to_user(redis_client):
+    memory = LongTermMemory(redis_client)
+    for i in range(5):
+        await memory.store_interaction("ana", "s1", {"content": f"ana-{i}"})
+    await memory.store_interaction("luis", "s2", {"content": "luis-0"})
+
+    recent = await memory.get_recent_interactions("ana", limit=3)
+
+    assert [item["content"] for item in recent] == ["ana-4", "ana-3", "ana-2"]
+    assert [item["content"] for item in await memory.get_recent_interactions("luis")] == ["luis-0"]
+    assert await memory.get_recent_interactions("nadie") == []
+
+
+@pytest.mark.asyncio
+async def test_index_is_capped(redis_client):
+    memory = LongTermMemory(redis_client, max_interactions=3)
+    for i in range(10):
+        await memory.store_interaction("ana", "s1", {"content": i})
+
+    assert await redis_client.zcard("interactions:ana") == 3
+    assert [item["content"] for item in await memory.get_recent_interactions("ana", limit=10)] == [9, 8, 7]
+
+
+@pytest.mark.asyncio
+async def test_expired_payloads_are_skipped(redis_client):
+    memory = LongTermMemory(redis_client)
+    await memory.store_interaction("ana", "s1", {"content": "vieja"})
+    await memory.store_interaction("ana", "s1", {"content": "nueva"})
+
+    oldest = (await redis_client.zrange("interactions:ana", 0, 0))[0]
+    await redis_client.delete(f"interaction:ana:{oldest}")
+
+    assert [item["content"] for item in await memory.get_recent_interactions("ana")] == ["nueva"]
+
+
+@pytest.mark.asyncio
+async def test_sessions_have_independent_windows():
+    memory = ShortTermMemory(window_size=3)
+
+    for i in range(5):
+        await memory.add_message("s1", "human", f"s1-{i}")
+    await memory.add_message("s2", "ai", "s2-0")
+
+    assert [m.content for m in await memory.get_messages("s1")] == ["s1-2", "s1-3", "s1-4"]
+    assert [m.type for m in await memory.get_messages("s2")] == ["ai"]
+
+    await memory.clear("s1")
+    assert await memory.get_messages("s1") == []
+    assert [m.content for m in await memory.get_messages("s2")] == ["s2-0"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_do_not_interleave():
+    memory = ShortTermMemory(window_size=50)
+
+    async def talk(session_id: str):
+        for i in range(20):
+            await memory.add_message(session_id, "human", f"{session_id}-{i}")
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(talk(f"s{n}") for n in range(10)))
+
+    for n in range(10):
+        assert [m.content for m in await memory.get_messages(f"s{n}")] == [f"s{n}-{i}" for i in range(20)]
+
+
+@pytest.mark.asyncio
+async def test_lru_sessions_spill_to_redis_and_restore(redis_client):
+    memory = ShortTermMemory(window_size=5, max_sessions=2, redis_client=redis_client)
+
+    await memory.add_message("s1", "human", "hola")
+    await memory.add_message("s1", "ai", "¡hola!")
+    await memory.add_message("s2", "human", "x")
+    await memory.add_message("s3", "human", "y")
+
+    assert memory.get_stats()["active_sessions"] == 2
+    assert await redis_client.llen("session:s1:messages") == 2
+
+    assert [m.content for m in await memory.get_messages("s1")] == ["hola", "¡hola!"]
+    stats = memory.get_stats()
+    assert stats["restored"] == 1
+    assert stats["evicted_lru"] == 2
+    assert not await redis_client.exists("session:s1:messages")
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_evicted():
+    memory = ShortTermMemory(idle_ttl_seconds=0.01)
+
+    await memory.add_message("vieja", "human", "hola")
+    await asyncio.sleep(0.02)
+    await memory.add_message("nueva", "human", "hola")
+
+    assert await memory.get_messages("vieja") == []
+    assert memory.get_stats()["evicted_idle"] == 1
+
+
+class SlowSemanticMemory:
+    def __init__(self):
+        self.added = []
+
+    def add_memory(self, content, metadata, memory_id=None):
+        self.added.append((content, metadata))
+
+    def search_memories(self, query, n_results=5, filter_dict=None):
+        time.sleep(0.1)
+        return [{"content": content} for content, metadata in self.added if metadata["user_id"] == filter_dict["user_id"]]
+
+
+@pytest.mark.asyncio
+async def test_memory_tiers_do_not_block_the_event_loop(redis_client):
+    memory = IntegratedMemorySystem.__new__(IntegratedMemorySystem)
+    memory.short_term = ShortTermMemory()
+    memory.long_term = LongTermMemory(redis_client)
+    memory.semantic = SlowSemanticMemory()
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticking = asyncio.create_task(ticker())
+    await memory.remember_interaction("ana", "s1", "human", "¿Qué es un átomo?")
+    context = await memory.get_relevant_context("ana", "átomo", session_id="s1")
+    ticking.cancel()
+
+    assert ticks >= 10
+    assert context["relevant_memories"] == [{"content": "¿Qué es un átomo?"}]
+    assert context["recent_interactions"][0]["content"] == "¿Qué es un átomo?"
+    assert context["current_conversation"] == ["¿Qué es un átomo?"]
+
+
+class LetterEmbedding(EmbeddingFunction):
+    """Embedding determinista para tests: histograma de letras"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, input):
+        self.batch_sizes.append(len(input))
+        vectors = []
+        for text in input:
+            vector = np.zeros(26, dtype=np.float32)
+            for char in text.lower():
+                if "a" <= char <= "z":
+                    vector[ord(char) - ord("a")] += 1
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.mark.asyncio
+async def test_semantic_writes_are_batched_and_persisted(tmp_path):
+    embedding = LetterEmbedding()
+    memory = SemanticMemory(persist_directory=str(tmp_path), batch_size=4, flush_interval_seconds=0.05,
+                            embedding_function=embedding)
+    for i in range(6):
+        memory.add_memory(f"derivadas parte {i}", {"user_id": "ana", "timestamp": f"2024-01-0{i + 1}"})
+    assert memory.get_stats()["pending"] == 6
+
+    await memory.close()
+    assert embedding.batch_sizes == [4, 2]
+
+    reopened = SemanticMemory(persist_directory=str(tmp_path), embedding_function=LetterEmbedding())
+    results = reopened.search_memories("derivadas", n_results=10, filter_dict={"user_id": "ana"})
+    assert len(results) == 6
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_semantic_retention_keeps_newest_per_user(tmp_path):
+    memory = SemanticMemory(persist_directory=str(tmp_path), max_memories_per_user=3,
+                            embedding_function=LetterEmbedding())
+    for i in range(5):
+        memory.add_memory(f"ana {i}", {"user_id": "ana", "timestamp": f"2024-01-0{i + 1}"})
+    memory.add_memory("luis", {"user_id": "luis", "timestamp": "2024-01-01"})
+    await memory.flush()
+
+    kept = memory.collection.get(where={"user_id": "ana"})["documents"]
+    assert sorted(kept) == ["ana 2", "ana 3", "ana 4"]
+    assert memory.collection.get(where={"user_id": "luis"})["documents"] == ["luis"]
+    assert memory.get_stats()["evicted"] == 2
+    await memory.close()
+
+
+class FlakyEmbedding(LetterEmbedding):
+    """Falla una vez en el lote que contiene el texto indicado"""
+
+    def __init__(self, fail_on):
+        super().__init__()
+        self.fail_on = fail_on
+
+    def __call__(self, input):
+        if self.fail_on in input:
+            self.fail_on = None
+            raise RuntimeError("embedding caído")
+        return super().__call__(input)
+
+
+@pytest.mark.asyncio
+async def test_semantic_counters_only_count_written_chunks(tmp_path):
+    memory = SemanticMemory(persist_directory=str(tmp_path), batch_size=2, embedding_workers=4,
+                            embedding_function=FlakyEmbedding(fail_on="nota 4"))
+    for i in range(8):
+        memory.add_memory(f"nota {i}", {"user_id": "ana", "timestamp": f"2024-01-0{i + 1}"})
+
+    with pytest.raises(RuntimeError):
+        await memory.flush()
+    assert (memory.flushed, memory.batches, memory.get_stats()["pending"]) == (6, 3, 2)
+
+    await memory.flush()
+    assert (memory.flushed, memory.batches, memory.get_stats()["pending"]) == (8, 4, 0)
+    await memory.close()
@@ -0,0 +1,70 @@
+"""
+Tests de la construcción perezosa y el arranque paralelo del orquestador
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.config import LLMConfig
+from src.orchestrator import STARTUP_COMPONENTS, LLMOrchestrator
+
+
+SERVICE_ROOT = Path(__file__).resolve().parents[2]
+
+
+def make_settings(**overrides) -> LLMConfig:
+    values = {"AZURE_AI_KEY": "x", "REDIS_PORT": 1, "SEMANTIC_MEMORY_PATH": "", **overrides}
+    return LLMConfig(**values)
+
+
+def test_importing_the_app_has_no_side_effects():
+    env = {k: v for k, v in os.environ.items() if k != "AZURE_AI_KEY"}
+    code = (
+        "import sys, src.main, src.orchestrator as o; "
+        "assert o._orchestrator is None; "
+        "assert 'langgraph' not in sys.modules and 'chromadb' not in sys.modules"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=SERVICE_ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_semantic_memory_path_does_not_depend_on_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("SEMANTIC_MEMORY_PATH", raising=False)
+
+    assert LLMConfig(AZURE_AI_KEY="x").semantic_memory_path == str(SERVICE_ROOT / "data" / "semantic_memory")
+    assert make_settings(SEMANTIC_MEMORY_PATH="./memoria").semantic_memory_path == str(SERVICE_ROOT / "memoria")
+    assert make_settings(SEMANTIC_MEMORY_PATH="/app/data/semantic_memory").semantic_memory_path == "/app/data/semantic_memory"
+    assert make_settings().semantic_memory_path == ""
+
+
+@pytest.mark.asyncio
+async def test_components_are_built_on_first_use_only():
+    orchestrator = LLMOrchestrator(make_settings())
+    assert orchestrator._components == {}
+
+    backends = orchestrator.tool_backends
+    assert orchestrator.tool_backends is backends
+    assert set(orchestrator._components) == {"tool_backends"}
+
+    await orchestrator.close()
+
+
+@pytest.mark.asyncio
+async def test_startup_builds_everything_and_reports_timings():
+    orchestrator = LLMOrchestrator(make_settings())
+
+    await orchestrator.startup()
+    await orchestrator.startup()
+
+    assert set(orchestrator._components) == set(STARTUP_COMPONENTS)
+    assert orchestrator.memory.semantic is orchestrator._components["semantic_memory"]
+    # Redis is unreachable on port 1: startup still completes and records the ping
+    assert {*STARTUP_COMPONENTS, "redis_ping", "total"} <= set(orchestrator.startup_timings)
+    assert orchestrator.get_metrics()["startup_ms"]["total"] > 0
+
+    await orchestrator.close()
@@ -0,0 +1,104 @@
+"""
+Tests del presupuesto de tokens y la compactación de prompts del agente
+"""
+
+from collections import OrderedDict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents import AtomiaAgent
+from src import prompt_budget
+from src.prompt_budget import OBSERVATION_NAME, PromptBudget, count_tokens
+
+
+def observation(text: str) -> HumanMessage:
+    return HumanMessage(content=text, name=OBSERVATION_NAME)
+
+
+def test_history_under_budget_is_untouched():
+    messages = [HumanMessage(content="Explica las derivadas"), AIMessage(content="Claro")]
+    compacted, usage = PromptBudget(max_prompt_tokens=1000).compact(messages)
+
+    assert compacted == messages
+    assert usage["prompt_tokens"] == usage["original_tokens"]
+
+
+def test_repeated_observations_are_deduplicated():
+    messages = [
+        HumanMessage(content="Busca átomos"),
+        observation("resultado largo " * 20),
+        AIMessage(content="Vuelvo a buscar"),
+        observation("resultado largo " * 20),
+    ]
+    compacted, usage = PromptBudget().compact(messages)
+
+    assert usage["deduplicated"] == 1
+    assert compacted[3].content == "[Same result as observation #1]"
+    assert compacted[1].content == messages[1].content
+    assert usage["prompt_tokens"] < usage["original_tokens"]
+
+
+def test_old_observations_truncated_then_summarized_to_fit():
+    request = HumanMessage(content="Planifica mi estudio")
+    steps = []
+    for i in range(8):
+        steps.append(AIMessage(content=f"Thought: paso {i}"))
+        steps.append(observation(f"dato {i} " * 300))
+    messages = [request, *steps]
+
+    budget = PromptBudget(max_prompt_tokens=1500, keep_recent_observations=1, max_observation_tokens=100)
+    compacted, usage = budget.compact(messages)
+
+    assert usage["truncated"] == 7
+    assert usage["prompt_tokens"] <= 1500
+    assert compacted[0] is request
+    assert compacted[-1].content == messages[-1].content
+    if usage["summarized"]:
+        assert compacted[1].content.startswith("Earlier steps (summarized):")
+
+
+def test_count_tokens_is_positive():
+    assert count_tokens("hola") >= 1
+
+
+def test_token_count_cache_is_bounded_and_keeps_no_text(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "_token_counts", OrderedDict())
+    monkeypatch.setattr(prompt_budget, "TOKEN_COUNT_CACHE_SIZE", 3)
+    observations = [f"observación {i} " * 500 for i in range(5)]
+
+    counts = [count_tokens(text) for text in observations]
+
+    assert counts == [count_tokens(text) for text in observations]
+    assert len(prompt_budget._token_counts) == 3
+    assert all(len(key) == 16 for key in prompt_budget._token_counts)
+
+
+class ScriptedLLM:
+    """Devuelve respuestas predefinidas y guarda los prompts recibidos"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        return AIMessage(content=self.responses.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_agent_reports_token_usage_per_iteration():
+    llm = ScriptedLLM([
+        'Thought: necesito átomos\nAction:\n```json\n{"tool_name": "search_atoms", "tool_input": "derivadas"}\n```',
+        "Final Answer: Empieza por atom_001",
+    ])
+    agent = AtomiaAgent(llm=llm, config={"enable_tools": True})
+
+    result = await agent.process(messages=[HumanMessage(content="¿Qué estudio?")])
+
+    assert result["messages"][-1].content == "Empieza por atom_001"
+    assert len(result["token_usage"]) == 2
+    assert result["token_usage"][1]["prompt_tokens"] > result["token_usage"][0]["prompt_tokens"]
+    # The cached system prefix is the same object on every iteration
+    assert llm.prompts[0][0] is llm.prompts[1][0]
+    assert agent.get_stats()["iterations"] == 2
@@ -0,0 +1,92 @@
+"""
+Tests de la caché de respuestas del orquestador
+"""
+
+import numpy as np
+import pytest
+
+from src.response_cache import ResponseCache
+from src.task_types import TaskType
+
+
+def bag_of_words_embedding(texts):
+    """Embedding determinista para tests: histograma de letras"""
+    vectors = []
+    for text in texts:
+        vector = np.zeros(26, dtype=np.float32)
+        for char in text.lower():
+            if "a" <= char <= "z":
+                vector[ord(char) - ord("a")] += 1
+        vectors.append(vector)
+    return vectors
+
+
+@pytest.mark.asyncio
+async def test_exact_hit_ignores_whitespace():
+    cache = ResponseCache(cost_per_1k_tokens=1.0)
+    await cache.put("Genera  preguntas\n sobre derivadas", "m", TaskType.QUESTION_GENERATION, "respuesta")
+
+    assert await cache.get("Genera preguntas sobre derivadas", "m", TaskType.QUESTION_GENERATION) == "respuesta"
+    assert await cache.get("Genera preguntas sobre derivadas", "otro-modelo", TaskType.QUESTION_GENERATION) is None
+    assert await cache.get("Genera preguntas sobre derivadas", "m", TaskType.ANSWER_EVALUATION) is None
+
+    stats = cache.get_stats()
+    assert stats["exact_hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["estimated_cost_saved"] > 0
+
+
+@pytest.mark.asyncio
+async def test_task_types_with_zero_ttl_are_not_cached():
+    cache = ResponseCache()
+    await cache.put("hola", "m", TaskType.TUTORING_DIALOGUE, "respuesta")
+    assert await cache.get("hola", "m", TaskType.TUTORING_DIALOGUE) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_byte_bound_evicts_least_recently_used():
+    cache = ResponseCache(max_bytes=400)
+    await cache.put("a", "m", TaskType.ATOMIZATION, "x" * 100)
+    await cache.put("b", "m", TaskType.ATOMIZATION, "y" * 100)
+    assert await cache.get("a", "m", TaskType.ATOMIZATION) is not None  # "a" pasa a ser el más reciente
+    await cache.put("c", "m", TaskType.ATOMIZATION, "z" * 100)
+
+    assert await cache.get("b", "m", TaskType.ATOMIZATION) is None
+    assert await cache.get("a", "m", TaskType.ATOMIZATION) is not None
+    assert cache.current_bytes <= cache.max_bytes
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier_matches_near_duplicates_only_for_allowed_tasks():
+    cache = ResponseCache(embedding_function=bag_of_words_embedding, similarity_threshold=0.95)
+    await cache.put("explica la fotosintesis", "m", TaskType.CONTENT_EXPLANATION, "explicacion")
+    await cache.put("la respuesta es fotosintesis", "m", TaskType.ANSWER_EVALUATION, "correcta")
+
+    assert await cache.get("explica la fotosintesis!!", "m", TaskType.CONTENT_EXPLANATION) == "explicacion"
+    assert await cache.get("explica fotosintesis la", "m", TaskType.CONTENT_EXPLANATION) == "explicacion"
+    assert await cache.get("qwerty", "m", TaskType.CONTENT_EXPLANATION) is None
+    # La evaluación nunca usa el nivel semántico
+    assert await cache.get("la respuesta es fotosintesis?", "m", TaskType.ANSWER_EVALUATION) is None
+    assert cache.get_stats()["semantic_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_index_follows_puts_and_evictions():
+    cache = ResponseCache(embedding_function=bag_of_words_embedding, similarity_threshold=0.95, max_bytes=2400)
+    prompts = [f"explica el tema {'abcdefghijklmnopqrstuvwxyz'[i] * 6}" for i in range(20)]
+    for i, prompt in enumerate(prompts):
+        await cache.put(prompt, "m", TaskType.CONTENT_EXPLANATION, f"respuesta {i}")
+    await cache.put(prompts[-1], "otro", TaskType.CONTENT_EXPLANATION, "otro modelo")
+
+    index = cache._indexes[(TaskType.CONTENT_EXPLANATION, "m")]
+    assert cache.evictions > 0
+    assert sorted(index.keys) == sorted(key for key, entry in cache._entries.items() if entry.model == "m")
+    assert await cache.get(prompts[-1] + "!", "m", TaskType.CONTENT_EXPLANATION) == "respuesta 19"
+    assert await cache.get(prompts[-1] + "!", "otro", TaskType.CONTENT_EXPLANATION) == "otro modelo"
+    # El primer prompt ya fue desalojado y su fila salió de la matriz
+    assert await cache.get(prompts[0] + "!", "m", TaskType.CONTENT_EXPLANATION) is None
+
+    cache.clear()
+    assert cache._indexes == {}
@@ -0,0 +1,97 @@
+"""
+Tests del planificador de peticiones LLM por carriles de prioridad
+"""
+
+import asyncio
+
+import pytest
+
+from src.scheduler import LLMScheduler, SchedulerRejected
+from src.task_types import TaskType
+
+
+async def run_task(scheduler: LLMScheduler, task_type: TaskType, user_id: str, duration: float, order: list):
+    async with scheduler.slot(task_type, user_id):
+        order.append(task_type)
+        await asyncio.sleep(duration)
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_overtake_bulk_backlog():
+    scheduler = LLMScheduler(max_concurrency=2, per_user_limit=100, shed_on_deadline=False)
+    order = []
+
+    bulk = [
+        asyncio.create_task(run_task(scheduler, TaskType.ATOMIZATION, "importer", 0.01, order))
+        for _ in range(20)
+    ]
+    await asyncio.sleep(0)
+    interactive = [
+        asyncio.create_task(run_task(scheduler, TaskType.ANSWER_EVALUATION, f"student-{i}", 0.01, order))
+        for i in range(4)
+    ]
+    await asyncio.gather(*bulk, *interactive)
+
+    # The four evaluations are served before most of the bulk backlog
+    last_interactive = max(i for i, task_type in enumerate(order) if task_type == TaskType.ANSWER_EVALUATION)
+    assert last_interactive < 8
+
+    stats = scheduler.get_stats()
+    assert stats["lanes"]["bulk"]["admitted"] == 20
+    assert stats["lanes"]["interactive"]["admitted"] == 4
+    assert stats["lanes"]["interactive"]["wait_p95_ms"] < stats["lanes"]["bulk"]["wait_p95_ms"]
+    assert stats["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_user_limit_lets_other_users_through():
+    scheduler = LLMScheduler(max_concurrency=4, per_user_limit=1, shed_on_deadline=False)
+    order = []
+
+    heavy = [
+        asyncio.create_task(run_task(scheduler, TaskType.QUESTION_GENERATION, "heavy", 0.02, order))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    other = asyncio.create_task(run_task(scheduler, TaskType.QUESTION_GENERATION, "other", 0.0, order))
+    await asyncio.sleep(0.005)
+
+    assert other.done()
+    assert scheduler.get_stats()["lanes"]["standard"]["queue_depth"] == 2
+    await asyncio.gather(*heavy)
+
+
+@pytest.mark.asyncio
+async def test_deadline_sheds_queued_requests():
+    scheduler = LLMScheduler(max_concurrency=1, per_user_limit=10, lane_deadlines={"interactive": 0.01})
+    order = []
+
+    blocker = asyncio.create_task(run_task(scheduler, TaskType.ATOMIZATION, "importer", 0.05, order))
+    await asyncio.sleep(0)
+
+    with pytest.raises(SchedulerRejected):
+        async with scheduler.slot(TaskType.TUTORING_DIALOGUE, "student"):
+            pass
+
+    await blocker
+    stats = scheduler.get_stats()
+    assert stats["lanes"]["interactive"]["shed"] == 1
+    assert stats["lanes"]["interactive"]["queue_depth"] == 0
+    assert stats["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_slot():
+    scheduler = LLMScheduler(max_concurrency=1, shed_on_deadline=False)
+    order = []
+
+    blocker = asyncio.create_task(run_task(scheduler, TaskType.ATOMIZATION, "importer", 0.02, order))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(run_task(scheduler, TaskType.ATOMIZATION, "importer", 0.0, order))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await blocker
+
+    async with scheduler.slot(TaskType.ATOMIZATION, "importer"):
+        assert scheduler.get_stats()["active"] == 1
+    assert scheduler.get_stats()["active"] == 0
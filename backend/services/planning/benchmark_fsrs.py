@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la reprogramación FSRS: AdvancedFSRS tarjeta a tarjeta frente al
+motor vectorizado BatchFSRS sobre un lote de tarjetas en todos los estados.
+
+Uso:
+    python benchmark_fsrs.py --cards 1000000 --scalar-sample 20000
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append('.')
+
+from src.infrastructure.algorithms.fsrs import AdvancedFSRS, Card, Rating, State
+from src.infrastructure.algorithms.fsrs_batch import BatchFSRS, CardBatch, from_epoch_us, to_epoch_us
+
+
+def synthetic_batch(fsrs: AdvancedFSRS, size: int, now: datetime, seed: int) -> CardBatch:
+    """Lote aleatorio con tarjetas nuevas, en aprendizaje y en revisión"""
+    rng = np.random.default_rng(seed)
+    batch = CardBatch.empty(size, fsrs, now=now)
+    batch.state[:] = rng.choice([s.value for s in State], size, p=[0.1, 0.1, 0.7, 0.1])
+    seen = batch.state != State.NEW.value
+    batch.stability[seen] = rng.uniform(0.5, 200, int(seen.sum()))
+    batch.difficulty[seen] = rng.uniform(1, 10, int(seen.sum()))
+    days_ago = rng.uniform(0, 90, size)
+    batch.last_review[seen] = to_epoch_us(now) - (days_ago[seen] * 86_400_000_000).astype(np.int64)
+    batch.reps[seen] = rng.integers(1, 30, int(seen.sum()))
+    batch.has_prerequisites[:] = rng.random(size) < 0.3
+    return batch
+
+
+def to_cards(batch: CardBatch, count: int):
+    """Primeras tarjetas del lote como objetos Card para la versión escalar"""
+    return [
+        Card(
+            due=from_epoch_us(batch.due[i]),
+            stability=float(batch.stability[i]),
+            difficulty=float(batch.difficulty[i]),
+            elapsed_days=int(batch.elapsed_days[i]),
+            scheduled_days=int(batch.scheduled_days[i]),
+            reps=int(batch.reps[i]),
+            lapses=int(batch.lapses[i]),
+            state=State(int(batch.state[i])),
+            last_review=from_epoch_us(batch.last_review[i]),
+            prerequisite_concepts=["prerequisito"] if batch.has_prerequisites[i] else [],
+        )
+        for i in range(count)
+    ]
+
+
+def bench_batch(engine: BatchFSRS, batch: CardBatch, ratings, response_times, confidence, now):
+    started = time.perf_counter()
+    engine.repeat(batch, ratings, response_times, confidence, now=now)
+    repeat_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    engine.predict_retention(batch, 1, now=now)
+    retention_seconds = time.perf_counter() - started
+    return repeat_seconds, retention_seconds
+
+
+def bench_scalar(fsrs: AdvancedFSRS, cards, ratings, response_times, confidence, now):
+    started = time.perf_counter()
+    for card, rating, rt, cs in zip(cards, ratings, response_times, confidence):
+        fsrs.repeat(card, Rating(int(rating)), float(rt), float(cs), now=now)
+    repeat_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for card in cards:
+        fsrs.predict_retention(card, 1, now=now)
+    retention_seconds = time.perf_counter() - started
+    return repeat_seconds, retention_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=1_000_000)
+    parser.add_argument("--scalar-sample", type=int, default=20_000,
+                        help="Tarjetas procesadas con la versión escalar (el resultado se extrapola)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import logging
+    import structlog
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    now = datetime.now()
+    fsrs = AdvancedFSRS()
+    engine = BatchFSRS(fsrs)
+    rng = np.random.default_rng(args.seed)
+    ratings = rng.integers(1, 5, args.cards)
+    response_times = rng.uniform(5, 1800, args.cards)
+    confidence = rng.random(args.cards)
+
+    batch = synthetic_batch(fsrs, args.cards, now - timedelta(days=1), args.seed)
+    sample = min(args.scalar_sample, args.cards)
+    scalar_cards = to_cards(batch, sample)
+
+    print(f"Reprogramación FSRS de {args.cards:,} tarjetas\n")
+    batch_repeat, batch_retention = bench_batch(engine, batch, ratings, response_times, confidence, now)
+    print(f"1. BatchFSRS.repeat:            {batch_repeat * 1000:10.1f} ms ({args.cards / batch_repeat:,.0f} tarjetas/s)")
+    print(f"   BatchFSRS.predict_retention: {batch_retention * 1000:10.1f} ms")
+
+    scalar_repeat, scalar_retention = bench_scalar(
+        fsrs, scalar_cards, ratings[:sample], response_times[:sample], confidence[:sample], now
+    )
+    factor = args.cards / sample
+    print(f"2. AdvancedFSRS.repeat:         {scalar_repeat * factor * 1000:10.1f} ms (extrapolado de {sample:,} tarjetas)")
+    print(f"   AdvancedFSRS.predict_retention: {scalar_retention * factor * 1000:7.1f} ms")
+    print(f"\n   Aceleración repeat:          {scalar_repeat * factor / batch_repeat:10.1f}x")
+    print(f"   Aceleración retención:       {scalar_retention * factor / batch_retention:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los algoritmos de planificación sobre datos sintéticos grandes:
+reparto de revisiones con límite diario, orden topológico de átomos con ciclos
+ranking ZDP de candidatos y cierres sobre la caché del grafo de prerrequisitos.
+
+Uso:
+    python benchmark_planning.py --size 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append('.')
+
+from src.domain.services.temp_sorter import build_dependency_graph, build_priorities, sort_atoms
+from src.infrastructure.algorithms.fsrs import AdvancedFSRS, State
+from src.infrastructure.algorithms.fsrs_batch import CardBatch
+from src.infrastructure.algorithms.fsrs_storage import to_epoch_us
+from src.infrastructure.algorithms.review_scheduler import ReviewScheduler
+from src.infrastructure.algorithms.zdp import ZDPAlgorithm
+from src.infrastructure.database.prerequisite_graph import GraphChanges, PrerequisiteGraph
+
+_US_PER_DAY = 86_400_000_000
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def bench_review_scheduler(size: int, seed: int, now: datetime) -> float:
+    """Reparto de `size` tarjetas en revisión a 30 días con 5 días de estudio por semana"""
+    rng = np.random.default_rng(seed)
+    batch = CardBatch.empty(size, AdvancedFSRS(), now=now)
+    batch.state[:] = State.REVIEW.value
+    batch.due[:] = to_epoch_us(now) + rng.integers(-5, 60, size) * _US_PER_DAY
+    batch.stability[:] = rng.uniform(1, 100, size)
+    batch.scheduled_days[:] = rng.integers(1, 120, size)
+    scheduler = ReviewScheduler(daily_limit=max(1, size // 50), available_days_per_week=5)
+
+    _, seconds = timed(scheduler.plan_batch, batch, days_ahead=30, now=now)
+    return seconds
+
+
+def bench_topological_sort(size: int, seed: int) -> float:
+    """Orden de `size` átomos con hasta 3 prerrequisitos y un ciclo largo que romper"""
+    rng = random.Random(seed)
+    atoms = [
+        {
+            "id": f"atom_{i}",
+            "dependencies": [f"atom_{rng.randrange(i)}" for _ in range(min(i, 3))],
+            "difficulty": rng.choice(["básico", "intermedio", "avanzado"]),
+            "estimated_duration_minutes": rng.randint(5, 60),
+            "zdp_score": rng.random(),
+        }
+        for i in range(size)
+    ]
+    graph = build_dependency_graph(atoms)
+    priorities = build_priorities(atoms)
+    if size > 10:
+        graph["atom_10"] = graph["atom_10"] + [f"atom_{size // 2}"]
+
+    _, seconds = timed(sort_atoms, graph, priorities)
+    return seconds
+
+
+def bench_zdp(size: int, seed: int) -> float:
+    """Ranking completo y zonas de `size` átomos con dificultad continua"""
+    difficulty = np.random.default_rng(seed).uniform(1.0, 3.0, size)
+    zdp = ZDPAlgorithm()
+
+    started = time.perf_counter()
+    zdp.rank(difficulty, "intermedio")
+    zdp.zones(difficulty, "intermedio")
+    return time.perf_counter() - started
+
+
+def bench_prerequisite_graph(size: int, seed: int):
+    """Carga de un grafo de `size` átomos con 2 prerrequisitos cada uno y cierres completos"""
+    rng = random.Random(seed)
+    edges = [(f"n{i}", f"n{rng.randrange(i)}") for i in range(1, size) for _ in range(2)]
+    graph, build_seconds = timed(PrerequisiteGraph.from_changes, GraphChanges(edges=edges))
+
+    started = time.perf_counter()
+    graph.ancestors([f"n{size - 1}"])
+    graph.descendants(["n0"])
+    return build_seconds, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import logging
+    import structlog
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    now = datetime.now()
+    print(f"Planificación con {args.size:,} elementos\n")
+    seconds = bench_review_scheduler(args.size, args.seed, now)
+    print(f"ReviewScheduler.plan_batch (30 días):   {seconds * 1000:10.1f} ms")
+    seconds = bench_topological_sort(args.size, args.seed)
+    print(f"sort_atoms (con un ciclo):              {seconds * 1000:10.1f} ms")
+    seconds = bench_zdp(args.size, args.seed)
+    print(f"ZDPAlgorithm.rank + zones:              {seconds * 1000:10.1f} ms")
+    build_seconds, closure_seconds = bench_prerequisite_graph(args.size, args.seed)
+    print(f"PrerequisiteGraph.from_changes:         {build_seconds * 1000:10.1f} ms")
+    print(f"PrerequisiteGraph ancestros + descend.: {closure_seconds * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
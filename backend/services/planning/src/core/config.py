@@ -5,6 +5,8 @@ Configuración del Servicio Agéntico de Planificación
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from typing import Dict, Any, Optional
+import json
+import os
 
 
 class Settings(BaseSettings):
@@ -43,6 +45,23 @@ class Settings(BaseSettings):
     )
     NEO4J_USER: str = Field("neo4j", description="Usuario para Neo4j")
     NEO4J_PASSWORD: str = Field("password", description="Contraseña para Neo4j")
+    NEO4J_DATABASE: Optional[str] = Field(None, description="Base de datos Neo4j (None = la del servidor)")
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = Field(
+        50,
+        description="Tamaño máximo del pool de conexiones del driver asíncrono de Neo4j"
+    )
+    GRAPH_CACHE_REFRESH_SECONDS: int = Field(
+        300,
+        description="Intervalo de refresco incremental de la caché del grafo de prerrequisitos"
+    )
+    GRAPH_CACHE_REFRESH_LAG_SECONDS: int = Field(
+        60,
+        description="Margen que el refresco incremental relee antes del último sello de versión"
+    )
+    GRAPH_CACHE_FULL_RELOAD_SECONDS: int = Field(
+        3600,
+        description="Intervalo de recarga completa de la caché del grafo de prerrequisitos"
+    )
     
     # Cache
     REDIS_URL: str = Field("redis://localhost:6379/1", env="REDIS_URL")
@@ -51,12 +70,18 @@ class Settings(BaseSettings):
     # Algoritmos pedagógicos
     FSRS_DEFAULT_PARAMETERS: Dict[str, Any] = Field(
         default_factory=lambda: {
-            "w": [0.4, 0.6, 2.4, 5.8],  # Pesos por defecto FSRS
+            "w": None,                   # None = AdvancedFSRS.DEFAULT_WEIGHTS
             "request_retention": 0.9,    # Retención objetivo
+            "daily_review_limit": 20,    # Repasos máximos por sesión
             "maximum_interval": 365      # Intervalo máximo en días
         }
     )
     
+    FSRS_WEIGHTS_FILE: Optional[str] = Field(
+        None,
+        description="JSON de pesos por cohorte generado por fsrs_optimizer"
+    )
+    
     ZDP_DIFFICULTY_WINDOW: float = Field(
         0.2,
         description="Ventana de dificultad para Zona de Desarrollo Próximo"
@@ -149,9 +174,15 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
         
-    def get_fsrs_params(self) -> Dict[str, Any]:
-        """Obtiene parámetros FSRS con valores por defecto"""
-        return self.FSRS_DEFAULT_PARAMETERS.copy()
+    def get_fsrs_params(self, cohort: str = "default") -> Dict[str, Any]:
+        """Obtiene parámetros FSRS, con los pesos ajustados de la cohorte si existen"""
+        params = self.FSRS_DEFAULT_PARAMETERS.copy()
+        if self.FSRS_WEIGHTS_FILE and os.path.exists(self.FSRS_WEIGHTS_FILE):
+            with open(self.FSRS_WEIGHTS_FILE) as f:
+                fitted = json.load(f).get(cohort)
+            if fitted and fitted.get("fitted"):
+                params["w"] = fitted["weights"]
+        return params
     
     def get_feature_flags(self) -> Dict[str, bool]:
         """Obtiene todos los feature flags activos"""
@@ -10,12 +10,14 @@ from typing import Dict, Any, Optional
 from .config import settings
 from ..domain.services.agentic_planning_service import AgenticPlanningService
 from ..infrastructure.database.planning_repository import PostgresPlanningRepository
-from ..infrastructure.database.neo4j_knowledge_graph import Neo4jPlanningRepository
+from ..infrastructure.database.neo4j_repository import Neo4jPlanningRepository
+from ..infrastructure.database.neo4j_knowledge_graph import Neo4jKnowledgeGraph
+from ..infrastructure.database.prerequisite_graph import PrerequisiteGraphCache
 from ..infrastructure.agentic.orchestrator_client import OrchestratorClient
 from ..infrastructure.clients.atomization_client import AtomizationClient
 from ..infrastructure.clients.evaluation_client import EvaluationClient
-from ..domain.algorithms.fsrs_algorithm import FSRSAlgorithm
-from ..domain.algorithms.zdp_algorithm import ZDPAlgorithm
+from ..infrastructure.algorithms.fsrs import FSRSAlgorithm
+from ..infrastructure.algorithms.zdp import ZDPAlgorithm
 
 logger = structlog.get_logger()
 
@@ -74,6 +76,26 @@ def get_neo4j_repository() -> Neo4jPlanningRepository:
         password=settings.NEO4J_PASSWORD
     )
 
+@lru_cache()
+def get_knowledge_graph() -> Neo4jKnowledgeGraph:
+    """Grafo de conocimiento con el driver asíncrono (el esquema se crea en el arranque)"""
+    return Neo4jKnowledgeGraph(
+        uri=settings.NEO4J_URI,
+        user=settings.NEO4J_USER,
+        password=settings.NEO4J_PASSWORD,
+        database=settings.NEO4J_DATABASE,
+        max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE
+    )
+
+@lru_cache()
+def get_prerequisite_graph_cache() -> PrerequisiteGraphCache:
+    """Caché en memoria del grafo de prerrequisitos (se carga en el arranque)"""
+    return PrerequisiteGraphCache(
+        get_neo4j_repository(),
+        refresh_lag_ms=settings.GRAPH_CACHE_REFRESH_LAG_SECONDS * 1000,
+        full_reload_seconds=settings.GRAPH_CACHE_FULL_RELOAD_SECONDS
+    )
+
 async def get_planning_service() -> AgenticPlanningService:
     """
     Obtiene instancia del servicio de planificación.
@@ -90,7 +112,7 @@ async def get_planning_service() -> AgenticPlanningService:
         
         # Crear repositorios con conexiones reales
         planning_repository = get_planning_repository()
-        graph_repository = get_neo4j_repository()
+        graph_repository = get_prerequisite_graph_cache()
         
         # Crear clientes de servicios
         atomization_client = get_atomization_client()
@@ -2,6 +2,7 @@
 Servicio Agéntico de Planificación con Workflow Plan-Execute-Observe-Reflect
 """
 
+import asyncio
 import json
 import re
 import uuid
@@ -18,10 +19,13 @@ from ...schemas import (
     AgentPlanningMetadata, LearningRecommendation,
     DifficultyLevel, PlanStatus
 )
-from .temp_sorter import build_dependency_graph, topological_sort_atoms
+from .temp_sorter import build_dependency_graph, build_priorities, sort_atoms
 
 logger = structlog.get_logger()
 
+# Sin fecha límite, el plan cubre los repasos hasta estos días después del último contenido nuevo
+DEFAULT_REVIEW_HORIZON_DAYS = 60
+
 
 class AgenticPlanningService:
     """
@@ -32,7 +36,7 @@ class AgenticPlanningService:
     def __init__(
         self,
         planning_repository,  # PlanningRepository
-        graph_repository, # Neo4jPlanningRepository
+        graph_repository, # PrerequisiteGraphCache (o Neo4jPlanningRepository)
         agentic_orchestrator,  # AgenticOrchestratorClient
         atomization_client,  # AtomizationServiceClient
         evaluation_client,  # EvaluationServiceClient
@@ -70,9 +74,9 @@ class AgenticPlanningService:
             )
             
             try:
-            agent_result = await self.agentic_orchestrator.process_educational_task(
-                planning_task
-            )
+                agent_result = await self.agentic_orchestrator.process_educational_task(
+                    planning_task
+                )
             except Exception as e:
                 logger.warning("Orchestrator failed, using fallback", error=str(e))
                 # Fallback para testing - simulación de respuesta del agente
@@ -92,18 +96,19 @@ class AgenticPlanningService:
             # Extraer plan de la respuesta del agente
             plan_data = self._extract_plan_from_agent(agent_result, request)
             
-            # Obtener todos los átomos candidatos desde el grafo
-            available_atoms = await self._get_available_atoms(request.learning_goals)
+            # Obtener los átomos candidatos del grafo y los ya dominados en paralelo
+            available_atoms, mastered_atom_ids = await asyncio.gather(
+                self._get_available_atoms(request.learning_goals),
+                self.planning_repository.get_mastered_atom_ids(request.user_id)
+            )
             
             # Fallback: si no hay átomos disponibles, crear algunos mock para testing
             if not available_atoms:
                 logger.info("No atoms from graph, creating mock atoms for testing")
                 available_atoms = self._create_mock_atoms(request.learning_goals)
             
-            # Obtener átomos que el usuario ya ha dominado
-            mastered_atom_ids = await self.planning_repository.get_mastered_atom_ids(request.user_id)
-            
             # Filtrar los átomos para excluir los ya dominados
+            mastered_atom_ids = set(mastered_atom_ids)
             unmastered_atoms = [
                 atom for atom in available_atoms
                 if atom['id'] not in mastered_atom_ids
@@ -286,17 +291,8 @@ class AgenticPlanningService:
         Obtiene átomos disponibles y sus dependencias desde el grafo de conocimiento.
         """
         try:
-            all_atoms = []
-            seen_atom_ids = set()
-            
-            for goal in learning_goals:
-                # Usar el repositorio de Neo4j para obtener la ruta de aprendizaje
-                path_atoms = await self.graph_repository.get_learning_path_for_topic(goal)
-                
-                for atom in path_atoms:
-                    if atom['id'] not in seen_atom_ids:
-                        all_atoms.append(atom)
-                        seen_atom_ids.add(atom['id'])
+            # Una sola consulta para todos los objetivos; los átomos llegan sin duplicados
+            all_atoms = await self.graph_repository.get_learning_paths_for_goals(learning_goals)
 
             logger.info("Retrieved atoms from graph", count=len(all_atoms), goals=learning_goals)
             return all_atoms
@@ -340,17 +336,24 @@ class AgenticPlanningService:
         # 1. Construir el grafo de dependencias a partir de los datos de los átomos
         dependency_graph = build_dependency_graph(available_atoms)
         
-        # 2. Ordenar los átomos topológicamente para asegurar un orden de aprendizaje válido
-        sorted_atom_ids, has_cycle = topological_sort_atoms(dependency_graph)
-        
-        if has_cycle:
+        # 2. Ordenar los átomos topológicamente, desempatando por prioridad pedagógica
+        #    (ZDP respecto al nivel actual del estudiante, dificultad y duración)
+        zdp_scores = None
+        if self.zdp_algorithm is not None and available_atoms:
+            zdp_scores = self.zdp_algorithm.score(
+                self.zdp_algorithm.encode(available_atoms), request.context.current_level
+            ).tolist()
+        topological_order = sort_atoms(dependency_graph, build_priorities(available_atoms, zdp_scores))
+        sorted_atom_ids = topological_order.order
+        
+        if topological_order.has_cycle:
             logger.warning(
-                "Cycle detected in learning path dependencies. Plan may be incorrect.",
+                "Cycle detected in learning path dependencies, breaking it",
                 user_id=request.user_id,
-                goals=request.learning_goals
+                goals=request.learning_goals,
+                cycles=topological_order.cycles,
+                removed_edges=topological_order.removed_edges
             )
-            # En caso de ciclo, usar un orden simple como fallback
-            sorted_atom_ids = [atom['id'] for atom in available_atoms if 'id' in atom]
 
         # Reordenar la lista de átomos según el orden topológico
         atom_map = {atom['id']: atom for atom in available_atoms}
@@ -409,9 +412,6 @@ class AgenticPlanningService:
     ) -> Schedule:
         """Crea calendario optimizado con repetición espaciada"""
         
-        daily_sessions = []
-        current_date = date.today()
-        
         # Calcular distribución de átomos
         atoms_per_day = learning_path.total_atoms / (request.time_available_hours * 60 / request.context.minutes_per_session)
         atoms_per_session = max(1, int(atoms_per_day))
@@ -420,67 +420,105 @@ class AgenticPlanningService:
         for phase in learning_path.phases:
             all_atoms.extend(phase.atoms)
         
-        # Aplicar algoritmo FSRS simulado para programar revisiones
-        review_schedule: Dict[int, List[str]] = self._generate_simple_review_schedule(
-            all_atoms,
-            request.context.available_days_per_week
-        )
+        # Estado de memoria real del usuario: una sola lectura para todos los átomos del plan
+        stored_cards = await self.planning_repository.get_fsrs_cards(request.user_id, all_atoms)
+        new_atoms = [atom for atom in all_atoms if atom not in stored_cards]
         
-        day_counter = 1
-        atom_index = 0
+        sessions_needed = -(-len(new_atoms) // atoms_per_session) or (1 if stored_cards else 0)
+        session_dates = self._study_dates(
+            date.today(), sessions_needed, request.context.available_days_per_week
+        )
         
-        while atom_index < len(all_atoms):
-            # Saltar días no disponibles
-            if current_date.weekday() >= request.context.available_days_per_week:
-                current_date += timedelta(days=1)
-                continue
-            
-            # Átomos nuevos para este día
-            new_atoms = all_atoms[atom_index:atom_index + atoms_per_session]
-            atom_index += len(new_atoms)
-            
-            # Átomos de repaso para este día
-            review_atoms = review_schedule.get(day_counter, [])
-            
+        # Los átomos nuevos se repasan según la tarjeta prevista tras estudiarlos;
+        # los ya estudiados, según su tarjeta guardada
+        review_cards = list(stored_cards.values())
+        for index, atom in enumerate(new_atoms):
+            review_cards.append(
+                self.fsrs_algorithm.project_introduction(atom, session_dates[index // atoms_per_session])
+            )
+        review_sessions, pending = self.fsrs_algorithm.schedule_reviews(review_cards, session_dates)
+        
+        # Añadir sesiones hasta que quepan los repasos que vencen después de la última
+        # sesión y los que no cupieron por el límite diario, sin pasar del horizonte
+        # del plan: los que vencen más tarde se informan como fuera del plan
+        horizon = max(
+            request.deadline or session_dates[-1] + timedelta(days=DEFAULT_REVIEW_HORIZON_DAYS),
+            session_dates[-1]
+        ) if session_dates else None
+        due_dates = {card.concept_id: card.due.date() for card in review_cards}
+        daily_limit = self.fsrs_algorithm.daily_review_limit
+        while pending and daily_limit > 0:
+            in_horizon = [atom for atom in pending if due_dates[atom] <= horizon]
+            extra_dates = [
+                session_date for session_date in self._study_dates(
+                    session_dates[-1] + timedelta(days=1),
+                    -(-len(in_horizon) // daily_limit),
+                    request.context.available_days_per_week,
+                    until=max(due_dates[atom] for atom in in_horizon) if in_horizon else None
+                )
+                if session_date <= horizon
+            ]
+            if not in_horizon or not extra_dates:
+                break
+            session_dates += extra_dates
+            review_sessions, pending = self.fsrs_algorithm.schedule_reviews(review_cards, session_dates)
+        
+        # Solo se recortan los días vacíos del final; `day` cuenta días naturales
+        # desde el inicio del plan, para que refleje cuándo toca cada repaso
+        last_used = max(
+            (index for index, review_atoms in enumerate(review_sessions)
+             if review_atoms or index * atoms_per_session < len(new_atoms)),
+            default=-1
+        )
+        daily_sessions = []
+        for index, review_atoms in enumerate(review_sessions[:last_used + 1]):
+            new_session_atoms = new_atoms[index * atoms_per_session:(index + 1) * atoms_per_session]
             session = DailySession(
-                day=day_counter,
-                date=None,  # Temporalmente como None para evitar error de validación
-                atoms=new_atoms,
+                day=(session_dates[index] - session_dates[0]).days + 1,
+                date=session_dates[index],
+                atoms=new_session_atoms,
                 review_atoms=review_atoms,
                 estimated_time_minutes=request.context.minutes_per_session,
-                session_type=self._determine_session_type(new_atoms, review_atoms)
+                session_type=self._determine_session_type(new_session_atoms, review_atoms)
             )
-            
             daily_sessions.append(session)
-            current_date += timedelta(days=1)
-            day_counter += 1
+        
+        logger.info(
+            "Schedule built from FSRS cards",
+            user_id=request.user_id,
+            stored_cards=len(stored_cards),
+            new_atoms=len(new_atoms),
+            reviews=sum(len(session.review_atoms) for session in daily_sessions),
+            reviews_beyond_plan=len(pending),
+            sessions=len(daily_sessions)
+        )
         
         return Schedule(
             daily_sessions=daily_sessions,
             total_days=len(daily_sessions),
             review_frequency=plan_data.get("review_strategy", "spaced"),
-            estimated_completion_date=daily_sessions[-1].date if daily_sessions else None
+            estimated_completion_date=daily_sessions[-1].date if daily_sessions else None,
+            reviews_beyond_plan=pending
         )
     
-    def _generate_simple_review_schedule(
-        self, atoms: List[str], days_per_week: int
-    ) -> Dict[int, List[str]]:
-        """Genera calendario simple de revisiones (simulación de FSRS)"""
-        review_schedule = {}
-        
-        # Intervalos de revisión simplificados: 1, 3, 7, 14 días
-        review_intervals = [1, 3, 7, 14]
-        
-        for i, atom in enumerate(atoms):
-            first_study_day = i // 2 + 1  # Día en que se estudia por primera vez
-            
-            for interval in review_intervals:
-                review_day = first_study_day + interval
-                if review_day not in review_schedule:
-                    review_schedule[review_day] = []
-                review_schedule[review_day].append(atom)
-        
-        return review_schedule
+    def _study_dates(
+        self,
+        start: date,
+        sessions: int,
+        days_per_week: int,
+        until: Optional[date] = None
+    ) -> List[date]:
+        """
+        Fechas de las próximas sesiones, saltando los días no disponibles de la semana.
+        Con `until`, se siguen añadiendo sesiones hasta cubrir esa fecha.
+        """
+        dates = []
+        current_date = start
+        while len(dates) < sessions or (until is not None and current_date <= until):
+            if current_date.weekday() < days_per_week:
+                dates.append(current_date)
+            current_date += timedelta(days=1)
+        return dates
     
     def _determine_session_type(self, new_atoms: List[str], review_atoms: List[str]) -> str:
         """Determina el tipo de sesión"""
@@ -614,6 +652,9 @@ class AgenticPlanningService:
                     risk_factors=[]
                 )
             
+            # Registrar las evaluaciones en las tarjetas FSRS del usuario (lectura y escritura en bloque)
+            await self._record_evaluations(current_plan.user_id, update_request)
+            
             # Analizar progreso con el agente
             adaptation_task = self._build_adaptation_task(
                 current_plan, update_request
@@ -649,6 +690,21 @@ class AgenticPlanningService:
             logger.error("Error updating plan", error=str(e), plan_id=plan_id)
             raise
     
+    async def _record_evaluations(self, user_id: str, update_request: UpdatePlanRequest) -> None:
+        """Aplica las evaluaciones a las tarjetas FSRS y las guarda en un único upsert"""
+        if not update_request.evaluation_results:
+            return
+        atom_ids = list(update_request.evaluation_results)
+        # Lectura estricta: si falla, no se guardan tarjetas nuevas encima del historial real
+        cards = await self.planning_repository.get_fsrs_cards(user_id, atom_ids, strict=True)
+        updated = self.fsrs_algorithm.apply_evaluations(
+            cards,
+            update_request.evaluation_results,
+            update_request.time_spent_minutes
+        )
+        await self.planning_repository.save_fsrs_cards(user_id, updated)
+        logger.info("Evaluations recorded in FSRS cards", user_id=user_id, atoms=len(updated))
+    
     def _build_adaptation_task(
         self,
         current_plan: LearningPlanResponse,
@@ -1,71 +1,408 @@
 """
 Temporary module for dependency graph and topological sorting.
+
+- Kahn con heap: entre los átomos disponibles se elige primero el de mejor
+  prioridad pedagógica (ZDP, dificultad, tiempo estimado)
+- Ciclos: componentes fuertemente conexas (Tarjan) y eliminación de un conjunto
+  mínimo de aristas para poder ordenar todo el grafo
 """
 
-from typing import Dict, List, Tuple, Set, Any
+from typing import Dict, List, Tuple, Set, Any, Optional, Sequence
+from dataclasses import dataclass, field
+import heapq
+import numpy as np
+
+# Posición de cada nivel de dificultad textual (los valores numéricos se usan tal cual)
+DIFFICULTY_RANK = {
+    "básico": 1.0, "basico": 1.0, "basic": 1.0,
+    "intermedio": 2.0, "intermediate": 2.0,
+    "avanzado": 3.0, "advanced": 3.0,
+}
+
+Priority = Tuple[float, float, float]
 
 
 def build_dependency_graph(atoms: List[Dict[str, Any]]) -> Dict[str, List[str]]:
     """
     Construye un grafo de dependencias a partir de una lista de átomos.
-    
+
     Args:
         atoms: Lista de átomos con estructura {'id': str, 'dependencies': List[str], ...}
-    
+
     Returns:
         Diccionario donde las claves son IDs de átomos y los valores son listas de dependencias
     """
     dependency_graph = {}
-    
+
     for atom in atoms:
         atom_id = atom.get('id', '')
         dependencies = atom.get('dependencies', [])
-        
+
         if atom_id:
             dependency_graph[atom_id] = dependencies
-    
+
     return dependency_graph
 
 
-def topological_sort_atoms(dependency_graph: Dict[str, List[str]]) -> Tuple[List[str], bool]:
+def pedagogical_priority(atom: Dict[str, Any], zdp_score: Optional[float] = None) -> Priority:
+    """
+    Clave de desempate (menor = antes): mayor zdp_score, menor dificultad y
+    menor tiempo estimado. `zdp_score` sustituye al campo del átomo si se da.
+    """
+    difficulty = atom.get('difficulty', atom.get('difficulty_level', 2.0))
+    if not isinstance(difficulty, (int, float)):
+        difficulty = DIFFICULTY_RANK.get(str(difficulty).lower(), 2.0)
+    return (
+        -float(atom.get('zdp_score', 0.0) if zdp_score is None else zdp_score),
+        float(difficulty),
+        float(atom.get('estimated_duration_minutes', atom.get('estimated_time_minutes', 0)) or 0),
+    )
+
+
+def build_priorities(atoms: List[Dict[str, Any]],
+                     zdp_scores: Optional[Sequence[float]] = None) -> Dict[str, Priority]:
+    """
+    Prioridad pedagógica por ID de átomo
+
+    Args:
+        atoms: Átomos candidatos
+        zdp_scores: Score ZDP de cada átomo, en el mismo orden (ver ZDPAlgorithm.score)
+    """
+    if zdp_scores is None:
+        return {atom['id']: pedagogical_priority(atom) for atom in atoms if atom.get('id')}
+    return {
+        atom['id']: pedagogical_priority(atom, score)
+        for atom, score in zip(atoms, zdp_scores) if atom.get('id')
+    }
+
+
+@dataclass
+class TopologicalOrder:
+    """Resultado de ordenar el grafo de dependencias"""
+    order: List[str]
+    cycles: List[List[str]] = field(default_factory=list)          # Componentes con ciclo
+    removed_edges: List[Tuple[str, str]] = field(default_factory=list)  # (prerrequisito, átomo)
+
+    @property
+    def has_cycle(self) -> bool:
+        return bool(self.cycles)
+
+
+def sort_atoms(dependency_graph: Dict[str, List[str]],
+               priorities: Optional[Dict[str, Priority]] = None) -> TopologicalOrder:
+    """
+    Ordena los átomos con los prerrequisitos antes que los átomos que dependen de ellos.
+
+    Args:
+        dependency_graph: Grafo de dependencias {atom_id: [dependency_ids]}; las dependencias
+            que no son claves del grafo (p. ej. átomos ya dominados) se ignoran
+        priorities: Prioridad pedagógica por átomo (ver pedagogical_priority); a igualdad,
+            se conserva el orden del grafo
+
+    Returns:
+        TopologicalOrder con todos los átomos. Si hay ciclos se informa de las componentes
+        fuertemente conexas y de las aristas eliminadas para romperlos.
+    """
+    nodes = list(dependency_graph)
+    graph = _Adjacency.build(dependency_graph, {node: i for i, node in enumerate(nodes)})
+
+    # Rango de prioridad de cada nodo: el heap trabaja con enteros
+    if priorities:
+        default = (0.0, 2.0, 0.0)
+        keys = np.array([priorities.get(node, default) for node in nodes], dtype=np.float64).reshape(-1, 3)
+        by_rank_array = np.lexsort((np.arange(len(nodes)), keys[:, 2], keys[:, 1], keys[:, 0]))
+        rank_array = np.empty(len(nodes), dtype=np.int64)
+        rank_array[by_rank_array] = np.arange(len(nodes))
+        by_rank, rank = by_rank_array.tolist(), rank_array.tolist()
+    else:
+        by_rank = list(range(len(nodes)))
+        rank = by_rank
+
+    kahn = _Kahn(graph, rank, by_rank)
+    order = kahn.run()
+    if len(order) == len(nodes):
+        return TopologicalOrder([nodes[i] for i in order])
+
+    # Kahn deja sin emitir los ciclos y todo lo que depende de ellos; quitando también
+    # los nodos que no llevan a ningún ciclo, Tarjan trabaja solo sobre la parte cíclica
+    pending = np.ones(len(nodes), dtype=bool)
+    pending[order] = False
+    remaining = _peel_sinks(graph, pending)
+    components = [c for c in tarjan_scc(graph, remaining) if _is_cyclic(c, graph)]
+    removed: List[Tuple[int, int]] = []
+    for component in components:
+        removed.extend(_feedback_edges(component, graph, rank))
+
+    # Sin esas aristas, el mismo Kahn continúa desde donde se quedó
+    order = kahn.release(removed).run()
+    return TopologicalOrder(
+        order=[nodes[i] for i in order],
+        cycles=[[nodes[i] for i in sorted(component, key=rank.__getitem__)] for component in components],
+        removed_edges=[(nodes[source], nodes[target]) for source, target in removed],
+    )
+
+
+def topological_sort_atoms(dependency_graph: Dict[str, List[str]],
+                           priorities: Optional[Dict[str, Priority]] = None) -> Tuple[List[str], bool]:
     """
     Ordena los átomos topológicamente basándose en sus dependencias.
-    
+
     Args:
         dependency_graph: Grafo de dependencias {atom_id: [dependency_ids]}
-    
+        priorities: Prioridad pedagógica opcional por átomo
+
     Returns:
-        Tuple con (lista_ordenada, hay_ciclo)
-    """
-    # Kahn's algorithm for topological sorting
-    in_degree = {}
-    
-    # Initialize in-degree for all nodes
-    for node in dependency_graph:
-        in_degree[node] = 0
-    
-    # Calculate in-degrees
-    for node in dependency_graph:
-        for dependency in dependency_graph[node]:
-            if dependency in in_degree:
-                in_degree[dependency] += 1
-    
-    # Queue for nodes with no incoming edges
-    queue = [node for node in in_degree if in_degree[node] == 0]
-    result = []
-    
-    while queue:
-        node = queue.pop(0)
-        result.append(node)
-        
-        # For each dependency of the current node
-        for dependency in dependency_graph.get(node, []):
-            if dependency in in_degree:
-                in_degree[dependency] -= 1
-                if in_degree[dependency] == 0:
-                    queue.append(dependency)
-    
-    # Check for cycles
-    has_cycle = len(result) != len(dependency_graph)
-    
-    return result, has_cycle 
\ No newline at end of file
+        Tuple con (lista_ordenada, hay_ciclo); la lista incluye todos los átomos
+        aunque haya ciclos (ver sort_atoms)
+    """
+    result = sort_atoms(dependency_graph, priorities)
+    return result.order, result.has_cycle
+
+
+class _Adjacency:
+    """Sucesores de cada nodo en formato CSR (listas planas de Python para iterar rápido)"""
+
+    def __init__(self, pointers: List[int], targets: List[int]):
+        self.pointers = pointers
+        self.targets = targets
+
+    @classmethod
+    def build(cls, dependency_graph: Dict[str, List[str]], index: Dict[str, int]) -> "_Adjacency":
+        size = len(index)
+        sources = np.array(
+            [index.get(dependency, -1) for dependencies in dependency_graph.values() for dependency in dependencies],
+            dtype=np.int64
+        )
+        targets = np.repeat(np.arange(size), [len(dependencies) for dependencies in dependency_graph.values()])
+        return cls.from_edges(sources, targets, size)
+
+    @classmethod
+    def from_edges(cls, sources: np.ndarray, targets: np.ndarray, size: int) -> "_Adjacency":
+        known = sources >= 0
+        sources, targets = sources[known], targets[known]
+        order = np.argsort(sources, kind="stable")
+        pointers = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=pointers[1:])
+        return cls(pointers.tolist(), targets[order].tolist())
+
+    def __len__(self) -> int:
+        return len(self.pointers) - 1
+
+    def __getitem__(self, node: int) -> List[int]:
+        return self.targets[self.pointers[node]:self.pointers[node + 1]]
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Arrays (origen, destino) de todas las aristas"""
+        sources = np.repeat(np.arange(len(self)), np.diff(self.pointers))
+        return sources, np.array(self.targets, dtype=np.int64)
+
+
+class _Kahn:
+    """Kahn con heap de rangos de prioridad; se puede reanudar tras quitar aristas"""
+
+    def __init__(self, graph: _Adjacency, rank: List[int], by_rank: List[int]):
+        self.graph = graph
+        self.rank = rank
+        self.by_rank = by_rank
+        self.in_degree = np.bincount(
+            np.array(graph.targets, dtype=np.int64), minlength=len(graph)
+        ).tolist()
+        self.heap = [rank[i] for i, degree in enumerate(self.in_degree) if degree == 0]
+        heapq.heapify(self.heap)
+        self.order: List[int] = []
+
+    def run(self) -> List[int]:
+        in_degree, rank, by_rank = self.in_degree, self.rank, self.by_rank
+        pointers, targets = self.graph.pointers, self.graph.targets
+        heap, pop, push, emit = self.heap, heapq.heappop, heapq.heappush, self.order.append
+        while heap:
+            node = by_rank[pop(heap)]
+            emit(node)
+            for target in targets[pointers[node]:pointers[node + 1]]:
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    push(heap, rank[target])
+        return self.order
+
+    def release(self, edges: List[Tuple[int, int]]) -> "_Kahn":
+        """Descuenta las aristas eliminadas (todas sus repeticiones) de los grados de entrada"""
+        for source, target in edges:
+            self.in_degree[target] -= self.graph[source].count(target)
+            if self.in_degree[target] == 0:
+                heapq.heappush(self.heap, self.rank[target])
+        return self
+
+
+def _peel_sinks(graph: _Adjacency, pending: np.ndarray) -> Set[int]:
+    """
+    Quita repetidamente de `pending` los nodos sin sucesores pendientes: no pueden
+    estar en un ciclo
+    """
+    sources, targets = graph.edges()
+    inner = pending[sources] & pending[targets]
+    sources, targets = sources[inner], targets[inner]
+    out_degree = np.bincount(sources, minlength=len(graph)).tolist()
+    predecessors = _Adjacency.from_edges(targets, sources, len(graph))
+
+    sinks = [node for node in np.flatnonzero(pending).tolist() if out_degree[node] == 0]
+    remaining = bytearray(pending.tobytes())
+    pointers, parents = predecessors.pointers, predecessors.targets
+    while sinks:
+        node = sinks.pop()
+        remaining[node] = 0
+        for source in parents[pointers[node]:pointers[node + 1]]:
+            out_degree[source] -= 1
+            if out_degree[source] == 0:
+                sinks.append(source)
+    return set(np.flatnonzero(np.frombuffer(remaining, dtype=bool)).tolist())
+
+
+def tarjan_scc(successors: Sequence[Sequence[int]], nodes: Optional[Set[int]] = None) -> List[List[int]]:
+    """
+    Componentes fuertemente conexas (Tarjan iterativo) del subgrafo inducido por `nodes`
+    """
+    nodes = set(range(len(successors))) if nodes is None else nodes
+    position: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    on_stack: Set[int] = set()
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in nodes:
+        if root in position:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                position[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+            targets = successors[node]
+            while child < len(targets):
+                target = targets[child]
+                child += 1
+                if target not in nodes:
+                    continue
+                if target not in position:
+                    work.append((node, child))
+                    work.append((target, 0))
+                    break
+                if target in on_stack:
+                    low[node] = min(low[node], position[target])
+            else:
+                if low[node] == position[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+    return components
+
+
+def _is_cyclic(component: List[int], successors: Sequence[Sequence[int]]) -> bool:
+    return len(component) > 1 or component[0] in successors[component[0]]
+
+
+def _feedback_edges(component: List[int], successors: Sequence[Sequence[int]], rank: List[int]) -> List[Tuple[int, int]]:
+    """
+    Aristas a eliminar para que la componente sea acíclica.
+
+    Ordena la componente con la heurística de Eades-Lin-Smyth (desempate por prioridad
+    pedagógica), toma las aristas que van hacia atrás en ese orden y vuelve a añadir
+    las que no cierran ningún ciclo, de modo que el conjunto eliminado es mínimo.
+    """
+    members = set(component)
+    inner = {node: list(dict.fromkeys(t for t in successors[node] if t in members)) for node in component}
+    order = _eades_order(component, inner, rank)
+    position = {node: i for i, node in enumerate(order)}
+
+    kept = {node: [t for t in inner[node] if position[t] > position[node]] for node in component}
+    backward = [(node, t) for node in component for t in inner[node] if position[t] <= position[node]]
+    backward.sort(key=lambda edge: (rank[edge[1]], rank[edge[0]]))
+
+    removed = []
+    for source, target in backward:
+        if source != target and not _reaches(kept, target, source):
+            kept[source].append(target)
+        else:
+            removed.append((source, target))
+    return removed
+
+
+def _eades_order(component: List[int], inner: Dict[int, List[int]], rank: List[int]) -> List[int]:
+    predecessors: Dict[int, List[int]] = {node: [] for node in component}
+    for node, targets in inner.items():
+        for target in targets:
+            predecessors[target].append(node)
+    out_degree = {node: len(inner[node]) for node in component}
+    in_degree = {node: len(predecessors[node]) for node in component}
+    alive = set(component)
+    head: List[int] = []
+    tail: List[int] = []
+
+    # Fuentes y sumideros por prioridad; el resto, por out-in máximo (heap perezoso)
+    sources = [rank[n] for n in component if in_degree[n] == 0]
+    sinks = [-rank[n] for n in component if out_degree[n] == 0 and in_degree[n] > 0]
+    balance = [(in_degree[n] - out_degree[n], rank[n], n) for n in component]
+    heapq.heapify(sources)
+    heapq.heapify(sinks)
+    heapq.heapify(balance)
+    node_at = {rank[n]: n for n in component}
+
+    def detach(node: int):
+        alive.discard(node)
+        for target in inner[node]:
+            if target in alive:
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    heapq.heappush(sources, rank[target])
+                else:
+                    heapq.heappush(balance, (in_degree[target] - out_degree[target], rank[target], target))
+        for source in predecessors[node]:
+            if source in alive:
+                out_degree[source] -= 1
+                if out_degree[source] == 0:
+                    heapq.heappush(sinks, -rank[source])
+                else:
+                    heapq.heappush(balance, (in_degree[source] - out_degree[source], rank[source], source))
+
+    while alive:
+        if sinks:
+            node = node_at[-heapq.heappop(sinks)]
+            if node in alive:
+                tail.append(node)
+                detach(node)
+        elif sources:
+            node = node_at[heapq.heappop(sources)]
+            if node in alive:
+                head.append(node)
+                detach(node)
+        else:
+            key, _, node = heapq.heappop(balance)
+            if node in alive and key == in_degree[node] - out_degree[node]:
+                head.append(node)
+                detach(node)
+    return head + tail[::-1]
+
+
+def _reaches(graph: Dict[int, List[int]], start: int, goal: int) -> bool:
+    seen = {start}
+    stack = [start]
+    while stack:
+        node = stack.pop()
+        if node == goal:
+            return True
+        for target in graph[node]:
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return False
@@ -4,13 +4,15 @@ Implementación avanzada basada en FSRS-5 con optimizaciones pedagógicas
 """
 
 from typing import Dict, List, Any, Tuple, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 import math
 import numpy as np
 import structlog
 from dataclasses import dataclass, field
 from enum import Enum
 
+from .fsrs_storage import RollingStats
+
 logger = structlog.get_logger()
 
 
@@ -30,9 +32,18 @@ class State(Enum):
     RELEARNING = 3 # Re-aprendizaje
 
 
-@dataclass
+# Patrones de error recientes que se conservan por tarjeta
+MAX_ERROR_PATTERNS = 8
+
+
+@dataclass(slots=True)
 class Card:
-    """Tarjeta FSRS mejorada con metadata educativa"""
+    """Tarjeta FSRS mejorada con metadata educativa
+    
+    El historial por tarjeta es de tamaño fijo: tiempos de respuesta y confianza
+    en ventanas RollingStats (con acumulados totales) y solo los últimos
+    MAX_ERROR_PATTERNS patrones de error.
+    """
     due: datetime
     stability: float
     difficulty: float
@@ -51,12 +62,24 @@ class Card:
     learning_objectives: List[str] = field(default_factory=list)
     
     # Análisis de patrones de aprendizaje
-    response_times: List[float] = field(default_factory=list)  # En segundos
-    error_patterns: List[str] = field(default_factory=list)
-    confidence_scores: List[float] = field(default_factory=list)
+    response_times: RollingStats = field(default_factory=RollingStats)  # En segundos
+    error_patterns: Tuple[str, ...] = ()
+    confidence_scores: RollingStats = field(default_factory=RollingStats)
+    
+    def __post_init__(self):
+        # Admite listas (formato anterior) y las convierte a almacenamiento acotado
+        if not isinstance(self.response_times, RollingStats):
+            self.response_times = RollingStats(self.response_times)
+        if not isinstance(self.confidence_scores, RollingStats):
+            self.confidence_scores = RollingStats(self.confidence_scores)
+        self.error_patterns = tuple(self.error_patterns)[-MAX_ERROR_PATTERNS:]
+    
+    def record_error(self, pattern: str):
+        """Registra un patrón de error conservando solo los más recientes"""
+        self.error_patterns = (self.error_patterns + (pattern,))[-MAX_ERROR_PATTERNS:]
 
 
-@dataclass
+@dataclass(slots=True)
 class ReviewLog:
     """Log de revisión FSRS"""
     rating: Rating
@@ -105,7 +128,14 @@ class AdvancedFSRS:
             maximum_interval: Intervalo máximo en días
             educational_mode: Habilita optimizaciones educativas
         """
-        self.w = weights or self.DEFAULT_WEIGHTS.copy()
+        if weights and len(weights) != len(self.DEFAULT_WEIGHTS):
+            logger.warning(
+                "Ignoring FSRS weights with wrong length",
+                expected=len(self.DEFAULT_WEIGHTS),
+                received=len(weights)
+            )
+            weights = None
+        self.w = list(weights) if weights else self.DEFAULT_WEIGHTS.copy()
         self.request_retention = request_retention
         self.maximum_interval = maximum_interval
         self.educational_mode = educational_mode
@@ -148,7 +178,8 @@ class AdvancedFSRS:
     
     def repeat(self, card: Card, rating: Rating, 
                response_time: Optional[float] = None,
-               confidence_score: Optional[float] = None) -> Tuple[Card, ReviewLog]:
+               confidence_score: Optional[float] = None,
+               now: Optional[datetime] = None) -> Tuple[Card, ReviewLog]:
         """
         Procesa una revisión y devuelve la tarjeta actualizada
         
@@ -157,8 +188,9 @@ class AdvancedFSRS:
             rating: Calificación de la respuesta
             response_time: Tiempo de respuesta en segundos
             confidence_score: Nivel de confianza (0-1)
+            now: Instante de la revisión (por defecto, ahora)
         """
-        now = datetime.now()
+        now = now or datetime.now()
         elapsed_days = (now - card.last_review).days if card.last_review else 0
         
         # Crear log de revisión
@@ -184,11 +216,11 @@ class AdvancedFSRS:
         
         # Procesar según el estado actual
         if card.state == State.NEW:
-            card = self._repeat_new(card, rating)
+            card = self._repeat_new(card, rating, now)
         elif card.state in (State.LEARNING, State.RELEARNING):
-            card = self._repeat_learning(card, rating)
+            card = self._repeat_learning(card, rating, now)
         else:  # State.REVIEW
-            card = self._repeat_review(card, rating, elapsed_days)
+            card = self._repeat_review(card, rating, elapsed_days, now)
         
         # Aplicar modificaciones educativas
         if self.educational_mode:
@@ -208,7 +240,7 @@ class AdvancedFSRS:
         
         return card, review_log
     
-    def _repeat_new(self, card: Card, rating: Rating) -> Card:
+    def _repeat_new(self, card: Card, rating: Rating, now: datetime) -> Card:
         """Procesa tarjeta nueva"""
         card.elapsed_days = 0
         card.reps += 1
@@ -216,19 +248,19 @@ class AdvancedFSRS:
         if rating == Rating.AGAIN:
             card.difficulty = self._next_difficulty(card.difficulty, rating)
             card.stability = self.w[3]
-            card.due = datetime.now() + timedelta(minutes=1)
+            card.due = now + timedelta(minutes=1)
             card.scheduled_days = 0
             card.state = State.LEARNING
         elif rating == Rating.HARD:
             card.difficulty = self._next_difficulty(card.difficulty, rating)
             card.stability = self.w[4]
-            card.due = datetime.now() + timedelta(minutes=5)
+            card.due = now + timedelta(minutes=5)
             card.scheduled_days = 0
             card.state = State.LEARNING
         elif rating == Rating.GOOD:
             card.difficulty = self._next_difficulty(card.difficulty, rating)
             card.stability = self.w[5]
-            card.due = datetime.now() + timedelta(minutes=10)
+            card.due = now + timedelta(minutes=10)
             card.scheduled_days = 0
             card.state = State.LEARNING
         else:  # Rating.EASY
@@ -236,12 +268,12 @@ class AdvancedFSRS:
             card.stability = self.w[6]
             interval = self._next_interval(card.stability)
             card.scheduled_days = interval
-            card.due = datetime.now() + timedelta(days=interval)
+            card.due = now + timedelta(days=interval)
             card.state = State.REVIEW
         
         return card
     
-    def _repeat_learning(self, card: Card, rating: Rating) -> Card:
+    def _repeat_learning(self, card: Card, rating: Rating, now: datetime) -> Card:
         """Procesa tarjeta en aprendizaje"""
         card.reps += 1
         
@@ -249,13 +281,13 @@ class AdvancedFSRS:
             card.lapses += 1
             card.difficulty = self._next_difficulty(card.difficulty, rating)
             card.stability = self.w[9]
-            card.due = datetime.now() + timedelta(minutes=5)
+            card.due = now + timedelta(minutes=5)
             card.scheduled_days = 0
             card.state = State.LEARNING
         elif rating == Rating.HARD:
             card.difficulty = self._next_difficulty(card.difficulty, rating)
             card.stability = self.w[10]
-            card.due = datetime.now() + timedelta(minutes=10)
+            card.due = now + timedelta(minutes=10)
             card.scheduled_days = 0
             card.state = State.LEARNING
         elif rating == Rating.GOOD:
@@ -263,19 +295,19 @@ class AdvancedFSRS:
             card.stability = self.w[11]
             interval = self._next_interval(card.stability)
             card.scheduled_days = interval
-            card.due = datetime.now() + timedelta(days=interval)
+            card.due = now + timedelta(days=interval)
             card.state = State.REVIEW
         else:  # Rating.EASY
             card.difficulty = self._next_difficulty(card.difficulty, rating)
             card.stability = self.w[12]
             interval = self._next_interval(card.stability)
             card.scheduled_days = max(interval, 4)
-            card.due = datetime.now() + timedelta(days=card.scheduled_days)
+            card.due = now + timedelta(days=card.scheduled_days)
             card.state = State.REVIEW
         
         return card
     
-    def _repeat_review(self, card: Card, rating: Rating, elapsed_days: int) -> Card:
+    def _repeat_review(self, card: Card, rating: Rating, elapsed_days: int, now: datetime) -> Card:
         """Procesa tarjeta en revisión"""
         card.elapsed_days = elapsed_days
         card.reps += 1
@@ -284,7 +316,7 @@ class AdvancedFSRS:
             card.lapses += 1
             card.difficulty = self._next_difficulty(card.difficulty, rating)
             card.stability = self._next_forget_stability(card, elapsed_days)
-            card.due = datetime.now() + timedelta(minutes=5)
+            card.due = now + timedelta(minutes=5)
             card.scheduled_days = 0
             card.state = State.RELEARNING
         else:
@@ -292,7 +324,7 @@ class AdvancedFSRS:
             card.stability = self._next_recall_stability(card, elapsed_days, rating)
             interval = self._next_interval(card.stability)
             card.scheduled_days = interval
-            card.due = datetime.now() + timedelta(days=interval)
+            card.due = now + timedelta(days=interval)
             card.state = State.REVIEW
         
         return card
@@ -303,17 +335,18 @@ class AdvancedFSRS:
         return max(1, min(next_d, 10))
     
     def _next_recall_stability(self, card: Card, elapsed_days: int, rating: Rating) -> float:
-        """Calcula estabilidad para respuesta correcta"""
+        """Calcula estabilidad para respuesta correcta (w[8..10] como en FSRS-5)"""
         hard_penalty = self.w[15] if rating == Rating.HARD else 1
         easy_bonus = self.w[16] if rating == Rating.EASY else 1
         
         return card.stability * (
-            math.exp(self.w[17]) *
+            math.exp(self.w[8]) *
             (11 - card.difficulty) *
-            math.pow(card.stability, -self.w[18]) *
-            (math.exp((1 - self._retention_from_stability(card.stability, elapsed_days)) * self.w[19]) - 1) *
+            math.pow(card.stability, -self.w[9]) *
+            (math.exp((1 - self._retention_from_stability(card.stability, elapsed_days)) * self.w[10]) - 1) *
             hard_penalty *
-            easy_bonus
+            easy_bonus +
+            1
         )
     
     def _next_forget_stability(self, card: Card, elapsed_days: int) -> float:
@@ -366,9 +399,9 @@ class AdvancedFSRS:
         
         return card
     
-    def predict_retention(self, card: Card, days_ahead: int = 0) -> float:
+    def predict_retention(self, card: Card, days_ahead: int = 0, now: Optional[datetime] = None) -> float:
         """Predice la retención de una tarjeta en X días"""
-        target_date = datetime.now() + timedelta(days=days_ahead)
+        target_date = (now or datetime.now()) + timedelta(days=days_ahead)
         elapsed = (target_date - card.last_review).days if card.last_review else 0
         return self._retention_from_stability(card.stability, elapsed)
     
@@ -385,51 +418,16 @@ class AdvancedFSRS:
         if not cards:
             return {}
         
-        total_cards = len(cards)
-        review_cards = [c for c in cards if c.state == State.REVIEW]
-        
-        # Estadísticas básicas
-        avg_stability = np.mean([c.stability for c in cards])
-        avg_difficulty = np.mean([c.difficulty for c in cards])
-        avg_reps = np.mean([c.reps for c in cards])
-        
-        # Análisis de tiempo de respuesta
-        all_response_times = []
-        for card in cards:
-            all_response_times.extend(card.response_times)
-        
-        avg_response_time = np.mean(all_response_times) if all_response_times else 0
-        
-        # Análisis de confianza
-        all_confidence_scores = []
-        for card in cards:
-            all_confidence_scores.extend(card.confidence_scores)
-        
-        avg_confidence = np.mean(all_confidence_scores) if all_confidence_scores else 0
-        
-        # Predicción de retención general
-        retention_predictions = [
-            self.predict_retention(card, 1) for card in review_cards
-        ]
-        avg_retention = np.mean(retention_predictions) if retention_predictions else 0
-        
-        return {
-            "total_cards": total_cards,
-            "review_cards": len(review_cards),
-            "average_stability": float(avg_stability),
-            "average_difficulty": float(avg_difficulty),
-            "average_repetitions": float(avg_reps),
-            "average_response_time_seconds": float(avg_response_time),
-            "average_confidence": float(avg_confidence),
-            "predicted_retention_tomorrow": float(avg_retention),
-            "learning_efficiency": float(avg_stability / max(avg_reps, 1)),
-            "mastery_rate": len([c for c in cards if c.stability > 50]) / total_cards
-        }
+        # Se calcula sobre columnas NumPy en lugar de listas por tarjeta
+        from .fsrs_batch import BatchFSRS, CardBatch
+        return BatchFSRS(self).analyze(CardBatch.from_cards(cards, self))
     
     async def generate_review_schedule(self, 
                                      cards: List[Card],
                                      days_ahead: int = 7,
-                                     daily_limit: int = 50) -> Dict[str, List[Card]]:
+                                     daily_limit: int = 50,
+                                     available_days_per_week: int = 7,
+                                     now: Optional[datetime] = None) -> Dict[str, List[Card]]:
         """
         Genera un calendario de revisiones optimizado
         
@@ -437,48 +435,17 @@ class AdvancedFSRS:
             cards: Lista de tarjetas
             days_ahead: Días hacia adelante a planificar
             daily_limit: Límite diario de revisiones
-        """
-        schedule = {}
-        now = datetime.now()
-        
-        # Obtener tarjetas que necesitan revisión
-        due_cards = [
-            card for card in cards 
-            if card.due <= now + timedelta(days=days_ahead)
-        ]
-        
-        # Ordenar por prioridad (urgencia + importancia)
-        due_cards.sort(key=lambda c: (
-            c.due,  # Urgencia
-            -c.stability,  # Importancia (menor estabilidad = más importante)
-            c.difficulty  # Dificultad como desempate
-        ))
-        
-        # Distribuir en días
-        for day in range(days_ahead + 1):
-            date_key = (now + timedelta(days=day)).strftime("%Y-%m-%d")
-            schedule[date_key] = []
-            
-            day_start = now + timedelta(days=day)
-            day_end = day_start + timedelta(days=1)
-            
-            # Tarjetas programadas para este día
-            day_cards = [
-                card for card in due_cards
-                if day_start <= card.due < day_end
-            ]
-            
-            # Aplicar límite diario
-            schedule[date_key] = day_cards[:daily_limit]
+            available_days_per_week: Días de estudio por semana
+            now: Momento de referencia (por defecto, ahora)
         
-        logger.info(
-            "Review schedule generated",
-            total_cards=len(due_cards),
-            days_ahead=days_ahead,
-            daily_limit=daily_limit
-        )
+        Las tarjetas vencidas entran el primer día y lo que supera el límite
+        diario pasa al siguiente día de estudio (ver ReviewScheduler).
+        """
+        from .review_scheduler import ReviewScheduler
         
-        return schedule
+        scheduler = ReviewScheduler(daily_limit, available_days_per_week)
+        plan = scheduler.plan_cards(cards, days_ahead=days_ahead, now=now)
+        return plan.by_date(cards)
 
 
 # Instancia global mejorada
@@ -488,30 +455,127 @@ fsrs_algorithm = AdvancedFSRS()
 class FSRSAlgorithm:
     """Wrapper para mantener compatibilidad con el código existente"""
     
+    # Puntuación mínima (0-1) de una evaluación para cada calificación
+    SCORE_THRESHOLDS = ((0.9, Rating.EASY), (0.7, Rating.GOOD), (0.5, Rating.HARD))
+    
     def __init__(self, parameters: Dict[str, Any]):
         self.fsrs = AdvancedFSRS(
             weights=parameters.get("w"),
             request_retention=parameters.get("request_retention", 0.9),
             maximum_interval=parameters.get("maximum_interval", 365)
         )
+        self.daily_review_limit = parameters.get("daily_review_limit", 10)
         logger.info("FSRS wrapper initialized", params=parameters)
     
+    def rating_from_evaluation(self, result: Dict[str, Any]) -> Rating:
+        """Calificación FSRS de un resultado de evaluación ('rating' 1-4 o 'score' 0-1)"""
+        if "rating" in result:
+            return Rating(int(result["rating"]))
+        score = result.get("score", 0.0)
+        for threshold, rating in self.SCORE_THRESHOLDS:
+            if score >= threshold:
+                return rating
+        return Rating.AGAIN
+    
+    def apply_evaluations(self,
+                          cards: Dict[str, Card],
+                          evaluation_results: Dict[str, Dict[str, Any]],
+                          time_spent_minutes: Optional[Dict[str, int]] = None,
+                          now: Optional[datetime] = None) -> Dict[str, Card]:
+        """
+        Registra un lote de evaluaciones sobre las tarjetas guardadas del usuario
+        
+        Args:
+            cards: Tarjetas existentes por atom_id (las que falten se crean)
+            evaluation_results: Resultado de evaluación por atom_id
+            time_spent_minutes: Tiempo dedicado por atom_id
+            now: Momento de la evaluación
+            
+        Returns:
+            Tarjetas actualizadas por atom_id, listas para guardarse en bloque
+        """
+        now = now or datetime.now()
+        time_spent_minutes = time_spent_minutes or {}
+        updated = {}
+        for atom_id, result in evaluation_results.items():
+            card = cards.get(atom_id) or self.fsrs.create_new_card(concept_id=atom_id)
+            minutes = time_spent_minutes.get(atom_id)
+            updated[atom_id], _ = self.fsrs.repeat(
+                card,
+                self.rating_from_evaluation(result),
+                response_time=minutes * 60 if minutes else None,
+                confidence_score=result.get("confidence"),
+                now=now
+            )
+        return updated
+    
+    def project_introduction(self, atom_id: str, studied_on: date) -> Card:
+        """
+        Tarjeta esperada tras estudiar un átomo nuevo ese día (pasos de aprendizaje
+        completados con GOOD), para planificar su primer repaso
+        """
+        card = self.fsrs.create_new_card(concept_id=atom_id)
+        studied_at = datetime.combine(studied_on, time(hour=9))
+        self.fsrs.repeat(card, Rating.GOOD, now=studied_at)
+        self.fsrs.repeat(card, Rating.GOOD, now=card.due)
+        return card
+    
+    def schedule_reviews(self,
+                         cards: List[Card],
+                         session_dates: List[date],
+                         daily_limit: Optional[int] = None) -> Tuple[List[List[str]], List[str]]:
+        """
+        Reparte los repasos de las tarjetas en las sesiones dadas
+        
+        Returns:
+            (atom_ids a repasar en cada sesión, en el orden de session_dates;
+             atom_ids pendientes: los que no caben en las sesiones o vencen después
+             de la última). Nada se descarta: quien llama debe añadir sesiones para
+             los pendientes.
+        """
+        from .review_scheduler import ReviewScheduler
+        
+        if not session_dates:
+            return [], [card.concept_id for card in cards]
+        start = session_dates[0]
+        offsets = [(session_date - start).days for session_date in session_dates]
+        study_days = np.zeros(offsets[-1] + 1, dtype=bool)
+        study_days[offsets] = True
+        
+        scheduler = ReviewScheduler(daily_limit if daily_limit is not None else self.daily_review_limit)
+        plan = scheduler.plan_cards(
+            cards,
+            days_ahead=offsets[-1],
+            now=datetime.combine(start, time()),
+            study_days=study_days
+        )
+        sessions = [[cards[i].concept_id for i in plan.days[offset]] for offset in offsets]
+        pending = [cards[i].concept_id for i in plan.overflow.tolist()]
+        pending += [card.concept_id for card in cards if card.due.date() > session_dates[-1]]
+        return sessions, pending
+    
     async def generate_review_schedule(self, atoms: List[str], 
-                                     available_days_per_week: int) -> Dict[int, List[str]]:
-        """Método de compatibilidad"""
-        # Convertir a formato legacy
-        schedule = {}
-        cards = [self.fsrs.create_new_card(concept_id=atom_id) for atom_id in atoms]
+                                     available_days_per_week: int,
+                                     daily_limit: Optional[int] = None,
+                                     cards: Optional[Dict[str, Card]] = None) -> Dict[int, List[str]]:
+        """
+        Método de compatibilidad: {sesión: atom_ids}, numerando solo los días con revisiones.
+        Usa las tarjetas guardadas en `cards` y crea tarjetas nuevas solo para los átomos sin historial.
+        """
+        daily_limit = daily_limit if daily_limit is not None else self.daily_review_limit
+        stored = cards or {}
+        cards = [stored.get(atom_id) or self.fsrs.create_new_card(concept_id=atom_id) for atom_id in atoms]
+        # Horizonte suficiente para que quepan todos los átomos con los días de estudio disponibles
+        sessions = -(-len(cards) // max(daily_limit, 1))
+        days_ahead = max(7, -(-sessions * 7 // available_days_per_week))
         
         modern_schedule = await self.fsrs.generate_review_schedule(
-            cards, days_ahead=7, daily_limit=10
+            cards, days_ahead=days_ahead, daily_limit=daily_limit,
+            available_days_per_week=available_days_per_week
         )
         
-        # Convertir de vuelta al formato esperado
-        day_counter = 1
-        for date_str, day_cards in modern_schedule.items():
-            if day_cards:
-                schedule[day_counter] = [card.concept_id for card in day_cards]
-                day_counter += 1
-        
-        return schedule 
\ No newline at end of file
+        day_cards = [day for day in modern_schedule.values() if day]
+        return {
+            session: [card.concept_id for card in cards_of_day]
+            for session, cards_of_day in enumerate(day_cards, start=1)
+        } 
\ No newline at end of file
@@ -0,0 +1,374 @@
+"""
+Motor FSRS vectorizado
+Procesa lotes de tarjetas como estructura de arrays NumPy (una columna por campo)
+con las mismas fórmulas que AdvancedFSRS, para reprogramar millones de tarjetas
+en unas pocas pasadas vectorizadas.
+"""
+
+from typing import Dict, List, Any, Optional, Sequence
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+import math
+import numpy as np
+import structlog
+
+from .fsrs import AdvancedFSRS, Card, Rating, State
+from .fsrs_storage import (
+    CARD_RECORD_DTYPE, NO_REVIEW, BufferLike, ReviewLogStore, from_epoch_us, to_epoch_us
+)
+
+logger = structlog.get_logger()
+
+
+_US_PER_MINUTE = 60_000_000
+_US_PER_DAY = 86_400_000_000
+
+# Minutos hasta la siguiente revisión en pasos de aprendizaje, por calificación (índice = rating)
+_NEW_STEP_MINUTES = np.array([0, 1, 5, 10, 0], dtype=np.int64)
+_LEARNING_STEP_MINUTES = np.array([0, 5, 10, 0, 0], dtype=np.int64)
+
+
+@dataclass
+class CardBatch:
+    """Lote de tarjetas FSRS como estructura de arrays"""
+    stability: np.ndarray           # float64
+    difficulty: np.ndarray          # float64
+    due: np.ndarray                 # int64, µs desde la época
+    last_review: np.ndarray         # int64, µs desde la época o NO_REVIEW
+    elapsed_days: np.ndarray        # int32
+    scheduled_days: np.ndarray      # int32
+    reps: np.ndarray                # int32
+    lapses: np.ndarray              # int32
+    state: np.ndarray               # int8, valores de State
+
+    # Metadata educativa usada por los ajustes de estabilidad
+    difficulty_multiplier: np.ndarray   # float64
+    estimated_time_minutes: np.ndarray  # int32
+    has_prerequisites: np.ndarray       # bool
+
+    # Agregados de tiempos de respuesta y confianza para el análisis de patrones
+    response_time_sum: np.ndarray       # float64
+    response_time_count: np.ndarray     # int32
+    confidence_sum: np.ndarray          # float64
+    confidence_count: np.ndarray        # int32
+
+    concept_ids: Optional[List[Optional[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.stability)
+
+    @classmethod
+    def empty(cls, size: int, fsrs: AdvancedFSRS, now: Optional[datetime] = None) -> "CardBatch":
+        """Lote de tarjetas nuevas equivalente a create_new_card()"""
+        now_us = to_epoch_us(now or datetime.now())
+        return cls(
+            stability=np.full(size, fsrs.w[0], dtype=np.float64),
+            difficulty=np.full(size, fsrs.w[2], dtype=np.float64),
+            due=np.full(size, now_us, dtype=np.int64),
+            last_review=np.full(size, NO_REVIEW, dtype=np.int64),
+            elapsed_days=np.zeros(size, dtype=np.int32),
+            scheduled_days=np.zeros(size, dtype=np.int32),
+            reps=np.zeros(size, dtype=np.int32),
+            lapses=np.zeros(size, dtype=np.int32),
+            state=np.full(size, State.NEW.value, dtype=np.int8),
+            difficulty_multiplier=np.full(size, fsrs.difficulty_multipliers["intermediate"], dtype=np.float64),
+            estimated_time_minutes=np.full(size, 15, dtype=np.int32),
+            has_prerequisites=np.zeros(size, dtype=bool),
+            response_time_sum=np.zeros(size, dtype=np.float64),
+            response_time_count=np.zeros(size, dtype=np.int32),
+            confidence_sum=np.zeros(size, dtype=np.float64),
+            confidence_count=np.zeros(size, dtype=np.int32),
+        )
+
+    @classmethod
+    def from_cards(cls, cards: Sequence[Card], fsrs: AdvancedFSRS) -> "CardBatch":
+        """Construye el lote a partir de tarjetas escalares"""
+        return cls(
+            stability=np.array([c.stability for c in cards], dtype=np.float64),
+            difficulty=np.array([c.difficulty for c in cards], dtype=np.float64),
+            due=np.array([to_epoch_us(c.due) for c in cards], dtype=np.int64),
+            last_review=np.array([to_epoch_us(c.last_review) for c in cards], dtype=np.int64),
+            elapsed_days=np.array([c.elapsed_days for c in cards], dtype=np.int32),
+            scheduled_days=np.array([c.scheduled_days for c in cards], dtype=np.int32),
+            reps=np.array([c.reps for c in cards], dtype=np.int32),
+            lapses=np.array([c.lapses for c in cards], dtype=np.int32),
+            state=np.array([c.state.value for c in cards], dtype=np.int8),
+            difficulty_multiplier=np.array(
+                [fsrs.difficulty_multipliers.get(c.difficulty_level, 1.0) for c in cards], dtype=np.float64
+            ),
+            estimated_time_minutes=np.array([c.estimated_time_minutes or 0 for c in cards], dtype=np.int32),
+            has_prerequisites=np.array([len(c.prerequisite_concepts) > 0 for c in cards], dtype=bool),
+            response_time_sum=np.array([c.response_times.total for c in cards], dtype=np.float64),
+            response_time_count=np.array([c.response_times.count for c in cards], dtype=np.int32),
+            confidence_sum=np.array([c.confidence_scores.total for c in cards], dtype=np.float64),
+            confidence_count=np.array([c.confidence_scores.count for c in cards], dtype=np.int32),
+            concept_ids=[c.concept_id for c in cards],
+        )
+
+    def to_records(self) -> np.ndarray:
+        """Estado FSRS empaquetado en un array estructurado (CARD_RECORD_DTYPE)"""
+        records = np.empty(len(self), dtype=CARD_RECORD_DTYPE)
+        for name in CARD_RECORD_DTYPE.names:
+            records[name] = getattr(self, name)
+        return records
+
+    def to_buffer(self) -> memoryview:
+        """Bytes de to_records() para guardar el lote en bytea o Redis"""
+        return memoryview(self.to_records()).cast("B")
+
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike, fsrs: AdvancedFSRS) -> "CardBatch":
+        """
+        Lote cuyas columnas FSRS son vistas sobre el buffer (sin copia).
+        Con bytes de solo lectura se copia una vez para poder actualizarlo en sitio;
+        la metadata educativa toma los valores por defecto.
+        """
+        records = np.frombuffer(buffer, dtype=CARD_RECORD_DTYPE)
+        if not records.flags.writeable:
+            records = records.copy()
+        batch = cls.empty(len(records), fsrs)
+        for name in CARD_RECORD_DTYPE.names:
+            setattr(batch, name, records[name])
+        return batch
+
+    def write_back(self, cards: Sequence[Card]):
+        """Copia el estado FSRS del lote sobre las tarjetas escalares de origen"""
+        for i, card in enumerate(cards):
+            card.stability = float(self.stability[i])
+            card.difficulty = float(self.difficulty[i])
+            card.due = from_epoch_us(self.due[i])
+            card.last_review = from_epoch_us(self.last_review[i])
+            card.elapsed_days = int(self.elapsed_days[i])
+            card.scheduled_days = int(self.scheduled_days[i])
+            card.reps = int(self.reps[i])
+            card.lapses = int(self.lapses[i])
+            card.state = State(int(self.state[i]))
+
+
+class BatchFSRS:
+    """
+    Versión vectorizada de AdvancedFSRS.
+
+    Usa los pesos y parámetros educativos de la instancia escalar y reproduce
+    sus resultados tarjeta a tarjeta: cada rama (estado × calificación) se
+    evalúa como máscara sobre todo el lote.
+    """
+
+    def __init__(self, fsrs: Optional[AdvancedFSRS] = None):
+        self.fsrs = fsrs or AdvancedFSRS()
+        self.w = np.asarray(self.fsrs.w, dtype=np.float64)
+        # Factor constante de _next_interval, calculado igual que en la versión escalar
+        self._log_retention = math.log(self.fsrs.request_retention)
+        self._log_09 = math.log(0.9)
+
+    # --- Fórmulas vectorizadas ---
+
+    def retention(self, stability: np.ndarray, elapsed_days: np.ndarray) -> np.ndarray:
+        """Retención exp(-t/S); 0 donde la estabilidad no es positiva"""
+        safe = np.where(stability > 0, stability, 1.0)
+        return np.where(stability > 0, np.exp(-elapsed_days / safe), 0.0)
+
+    def next_interval(self, stability: np.ndarray) -> np.ndarray:
+        """Intervalo en días, redondeado como round() de Python (mitad a par)"""
+        interval = np.rint(stability / self._log_retention * self._log_09)
+        return np.clip(interval, 1, self.fsrs.maximum_interval).astype(np.int32)
+
+    def next_difficulty(self, difficulty: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+        next_d = difficulty - self.w[6] * (ratings - 3)
+        return np.clip(next_d, 1, 10)
+
+    def next_recall_stability(self, stability: np.ndarray, difficulty: np.ndarray,
+                              elapsed_days: np.ndarray, ratings: np.ndarray) -> np.ndarray:
+        w = self.fsrs.w
+        hard_penalty = np.where(ratings == Rating.HARD.value, w[15], 1.0)
+        easy_bonus = np.where(ratings == Rating.EASY.value, w[16], 1.0)
+        return stability * (
+            math.exp(w[8]) *
+            (11 - difficulty) *
+            np.power(stability, -w[9]) *
+            (np.exp((1 - self.retention(stability, elapsed_days)) * w[10]) - 1) *
+            hard_penalty *
+            easy_bonus +
+            1
+        )
+
+    def next_forget_stability(self, stability: np.ndarray, difficulty: np.ndarray,
+                              elapsed_days: np.ndarray) -> np.ndarray:
+        w = self.fsrs.w
+        return (
+            w[11] *
+            np.power(difficulty, -w[12]) *
+            (np.power(stability + 1, w[13]) - 1) *
+            np.exp((1 - self.retention(stability, elapsed_days)) * w[14])
+        )
+
+    # --- Operaciones sobre lotes ---
+
+    def repeat(self, batch: CardBatch, ratings: np.ndarray,
+               response_times: Optional[np.ndarray] = None,
+               confidence_scores: Optional[np.ndarray] = None,
+               index: Optional[np.ndarray] = None,
+               now: Optional[datetime] = None,
+               log: Optional[ReviewLogStore] = None):
+        """
+        Aplica una revisión a cada tarjeta del lote (o a las posiciones de index), en sitio
+
+        Args:
+            batch: Lote de tarjetas
+            ratings: Calificación (1-4) por tarjeta revisada
+            response_times: Segundos por tarjeta; NaN o 0 equivalen a None
+            confidence_scores: Confianza (0-1) por tarjeta; NaN o 0 equivalen a None
+            index: Posiciones (sin repetir) del lote revisadas; por defecto, todas
+            now: Instante de la revisión (por defecto, ahora)
+            log: Si se indica, recibe una fila por revisión con el estado previo
+        """
+        idx = slice(None) if index is None else np.asarray(index)
+        ratings = np.asarray(ratings, dtype=np.int64)
+        now_us = to_epoch_us(now or datetime.now())
+
+        stability = batch.stability[idx]
+        state = batch.state[idx]
+        last_review = batch.last_review[idx]
+        reviewed = last_review != NO_REVIEW
+        elapsed = np.where(reviewed, (now_us - np.where(reviewed, last_review, now_us)) // _US_PER_DAY, 0)
+
+        is_new = state == State.NEW.value
+        is_review = state == State.REVIEW.value
+        is_learning = ~is_new & ~is_review  # LEARNING y RELEARNING
+        again = ratings == Rating.AGAIN.value
+        easy = ratings == Rating.EASY.value
+        forgot = is_review & again
+        recalled = is_review & ~again
+        graduated = (is_new & easy) | (is_learning & (ratings >= Rating.GOOD.value)) | recalled
+
+        if log is not None:
+            log.extend(
+                card=np.arange(len(batch))[idx],
+                review=np.full(len(ratings), now_us, dtype=np.int64),
+                rating=ratings,
+                state=state,
+                elapsed_days=elapsed,
+                scheduled_days=batch.scheduled_days[idx],
+                stability=stability,
+                difficulty=batch.difficulty[idx],
+                response_time=np.nan if response_times is None else response_times,
+                confidence=np.nan if confidence_scores is None else confidence_scores,
+            )
+
+        # La dificultad se actualiza igual en todos los estados, antes que la estabilidad
+        difficulty = self.next_difficulty(batch.difficulty[idx], ratings)
+
+        # Nuevas: estabilidad inicial w[3..6]; aprendizaje: w[9..12]; revisión: olvido o recuerdo
+        new_stability = np.where(is_review, stability, self.w[np.where(is_new, 2, 8) + ratings])
+        if forgot.any():
+            new_stability[forgot] = self.next_forget_stability(stability[forgot], difficulty[forgot], elapsed[forgot])
+        if recalled.any():
+            new_stability[recalled] = self.next_recall_stability(
+                stability[recalled], difficulty[recalled], elapsed[recalled], ratings[recalled]
+            )
+
+        new_state = np.select(
+            [forgot, graduated], [State.RELEARNING.value, State.REVIEW.value], State.LEARNING.value
+        ).astype(np.int8)
+
+        interval = self.next_interval(new_stability)
+        interval = np.where(is_learning & easy, np.maximum(interval, 4), interval)
+        scheduled = np.where(graduated, interval, 0).astype(np.int32)
+        step_minutes = np.where(
+            is_new, _NEW_STEP_MINUTES[ratings], np.where(is_learning, _LEARNING_STEP_MINUTES[ratings], 5)
+        )
+        due = np.where(graduated, now_us + scheduled.astype(np.int64) * _US_PER_DAY, now_us + step_minutes * _US_PER_MINUTE)
+
+        if self.fsrs.educational_mode:
+            new_stability = self._apply_educational_adjustments(
+                batch, idx, new_stability, response_times, confidence_scores
+            )
+
+        # Agregados de metadata (0 y NaN cuentan como "sin dato", igual que en la versión escalar)
+        if response_times is not None:
+            rt = np.asarray(response_times, dtype=np.float64)
+            rt_mask = ~np.isnan(rt) & (rt != 0)
+            batch.response_time_sum[idx] += np.where(rt_mask, rt, 0.0)
+            batch.response_time_count[idx] += rt_mask
+        if confidence_scores is not None:
+            cs = np.asarray(confidence_scores, dtype=np.float64)
+            cs_mask = ~np.isnan(cs) & (cs != 0)
+            batch.confidence_sum[idx] += np.where(cs_mask, cs, 0.0)
+            batch.confidence_count[idx] += cs_mask
+
+        batch.stability[idx] = new_stability
+        batch.difficulty[idx] = difficulty
+        batch.state[idx] = new_state
+        batch.scheduled_days[idx] = scheduled
+        batch.due[idx] = due
+        batch.elapsed_days[idx] = np.where(is_new, 0, np.where(is_review, elapsed, batch.elapsed_days[idx]))
+        batch.reps[idx] += 1
+        batch.lapses[idx] += again & ~is_new
+        batch.last_review[idx] = now_us
+
+        logger.debug("Card batch reviewed", cards=len(ratings), graduated=int(graduated.sum()), lapsed=int(forgot.sum()))
+
+    def _apply_educational_adjustments(self, batch: CardBatch, idx, stability: np.ndarray,
+                                       response_times: Optional[np.ndarray],
+                                       confidence_scores: Optional[np.ndarray]) -> np.ndarray:
+        """Mismos factores y en el mismo orden que AdvancedFSRS._apply_educational_adjustments"""
+        stability = stability * batch.difficulty_multiplier[idx]
+
+        if response_times is not None:
+            rt = np.asarray(response_times, dtype=np.float64)
+            expected = batch.estimated_time_minutes[idx] * 60.0
+            has_time = ~np.isnan(rt) & (rt != 0) & (expected != 0)
+            slow = has_time & (rt > expected * 2)
+            fast = has_time & ~slow & (rt < expected * 0.5)
+            stability = np.where(slow, stability * 0.9, stability)
+            stability = np.where(fast, stability * 1.1, stability)
+
+        if confidence_scores is not None:
+            cs = np.asarray(confidence_scores, dtype=np.float64)
+            has_conf = ~np.isnan(cs) & (cs != 0)
+            stability = np.where(has_conf & (cs < 0.5), stability * 0.8, stability)
+            stability = np.where(has_conf & (cs > 0.8), stability * 1.1, stability)
+
+        bonus = 1 + self.fsrs.concept_stability_bonus
+        return np.where(batch.has_prerequisites[idx], stability * bonus, stability)
+
+    def predict_retention(self, batch: CardBatch, days_ahead: int = 0,
+                          now: Optional[datetime] = None) -> np.ndarray:
+        """Retención prevista de cada tarjeta dentro de days_ahead días"""
+        target_us = to_epoch_us((now or datetime.now()) + timedelta(days=days_ahead))
+        reviewed = batch.last_review != NO_REVIEW
+        elapsed = np.where(reviewed, (target_us - np.where(reviewed, batch.last_review, target_us)) // _US_PER_DAY, 0)
+        return self.retention(batch.stability, elapsed)
+
+    def optimal_interval(self, batch: CardBatch, target_retention: float) -> np.ndarray:
+        """Intervalo óptimo de cada tarjeta para una retención objetivo"""
+        if target_retention <= 0 or target_retention >= 1:
+            return np.ones(len(batch), dtype=np.int32)
+        interval = np.rint(batch.stability * math.log(target_retention) / self._log_09)
+        return np.clip(interval, 1, self.fsrs.maximum_interval).astype(np.int32)
+
+    def analyze(self, batch: CardBatch, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Equivalente vectorizado de AdvancedFSRS.analyze_learning_patterns"""
+        total_cards = len(batch)
+        if not total_cards:
+            return {}
+
+        review = batch.state == State.REVIEW.value
+        avg_stability = float(batch.stability.mean())
+        avg_reps = float(batch.reps.mean())
+        response_count = int(batch.response_time_count.sum())
+        confidence_count = int(batch.confidence_count.sum())
+        retention = self.predict_retention(batch, 1, now)[review]
+
+        return {
+            "total_cards": total_cards,
+            "review_cards": int(review.sum()),
+            "average_stability": avg_stability,
+            "average_difficulty": float(batch.difficulty.mean()),
+            "average_repetitions": avg_reps,
+            "average_response_time_seconds": float(batch.response_time_sum.sum() / response_count) if response_count else 0.0,
+            "average_confidence": float(batch.confidence_sum.sum() / confidence_count) if confidence_count else 0.0,
+            "predicted_retention_tomorrow": float(retention.mean()) if len(retention) else 0.0,
+            "learning_efficiency": avg_stability / max(avg_reps, 1),
+            "mastery_rate": int((batch.stability > 50).sum()) / total_cards,
+        }
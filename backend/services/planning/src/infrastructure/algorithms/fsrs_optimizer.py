@@ -0,0 +1,356 @@
+"""
+Optimizador de pesos FSRS
+Ajusta los pesos de AdvancedFSRS por cohorte (o por usuario) a partir del log de
+revisiones, minimizando la log-loss de la retención prevista en cada revisión.
+
+La reproducción del historial es vectorizada en dos ejes: todas las secuencias
+de revisión de la cohorte a la vez y, para el gradiente por diferencias
+centrales, todas las variantes de los pesos a la vez.
+"""
+
+from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import argparse
+import json
+import os
+import numpy as np
+import structlog
+
+from .fsrs import AdvancedFSRS, Rating, State
+from .fsrs_storage import ReviewLogStore
+
+logger = structlog.get_logger()
+
+
+# Límites de cada peso durante la optimización; los exponentes se acotan para evitar desbordes
+WEIGHT_BOUNDS = np.array([
+    (0.01, 100), (0.01, 100), (1, 10), (0.01, 100), (0.01, 100), (0.01, 100), (0.01, 5),
+    (0.001, 1), (0, 5), (0, 1), (0.01, 5), (0.01, 100), (0.001, 1), (0.01, 1), (0, 5),
+    (0.01, 1), (1, 6), (0, 2), (0, 2),
+])
+
+_EPSILON = 1e-6
+
+
+@dataclass
+class ReviewSequences:
+    """Historial de una cohorte como matrices tarjeta × revisión (rellenadas con valid=False)"""
+    rating: np.ndarray        # int64 (n, L)
+    state: np.ndarray         # int8 (n, L), estado antes de cada revisión
+    elapsed: np.ndarray       # float64 (n, L), días desde la revisión anterior
+    valid: np.ndarray         # bool (n, L)
+    stability0: np.ndarray    # float64 (n,), estabilidad si la secuencia no empieza en NEW
+    difficulty0: np.ndarray   # float64 (n,)
+
+    def __len__(self) -> int:
+        return len(self.rating)
+
+    @property
+    def predicted_reviews(self) -> int:
+        """Revisiones en estado REVIEW, las únicas con predicción de retención"""
+        return int((self.valid & (self.state == State.REVIEW.value)).sum())
+
+    def subset(self, rows: np.ndarray) -> "ReviewSequences":
+        return ReviewSequences(
+            self.rating[rows], self.state[rows], self.elapsed[rows], self.valid[rows],
+            self.stability0[rows], self.difficulty0[rows],
+        )
+
+    @classmethod
+    def from_records(cls, records: np.ndarray, max_length: int = 64) -> "ReviewSequences":
+        """Agrupa las filas del log por tarjeta en orden cronológico (primeras max_length revisiones)"""
+        records = records[np.lexsort((records["review"], records["card"]))]
+        cards, starts, counts = np.unique(records["card"], return_index=True, return_counts=True)
+        length = int(min(counts.max(), max_length)) if len(counts) else 0
+        position = np.arange(len(records)) - np.repeat(starts, counts)
+        keep = position < length
+        row = np.repeat(np.arange(len(cards)), counts)[keep]
+        col = position[keep]
+        kept = records[keep]
+
+        shape = (len(cards), length)
+        rating = np.ones(shape, dtype=np.int64)
+        state = np.zeros(shape, dtype=np.int8)
+        elapsed = np.zeros(shape, dtype=np.float64)
+        valid = np.zeros(shape, dtype=bool)
+        rating[row, col] = kept["rating"]
+        state[row, col] = kept["state"]
+        elapsed[row, col] = kept["elapsed_days"]
+        valid[row, col] = True
+        first = records[starts]
+        return cls(rating, state, elapsed, valid,
+                   first["stability"].astype(np.float64), first["difficulty"].astype(np.float64))
+
+
+def replay_loss(weights: np.ndarray, sequences: ReviewSequences) -> np.ndarray:
+    """
+    Log-loss media de la retención prevista para cada vector de pesos.
+
+    Args:
+        weights: Matriz (P, 19) con P vectores de pesos evaluados a la vez
+        sequences: Historial de la cohorte
+
+    Returns:
+        Array (P,) con la log-loss media sobre las revisiones en estado REVIEW
+    """
+    losses, count = _replay(weights, sequences)
+    return losses / max(count, 1)
+
+
+def _replay(weights: np.ndarray, sequences: ReviewSequences, collect: bool = False):
+    """Reproduce las transiciones de AdvancedFSRS (sin ajustes educativos) paso a paso"""
+    W = np.atleast_2d(weights)
+    P = len(W)
+    col = lambda i: W[:, i:i + 1]  # noqa: E731 - columna (P, 1) para difundir sobre tarjetas
+
+    first_new = sequences.state[:, 0] == State.NEW.value if sequences.rating.shape[1] else np.zeros(0, bool)
+    S = np.broadcast_to(np.where(first_new, 1.0, sequences.stability0), (P, len(sequences))).copy()
+    D = np.where(first_new, col(2), sequences.difficulty0)
+    losses = np.zeros(P)
+    count = 0
+    predictions: List[np.ndarray] = []
+    outcomes: List[np.ndarray] = []
+
+    for t in range(sequences.rating.shape[1]):
+        r = sequences.rating[:, t]
+        st = sequences.state[:, t]
+        e = sequences.elapsed[:, t]
+        valid = sequences.valid[:, t]
+        is_new = st == State.NEW.value
+        is_review = st == State.REVIEW.value
+        again = r == Rating.AGAIN.value
+
+        R = np.exp(-e / S)
+        scored = valid & is_review
+        if scored.any():
+            p = np.clip(R[:, scored], _EPSILON, 1 - _EPSILON)
+            y = ~again[scored]
+            losses -= np.where(y, np.log(p), np.log(1 - p)).sum(axis=1)
+            count += int(scored.sum())
+            if collect:
+                predictions.append(R[0, scored])
+                outcomes.append(y)
+
+        D_next = np.clip(D - col(6) * (r - 3), 1, 10)
+        forget = (
+            col(11) * np.power(D_next, -col(12)) * (np.power(S + 1, col(13)) - 1) * np.exp((1 - R) * col(14))
+        )
+        hard = np.where(r == Rating.HARD.value, col(15), 1.0)
+        easy = np.where(r == Rating.EASY.value, col(16), 1.0)
+        recall = S * (
+            np.exp(col(8)) * (11 - D_next) * np.power(S, -col(9)) * (np.exp((1 - R) * col(10)) - 1) * hard * easy + 1
+        )
+        S_next = np.select(
+            [is_new, ~is_review, again],
+            [W[:, 2 + r], W[:, 8 + r], forget],
+            recall,
+        )
+        S = np.where(valid, np.maximum(S_next, 0.01), S)
+        D = np.where(valid, D_next, D)
+
+    if collect:
+        return (losses, count,
+                np.concatenate(predictions) if predictions else np.zeros(0),
+                np.concatenate(outcomes) if outcomes else np.zeros(0, bool))
+    return losses, count
+
+
+def evaluate(weights: List[float], sequences: ReviewSequences, bins: int = 10) -> Dict[str, float]:
+    """Log-loss y error de calibración (RMSE por tramos de retención prevista)"""
+    losses, count, predicted, recalled = _replay(np.asarray(weights, dtype=np.float64), sequences, collect=True)
+    if not count:
+        return {"log_loss": 0.0, "calibration_rmse": 0.0, "reviews": 0}
+    bucket = np.minimum((predicted * bins).astype(np.int64), bins - 1)
+    totals = np.bincount(bucket, minlength=bins)
+    mean_predicted = np.bincount(bucket, weights=predicted, minlength=bins)
+    observed = np.bincount(bucket, weights=recalled.astype(np.float64), minlength=bins)
+    used = totals > 0
+    squared_error = ((mean_predicted[used] - observed[used]) / totals[used]) ** 2
+    return {
+        "log_loss": float(losses[0] / count),
+        "calibration_rmse": float(np.sqrt(np.average(squared_error, weights=totals[used]))),
+        "reviews": count,
+    }
+
+
+@dataclass
+class FitResult:
+    """Resultado del ajuste de una cohorte"""
+    cohort: str
+    weights: List[float]
+    fitted: bool                     # False si el ajuste no mejoró en validación y se mantienen los iniciales
+    cards: int
+    train_reviews: int
+    iterations: int
+    train_loss: float
+    holdout_initial: Dict[str, float] = field(default_factory=dict)
+    holdout_fitted: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cohort": self.cohort,
+            "weights": self.weights,
+            "fitted": self.fitted,
+            "cards": self.cards,
+            "train_reviews": self.train_reviews,
+            "iterations": self.iterations,
+            "train_loss": self.train_loss,
+            "holdout_initial": self.holdout_initial,
+            "holdout_fitted": self.holdout_fitted,
+        }
+
+
+class FSRSOptimizer:
+    """
+    Ajuste de pesos por descenso de gradiente (Adam con proyección a WEIGHT_BOUNDS).
+    El gradiente se estima por diferencias centrales evaluando los 2×19 vectores
+    perturbados en una sola reproducción vectorizada del historial.
+    """
+
+    def __init__(self,
+                 initial_weights: Optional[List[float]] = None,
+                 iterations: int = 200,
+                 learning_rate: float = 0.02,
+                 holdout_fraction: float = 0.2,
+                 min_reviews: int = 200,
+                 max_sequence_length: int = 64,
+                 tolerance: float = 1e-6,
+                 seed: int = 42):
+        self.initial_weights = np.asarray(initial_weights or AdvancedFSRS.DEFAULT_WEIGHTS, dtype=np.float64)
+        self.iterations = iterations
+        self.learning_rate = learning_rate
+        self.holdout_fraction = holdout_fraction
+        self.min_reviews = min_reviews
+        self.max_sequence_length = max_sequence_length
+        self.tolerance = tolerance
+        self.seed = seed
+        # Paso de cada parámetro proporcional a su escala
+        self._scale = np.maximum(np.abs(self.initial_weights), 0.1)
+
+    def split(self, sequences: ReviewSequences):
+        """Separa tarjetas (no revisiones) en entrenamiento y validación"""
+        rng = np.random.default_rng(self.seed)
+        holdout = rng.random(len(sequences)) < self.holdout_fraction
+        return sequences.subset(~holdout), sequences.subset(holdout)
+
+    def fit(self, records: np.ndarray, cohort: str = "default") -> FitResult:
+        """Ajusta los pesos con el log de revisiones (ReviewLogStore.records) de una cohorte"""
+        sequences = ReviewSequences.from_records(records, self.max_sequence_length)
+        train, holdout = self.split(sequences)
+        initial = self.initial_weights.tolist()
+
+        if train.predicted_reviews < self.min_reviews:
+            logger.info("Not enough reviews to fit FSRS weights", cohort=cohort, reviews=train.predicted_reviews)
+            return FitResult(cohort, initial, False, len(sequences), train.predicted_reviews, 0,
+                             float(replay_loss(self.initial_weights, train)[0]))
+
+        weights, loss, iterations = self._minimize(train)
+        holdout_initial = evaluate(initial, holdout)
+        holdout_fitted = evaluate(weights.tolist(), holdout)
+        improved = holdout_fitted["reviews"] == 0 or holdout_fitted["log_loss"] <= holdout_initial["log_loss"]
+
+        logger.info(
+            "FSRS weights fitted",
+            cohort=cohort,
+            cards=len(sequences),
+            iterations=iterations,
+            train_loss=loss,
+            holdout_loss_initial=holdout_initial["log_loss"],
+            holdout_loss_fitted=holdout_fitted["log_loss"],
+            kept=improved
+        )
+        return FitResult(
+            cohort=cohort,
+            weights=weights.tolist() if improved else initial,
+            fitted=improved,
+            cards=len(sequences),
+            train_reviews=train.predicted_reviews,
+            iterations=iterations,
+            train_loss=loss,
+            holdout_initial=holdout_initial,
+            holdout_fitted=holdout_fitted,
+        )
+
+    def _minimize(self, sequences: ReviewSequences):
+        low, high = WEIGHT_BOUNDS[:, 0], WEIGHT_BOUNDS[:, 1]
+        w = np.clip(self.initial_weights.copy(), low, high)
+        n = len(w)
+        step = 1e-4 * self._scale
+        perturbation = np.concatenate([np.diag(step), -np.diag(step)])
+        m = np.zeros(n)
+        v = np.zeros(n)
+        beta1, beta2 = 0.9, 0.999
+        best_w, best_loss = w.copy(), np.inf
+        stalled = 0
+
+        for iteration in range(1, self.iterations + 1):
+            candidates = np.vstack([w, w + perturbation])
+            losses = replay_loss(candidates, sequences)
+            loss = float(losses[0])
+            if loss < best_loss - self.tolerance:
+                best_w, best_loss, stalled = w.copy(), loss, 0
+            else:
+                stalled += 1
+                if stalled >= 20:
+                    break
+
+            gradient = (losses[1:n + 1] - losses[n + 1:]) / (2 * step)
+            m = beta1 * m + (1 - beta1) * gradient
+            v = beta2 * v + (1 - beta2) * gradient ** 2
+            m_hat = m / (1 - beta1 ** iteration)
+            v_hat = v / (1 - beta2 ** iteration)
+            w = np.clip(w - self.learning_rate * self._scale * m_hat / (np.sqrt(v_hat) + 1e-12), low, high)
+
+        return best_w, best_loss, iteration
+
+
+def _fit_cohort(cohort: str, buffer: bytes, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Punto de entrada de cada proceso del pool"""
+    records = ReviewLogStore.from_buffer(buffer).records
+    return FSRSOptimizer(**options).fit(records, cohort).to_dict()
+
+
+def optimize_cohorts(cohorts: Dict[str, ReviewLogStore],
+                     max_workers: Optional[int] = None,
+                     **options) -> Dict[str, FitResult]:
+    """
+    Ajusta cada cohorte en un proceso del pool
+
+    Args:
+        cohorts: Log de revisiones por cohorte (o por usuario)
+        max_workers: Procesos del pool (por defecto, CPUs disponibles)
+        **options: Argumentos de FSRSOptimizer
+    """
+    workers = min(max_workers or os.cpu_count() or 1, max(len(cohorts), 1))
+    if workers <= 1:
+        results = [_fit_cohort(name, bytes(store.to_buffer()), options) for name, store in cohorts.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fit_cohort, name, bytes(store.to_buffer()), options)
+                       for name, store in cohorts.items()]
+            results = [future.result() for future in futures]
+    return {result["cohort"]: FitResult(**result) for result in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajusta pesos FSRS por cohorte a partir de logs de revisión")
+    parser.add_argument("logs", nargs="+", help="Ficheros <cohorte>.bin con el buffer de ReviewLogStore")
+    parser.add_argument("--output", default="fsrs_weights.json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    cohorts = {}
+    for path in args.logs:
+        with open(path, "rb") as f:
+            cohorts[os.path.splitext(os.path.basename(path))[0]] = ReviewLogStore.from_buffer(f.read())
+
+    results = optimize_cohorts(cohorts, max_workers=args.workers, iterations=args.iterations)
+    with open(args.output, "w") as f:
+        json.dump({name: result.to_dict() for name, result in results.items()}, f, indent=2)
+    print(f"Pesos de {len(results)} cohortes guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Almacenamiento compacto de tarjetas y revisiones FSRS
+- RollingStats: ventana circular de tamaño fijo (array('f')) con acumulados de toda la vida
+- ReviewLogStore: log de revisiones columnar sobre un array estructurado NumPy
+- CARD_RECORD_DTYPE: registro binario de tarjeta para serializar lotes sin copias
+"""
+
+from typing import Iterable, Iterator, Optional, Union
+from datetime import datetime, timedelta
+from array import array
+import numpy as np
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+# Las fechas se guardan como microsegundos desde la época (datetime naive), de modo
+# que las diferencias enteras coinciden exactamente con la aritmética de timedelta
+_EPOCH = datetime(1970, 1, 1)
+NO_REVIEW = np.iinfo(np.int64).min  # Centinela de last_review = None
+
+# Valores recientes que se conservan por tarjeta para tiempos de respuesta y confianza
+DEFAULT_WINDOW_SIZE = 16
+
+
+def to_epoch_us(value: Optional[datetime]) -> int:
+    """Convierte un datetime naive a microsegundos desde la época"""
+    if value is None:
+        return int(NO_REVIEW)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_us(value: int) -> Optional[datetime]:
+    """Inversa de to_epoch_us"""
+    if value == NO_REVIEW:
+        return None
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+class RollingStats:
+    """
+    Últimos `size` valores de una serie más su suma y cuenta totales.
+
+    Ocupa lo mismo tras 10 o 10.000 revisiones: la media histórica se obtiene
+    de los acumulados y la ventana sirve para tendencias recientes.
+    """
+
+    __slots__ = ("_values", "_next", "count", "total")
+
+    def __init__(self, values: Iterable[float] = (), size: int = DEFAULT_WINDOW_SIZE):
+        self._values = array("f", bytes(4 * size))
+        self._next = 0
+        self.count = 0
+        self.total = 0.0
+        for value in values:
+            self.append(value)
+
+    @property
+    def size(self) -> int:
+        return len(self._values)
+
+    def append(self, value: float):
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        self.count += 1
+        self.total += value
+
+    def __len__(self) -> int:
+        return min(self.count, len(self._values))
+
+    def __iter__(self) -> Iterator[float]:
+        """Valores de la ventana en orden cronológico"""
+        size = len(self._values)
+        start = self._next if self.count >= size else 0
+        for i in range(len(self)):
+            yield self._values[(start + i) % size]
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RollingStats):
+            return list(self) == list(other) and self.count == other.count and self.total == other.total
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"RollingStats(count={self.count}, mean={self.mean():.3f}, window={list(self)})"
+
+    def mean(self) -> float:
+        """Media de todos los valores registrados"""
+        return self.total / self.count if self.count else 0.0
+
+    def recent_mean(self) -> float:
+        """Media de los valores de la ventana"""
+        n = len(self)
+        return sum(self) / n if n else 0.0
+
+    def buffer(self) -> memoryview:
+        """Vista sin copia de la ventana (orden circular interno)"""
+        return memoryview(self._values)
+
+
+# Una fila por revisión; el formato binario es estable para guardarlo en bytea o Redis
+REVIEW_LOG_DTYPE = np.dtype([
+    ("card", np.int64),            # Índice o id numérico de la tarjeta
+    ("review", np.int64),          # µs desde la época
+    ("rating", np.int8),
+    ("state", np.int8),            # Estado antes de la revisión
+    ("elapsed_days", np.int32),
+    ("scheduled_days", np.int32),
+    ("stability", np.float32),     # Antes de la revisión
+    ("difficulty", np.float32),
+    ("response_time", np.float32),  # NaN = sin dato
+    ("confidence", np.float32),
+])
+
+# Estado FSRS de una tarjeta, para volcar y recuperar lotes completos
+CARD_RECORD_DTYPE = np.dtype([
+    ("stability", np.float64),
+    ("difficulty", np.float64),
+    ("due", np.int64),
+    ("last_review", np.int64),
+    ("elapsed_days", np.int32),
+    ("scheduled_days", np.int32),
+    ("reps", np.int32),
+    ("lapses", np.int32),
+    ("state", np.int8),
+])
+
+
+class ReviewLogStore:
+    """Log de revisiones columnar con crecimiento amortizado"""
+
+    def __init__(self, capacity: int = 1024, records: Optional[np.ndarray] = None):
+        if records is not None:
+            self._records = records
+            self._size = len(records)
+        else:
+            self._records = np.zeros(capacity, dtype=REVIEW_LOG_DTYPE)
+            self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def records(self) -> np.ndarray:
+        """Vista de las filas ocupadas; cada campo es una columna (p. ej. records['rating'])"""
+        return self._records[:self._size]
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed <= len(self._records):
+            return
+        grown = np.zeros(max(needed, 2 * len(self._records), 16), dtype=REVIEW_LOG_DTYPE)
+        grown[:self._size] = self._records[:self._size]
+        self._records = grown
+
+    def append(self, card: int, review_us: int, rating: int, state: int,
+               elapsed_days: int, scheduled_days: int, stability: float, difficulty: float,
+               response_time: Optional[float] = None, confidence: Optional[float] = None):
+        self._reserve(1)
+        self._records[self._size] = (
+            card, review_us, rating, state, elapsed_days, scheduled_days, stability, difficulty,
+            np.nan if response_time is None else response_time,
+            np.nan if confidence is None else confidence,
+        )
+        self._size += 1
+
+    def append_log(self, card: int, log) -> None:
+        """Añade un ReviewLog de AdvancedFSRS.repeat"""
+        self.append(
+            card, to_epoch_us(log.review), log.rating.value, log.state.value,
+            log.elapsed_days, log.scheduled_days, log.stability, log.difficulty,
+            log.response_time_seconds, log.confidence_score,
+        )
+
+    def extend(self, **columns: np.ndarray):
+        """Añade un bloque de revisiones dado como columnas de la misma longitud"""
+        count = len(next(iter(columns.values())))
+        self._reserve(count)
+        block = self._records[self._size:self._size + count]
+        for name in REVIEW_LOG_DTYPE.names:
+            block[name] = columns.get(name, np.nan if name in ("response_time", "confidence") else 0)
+        self._size += count
+
+    def for_cards(self, cards: Iterable[int]) -> np.ndarray:
+        """Revisiones de las tarjetas indicadas, ordenadas por tarjeta y fecha"""
+        records = self.records
+        selected = records[np.isin(records["card"], np.fromiter(cards, dtype=np.int64))]
+        return selected[np.lexsort((selected["review"], selected["card"]))]
+
+    def to_buffer(self) -> memoryview:
+        """Bytes de las filas ocupadas, sin copia (para bytea de Postgres o un valor de Redis)"""
+        return memoryview(self.records).cast("B")
+
+    @classmethod
+    def from_buffer(cls, buffer: BufferLike) -> "ReviewLogStore":
+        """Reconstruye el log como vista del buffer; solo se copia al añadir filas"""
+        return cls(records=np.frombuffer(buffer, dtype=REVIEW_LOG_DTYPE))
@@ -0,0 +1,194 @@
+"""
+Planificador de revisiones con capacidad diaria
+Reparte las tarjetas FSRS vencidas en los próximos días respetando el límite
+diario y los días de estudio de la semana:
+- Agrupa por día de vencimiento en una sola pasada (ordenación NumPy)
+- Reparto con fuzz: las tarjetas de intervalo largo se mueven dentro de su
+  rango de fuzz al día de estudio con menos carga, aplanando los picos
+- Lo que no cabe en un día pasa al siguiente día de estudio en orden de prioridad
+"""
+
+from typing import Dict, List, Any, Optional, Sequence, TypeVar
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+import numpy as np
+import structlog
+
+from .fsrs import Card, State
+from .fsrs_batch import CardBatch
+from .fsrs_storage import to_epoch_us
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+_US_PER_DAY = 86_400_000_000
+
+# Rangos de fuzz de FSRS: (inicio, fin, factor) sobre el intervalo en días
+FUZZ_RANGES = ((2.5, 7.0, 0.15), (7.0, 20.0, 0.1), (20.0, np.inf, 0.05))
+
+
+def fuzz_delta(intervals: np.ndarray) -> np.ndarray:
+    """Días que una revisión puede adelantarse o retrasarse según su intervalo (0 = sin fuzz)"""
+    intervals = np.asarray(intervals, dtype=np.float64)
+    delta = np.ones_like(intervals)
+    for start, end, factor in FUZZ_RANGES:
+        delta += factor * np.maximum(np.minimum(intervals, end) - start, 0.0)
+    return np.where(intervals < 2.5, 0, np.floor(delta)).astype(np.int64)
+
+
+@dataclass
+class ReviewPlan:
+    """Reparto de tarjetas por día; guarda posiciones en la secuencia planificada"""
+    start: datetime                 # Medianoche del primer día
+    days: List[np.ndarray]          # Índices de tarjeta por día (0 = hoy)
+    overflow: np.ndarray            # Vencidas en el horizonte que no caben en él
+    study_days: np.ndarray          # bool por día
+
+    @property
+    def loads(self) -> List[int]:
+        return [len(day) for day in self.days]
+
+    def date_key(self, day: int) -> str:
+        return (self.start + timedelta(days=day)).strftime("%Y-%m-%d")
+
+    def by_date(self, items: Sequence[T]) -> Dict[str, List[T]]:
+        """Calendario {fecha: elementos} con todos los días del horizonte"""
+        return {self.date_key(day): [items[i] for i in indices] for day, indices in enumerate(self.days)}
+
+    def summary(self) -> Dict[str, Any]:
+        loads = self.loads
+        return {
+            "scheduled": sum(loads),
+            "overflow": len(self.overflow),
+            "peak_load": max(loads, default=0),
+            "study_days": int(self.study_days.sum()),
+        }
+
+
+class ReviewScheduler:
+    """Reparto de revisiones por días con límite diario y balanceo de carga"""
+
+    def __init__(self,
+                 daily_limit: int = 50,
+                 available_days_per_week: int = 7,
+                 load_balance: bool = True):
+        if not 1 <= available_days_per_week <= 7:
+            raise ValueError("available_days_per_week must be between 1 and 7")
+        if daily_limit < 0:
+            raise ValueError("daily_limit must be non-negative")
+        self.daily_limit = daily_limit
+        self.available_days_per_week = available_days_per_week
+        self.load_balance = load_balance
+
+    def study_days(self, days: int) -> np.ndarray:
+        """
+        Días de estudio repartidos de forma uniforme en cada semana, empezando hoy
+        (p. ej. 3 días/semana → días 0, 3 y 5)
+        """
+        offset = np.arange(days) % 7
+        k = self.available_days_per_week
+        return (offset * k) // 7 != ((offset - 1) * k) // 7
+
+    def plan(self,
+             due: np.ndarray,
+             stability: np.ndarray,
+             difficulty: np.ndarray,
+             scheduled_days: np.ndarray,
+             state: np.ndarray,
+             days_ahead: int = 7,
+             now: Optional[datetime] = None,
+             study_days: Optional[np.ndarray] = None) -> ReviewPlan:
+        """
+        Planifica las tarjetas dadas como columnas (due en µs desde la época)
+
+        La prioridad dentro de un día es: día objetivo, vencimiento, menor estabilidad
+        (más riesgo de olvido) y menor dificultad. Las tarjetas que vencen después del
+        horizonte no se planifican. `study_days` (bool por día) sustituye al reparto
+        semanal cuando el calendario de sesiones ya está fijado.
+        """
+        now = now or datetime.now()
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        horizon = days_ahead + 1
+        study = self.study_days(horizon) if study_days is None else np.asarray(study_days, dtype=bool)
+
+        due = np.asarray(due, dtype=np.int64)
+        due_day = np.maximum((due - to_epoch_us(start)) // _US_PER_DAY, 0)
+        selected = np.flatnonzero(due_day < horizon)
+        target = due_day[selected]
+
+        if self.load_balance and len(selected):
+            target = self._balance(
+                target,
+                np.asarray(scheduled_days)[selected],
+                np.asarray(state)[selected] == State.REVIEW.value,
+                due[selected],
+                study,
+            )
+
+        order = selected[np.lexsort((
+            np.asarray(difficulty)[selected],
+            np.asarray(stability)[selected],
+            due[selected],
+            target,
+        ))]
+        # El orden de prioridad empieza por el día objetivo, así que la cola de pendientes
+        # es un prefijo de `order`: cada día toma hasta daily_limit tarjetas del frente
+        released = np.searchsorted(np.sort(target), np.arange(horizon), side="right")
+        days: List[np.ndarray] = []
+        taken = 0
+        for day in range(horizon):
+            take = min(self.daily_limit, released[day] - taken) if study[day] else 0
+            days.append(order[taken:taken + take])
+            taken += take
+
+        plan = ReviewPlan(start=start, days=days, overflow=order[taken:], study_days=study)
+        logger.info("Review plan generated", cards=len(due), days_ahead=days_ahead,
+                    daily_limit=self.daily_limit, **plan.summary())
+        return plan
+
+    def plan_cards(self, cards: Sequence[Card], days_ahead: int = 7,
+                   now: Optional[datetime] = None,
+                   study_days: Optional[np.ndarray] = None) -> ReviewPlan:
+        return self.plan(
+            due=np.fromiter((to_epoch_us(card.due) for card in cards), dtype=np.int64, count=len(cards)),
+            stability=np.fromiter((card.stability for card in cards), dtype=np.float64, count=len(cards)),
+            difficulty=np.fromiter((card.difficulty for card in cards), dtype=np.float64, count=len(cards)),
+            scheduled_days=np.fromiter((card.scheduled_days for card in cards), dtype=np.int64, count=len(cards)),
+            state=np.fromiter((card.state.value for card in cards), dtype=np.int8, count=len(cards)),
+            days_ahead=days_ahead,
+            now=now,
+            study_days=study_days,
+        )
+
+    def plan_batch(self, batch: CardBatch, days_ahead: int = 7,
+                   now: Optional[datetime] = None) -> ReviewPlan:
+        return self.plan(batch.due, batch.stability, batch.difficulty, batch.scheduled_days,
+                         batch.state, days_ahead, now)
+
+    def _balance(self, target: np.ndarray, intervals: np.ndarray, in_review: np.ndarray,
+                 due: np.ndarray, study: np.ndarray) -> np.ndarray:
+        """
+        Mueve cada tarjeta con fuzz al día de estudio menos cargado de su rango.
+        Las tarjetas ya vencidas (día 0) o en aprendizaje se quedan donde están.
+        """
+        horizon = len(study)
+        delta = np.where(in_review & (target > 0), fuzz_delta(intervals), 0)
+        movable = delta > 0
+        loads = np.bincount(target[~movable], minlength=horizon).tolist()
+        is_study = study.tolist()
+        target = target.copy()
+
+        # En orden de vencimiento, para que el reparto sea determinista
+        moved = np.flatnonzero(movable)
+        moved = moved[np.argsort(due[moved], kind="stable")]
+        for i, day, d in zip(moved.tolist(), target[moved].tolist(), delta[moved].tolist()):
+            best, best_key = day, None
+            for candidate in range(max(day - d, 1), min(day + d, horizon - 1) + 1):
+                if is_study[candidate]:
+                    key = (loads[candidate], abs(candidate - day), candidate)
+                    if best_key is None or key < best_key:
+                        best, best_key = candidate, key
+            target[i] = best
+            loads[best] += 1
+        return target
@@ -1,13 +1,79 @@
 """
 Algoritmo de Zona de Desarrollo Próximo (ZDP)
 Basado en la teoría de Vygotsky
+
+El cálculo trabaja por lotes: la dificultad de los átomos se codifica una vez
+en un array NumPy (nivel textual o valor continuo calibrado con evaluaciones)
+y los scores, las zonas y el orden se obtienen vectorizados.
 """
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Sequence, Union
+from dataclasses import dataclass
+import numpy as np
 import structlog
 
 logger = structlog.get_logger()
 
+# Valor numérico de cada nivel textual (los valores numéricos se usan tal cual)
+LEVEL_VALUES = {
+    "básico": 1.0, "basico": 1.0, "basic": 1.0,
+    "intermedio": 2.0, "intermediate": 2.0,
+    "avanzado": 3.0, "advanced": 3.0,
+}
+DEFAULT_DIFFICULTY = 2.0
+MIN_DIFFICULTY, MAX_DIFFICULTY = 1.0, 3.0
+
+IDEAL_DIFF = 0.3   # El contenido ideal es un 30% más difícil que el nivel actual
+ZONE_WIDTH = 0.5   # Hasta un 50% más difícil sigue dentro de la ZDP
+
+Level = Union[str, float]
+
+
+def level_value(level: Level) -> float:
+    """Valor numérico de un nivel o dificultad (textual o numérico)"""
+    level = getattr(level, "value", level)  # DifficultyLevel y otros Enum
+    if isinstance(level, (int, float)) and not isinstance(level, bool):
+        return float(level)
+    return LEVEL_VALUES.get(str(level).lower(), DEFAULT_DIFFICULTY)
+
+
+def calibrate_difficulty(
+    base: np.ndarray,
+    mean_score: np.ndarray,
+    attempts: np.ndarray,
+    prior_strength: float = 5.0
+) -> np.ndarray:
+    """
+    Dificultad continua a partir de los resultados de evaluación.
+
+    La dificultad d ∈ [1, 3] equivale a una tasa de acierto esperada
+    p = (3 - d) / 2. La dificultad base actúa como prior con el peso de
+    `prior_strength` intentos y se combina con la media observada:
+    con pocos intentos apenas se mueve, con muchos domina la evidencia.
+    """
+    base = np.clip(np.asarray(base, dtype=np.float64), MIN_DIFFICULTY, MAX_DIFFICULTY)
+    mean_score = np.clip(np.asarray(mean_score, dtype=np.float64), 0.0, 1.0)
+    attempts = np.maximum(np.asarray(attempts, dtype=np.float64), 0.0)
+
+    prior = (MAX_DIFFICULTY - base) / (MAX_DIFFICULTY - MIN_DIFFICULTY)
+    success = (prior * prior_strength + mean_score * attempts) / (prior_strength + attempts)
+    return MAX_DIFFICULTY - success * (MAX_DIFFICULTY - MIN_DIFFICULTY)
+
+
+@dataclass
+class ZDPZones:
+    """Máscaras booleanas de la posición de cada átomo respecto a la ZDP"""
+    below: np.ndarray   # Demasiado fácil
+    inside: np.ndarray  # En la zona óptima
+    above: np.ndarray   # Demasiado difícil
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "below_zdp": int(self.below.sum()),
+            "in_zdp": int(self.inside.sum()),
+            "above_zdp": int(self.above.sum()),
+        }
+
 
 class ZDPAlgorithm:
     """
@@ -24,10 +90,90 @@ class ZDPAlgorithm:
             difficulty_window=difficulty_window
         )
     
+    def encode(
+        self,
+        atoms: Sequence[Dict[str, Any]],
+        evaluations: Optional[Dict[str, Sequence[float]]] = None,
+        prior_strength: float = 5.0
+    ) -> np.ndarray:
+        """
+        Codifica la dificultad de los átomos en un array (una sola pasada).
+
+        Args:
+            atoms: Átomos con 'difficulty' textual o numérica
+            evaluations: Scores de evaluación (0-1) por ID de átomo; si se dan,
+                la dificultad se calibra con ellos (ver calibrate_difficulty)
+            prior_strength: Peso en intentos de la dificultad declarada
+
+        Returns:
+            Array float64 con la dificultad de cada átomo, en el orden dado
+        """
+        difficulty = np.fromiter(
+            (self._get_atom_difficulty(atom) for atom in atoms),
+            dtype=np.float64,
+            count=len(atoms)
+        )
+        if not evaluations:
+            return difficulty
+
+        mean_score = np.zeros(len(atoms))
+        attempts = np.zeros(len(atoms))
+        for i, atom in enumerate(atoms):
+            scores = evaluations.get(atom.get("id"))
+            if scores:
+                mean_score[i] = sum(scores) / len(scores)
+                attempts[i] = len(scores)
+        return calibrate_difficulty(difficulty, mean_score, attempts, prior_strength)
+
+    def score(self, difficulty: np.ndarray, current_level: Level) -> np.ndarray:
+        """Score ZDP vectorizado (mayor = más apropiado); ver _calculate_zdp_score"""
+        diff = np.asarray(difficulty, dtype=np.float64) - level_value(current_level)
+        window = self.difficulty_window
+        return np.where(
+            diff < 0,
+            np.maximum(0.0, 1.0 + diff),
+            np.where(
+                diff <= IDEAL_DIFF + window,
+                1.0 - np.abs(diff - IDEAL_DIFF) / window,
+                np.maximum(0.0, 1.0 - (diff - IDEAL_DIFF - window))
+            )
+        )
+
+    def zones(self, difficulty: np.ndarray, current_level: Level) -> ZDPZones:
+        """Máscaras por debajo / dentro / por encima de la ZDP"""
+        diff = np.asarray(difficulty, dtype=np.float64) - level_value(current_level)
+        below = diff < 0
+        above = diff > ZONE_WIDTH
+        return ZDPZones(below=below, inside=~(below | above), above=above)
+
+    def rank(
+        self,
+        difficulty: np.ndarray,
+        current_level: Level,
+        limit: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Índices de los átomos de mayor a menor score ZDP (a igualdad, orden original).
+
+        Con `limit` solo se ordenan los `limit` mejores (argpartition), lo que evita
+        ordenar todo el catálogo cuando se piden pocos candidatos.
+        """
+        scores = self.score(difficulty, current_level)
+        if limit is None or limit >= len(scores):
+            return np.argsort(-scores, kind="stable")
+        if limit <= 0:
+            return np.empty(0, dtype=np.int64)
+        # Umbral del limit-ésimo mejor score; los empatados en él se deciden por índice
+        threshold = -np.partition(-scores, limit - 1)[limit - 1]
+        candidates = np.flatnonzero(scores >= threshold)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return order[:limit]
+
     async def optimize_difficulty_progression(
         self,
         atoms: List[Dict[str, Any]],
-        current_level: str
+        current_level: Level,
+        evaluations: Optional[Dict[str, Sequence[float]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Optimiza la progresión de dificultad de los átomos.
@@ -35,33 +181,13 @@ class ZDPAlgorithm:
         Args:
             atoms: Lista de átomos con información de dificultad
             current_level: Nivel actual del estudiante
+            evaluations: Scores de evaluación por átomo para calibrar la dificultad
             
         Returns:
-            Lista de átomos ordenados para progresión óptima
+            Lista de átomos ordenados para progresión óptima (los átomos no se modifican;
+            para lotes grandes, usar encode + rank y trabajar con los índices)
         """
-        # Mapear nivel a valor numérico
-        level_map = {
-            "básico": 1.0,
-            "intermedio": 2.0,
-            "avanzado": 3.0
-        }
-        
-        current_level_value = level_map.get(current_level, 2.0)
-        
-        # Calcular ZDP para cada átomo
-        for atom in atoms:
-            atom_difficulty = self._get_atom_difficulty(atom)
-            atom["zdp_score"] = self._calculate_zdp_score(
-                current_level_value,
-                atom_difficulty
-            )
-        
-        # Ordenar por ZDP score (mayor score = más apropiado)
-        sorted_atoms = sorted(
-            atoms,
-            key=lambda a: a["zdp_score"],
-            reverse=True
-        )
+        order = self.rank(self.encode(atoms, evaluations), current_level)
         
         logger.info(
             "Difficulty progression optimized",
@@ -69,18 +195,11 @@ class ZDPAlgorithm:
             current_level=current_level
         )
         
-        return sorted_atoms
+        return [atoms[i] for i in order.tolist()]
     
     def _get_atom_difficulty(self, atom: Dict[str, Any]) -> float:
         """Obtiene el valor numérico de dificultad de un átomo"""
-        difficulty_map = {
-            "básico": 1.0,
-            "intermedio": 2.0,
-            "avanzado": 3.0
-        }
-        
-        difficulty_str = atom.get("difficulty", "intermedio")
-        return difficulty_map.get(difficulty_str, 2.0)
+        return level_value(atom.get("difficulty", atom.get("difficulty_level", DEFAULT_DIFFICULTY)))
     
     def _calculate_zdp_score(
         self,
@@ -96,7 +215,7 @@ class ZDPAlgorithm:
         diff = atom_difficulty - current_level
         
         # El contenido ideal está ligeramente por encima del nivel actual
-        ideal_diff = 0.3  # 30% más difícil que el nivel actual
+        ideal_diff = IDEAL_DIFF
         
         # Calcular score basado en qué tan cerca está del ideal
         if diff < 0:
@@ -138,7 +257,7 @@ class ZDPAlgorithm:
         new_difficulty = current_difficulty + adjustment
         
         # Limitar entre 1.0 y 3.0
-        new_difficulty = max(1.0, min(3.0, new_difficulty))
+        new_difficulty = max(MIN_DIFFICULTY, min(MAX_DIFFICULTY, new_difficulty))
         
         logger.debug(
             "Difficulty adjusted",
@@ -152,7 +271,7 @@ class ZDPAlgorithm:
     def group_atoms_by_zdp(
         self,
         atoms: List[Dict[str, Any]],
-        current_level: float
+        current_level: Level
     ) -> Dict[str, List[Dict[str, Any]]]:
         """
         Agrupa átomos por su relación con la ZDP del estudiante.
@@ -160,24 +279,12 @@ class ZDPAlgorithm:
         Returns:
             Diccionario con categorías: below_zdp, in_zdp, above_zdp
         """
-        groups = {
-            "below_zdp": [],  # Demasiado fácil
-            "in_zdp": [],     # En la zona óptima
-            "above_zdp": []   # Demasiado difícil
+        zones = self.zones(self.encode(atoms), current_level)
+        return {
+            "below_zdp": [atoms[i] for i in np.flatnonzero(zones.below).tolist()],
+            "in_zdp": [atoms[i] for i in np.flatnonzero(zones.inside).tolist()],
+            "above_zdp": [atoms[i] for i in np.flatnonzero(zones.above).tolist()],
         }
-        
-        for atom in atoms:
-            atom_difficulty = self._get_atom_difficulty(atom)
-            diff = atom_difficulty - current_level
-            
-            if diff < 0:
-                groups["below_zdp"].append(atom)
-            elif diff <= 0.5:  # Hasta 50% más difícil está en ZDP
-                groups["in_zdp"].append(atom)
-            else:
-                groups["above_zdp"].append(atom)
-        
-        return groups
     
     def recommend_scaffolding(
         self,
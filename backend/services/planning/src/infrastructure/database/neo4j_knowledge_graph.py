@@ -4,15 +4,22 @@ Maneja átomos de aprendizaje, relaciones, progreso de usuarios, y rutas adaptat
 """
 
 from typing import List, Dict, Any, Optional, Tuple
-from neo4j import GraphDatabase, Session
+from neo4j import AsyncGraphDatabase, EagerResult, RoutingControl
 import structlog
-import asyncio
 from datetime import datetime
 import uuid
 import json
 
 logger = structlog.get_logger()
 
+# Índices y restricciones del esquema (idempotentes)
+SCHEMA_INDEXES = (
+    "CREATE INDEX atom_title_index IF NOT EXISTS FOR (a:LearningAtom) ON (a.title)",
+    "CREATE INDEX atom_difficulty_index IF NOT EXISTS FOR (a:LearningAtom) ON (a.difficulty_level)",
+    "CREATE INDEX atom_tags_index IF NOT EXISTS FOR (a:LearningAtom) ON (a.tags)",
+    "CREATE INDEX user_id_index IF NOT EXISTS FOR (u:User) ON (u.id)",
+)
+
 class Neo4jKnowledgeGraph:
     """
     Repositorio agéntico para el grafo de conocimiento educativo.
@@ -23,74 +30,95 @@ class Neo4jKnowledgeGraph:
     - Generación de rutas de aprendizaje adaptativas
     - Análisis de dependencias y prerrequisitos
     - Recomendaciones personalizadas
+
+    Usa el driver asíncrono de Neo4j con su pool de conexiones: las consultas no
+    bloquean el event loop. Las lecturas se envían con enrutado de lectura, así que
+    con un URI `neo4j://` de clúster van a las réplicas. El esquema se crea de forma
+    explícita con initialize() (en el lifespan de la aplicación).
     """
 
-    def __init__(self, uri: str, user: str, password: str):
-        self._driver = GraphDatabase.driver(uri, auth=(user, password))
-        self._init_task = asyncio.create_task(self._initialize_schema())
-        logger.info("Neo4jKnowledgeGraph initialized", uri=uri, user=user)
+    def __init__(
+        self,
+        uri: str,
+        user: str,
+        password: str,
+        database: Optional[str] = None,
+        max_connection_pool_size: int = 50,
+        connection_acquisition_timeout: float = 60.0
+    ):
+        self._driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout
+        )
+        self._database = database
+        self._schema_ready = False
+        logger.info("Neo4jKnowledgeGraph initialized", uri=uri, user=user,
+                    max_connection_pool_size=max_connection_pool_size)
+
+    async def _read(self, query: str, **parameters: Any) -> EagerResult:
+        """Ejecuta una consulta de lectura (enrutable a réplicas)"""
+        return await self._driver.execute_query(
+            query, parameters, routing_=RoutingControl.READ, database_=self._database
+        )
 
-    async def _initialize_schema(self):
-        """Inicializa el esquema del grafo con índices y restricciones"""
+    async def _write(self, query: str, **parameters: Any) -> EagerResult:
+        """Ejecuta una consulta de escritura en el líder"""
+        return await self._driver.execute_query(
+            query, parameters, routing_=RoutingControl.WRITE, database_=self._database
+        )
+
+    async def initialize(self):
+        """Inicializa el esquema del grafo con índices y restricciones (idempotente)"""
+        if self._schema_ready:
+            return
         try:
-            with self._driver.session() as session:
-                # Crear índices para átomos de aprendizaje (solo si no existen)
-                try:
-                    session.run("CREATE INDEX atom_title_index IF NOT EXISTS FOR (a:LearningAtom) ON (a.title)")
-                    session.run("CREATE INDEX atom_difficulty_index IF NOT EXISTS FOR (a:LearningAtom) ON (a.difficulty_level)")
-                    session.run("CREATE INDEX atom_tags_index IF NOT EXISTS FOR (a:LearningAtom) ON (a.tags)")
-                except Exception as idx_error:
-                    logger.warning("Some indexes already exist", error=str(idx_error))
-                
-                # Crear índices para usuarios
+            # Crear índices (solo si no existen)
+            for statement in SCHEMA_INDEXES:
                 try:
-                    session.run("CREATE INDEX user_id_index IF NOT EXISTS FOR (u:User) ON (u.id)")
+                    await self._write(statement)
                 except Exception as idx_error:
-                    logger.warning("User index already exists", error=str(idx_error))
-                
-                # Crear restricciones de unicidad (manejar conflictos con índices existentes)
+                    logger.warning("Index creation failed", statement=statement, error=str(idx_error))
+            
+            # Crear restricciones de unicidad (manejar conflictos con índices existentes)
+            for label, constraint in (("LearningAtom", "atom_id_unique"), ("User", "user_id_unique")):
                 try:
-                    # Verificar si ya existe un índice en atom.id
-                    result = session.run("SHOW INDEXES YIELD name, labelsOrTypes, properties WHERE 'LearningAtom' IN labelsOrTypes AND 'id' IN properties")
-                    existing_indexes = list(result)
+                    # Verificar si ya existe un índice en el id
+                    existing_indexes, _, _ = await self._read(
+                        "SHOW INDEXES YIELD name, labelsOrTypes, properties "
+                        "WHERE $label IN labelsOrTypes AND 'id' IN properties",
+                        label=label
+                    )
                     
                     if existing_indexes:
-                        logger.info("Index on LearningAtom.id already exists, skipping constraint creation")
+                        logger.info("Index on id already exists, skipping constraint creation", label=label)
                     else:
-                        session.run("CREATE CONSTRAINT atom_id_unique IF NOT EXISTS FOR (a:LearningAtom) REQUIRE a.id IS UNIQUE")
+                        # Las etiquetas no admiten parámetros; vienen de la tupla fija de arriba
+                        await self._write(
+                            f"CREATE CONSTRAINT {constraint} IF NOT EXISTS "
+                            f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+                        )
                 except Exception as constraint_error:
-                    logger.warning("Constraint creation failed", error=str(constraint_error))
-                
-                try:
-                    # Similar para User.id
-                    result = session.run("SHOW INDEXES YIELD name, labelsOrTypes, properties WHERE 'User' IN labelsOrTypes AND 'id' IN properties")
-                    existing_user_indexes = list(result)
-                    
-                    if existing_user_indexes:
-                        logger.info("Index on User.id already exists, skipping constraint creation")
-                    else:
-                        session.run("CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE")
-                except Exception as constraint_error:
-                    logger.warning("User constraint creation failed", error=str(constraint_error))
-                
-                logger.info("Neo4j schema initialized successfully")
+                    logger.warning("Constraint creation failed", label=label, error=str(constraint_error))
+            
+            self._schema_ready = True
+            logger.info("Neo4j schema initialized successfully")
         except Exception as e:
             logger.error("Failed to initialize Neo4j schema", error=str(e))
             # No lanzar excepción para que los tests puedan continuar
             logger.warning("Continuing without full schema initialization")
 
     async def close(self):
-        """Cierra la conexión a Neo4j"""
+        """Cierra la conexión a Neo4j y el pool"""
         if self._driver:
-            self._driver.close()
+            await self._driver.close()
             logger.info("Neo4j connection closed")
 
     # ========== GESTIÓN DE ÁTOMOS DE APRENDIZAJE ==========
 
     async def create_learning_atom(self, atom_data: Dict[str, Any]) -> str:
         """Crea un nuevo átomo de aprendizaje en el grafo"""
-        await self._init_task
-        
         atom_id = atom_data.get('id', str(uuid.uuid4()))
         
         query = """
@@ -109,33 +137,29 @@ class Neo4jKnowledgeGraph:
         RETURN a.id as atom_id
         """
         
-        with self._driver.session() as session:
-            # Convertir agent_metadata a JSON string para Neo4j
-            agent_metadata = atom_data.get('agent_metadata', {})
-            agent_metadata_json = json.dumps(agent_metadata) if agent_metadata else "{}"
-            
-            result = session.run(query, 
-                id=atom_id,
-                title=atom_data.get('title', ''),
-                content=atom_data.get('content', ''),
-                difficulty_level=atom_data.get('difficulty_level', 'intermedio'),
-                estimated_time_minutes=atom_data.get('estimated_time_minutes', 15),
-                tags=atom_data.get('tags', []),
-                learning_objectives=atom_data.get('learning_objectives', []),
-                created_by_agent=atom_data.get('created_by_agent', True),
-                agent_metadata=agent_metadata_json
-            )
-            
-            record = result.single()
-            created_id = record['atom_id'] if record else atom_id
-            
-            logger.info("Learning atom created", atom_id=created_id, title=atom_data.get('title'))
-            return created_id
+        # Convertir agent_metadata a JSON string para Neo4j
+        agent_metadata = atom_data.get('agent_metadata', {})
+        agent_metadata_json = json.dumps(agent_metadata) if agent_metadata else "{}"
+        
+        records, _, _ = await self._write(query,
+            id=atom_id,
+            title=atom_data.get('title', ''),
+            content=atom_data.get('content', ''),
+            difficulty_level=atom_data.get('difficulty_level', 'intermedio'),
+            estimated_time_minutes=atom_data.get('estimated_time_minutes', 15),
+            tags=atom_data.get('tags', []),
+            learning_objectives=atom_data.get('learning_objectives', []),
+            created_by_agent=atom_data.get('created_by_agent', True),
+            agent_metadata=agent_metadata_json
+        )
+        
+        created_id = records[0]['atom_id'] if records else atom_id
+        
+        logger.info("Learning atom created", atom_id=created_id, title=atom_data.get('title'))
+        return created_id
 
     async def create_prerequisite_relationship(self, atom_id: str, prerequisite_id: str, strength: float = 1.0):
         """Crea una relación de prerrequisito entre dos átomos"""
-        await self._init_task
-        
         query = """
         MATCH (atom:LearningAtom {id: $atom_id})
         MATCH (prereq:LearningAtom {id: $prerequisite_id})
@@ -143,34 +167,31 @@ class Neo4jKnowledgeGraph:
         RETURN atom.id, prereq.id
         """
         
-        with self._driver.session() as session:
-            result = session.run(query, 
-                atom_id=atom_id,
-                prerequisite_id=prerequisite_id,
-                strength=strength
-            )
-            
-            if result.single():
-                logger.info("Prerequisite relationship created", 
-                           atom=atom_id, prerequisite=prerequisite_id, strength=strength)
-                return True
-            return False
+        records, _, _ = await self._write(query,
+            atom_id=atom_id,
+            prerequisite_id=prerequisite_id,
+            strength=strength
+        )
+        
+        if records:
+            logger.info("Prerequisite relationship created", 
+                       atom=atom_id, prerequisite=prerequisite_id, strength=strength)
+            return True
+        return False
 
     async def get_learning_path_for_topic(self, topic: str, difficulty_level: Optional[str] = None, max_depth: int = 10) -> List[Dict[str, Any]]:
         """Obtiene una ruta de aprendizaje optimizada para un tema específico"""
-        await self._init_task
-        
-        # Query simplificada que funciona correctamente
+        # La profundidad no puede ser un parámetro en Cypher: se interpola como entero
         query = """
         // Encontrar átomos relacionados con el tema
         MATCH (start:LearningAtom)
         WHERE $topic IN start.tags
-        """ + (f"AND start.difficulty_level = '{difficulty_level}'" if difficulty_level else "") + """
+          AND ($difficulty_level IS NULL OR start.difficulty_level = $difficulty_level)
         
         // Obtener la ruta completa de prerrequisitos
         CALL {
             WITH start
-            MATCH path = (start)-[:REQUIRES*0..""" + str(max_depth) + """]->(prereq:LearningAtom)
+            MATCH path = (start)-[:REQUIRES*0..""" + str(int(max_depth)) + """]->(prereq:LearningAtom)
             RETURN collect(DISTINCT prereq) as prerequisites
         }
         
@@ -199,20 +220,17 @@ class Neo4jKnowledgeGraph:
             atom_data.estimated_time_minutes
         """
         
-        with self._driver.session() as session:
-            result = session.run(query, topic=topic)
-            atoms = [record['atom_data'] for record in result]
-            
-            logger.info("Learning path generated", 
-                       topic=topic, difficulty=difficulty_level, atoms_count=len(atoms))
-            return atoms
+        records, _, _ = await self._read(query, topic=topic, difficulty_level=difficulty_level)
+        atoms = [record['atom_data'] for record in records]
+        
+        logger.info("Learning path generated", 
+                   topic=topic, difficulty=difficulty_level, atoms_count=len(atoms))
+        return atoms
 
     # ========== GESTIÓN DE USUARIOS Y PROGRESO ==========
 
     async def create_or_update_user(self, user_id: str, user_data: Dict[str, Any]):
         """Crea o actualiza un usuario en el grafo"""
-        await self._init_task
-        
         query = """
         MERGE (u:User {id: $user_id})
         SET u.name = $name,
@@ -222,23 +240,20 @@ class Neo4jKnowledgeGraph:
         RETURN u.id
         """
         
-        with self._driver.session() as session:
-            result = session.run(query,
-                user_id=user_id,
-                name=user_data.get('name', ''),
-                learning_style=user_data.get('learning_style', 'mixto'),
-                preferred_difficulty=user_data.get('preferred_difficulty', 'intermedio')
-            )
-            
-            if result.single():
-                logger.info("User created/updated", user_id=user_id)
-                return True
-            return False
+        records, _, _ = await self._write(query,
+            user_id=user_id,
+            name=user_data.get('name', ''),
+            learning_style=user_data.get('learning_style', 'mixto'),
+            preferred_difficulty=user_data.get('preferred_difficulty', 'intermedio')
+        )
+        
+        if records:
+            logger.info("User created/updated", user_id=user_id)
+            return True
+        return False
 
     async def update_user_progress(self, user_id: str, atom_id: str, mastery_level: float, evaluation_id: Optional[str] = None):
         """Actualiza el progreso de un usuario en un átomo específico"""
-        await self._init_task
-        
         query = """
         MATCH (u:User {id: $user_id})
         MATCH (a:LearningAtom {id: $atom_id})
@@ -252,28 +267,25 @@ class Neo4jKnowledgeGraph:
         RETURN p.mastery_level, p.attempts
         """
         
-        with self._driver.session() as session:
-            result = session.run(query,
-                user_id=user_id,
-                atom_id=atom_id,
-                mastery_level=mastery_level,
-                evaluation_id=evaluation_id
-            )
-            
-            record = result.single()
-            if record:
-                logger.info("User progress updated", 
-                           user_id=user_id, atom_id=atom_id, mastery=mastery_level)
-                return {
-                    'mastery_level': record['p.mastery_level'],
-                    'attempts': record['p.attempts']
-                }
-            return None
+        records, _, _ = await self._write(query,
+            user_id=user_id,
+            atom_id=atom_id,
+            mastery_level=mastery_level,
+            evaluation_id=evaluation_id
+        )
+        
+        if records:
+            record = records[0]
+            logger.info("User progress updated", 
+                       user_id=user_id, atom_id=atom_id, mastery=mastery_level)
+            return {
+                'mastery_level': record['p.mastery_level'],
+                'attempts': record['p.attempts']
+            }
+        return None
 
     async def get_user_progress_summary(self, user_id: str) -> Dict[str, Any]:
         """Obtiene un resumen completo del progreso del usuario"""
-        await self._init_task
-        
         query = """
         MATCH (u:User {id: $user_id})-[p:PROGRESSED_IN]->(a:LearningAtom)
         
@@ -299,31 +311,27 @@ class Neo4jKnowledgeGraph:
         } as summary
         """
         
-        with self._driver.session() as session:
-            result = session.run(query, user_id=user_id)
-            record = result.single()
-            
-            if record:
-                summary = record['summary']
-                logger.info("User progress summary retrieved", 
-                           user_id=user_id, total_atoms=summary['total_atoms'])
-                return summary
-            else:
-                return {
-                    'user_id': user_id,
-                    'total_atoms': 0,
-                    'mastered_atoms': 0,
-                    'average_mastery': 0.0,
-                    'mastery_percentage': 0.0,
-                    'progress_details': []
-                }
+        records, _, _ = await self._read(query, user_id=user_id)
+        
+        if records:
+            summary = records[0]['summary']
+            logger.info("User progress summary retrieved", 
+                       user_id=user_id, total_atoms=summary['total_atoms'])
+            return summary
+        else:
+            return {
+                'user_id': user_id,
+                'total_atoms': 0,
+                'mastered_atoms': 0,
+                'average_mastery': 0.0,
+                'mastery_percentage': 0.0,
+                'progress_details': []
+            }
 
     # ========== RECOMENDACIONES ADAPTATIVAS ==========
 
     async def get_next_recommended_atoms(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Obtiene los próximos átomos recomendados basados en el progreso del usuario"""
-        await self._init_task
-        
         # Query simplificada para recomendaciones
         query = """
         MATCH (u:User {id: $user_id})
@@ -362,20 +370,17 @@ class Neo4jKnowledgeGraph:
         LIMIT $limit
         """
         
-        with self._driver.session() as session:
-            result = session.run(query, user_id=user_id, limit=limit)
-            recommendations = [record['recommended_atom'] for record in result]
-            
-            logger.info("Recommendations generated", 
-                       user_id=user_id, count=len(recommendations))
-            return recommendations
+        records, _, _ = await self._read(query, user_id=user_id, limit=limit)
+        recommendations = [record['recommended_atom'] for record in records]
+        
+        logger.info("Recommendations generated", 
+                   user_id=user_id, count=len(recommendations))
+        return recommendations
 
     # ========== ANÁLISIS DEL GRAFO ==========
 
     async def get_knowledge_graph_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas generales del grafo de conocimiento"""
-        await self._init_task
-        
         query = """
         // Contar nodos y relaciones
         MATCH (atoms:LearningAtom)
@@ -391,20 +396,16 @@ class Neo4jKnowledgeGraph:
         } as stats
         """
         
-        with self._driver.session() as session:
-            result = session.run(query)
-            record = result.single()
-            
-            if record:
-                stats = record['stats']
-                logger.info("Knowledge graph stats retrieved", **stats)
-                return stats
-            return {}
+        records, _, _ = await self._read(query)
+        
+        if records:
+            stats = records[0]['stats']
+            logger.info("Knowledge graph stats retrieved", **stats)
+            return stats
+        return {}
 
     async def find_learning_gaps(self, user_id: str) -> List[Dict[str, Any]]:
         """Identifica brechas en el aprendizaje del usuario"""
-        await self._init_task
-        
         # Query simplificada para análisis de brechas
         query = """
         MATCH (u:User {id: $user_id})-[p:PROGRESSED_IN]->(atom:LearningAtom)
@@ -431,21 +432,21 @@ class Neo4jKnowledgeGraph:
         ORDER BY gap.current_mastery ASC
         """
         
-        with self._driver.session() as session:
-            result = session.run(query, user_id=user_id)
-            gaps = [record['gap'] for record in result]
-            
-            # Filtrar prerrequisitos nulos
-            for gap in gaps:
-                gap['missing_prerequisites'] = [p for p in gap['missing_prerequisites'] if p is not None]
-            
-            logger.info("Learning gaps identified", user_id=user_id, gaps_count=len(gaps))
-            return gaps
+        records, _, _ = await self._read(query, user_id=user_id)
+        gaps = [record['gap'] for record in records]
+        
+        # Filtrar prerrequisitos nulos
+        for gap in gaps:
+            gap['missing_prerequisites'] = [p for p in gap['missing_prerequisites'] if p is not None]
+        
+        logger.info("Learning gaps identified", user_id=user_id, gaps_count=len(gaps))
+        return gaps
 
     # ========== UTILIDADES ==========
 
-    def __enter__(self):
+    async def __aenter__(self):
+        await self.initialize()
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        asyncio.create_task(self.close())
\ No newline at end of file
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
\ No newline at end of file
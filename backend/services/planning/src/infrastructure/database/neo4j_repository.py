@@ -1,9 +1,71 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+import asyncio
 from neo4j import GraphDatabase
 import structlog
 
+from .prerequisite_graph import GraphChanges
+
 logger = structlog.get_logger(__name__)
 
+# Profundidad máxima de la expansión de prerrequisitos
+MAX_PREREQUISITE_DEPTH = 10
+
+
+def build_learning_paths_query(max_depth: int = MAX_PREREQUISITE_DEPTH) -> str:
+    """
+    Consulta de rutas para varios objetivos en un solo viaje a Neo4j.
+
+    Los átomos de partida se deduplican antes de expandir y cada átomo alcanzado
+    se devuelve una sola vez (DISTINCT permite al planificador podar la expansión),
+    proyectando solo los campos que usa la planificación: nada de `content`.
+    La profundidad no puede ser un parámetro en Cypher, por eso se interpola como entero.
+    """
+    return f"""
+    MATCH (start:LearningAtom)
+    WHERE any(tag IN start.tags WHERE tag IN $goals)
+    WITH DISTINCT start
+    MATCH (start)-[:REQUIRES*0..{int(max_depth)}]->(atom:LearningAtom)
+    WITH DISTINCT atom
+    RETURN atom {{
+        .id,
+        .title,
+        .difficulty_level,
+        .estimated_time_minutes,
+        dependencies: [(atom)-[:REQUIRES]->(prereq:LearningAtom) | prereq.id]
+    }} AS atom_data
+    ORDER BY atom_data.id
+    """
+
+
+# Átomos y aristas del grafo de prerrequisitos; con $since solo lo creado desde ese sello
+PREREQUISITE_ATOMS_QUERY = """
+MATCH (atom:LearningAtom)
+WITH atom, coalesce(atom.updated_at, atom.created_at).epochMillis AS stamp
+WHERE $since IS NULL OR stamp >= $since
+RETURN atom {.id, .title, .difficulty_level, .estimated_time_minutes, .tags} AS atom_data, stamp
+"""
+
+# Con $since: aristas selladas desde entonces y todas las que tocan un átomo cambiado.
+# Lo segundo cubre las aristas sin created_at (escritores que solo hacen MERGE), que
+# se guardan en la misma operación que sus átomos.
+PREREQUISITE_EDGES_QUERY = """
+CALL {
+    MATCH (atom:LearningAtom)-[relation:REQUIRES]->(prereq:LearningAtom)
+    WHERE $since IS NULL OR relation.created_at.epochMillis >= $since
+    RETURN relation
+    UNION
+    MATCH (changed:LearningAtom)
+    WHERE $since IS NOT NULL
+      AND coalesce(changed.updated_at, changed.created_at).epochMillis >= $since
+    MATCH (changed)-[relation:REQUIRES]-(:LearningAtom)
+    RETURN relation
+}
+RETURN startNode(relation).id AS atom_id,
+       endNode(relation).id AS prerequisite_id,
+       relation.created_at.epochMillis AS stamp
+"""
+
+
 class Neo4jPlanningRepository:
     """
     Repositorio para leer el grafo de conocimiento de Neo4j y
@@ -16,44 +78,75 @@ class Neo4jPlanningRepository:
     def close(self):
         self._driver.close()
 
-    async def get_learning_path_for_topic(self, topic: str) -> List[Dict[str, Any]]:
+    async def get_learning_paths_for_goals(
+        self,
+        goals: Sequence[str],
+        max_depth: int = MAX_PREREQUISITE_DEPTH
+    ) -> List[Dict[str, Any]]:
         """
-        Obtiene una ruta de aprendizaje (secuencia de átomos) para un tema.
+        Obtiene los átomos de todos los objetivos y sus prerrequisitos en una sola consulta.
 
-        Encuentra todos los átomos etiquetados con el tema y sus dependencias,
-        y los devuelve en un orden topológico.
+        Devuelve cada átomo una vez, con `id`, `title`, `difficulty_level`,
+        `estimated_time_minutes` y `dependencies` (IDs de sus prerrequisitos directos);
+        el orden topológico se calcula en la lógica de negocio. La consulta corre en un
+        hilo, así que puede esperarse en paralelo con otras lecturas.
         """
-        query = """
-        // 1. Encontrar todos los átomos relacionados con el tema
-        MATCH (start_atom:LearningAtom)
-        WHERE $topic IN start_atom.tags
-
-        // 2. Encontrar todos los prerrequisitos de forma recursiva
-        CALL {
-            WITH start_atom
-            MATCH path = (dependent:LearningAtom)-[:REQUIRES*0..]->(prereq:LearningAtom)
-            WHERE dependent = start_atom
-            RETURN collect(nodes(path)) as all_nodes_nested
-        }
-
-        // 3. Desanidar y obtener nodos únicos
-        UNWIND all_nodes_nested as node_list
-        UNWIND node_list as atom_node
-        WITH collect(DISTINCT atom_node) as atoms
-
-        // 4. Devolver los átomos (se ordenarán en la lógica de negocio)
-        RETURN atoms
+        goals = list(dict.fromkeys(goals))
+        if not goals:
+            return []
+        atoms = await asyncio.to_thread(self._read_learning_paths, goals, max_depth)
+        logger.info("Learning paths fetched", goals=goals, atoms_count=len(atoms))
+        return atoms
+
+    def _read_learning_paths(self, goals: List[str], max_depth: int) -> List[Dict[str, Any]]:
+        query = build_learning_paths_query(max_depth)
+
+        def read(tx):
+            return [record["atom_data"] for record in tx.run(query, goals=goals)]
+
+        with self._driver.session() as session:
+            return session.execute_read(read)
+
+    async def load_prerequisite_graph(self, since: Optional[int] = None) -> GraphChanges:
+        """
+        Lee los átomos y las aristas REQUIRES para la caché del grafo de prerrequisitos.
+
+        Args:
+            since: Sello de versión (epoch en ms); None lee el grafo completo
+
+        Returns:
+            GraphChanges con el sello del cambio más reciente leído. La comparación
+            es inclusiva: releer un cambio en el mismo sello es inocuo.
         """
+        return await asyncio.to_thread(self._read_prerequisite_graph, since)
+
+    def _read_prerequisite_graph(self, since: Optional[int]) -> GraphChanges:
+        def read(tx):
+            atoms = list(tx.run(PREREQUISITE_ATOMS_QUERY, since=since))
+            edges = list(tx.run(PREREQUISITE_EDGES_QUERY, since=since))
+            return atoms, edges
+
         with self._driver.session() as session:
-            result = session.run(query, topic=topic)
-            # Extraer los datos de los nodos
-            raw_atoms = result.single()
-            if raw_atoms and 'atoms' in raw_atoms:
-                return [dict(record) for record in raw_atoms['atoms']]
-            return []
+            atoms, edges = session.execute_read(read)
+
+        stamps = [r["stamp"] for r in atoms + edges if r["stamp"] is not None]
+        return GraphChanges(
+            atoms=[r["atom_data"] for r in atoms],
+            edges=[(r["atom_id"], r["prerequisite_id"]) for r in edges],
+            version=max(stamps, default=since),
+        )
+
+    async def get_learning_path_for_topic(self, topic: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene una ruta de aprendizaje (secuencia de átomos) para un tema.
+
+        Encuentra todos los átomos etiquetados con el tema y sus dependencias;
+        ver get_learning_paths_for_goals.
+        """
+        return await self.get_learning_paths_for_goals([topic])
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close() 
\ No newline at end of file
+        self.close() 
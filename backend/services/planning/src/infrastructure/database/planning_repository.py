@@ -8,10 +8,12 @@ import structlog
 from datetime import datetime
 from sqlalchemy import text, MetaData, Table, Column, String, JSON, Float, DateTime, Integer
 from sqlalchemy import insert, update as sa_update, select, delete as sa_delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker as _sm
 
 from ...schemas import LearningPlanResponse
+from ..algorithms.fsrs import Card, State
 
 logger = structlog.get_logger()
 
@@ -40,6 +42,45 @@ user_progress_table = Table(
     Column("last_review", DateTime, default=datetime.utcnow),
 )
 
+# Estado FSRS por (usuario, átomo); se lee en bloque al planificar y se escribe en bloque tras evaluar
+fsrs_cards_table = Table(
+    "fsrs_cards",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("atom_id", String, primary_key=True),
+    Column("stability", Float, nullable=False),
+    Column("difficulty", Float, nullable=False),
+    Column("due", DateTime, nullable=False),
+    Column("last_review", DateTime, nullable=True),
+    Column("elapsed_days", Integer, default=0),
+    Column("scheduled_days", Integer, default=0),
+    Column("reps", Integer, default=0),
+    Column("lapses", Integer, default=0),
+    Column("state", Integer, default=0),
+    Column("difficulty_level", String, default="intermediate"),
+    Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+)
+
+FSRS_CARD_FIELDS = (
+    "stability", "difficulty", "due", "last_review", "elapsed_days",
+    "scheduled_days", "reps", "lapses", "state", "difficulty_level",
+)
+
+
+def card_to_row(user_id: str, atom_id: str, card: Card) -> Dict[str, Any]:
+    """Fila de fsrs_cards para una tarjeta"""
+    row = {name: getattr(card, name) for name in FSRS_CARD_FIELDS}
+    row.update(user_id=user_id, atom_id=atom_id, state=card.state.value, updated_at=datetime.utcnow())
+    return row
+
+
+def card_from_row(row: Dict[str, Any]) -> Card:
+    """Tarjeta a partir de una fila de fsrs_cards"""
+    values = {name: row[name] for name in FSRS_CARD_FIELDS}
+    values["state"] = State(values["state"])
+    return Card(concept_id=row["atom_id"], **values)
+
+
 class PostgresPlanningRepository:
     """
     Repositorio para la gestión de datos de planificación en PostgreSQL.
@@ -111,7 +152,7 @@ class PostgresPlanningRepository:
             result = await session.execute(stmt)
             row = result.fetchone()
             if not row:
-        return None
+                return None
             record = dict(row._mapping)
             return LearningPlanResponse(**record["plan_json"])
 
@@ -177,6 +218,49 @@ class PostgresPlanningRepository:
         return {
             "total_plans": total_plans,
             "active_plans": active_plans,
-                "completed_plans": len(completed.fetchall()),
-                "adapted_plans": len(adapted.fetchall()),
-        } 
\ No newline at end of file
+            "completed_plans": len(completed.fetchall()),
+            "adapted_plans": len(adapted.fetchall()),
+        }
+
+    async def get_fsrs_cards(self, user_id: str, atom_ids: List[str], strict: bool = False) -> Dict[str, Card]:
+        """
+        Obtiene en una sola consulta las tarjetas FSRS del usuario para los átomos dados.
+        Los átomos sin historial no aparecen en el resultado.
+
+        Con `strict` los errores de lectura se propagan en lugar de devolver {}: quien
+        va a reescribir las tarjetas no debe confundir un fallo con "sin historial".
+        """
+        if not atom_ids:
+            return {}
+        await self._init_task
+        stmt = select(fsrs_cards_table).where(
+            fsrs_cards_table.c.user_id == user_id,
+            fsrs_cards_table.c.atom_id.in_(atom_ids)
+        )
+        try:
+            async with self.async_session() as session:
+                result = await session.execute(stmt)
+                cards = {row.atom_id: card_from_row(row._mapping) for row in result.fetchall()}
+            logger.info("Fetched FSRS cards", user_id=user_id, requested=len(atom_ids), found=len(cards))
+            return cards
+        except Exception as e:
+            logger.error("Failed to fetch FSRS cards", error=str(e), user_id=user_id)
+            if strict:
+                raise
+            return {}
+
+    async def save_fsrs_cards(self, user_id: str, cards: Dict[str, Card]) -> None:
+        """Inserta o actualiza en bloque (un único upsert) las tarjetas FSRS del usuario"""
+        if not cards:
+            return
+        await self._init_task
+        stmt = pg_insert(fsrs_cards_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[fsrs_cards_table.c.user_id, fsrs_cards_table.c.atom_id],
+            set_={name: stmt.excluded[name] for name in FSRS_CARD_FIELDS + ("updated_at",)}
+        )
+        rows = [card_to_row(user_id, atom_id, card) for atom_id, card in cards.items()]
+        async with self.async_session() as session:
+            await session.execute(stmt, rows)
+            await session.commit()
+        logger.info("FSRS cards saved", user_id=user_id, count=len(rows))
@@ -0,0 +1,336 @@
+"""
+Caché en memoria del grafo de prerrequisitos
+Copia local de los átomos y las aristas REQUIRES de Neo4j para que la
+planificación no recorra el grafo remoto en cada petición:
+- Adyacencia en CSR (NumPy) en los dos sentidos: prerrequisitos y dependientes
+- Cierres de ancestros/descendientes por BFS vectorizado sobre el CSR
+- Actualización incremental: los cambios (eventos o lecturas desde el último
+  sello de versión) se acumulan en un delta que se compacta al crecer
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from dataclasses import dataclass, field
+import asyncio
+import time
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+# Campos de átomo que se guardan (los que usa la planificación)
+ATOM_FIELDS = ("id", "title", "difficulty_level", "estimated_time_minutes", "tags")
+
+# El delta se compacta en el CSR cuando supera esta fracción de las aristas
+COMPACT_RATIO = 0.1
+COMPACT_MIN_EDGES = 1024
+
+# El refresco relee este margen antes del último sello: una transacción que
+# selló antes pero confirmó después del refresco anterior no se pierde
+DEFAULT_REFRESH_LAG_MS = 60_000
+# Recarga completa periódica para corregir lo que el incremental no ve (borrados)
+DEFAULT_FULL_RELOAD_SECONDS = 3600
+
+
+@dataclass
+class GraphChanges:
+    """Átomos y aristas nuevos o modificados hasta un sello de versión"""
+    atoms: List[Dict[str, Any]] = field(default_factory=list)
+    edges: List[Tuple[str, str]] = field(default_factory=list)  # (átomo, prerrequisito)
+    version: Optional[int] = None  # Epoch en ms del cambio más reciente
+
+    def __len__(self) -> int:
+        return len(self.atoms) + len(self.edges)
+
+
+def _csr(sources: np.ndarray, targets: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32)
+
+
+class _Adjacency:
+    """CSR inmutable más un delta de aristas añadidas desde la última compactación"""
+
+    def __init__(self, size: int = 0):
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.pending: Dict[int, List[int]] = {}
+        self.pending_count = 0
+
+    def neighbours(self, node: int) -> List[int]:
+        result = self.indices[self.indptr[node]:self.indptr[node + 1]].tolist() if node + 1 < len(self.indptr) else []
+        return result + self.pending.get(node, [])
+
+    def has_edge(self, source: int, target: int) -> bool:
+        if source + 1 < len(self.indptr) and target in self.indices[self.indptr[source]:self.indptr[source + 1]]:
+            return True
+        return target in self.pending.get(source, ())
+
+    def add(self, source: int, target: int) -> None:
+        self.pending.setdefault(source, []).append(target)
+        self.pending_count += 1
+
+    def expand(self, frontier: np.ndarray) -> np.ndarray:
+        """Vecinos de todos los nodos de la frontera (con repeticiones)"""
+        known = frontier[frontier < len(self.indptr) - 1]
+        starts, ends = self.indptr[known], self.indptr[known + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total:
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+            found = self.indices[offsets]
+        else:
+            found = np.zeros(0, dtype=np.int32)
+        if self.pending:
+            extra = [t for node in frontier.tolist() for t in self.pending.get(node, ())]
+            if extra:
+                found = np.concatenate([found, np.asarray(extra, dtype=np.int32)])
+        return found
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        sources = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        targets = self.indices
+        if self.pending:
+            extra_sources = [s for s, ts in self.pending.items() for _ in ts]
+            extra_targets = [t for ts in self.pending.values() for t in ts]
+            sources = np.concatenate([sources, np.asarray(extra_sources, dtype=np.int32)])
+            targets = np.concatenate([targets, np.asarray(extra_targets, dtype=np.int32)])
+        return sources, targets
+
+    @classmethod
+    def build(cls, sources: np.ndarray, targets: np.ndarray, size: int) -> "_Adjacency":
+        adjacency = cls()
+        adjacency.indptr, adjacency.indices = _csr(sources, targets, size)
+        return adjacency
+
+
+class PrerequisiteGraph:
+    """
+    Grafo de prerrequisitos en memoria.
+
+    Las aristas van de cada átomo a sus prerrequisitos (como REQUIRES en Neo4j):
+    los ancestros de un átomo son todo lo que hay que aprender antes y los
+    descendientes, todo lo que depende de él.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.atoms: List[Dict[str, Any]] = []
+        self.tags: Dict[str, Set[int]] = {}
+        self.prerequisites = _Adjacency()
+        self.dependents = _Adjacency()
+        self.edge_count = 0
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, atom_id: str) -> bool:
+        return atom_id in self.index
+
+    @classmethod
+    def from_changes(cls, changes: GraphChanges) -> "PrerequisiteGraph":
+        """Construye el grafo de una carga completa (CSR directo, sin delta)"""
+        graph = cls()
+        for atom in changes.atoms:
+            graph._upsert_atom(atom)
+        for atom_id, prerequisite_id in changes.edges:
+            graph._node(atom_id)
+            graph._node(prerequisite_id)
+        if changes.edges:
+            pairs = np.array([(graph.index[a], graph.index[p]) for a, p in changes.edges], dtype=np.int64)
+            pairs = np.unique(pairs, axis=0)
+            graph._rebuild(pairs[:, 0], pairs[:, 1])
+        else:
+            graph._rebuild(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        graph.version = changes.version
+        return graph
+
+    def apply(self, changes: GraphChanges) -> int:
+        """
+        Aplica cambios incrementales (idempotente: átomos por upsert, aristas sin duplicar).
+
+        Returns:
+            Número de aristas nuevas
+        """
+        for atom in changes.atoms:
+            self._upsert_atom(atom)
+        added = 0
+        for atom_id, prerequisite_id in changes.edges:
+            source, target = self._node(atom_id), self._node(prerequisite_id)
+            if not self.prerequisites.has_edge(source, target):
+                self.prerequisites.add(source, target)
+                self.dependents.add(target, source)
+                added += 1
+        self.edge_count += added
+        if changes.version is not None:
+            self.version = max(self.version or changes.version, changes.version)
+        if self.prerequisites.pending_count > max(COMPACT_MIN_EDGES, COMPACT_RATIO * self.edge_count):
+            self.compact()
+        return added
+
+    def compact(self) -> None:
+        """Vuelca el delta en los CSR"""
+        sources, targets = self.prerequisites.edges()
+        self._rebuild(sources, targets)
+
+    def ancestors(self, atom_ids: Iterable[str], max_depth: Optional[int] = None,
+                  include_self: bool = False) -> List[str]:
+        """Prerrequisitos directos e indirectos de los átomos dados"""
+        return self._closure(self.prerequisites, atom_ids, max_depth, include_self)
+
+    def descendants(self, atom_ids: Iterable[str], max_depth: Optional[int] = None,
+                    include_self: bool = False) -> List[str]:
+        """Átomos que dependen directa o indirectamente de los átomos dados"""
+        return self._closure(self.dependents, atom_ids, max_depth, include_self)
+
+    def atoms_for_goals(self, goals: Sequence[str]) -> List[str]:
+        """Átomos etiquetados con alguno de los objetivos"""
+        found: Set[int] = set()
+        for goal in goals:
+            found |= self.tags.get(goal, set())
+        return [self.ids[i] for i in sorted(found)]
+
+    def learning_paths(self, goals: Sequence[str], max_depth: int = 10) -> List[Dict[str, Any]]:
+        """
+        Átomos de los objetivos y sus prerrequisitos, con el mismo formato que
+        Neo4jPlanningRepository.get_learning_paths_for_goals
+        """
+        path = self.ancestors(self.atoms_for_goals(goals), max_depth=max_depth, include_self=True)
+        result = []
+        for atom_id in sorted(path):
+            node = self.index[atom_id]
+            atom = {key: value for key, value in self.atoms[node].items() if key != "tags"}
+            atom["dependencies"] = [self.ids[p] for p in self.prerequisites.neighbours(node)]
+            result.append(atom)
+        return result
+
+    def _closure(self, adjacency: _Adjacency, atom_ids: Iterable[str],
+                 max_depth: Optional[int], include_self: bool) -> List[str]:
+        starts = np.unique(np.array([self.index[a] for a in atom_ids if a in self.index], dtype=np.int64))
+        visited = np.zeros(len(self.ids), dtype=bool)
+        # BFS por niveles: cada nivel expande toda la frontera de una vez sobre el CSR
+        frontier, depth = np.unique(adjacency.expand(starts)).astype(np.int64), 1
+        while len(frontier) and (max_depth is None or depth <= max_depth):
+            visited[frontier] = True
+            found = adjacency.expand(frontier)
+            frontier = np.unique(found[~visited[found]]).astype(np.int64)
+            depth += 1
+        if include_self:
+            visited[starts] = True
+        return [self.ids[i] for i in np.flatnonzero(visited).tolist()]
+
+    def _node(self, atom_id: str) -> int:
+        node = self.index.get(atom_id)
+        if node is None:
+            node = len(self.ids)
+            self.index[atom_id] = node
+            self.ids.append(atom_id)
+            self.atoms.append({"id": atom_id})
+        return node
+
+    def _upsert_atom(self, atom: Dict[str, Any]) -> None:
+        node = self._node(atom["id"])
+        for tag in self.atoms[node].get("tags") or ():
+            self.tags.get(tag, set()).discard(node)
+        self.atoms[node] = {key: atom.get(key) for key in ATOM_FIELDS}
+        for tag in atom.get("tags") or ():
+            self.tags.setdefault(tag, set()).add(node)
+
+    def _rebuild(self, sources: np.ndarray, targets: np.ndarray) -> None:
+        size = len(self.ids)
+        self.prerequisites = _Adjacency.build(sources, targets, size)
+        self.dependents = _Adjacency.build(targets, sources, size)
+        self.edge_count = len(sources)
+
+
+class PrerequisiteGraphCache:
+    """
+    Caché del grafo de prerrequisitos delante de Neo4jPlanningRepository.
+
+    Se carga al arrancar (load) y se mantiene al día con refresh, que solo lee
+    lo creado desde el último sello de versión (menos refresh_lag_ms de margen,
+    ya que apply es idempotente), o con apply_changes cuando quien escribe en
+    el grafo publica los cambios. run_refresh_loop hace además una recarga
+    completa cada full_reload_seconds. Expone get_learning_paths_for_goals,
+    así que el servicio de planificación puede usarla como graph_repository.
+    """
+
+    def __init__(self, repository, max_depth: int = 10,
+                 refresh_lag_ms: int = DEFAULT_REFRESH_LAG_MS,
+                 full_reload_seconds: Optional[float] = DEFAULT_FULL_RELOAD_SECONDS):
+        self.repository = repository
+        self.max_depth = max_depth
+        self.refresh_lag_ms = refresh_lag_ms
+        self.full_reload_seconds = full_reload_seconds
+        self.graph: Optional[PrerequisiteGraph] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.graph is not None
+
+    async def load(self) -> PrerequisiteGraph:
+        """Carga completa; sustituye el grafo de una vez"""
+        async with self._lock:
+            changes = await self.repository.load_prerequisite_graph()
+            self.graph = PrerequisiteGraph.from_changes(changes)
+            self._loaded_at = time.monotonic()
+        logger.info("Prerequisite graph loaded", atoms=len(self.graph),
+                    edges=self.graph.edge_count, version=self.graph.version)
+        return self.graph
+
+    async def refresh(self) -> int:
+        """Aplica lo creado desde el último sello de versión; carga todo si aún no hay grafo"""
+        if self.graph is None:
+            await self.load()
+            return 0
+        async with self._lock:
+            version = self.graph.version
+            since = version - self.refresh_lag_ms if version is not None else None
+            changes = await self.repository.load_prerequisite_graph(since=since)
+            self.graph.apply(changes)
+        if changes:
+            logger.info("Prerequisite graph refreshed", atoms=len(changes.atoms),
+                        edges=len(changes.edges), version=self.graph.version)
+        return len(changes)
+
+    def full_reload_due(self) -> bool:
+        return (
+            self.full_reload_seconds is not None
+            and time.monotonic() - self._loaded_at >= self.full_reload_seconds
+        )
+
+    def apply_changes(self, changes: GraphChanges) -> None:
+        """Evento de cambio: aplica átomos y aristas recién escritos"""
+        if self.graph is not None:
+            self.graph.apply(changes)
+
+    async def run_refresh_loop(self, interval_seconds: float) -> None:
+        """Refresco periódico; pensado para lanzarse como tarea en el arranque"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                if self.full_reload_due():
+                    await self.load()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                logger.warning("Prerequisite graph refresh failed", error=str(e))
+
+    async def get_learning_paths_for_goals(self, goals: Sequence[str],
+                                           max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Igual que en el repositorio, pero resuelto en memoria"""
+        if self.graph is None:
+            logger.warning("Prerequisite graph not loaded, querying Neo4j")
+            return await self.repository.get_learning_paths_for_goals(goals)
+        return self.graph.learning_paths(goals, max_depth or self.max_depth)
+
+    def ancestors(self, atom_ids: Iterable[str], max_depth: Optional[int] = None) -> List[str]:
+        return self.graph.ancestors(atom_ids, max_depth) if self.graph else []
+
+    def descendants(self, atom_ids: Iterable[str], max_depth: Optional[int] = None) -> List[str]:
+        return self.graph.descendants(atom_ids, max_depth) if self.graph else []
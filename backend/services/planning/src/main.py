@@ -2,13 +2,18 @@
 Servicio de Planificación Adaptativa para Atomia
 """
 
+import asyncio
 import structlog
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 import time
 from typing import Dict, Any, List
 
+from .api.v1.router import api_router
+from .core.config import settings
+from .core.dependencies import get_knowledge_graph, get_prerequisite_graph_cache
+
 # Configurar logging básico
 logger = structlog.get_logger()
 
@@ -16,7 +21,27 @@ logger = structlog.get_logger()
 async def lifespan(app: FastAPI):
     """Gestión del ciclo de vida del servicio"""
     logger.info("📚 Starting Atomia Planning Service")
+    
+    # Crear el esquema del grafo de conocimiento (índices y restricciones)
+    knowledge_graph = get_knowledge_graph()
+    await knowledge_graph.initialize()
+    
+    # Cargar el grafo de prerrequisitos en memoria y mantenerlo al día
+    graph_cache = get_prerequisite_graph_cache()
+    try:
+        await graph_cache.load()
+    except Exception as e:
+        logger.warning("Prerequisite graph not loaded, will retry on refresh", error=str(e))
+    refresh_task = asyncio.create_task(
+        graph_cache.run_refresh_loop(settings.GRAPH_CACHE_REFRESH_SECONDS)
+    )
+    
     yield
+    
+    refresh_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await refresh_task
+    await knowledge_graph.close()
     logger.info("🛑 Shutting down Atomia Planning Service")
 
 app = FastAPI(
@@ -41,11 +66,14 @@ app.add_middleware(
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
-        response = await call_next(request)
+    response = await call_next(request)
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
-        return response
+    return response
         
+# API agéntica: planes, adaptación por progreso y recomendaciones
+app.include_router(api_router, prefix="/api/v1")
+
 # Health check
 @app.get("/health")
 async def health_check():
@@ -131,41 +159,6 @@ async def update_progress(plan_id: str, progress_data: Dict[str, Any]):
         ]
     }
 
-@app.get("/api/v1/users/{user_id}/next-atoms")
-async def get_next_atoms(user_id: str, limit: int = 3):
-    """Obtener próximos átomos recomendados para el usuario"""
-    return {
-        "user_id": user_id,
-        "recommended_atoms": [
-            {
-                "id": "atom_next_1",
-                "title": "Siguiente Concepto",
-                "priority": "high",
-                "reason": "Builds on recently mastered concepts"
-            },
-            {
-                "id": "atom_review_1",
-                "title": "Repaso Importante",
-                "priority": "medium", 
-                "reason": "Due for spaced repetition review"
-            }
-        ]
-    }
-
-@app.post("/api/v1/plans/{plan_id}/adapt")
-async def adapt_plan(plan_id: str, adaptation_data: Dict[str, Any]):
-    """Adaptar plan basado en rendimiento del usuario"""
-    return {
-        "plan_id": plan_id,
-        "adapted": True,
-        "changes": [
-            "Increased difficulty for mathematics section",
-            "Added extra practice exercises",
-            "Adjusted review schedule"
-        ],
-        "reasoning": "User showing strong performance, ready for more challenge"
-    }
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8004) 
\ No newline at end of file
@@ -4,6 +4,7 @@ Esquemas Pydantic para el Servicio Agéntico de Planificación
 
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
+import datetime as dt
 from enum import Enum
 from pydantic import BaseModel, Field, field_validator
 
@@ -85,7 +86,8 @@ class LearningPhase(BaseModel):
 class DailySession(BaseModel):
     """Sesión diaria de estudio"""
     day: int = Field(..., ge=1)
-    date: Optional[date] = None
+    # `dt.date`: el nombre del campo oculta al tipo `date` dentro de la clase
+    date: Optional[dt.date] = None
     atoms: List[str] = Field(
         ..., 
         description="Átomos nuevos a estudiar"
@@ -125,6 +127,10 @@ class Schedule(BaseModel):
         description="Frecuencia de repaso: daily, spaced, adaptive"
     )
     estimated_completion_date: Optional[date] = None
+    reviews_beyond_plan: List[str] = Field(
+        default_factory=list,
+        description="Átomos cuyo repaso vence después del horizonte del plan"
+    )
 
 
 class AgentPlanningMetadata(BaseModel):
@@ -26,7 +26,7 @@ def knowledge_graph():
     """Fixture que proporciona una instancia del grafo de conocimiento"""
     async def _get_kg():
         kg = Neo4jKnowledgeGraph(**NEO4J_CONFIG)
-        await kg._init_task
+        await kg.initialize()
         return kg
     
     return _get_kg
@@ -91,8 +91,7 @@ class TestNeo4jKnowledgeGraph:
         assert relationship_created is True
         
         # Limpiar datos de prueba
-        with kg._driver.session() as session:
-            session.run("MATCH (n:LearningAtom) WHERE n.id STARTS WITH 'test_atom_' DETACH DELETE n")
+        await kg._driver.execute_query("MATCH (n:LearningAtom) WHERE n.id STARTS WITH 'test_atom_' DETACH DELETE n")
         
         await kg.close()
         
@@ -154,8 +153,7 @@ class TestNeo4jKnowledgeGraph:
         assert difficulties[0] == 'básico'
         
         # Limpiar datos de prueba
-        with kg._driver.session() as session:
-            session.run("MATCH (n:LearningAtom) WHERE n.id STARTS WITH 'test_path_atom_' DETACH DELETE n")
+        await kg._driver.execute_query("MATCH (n:LearningAtom) WHERE n.id STARTS WITH 'test_path_atom_' DETACH DELETE n")
         
         await kg.close()
         
@@ -221,9 +219,8 @@ class TestNeo4jKnowledgeGraph:
         assert len(progress_summary['progress_details']) == 3
         
         # Limpiar datos de prueba
-        with kg._driver.session() as session:
-            session.run(f"MATCH (n:LearningAtom) WHERE n.id STARTS WITH 'test_progress_atom_' DETACH DELETE n")
-            session.run(f"MATCH (n:User) WHERE n.id = '{user_id}' DETACH DELETE n")
+        await kg._driver.execute_query("MATCH (n:LearningAtom) WHERE n.id STARTS WITH 'test_progress_atom_' DETACH DELETE n")
+        await kg._driver.execute_query("MATCH (n:User) WHERE n.id = $user_id DETACH DELETE n", user_id=user_id)
         
         await kg.close()
         
@@ -339,7 +336,7 @@ if __name__ == "__main__":
     # Ejecutar tests individualmente para debugging
     async def run_single_test():
         kg = Neo4jKnowledgeGraph(**NEO4J_CONFIG)
-        await kg._init_task
+        await kg.initialize()
         
         # Ejecutar un test específico
         test_instance = TestNeo4jKnowledgeGraph()
@@ -0,0 +1,151 @@
+"""
+Tests del motor FSRS vectorizado frente a la implementación escalar
+"""
+
+import copy
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.infrastructure.algorithms.fsrs import AdvancedFSRS, Card, Rating, State
+from src.infrastructure.algorithms.fsrs_batch import BatchFSRS, CardBatch
+
+
+NOW = datetime(2025, 3, 1, 9, 30)
+
+
+def random_cards(n: int, states, seed: int = 7):
+    rng = random.Random(seed)
+    cards = []
+    for i in range(n):
+        state = rng.choice(states)
+        last_review = None if state == State.NEW else NOW - timedelta(days=rng.uniform(0, 60), minutes=rng.randint(0, 600))
+        cards.append(Card(
+            due=NOW + timedelta(days=rng.uniform(-5, 30)),
+            stability=rng.uniform(0.5, 120),
+            difficulty=rng.uniform(1, 10),
+            elapsed_days=rng.randint(0, 30),
+            scheduled_days=rng.randint(0, 30),
+            reps=rng.randint(0, 20),
+            lapses=rng.randint(0, 5),
+            state=state,
+            last_review=last_review,
+            concept_id=f"atom_{i}",
+            difficulty_level=rng.choice(["basic", "intermediate", "advanced", "unknown"]),
+            estimated_time_minutes=rng.choice([0, 5, 15]),
+            prerequisite_concepts=["p"] if rng.random() < 0.3 else [],
+            response_times=[rng.uniform(10, 100) for _ in range(rng.randint(0, 3))],
+            confidence_scores=[rng.random() for _ in range(rng.randint(0, 3))],
+        ))
+    return cards
+
+
+def random_reviews(n: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    ratings = rng.integers(1, 5, n)
+    response_times = np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0, 2400, n))
+    response_times[rng.random(n) < 0.05] = 0.0
+    confidence = np.where(rng.random(n) < 0.2, np.nan, rng.random(n))
+    return ratings, response_times, confidence
+
+
+def optional(value: float):
+    return None if np.isnan(value) else float(value)
+
+
+def assert_matches(scalar_cards, batch: CardBatch):
+    expected = CardBatch.from_cards(scalar_cards, AdvancedFSRS())
+    np.testing.assert_allclose(batch.stability, expected.stability, rtol=1e-12)
+    np.testing.assert_allclose(batch.difficulty, expected.difficulty, rtol=1e-12)
+    for field in ("due", "last_review", "elapsed_days", "scheduled_days", "reps", "lapses", "state",
+                  "response_time_count", "confidence_count"):
+        np.testing.assert_array_equal(getattr(batch, field), getattr(expected, field), err_msg=field)
+    np.testing.assert_allclose(batch.response_time_sum, expected.response_time_sum, rtol=1e-12)
+    np.testing.assert_allclose(batch.confidence_sum, expected.confidence_sum, rtol=1e-12)
+
+
+def test_batch_repeat_matches_scalar_repeat():
+    fsrs = AdvancedFSRS()
+    cards = random_cards(500, list(State))
+    ratings, response_times, confidence = random_reviews(len(cards))
+
+    batch = CardBatch.from_cards(cards, fsrs)
+    BatchFSRS(fsrs).repeat(batch, ratings, response_times, confidence, now=NOW)
+
+    scalar_cards = copy.deepcopy(cards)
+    for card, rating, rt, cs in zip(scalar_cards, ratings, response_times, confidence):
+        fsrs.repeat(card, Rating(int(rating)), optional(rt), optional(cs), now=NOW)
+
+    assert_matches(scalar_cards, batch)
+
+
+def test_repeat_on_a_subset_leaves_other_cards_untouched():
+    fsrs = AdvancedFSRS()
+    cards = random_cards(50, list(State))
+    batch = CardBatch.from_cards(cards, fsrs)
+    index = np.arange(0, 50, 3)
+    ratings = np.full(len(index), Rating.GOOD.value)
+
+    BatchFSRS(fsrs).repeat(batch, ratings, index=index, now=NOW)
+
+    scalar_cards = copy.deepcopy(cards)
+    for i in index:
+        fsrs.repeat(scalar_cards[i], Rating.GOOD, now=NOW)
+    assert_matches(scalar_cards, batch)
+
+
+def test_write_back_round_trips_to_cards():
+    fsrs = AdvancedFSRS()
+    cards = random_cards(20, list(State))
+    batch = CardBatch.from_cards(cards, fsrs)
+    BatchFSRS(fsrs).repeat(batch, np.full(20, Rating.HARD.value), now=NOW)
+
+    batch.write_back(cards)
+
+    assert all(card.last_review == NOW for card in cards)
+    assert_matches(cards, batch)
+
+
+def test_retention_intervals_and_analysis_match_scalar():
+    fsrs = AdvancedFSRS()
+    engine = BatchFSRS(fsrs)
+    cards = random_cards(300, list(State))
+    batch = CardBatch.from_cards(cards, fsrs)
+
+    np.testing.assert_allclose(
+        engine.predict_retention(batch, 3, now=NOW),
+        [fsrs.predict_retention(card, 3, now=NOW) for card in cards],
+        rtol=1e-12,
+    )
+    np.testing.assert_array_equal(
+        engine.next_interval(batch.stability),
+        [fsrs._next_interval(card.stability) for card in cards],
+    )
+    np.testing.assert_array_equal(
+        engine.optimal_interval(batch, 0.85),
+        [fsrs.get_optimal_interval(card, 0.85) for card in cards],
+    )
+
+    analysis = engine.analyze(batch, now=NOW)
+    review_cards = [c for c in cards if c.state == State.REVIEW]
+    assert analysis["total_cards"] == 300
+    assert analysis["review_cards"] == len(review_cards)
+    assert analysis["average_response_time_seconds"] == pytest.approx(
+        np.mean([t for c in cards for t in c.response_times])
+    )
+    assert analysis["predicted_retention_tomorrow"] == pytest.approx(
+        np.mean([fsrs.predict_retention(c, 1, now=NOW) for c in review_cards])
+    )
+    assert fsrs.analyze_learning_patterns(cards)["mastery_rate"] == analysis["mastery_rate"]
+
+
+def test_empty_batch_matches_new_cards():
+    fsrs = AdvancedFSRS()
+    batch = CardBatch.empty(4, fsrs, now=NOW)
+    expected = CardBatch.from_cards([fsrs.create_new_card() for _ in range(4)], fsrs)
+
+    np.testing.assert_array_equal(batch.stability, expected.stability)
+    np.testing.assert_array_equal(batch.state, expected.state)
+    assert (batch.due == batch.due[0]).all()
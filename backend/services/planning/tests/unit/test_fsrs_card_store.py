@@ -0,0 +1,221 @@
+"""
+Tests de las tarjetas FSRS persistentes en la planificación y tras las evaluaciones
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.domain.services.agentic_planning_service import AgenticPlanningService
+from src.infrastructure.algorithms.fsrs import FSRSAlgorithm, Rating, State
+from src.infrastructure.database.planning_repository import card_from_row, card_to_row
+from src.schemas import (
+    CreatePlanRequest, DifficultyLevel, LearningContext, LearningPath, LearningPhase, UpdatePlanRequest
+)
+
+
+class InMemoryCardRepository:
+    """Repositorio de tarjetas en memoria que cuenta las lecturas y escrituras"""
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+        self.writes = 0
+
+    async def get_fsrs_cards(self, user_id, atom_ids, strict=False):
+        self.reads += 1
+        return {
+            atom_id: card_from_row(self.rows[(user_id, atom_id)])
+            for atom_id in atom_ids if (user_id, atom_id) in self.rows
+        }
+
+    async def save_fsrs_cards(self, user_id, cards):
+        self.writes += 1
+        for atom_id, card in cards.items():
+            self.rows[(user_id, atom_id)] = card_to_row(user_id, atom_id, card)
+
+
+class FailingReadRepository(InMemoryCardRepository):
+    """La lectura falla como lo haría una caída transitoria de la base de datos"""
+
+    async def get_fsrs_cards(self, user_id, atom_ids, strict=False):
+        self.reads += 1
+        if strict:
+            raise ConnectionError("database unavailable")
+        return {}
+
+
+def make_service(repository, daily_review_limit=20):
+    return AgenticPlanningService(
+        planning_repository=repository,
+        graph_repository=None,
+        agentic_orchestrator=None,
+        atomization_client=None,
+        evaluation_client=None,
+        fsrs_algorithm=FSRSAlgorithm({"daily_review_limit": daily_review_limit}),
+        zdp_algorithm=None,
+    )
+
+
+def plan_request(days_per_week: int = 7) -> CreatePlanRequest:
+    return CreatePlanRequest(
+        user_id="user_1",
+        learning_goals=["álgebra"],
+        time_available_hours=2,
+        context=LearningContext(available_days_per_week=days_per_week, minutes_per_session=30),
+    )
+
+
+def learning_path(atoms) -> LearningPath:
+    return LearningPath(
+        total_atoms=len(atoms),
+        estimated_time_hours=1,
+        difficulty_progression="gradual",
+        phases=[LearningPhase(phase_id=1, name="Fase 1", atoms=atoms, estimated_duration_minutes=60,
+                              difficulty_level=DifficultyLevel.BASICO)],
+    )
+
+
+def test_card_rows_round_trip():
+    fsrs = FSRSAlgorithm({})
+    card = fsrs.project_introduction("atom_1", date(2025, 3, 3))
+
+    restored = card_from_row(card_to_row("user_1", "atom_1", card))
+
+    assert restored.state == State.REVIEW
+    assert (restored.due, restored.stability, restored.reps) == (card.due, card.stability, card.reps)
+    assert restored.concept_id == "atom_1"
+
+
+def test_schedule_uses_stored_cards_with_a_single_bulk_read():
+    repository = InMemoryCardRepository()
+    fsrs = FSRSAlgorithm({})
+    today = datetime.combine(date.today(), datetime.min.time())
+    overdue = fsrs.fsrs.create_new_card("estudiado")
+    fsrs.fsrs.repeat(overdue, Rating.GOOD, now=today - timedelta(days=30))
+    fsrs.fsrs.repeat(overdue, Rating.GOOD, now=overdue.due)
+    asyncio.run(repository.save_fsrs_cards("user_1", {"estudiado": overdue}))
+    atoms = ["estudiado"] + [f"atom_{i}" for i in range(8)]
+
+    schedule = asyncio.run(make_service(repository)._create_optimized_schedule(
+        learning_path(atoms), plan_request(), {}
+    ))
+
+    assert repository.reads == 1
+    introduced = [atom for session in schedule.daily_sessions for atom in session.atoms]
+    assert introduced == atoms[1:]
+    assert "estudiado" in schedule.daily_sessions[0].review_atoms
+    first_day = {atom: session.day for session in schedule.daily_sessions for atom in session.atoms}
+    for session in schedule.daily_sessions:
+        for atom in session.review_atoms:
+            assert atom == "estudiado" or session.day > first_day[atom]
+
+
+def test_reviews_only_land_on_available_days():
+    repository = InMemoryCardRepository()
+    service = make_service(repository)
+
+    dates = service._study_dates(date(2025, 3, 3), 6, 3)
+    schedule = asyncio.run(service._create_optimized_schedule(
+        learning_path([f"atom_{i}" for i in range(12)]), plan_request(days_per_week=3), {}
+    ))
+
+    assert all(d.weekday() < 3 for d in dates)
+    assert len(schedule.daily_sessions) == schedule.total_days
+    assert sum(len(s.review_atoms) for s in schedule.daily_sessions) > 0
+
+
+def stored_card(fsrs, atom_id, due):
+    card = fsrs.fsrs.create_new_card(atom_id)
+    fsrs.fsrs.repeat(card, Rating.GOOD, now=due - timedelta(days=20))
+    fsrs.fsrs.repeat(card, Rating.GOOD, now=card.due)
+    card.due = due
+    return card
+
+
+def test_reviews_due_after_the_new_content_are_still_scheduled():
+    repository = InMemoryCardRepository()
+    fsrs = FSRSAlgorithm({})
+    today = datetime.combine(date.today(), datetime.min.time())
+    cards = {f"atom_{i}": stored_card(fsrs, f"atom_{i}", today + timedelta(days=10 * i + 1, hours=9))
+             for i in range(4)}
+    asyncio.run(repository.save_fsrs_cards("user_1", cards))
+
+    schedule = asyncio.run(make_service(repository)._create_optimized_schedule(
+        learning_path(list(cards)), plan_request(days_per_week=5), {}
+    ))
+
+    reviewed = [atom for session in schedule.daily_sessions for atom in session.review_atoms]
+    assert sorted(reviewed) == sorted(cards)
+    assert schedule.daily_sessions[-1].review_atoms
+    # Cada sesión conserva su fecha real: ningún repaso se adelanta en el calendario
+    for session in schedule.daily_sessions:
+        assert session.day == (session.date - schedule.daily_sessions[0].date).days + 1
+        for atom in session.review_atoms:
+            assert session.date >= cards[atom].due.date()
+
+
+def test_reviews_past_the_plan_horizon_are_reported_not_scheduled():
+    repository = InMemoryCardRepository()
+    fsrs = FSRSAlgorithm({})
+    today = datetime.combine(date.today(), datetime.min.time())
+    cards = {
+        "pronto": stored_card(fsrs, "pronto", today + timedelta(days=3, hours=9)),
+        "lejano": stored_card(fsrs, "lejano", today + timedelta(days=300, hours=9)),
+    }
+    asyncio.run(repository.save_fsrs_cards("user_1", cards))
+
+    schedule = asyncio.run(make_service(repository)._create_optimized_schedule(
+        learning_path(list(cards)), plan_request(), {}
+    ))
+
+    assert schedule.reviews_beyond_plan == ["lejano"]
+    assert [session.day for session in schedule.daily_sessions] == [1, 2, 3, 4]
+    assert schedule.daily_sessions[-1].review_atoms == ["pronto"]
+    assert schedule.estimated_completion_date == date.today() + timedelta(days=3)
+
+
+def test_reviews_over_the_daily_limit_get_extra_sessions():
+    repository = InMemoryCardRepository()
+    fsrs = FSRSAlgorithm({})
+    overdue = datetime.combine(date.today(), datetime.min.time()) - timedelta(days=2)
+    cards = {f"atom_{i}": stored_card(fsrs, f"atom_{i}", overdue) for i in range(25)}
+    asyncio.run(repository.save_fsrs_cards("user_1", cards))
+
+    schedule = asyncio.run(make_service(repository, daily_review_limit=10)._create_optimized_schedule(
+        learning_path(list(cards)), plan_request(), {}
+    ))
+
+    loads = [len(session.review_atoms) for session in schedule.daily_sessions]
+    assert loads == [10, 10, 5]
+    assert schedule.total_days == 3
+
+
+def test_evaluations_are_written_back_in_one_batch():
+    repository = InMemoryCardRepository()
+    service = make_service(repository)
+    update = UpdatePlanRequest(
+        evaluation_results={"atom_1": {"score": 0.95}, "atom_2": {"score": 0.2}, "atom_3": {"rating": 2}},
+        time_spent_minutes={"atom_1": 4},
+    )
+
+    asyncio.run(service._record_evaluations("user_1", update))
+    asyncio.run(service._record_evaluations("user_1", update))
+
+    assert (repository.reads, repository.writes) == (2, 2)
+    cards = asyncio.run(repository.get_fsrs_cards("user_1", ["atom_1", "atom_2", "atom_3"]))
+    assert {atom: card.reps for atom, card in cards.items()} == {"atom_1": 2, "atom_2": 2, "atom_3": 2}
+    assert cards["atom_1"].state == State.REVIEW
+    assert cards["atom_2"].state == State.LEARNING
+    assert cards["atom_2"].lapses == 1
+
+
+def test_failed_card_read_does_not_overwrite_history():
+    repository = FailingReadRepository()
+    update = UpdatePlanRequest(evaluation_results={"atom_1": {"score": 0.95}})
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(make_service(repository)._record_evaluations("user_1", update))
+
+    assert repository.writes == 0
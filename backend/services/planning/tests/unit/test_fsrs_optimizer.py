@@ -0,0 +1,122 @@
+"""
+Tests del optimizador de pesos FSRS sobre historiales simulados
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.infrastructure.algorithms.fsrs import AdvancedFSRS, Rating, State
+from src.infrastructure.algorithms.fsrs_batch import BatchFSRS, CardBatch, to_epoch_us
+from src.infrastructure.algorithms.fsrs_optimizer import (
+    FSRSOptimizer, ReviewSequences, evaluate, optimize_cohorts, replay_loss
+)
+from src.infrastructure.algorithms.fsrs_storage import ReviewLogStore
+
+
+START = datetime(2025, 1, 1, 9, 0)
+
+
+def simulate_reviews(weights, cards: int = 300, days: int = 120, seed: int = 3) -> ReviewLogStore:
+    """Estudiantes cuyo olvido sigue `weights`; cada día se revisan las tarjetas vencidas"""
+    rng = np.random.default_rng(seed)
+    engine = BatchFSRS(AdvancedFSRS(weights=weights, educational_mode=False))
+    batch = CardBatch.empty(cards, engine.fsrs, now=START)
+    log = ReviewLogStore()
+
+    for day in range(days):
+        now = START + timedelta(days=day)
+        due = np.flatnonzero(batch.due <= to_epoch_us(now))
+        if not len(due):
+            continue
+        in_review = batch.state[due] == State.REVIEW.value
+        elapsed = np.where(in_review, to_epoch_us(now) - batch.last_review[due], 0) / 86_400_000_000
+        recalled = rng.random(len(due)) < np.exp(-elapsed / batch.stability[due])
+        ratings = np.where(in_review & ~recalled, Rating.AGAIN.value, rng.choice([2, 3, 3, 3, 4], len(due)))
+        ratings = np.where(~in_review & (rng.random(len(due)) < 0.1), Rating.AGAIN.value, ratings)
+        engine.repeat(batch, ratings, index=due, now=now, log=log)
+    return log
+
+
+@pytest.fixture(scope="module")
+def true_weights():
+    weights = list(AdvancedFSRS.DEFAULT_WEIGHTS)
+    weights[8] -= 0.8   # Los estudiantes olvidan bastante más rápido de lo que suponen los pesos por defecto
+    weights[11] *= 0.5
+    return weights
+
+
+@pytest.fixture(scope="module")
+def review_log(true_weights):
+    return simulate_reviews(true_weights)
+
+
+def test_sequences_group_reviews_by_card_in_order():
+    log = ReviewLogStore()
+    log.extend(
+        card=np.array([2, 1, 2, 1, 2]),
+        review=np.array([30, 10, 10, 20, 20]),
+        rating=np.array([3, 1, 1, 4, 2]),
+        state=np.array([2, 0, 0, 1, 1]),
+        elapsed_days=np.array([5, 0, 0, 0, 0]),
+    )
+
+    sequences = ReviewSequences.from_records(log.records)
+
+    assert sequences.rating.tolist() == [[1, 4, 1], [1, 2, 3]]
+    assert sequences.valid.tolist() == [[True, True, False], [True, True, True]]
+    assert sequences.elapsed[1, 2] == 5
+    assert sequences.predicted_reviews == 1
+    assert ReviewSequences.from_records(log.records, max_length=2).rating.shape == (2, 2)
+
+
+def test_weight_variants_are_replayed_independently(review_log):
+    sequences = ReviewSequences.from_records(review_log.records)
+    weights = np.asarray(AdvancedFSRS.DEFAULT_WEIGHTS)
+
+    losses = replay_loss(np.vstack([weights, weights]), sequences)
+
+    assert losses[0] == losses[1]
+    assert evaluate(weights.tolist(), sequences)["log_loss"] == pytest.approx(losses[0])
+
+
+def test_fit_recovers_weights_that_predict_retention_better(review_log, true_weights):
+    optimizer = FSRSOptimizer(iterations=60, learning_rate=0.05)
+
+    result = optimizer.fit(review_log.records, cohort="simulada")
+
+    sequences = ReviewSequences.from_records(review_log.records)
+    _, holdout = optimizer.split(sequences)
+    assert result.fitted
+    assert result.holdout_fitted["log_loss"] < result.holdout_initial["log_loss"]
+    assert result.holdout_fitted["calibration_rmse"] < result.holdout_initial["calibration_rmse"]
+    assert result.weights[8] < AdvancedFSRS.DEFAULT_WEIGHTS[8]
+    assert evaluate(true_weights, holdout)["log_loss"] <= result.holdout_initial["log_loss"]
+
+
+def test_small_cohorts_keep_the_initial_weights(review_log):
+    few = review_log.records[review_log.records["card"] < 3]
+
+    result = FSRSOptimizer(min_reviews=500).fit(few, cohort="pequeña")
+
+    assert not result.fitted
+    assert result.weights == AdvancedFSRS.DEFAULT_WEIGHTS
+    assert result.iterations == 0
+
+
+def test_cohorts_are_fitted_in_a_process_pool(review_log, true_weights):
+    cohorts = {"a": review_log, "b": simulate_reviews(true_weights, cards=150, days=60, seed=9)}
+
+    results = optimize_cohorts(cohorts, max_workers=2, iterations=5)
+
+    assert set(results) == {"a", "b"}
+    assert all(len(result.weights) == 19 for result in results.values())
+    assert results["a"].cards == 300
+
+
+def test_fitted_weights_load_into_the_scheduler(review_log):
+    result = FSRSOptimizer(iterations=10).fit(review_log.records)
+
+    assert AdvancedFSRS(weights=result.weights).w == result.weights
+    assert AdvancedFSRS(weights=[0.4, 0.6, 2.4, 5.8]).w == AdvancedFSRS.DEFAULT_WEIGHTS
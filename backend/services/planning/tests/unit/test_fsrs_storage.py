@@ -0,0 +1,99 @@
+"""
+Tests del almacenamiento compacto de tarjetas y del log columnar de revisiones
+"""
+
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from src.infrastructure.algorithms.fsrs import AdvancedFSRS, Card, Rating, State
+from src.infrastructure.algorithms.fsrs_batch import BatchFSRS, CardBatch
+from src.infrastructure.algorithms.fsrs_storage import ReviewLogStore, RollingStats, to_epoch_us
+
+
+NOW = datetime(2025, 3, 1, 9, 30)
+
+
+def test_rolling_stats_keep_a_fixed_window_and_lifetime_totals():
+    stats = RollingStats(size=4)
+    for value in range(1, 11):
+        stats.append(value)
+
+    assert list(stats) == [7, 8, 9, 10]
+    assert stats.count == 10
+    assert stats.mean() == 5.5
+    assert stats.recent_mean() == 8.5
+    assert len(stats.buffer().tobytes()) == 16
+
+
+def test_card_history_does_not_grow_with_reviews():
+    fsrs = AdvancedFSRS()
+    card = fsrs.create_new_card("atom_1")
+    assert not hasattr(card, "__dict__")
+
+    for _ in range(10):
+        card.response_times.append(30.0)
+    size_after_10 = sys.getsizeof(card.response_times.buffer().obj)
+    for _ in range(10_000):
+        card.response_times.append(30.0)
+        card.record_error("signo")
+
+    assert sys.getsizeof(card.response_times.buffer().obj) == size_after_10
+    assert len(card.error_patterns) == 8
+    assert card.response_times.count == 10_010
+
+
+def test_card_still_accepts_lists():
+    card = Card(due=NOW, stability=1, difficulty=5, elapsed_days=0, scheduled_days=0, reps=0, lapses=0,
+                state=State.NEW, response_times=[10.0, 20.0], confidence_scores=[0.5])
+
+    assert card.response_times.mean() == 15.0
+    assert list(card.confidence_scores) == [0.5]
+
+
+def test_batch_reviews_are_logged_and_round_trip_through_bytes():
+    fsrs = AdvancedFSRS()
+    batch = CardBatch.empty(5, fsrs, now=NOW)
+    log = ReviewLogStore(capacity=2)
+
+    BatchFSRS(fsrs).repeat(batch, np.array([1, 2, 3, 4, 3]), response_times=np.full(5, 42.0), now=NOW, log=log)
+    BatchFSRS(fsrs).repeat(batch, np.array([3, 3]), index=np.array([0, 4]), now=NOW, log=log)
+
+    assert len(log) == 7
+    restored = ReviewLogStore.from_buffer(bytes(log.to_buffer()))
+    assert restored.to_buffer().tobytes() == log.to_buffer().tobytes()
+    history = restored.for_cards([4])
+    assert history["rating"].tolist() == [3, 3]
+    assert history["state"].tolist() == [State.NEW.value, State.LEARNING.value]
+    assert np.isnan(history["response_time"][1])
+
+
+def test_scalar_review_logs_share_the_columnar_store():
+    fsrs = AdvancedFSRS()
+    card = fsrs.create_new_card("atom_1")
+    log = ReviewLogStore()
+
+    _, review_log = fsrs.repeat(card, Rating.GOOD, response_time=12.0, now=NOW)
+    log.append_log(7, review_log)
+
+    row = log.records[0]
+    assert (row["card"], row["review"], row["rating"], row["state"]) == (7, to_epoch_us(NOW), 3, State.NEW.value)
+    assert row["response_time"] == 12.0
+    assert np.isnan(row["confidence"])
+
+
+def test_card_batch_loads_from_a_writable_buffer_without_copying():
+    fsrs = AdvancedFSRS()
+    source = CardBatch.empty(100, fsrs, now=NOW)
+    BatchFSRS(fsrs).repeat(source, np.full(100, Rating.EASY.value), now=NOW)
+
+    buffer = bytearray(source.to_buffer())
+    loaded = CardBatch.from_buffer(buffer, fsrs)
+
+    assert np.shares_memory(loaded.stability, np.frombuffer(buffer, dtype=np.uint8))
+    np.testing.assert_array_equal(loaded.due, source.due)
+    np.testing.assert_array_equal(loaded.state, source.state)
+
+    BatchFSRS(fsrs).repeat(loaded, np.full(100, Rating.GOOD.value), now=NOW)
+    assert CardBatch.from_buffer(bytes(buffer), fsrs).reps.tolist() == [2] * 100
@@ -0,0 +1,121 @@
+"""
+Tests de la obtención de rutas de varios objetivos en una sola consulta
+"""
+
+import asyncio
+
+from src.domain.services.agentic_planning_service import AgenticPlanningService
+from src.infrastructure.database.neo4j_repository import Neo4jPlanningRepository, build_learning_paths_query
+
+
+class RecordingDriver:
+    """Driver falso que registra las consultas y devuelve filas fijas"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work):
+        return work(self)
+
+    def run(self, query, **parameters):
+        self.queries.append((query, parameters))
+        return [{"atom_data": row} for row in self.rows]
+
+
+def make_repository(rows):
+    repository = Neo4jPlanningRepository("bolt://localhost:7687", "neo4j", "test")
+    repository._driver = RecordingDriver(rows)
+    return repository
+
+
+def test_all_goals_are_fetched_with_one_query():
+    rows = [{"id": "a1", "title": "A", "difficulty_level": "básico", "estimated_time_minutes": 10,
+             "dependencies": []}]
+    repository = make_repository(rows)
+    goals = [f"objetivo_{i}" for i in range(10)] + ["objetivo_0"]
+
+    atoms = asyncio.run(repository.get_learning_paths_for_goals(goals))
+
+    assert atoms == rows
+    assert len(repository._driver.queries) == 1
+    query, parameters = repository._driver.queries[0]
+    assert parameters == {"goals": [f"objetivo_{i}" for i in range(10)]}
+    assert ".content" not in query
+    assert asyncio.run(repository.get_learning_paths_for_goals([])) == []
+    assert len(repository._driver.queries) == 1
+
+
+def test_query_depth_is_an_integer_bound():
+    assert "[:REQUIRES*0..4]" in build_learning_paths_query(4)
+    assert "[:REQUIRES*0..3]" in build_learning_paths_query("3")
+
+
+class InFlight:
+    """Cuenta las lecturas en curso a la vez"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    async def wait(self):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.current -= 1
+
+
+class SlowGraph:
+    def __init__(self, in_flight):
+        self.in_flight = in_flight
+        self.calls = 0
+
+    async def get_learning_paths_for_goals(self, goals):
+        self.calls += 1
+        await self.in_flight.wait()
+        return [{"id": "a1", "dependencies": []}, {"id": "a2", "dependencies": ["a1"]}]
+
+
+class SlowPlanningRepository:
+    def __init__(self, in_flight):
+        self.in_flight = in_flight
+
+    async def get_mastered_atom_ids(self, user_id):
+        await self.in_flight.wait()
+        return ["a1"]
+
+
+def test_graph_and_mastered_lookups_run_concurrently():
+    in_flight = InFlight()
+    graph = SlowGraph(in_flight)
+    service = AgenticPlanningService(
+        planning_repository=SlowPlanningRepository(in_flight),
+        graph_repository=graph,
+        agentic_orchestrator=None,
+        atomization_client=None,
+        evaluation_client=None,
+        fsrs_algorithm=None,
+        zdp_algorithm=None,
+    )
+
+    async def fetch():
+        return await asyncio.gather(
+            service._get_available_atoms(["álgebra", "geometría"]),
+            service.planning_repository.get_mastered_atom_ids("user_1"),
+        )
+
+    atoms, mastered = asyncio.run(fetch())
+
+    assert [atom["id"] for atom in atoms] == ["a1", "a2"] and mastered == ["a1"]
+    assert graph.calls == 1
+    assert in_flight.peak == 2
@@ -0,0 +1,70 @@
+"""
+Tests del grafo de conocimiento con el driver asíncrono (sin servidor Neo4j)
+"""
+
+import asyncio
+
+from neo4j import EagerResult, RoutingControl
+
+from src.infrastructure.database.neo4j_knowledge_graph import Neo4jKnowledgeGraph
+
+
+class RecordingAsyncDriver:
+    """Driver asíncrono falso: registra cada execute_query"""
+
+    def __init__(self, records=None):
+        self.records = records or []
+        self.calls = []
+        self.closed = False
+
+    async def execute_query(self, query, parameters=None, routing_=RoutingControl.WRITE, database_=None):
+        self.calls.append({"query": query, "parameters": parameters, "routing": routing_, "database": database_})
+        return EagerResult(self.records, None, [])
+
+    async def close(self):
+        self.closed = True
+
+
+def make_graph(records=None):
+    # Crear el repositorio no necesita un event loop en marcha
+    graph = Neo4jKnowledgeGraph("neo4j://localhost:7687", "neo4j", "test", database="atomia")
+    graph._driver = RecordingAsyncDriver(records)
+    return graph
+
+
+def test_difficulty_is_a_query_parameter_and_reads_are_routed():
+    graph = make_graph([{"atom_data": {"id": "a1"}}])
+
+    atoms = asyncio.run(graph.get_learning_path_for_topic("álgebra", difficulty_level="x' OR 1=1 //", max_depth=3))
+
+    call = graph._driver.calls[0]
+    assert atoms == [{"id": "a1"}]
+    assert call["parameters"] == {"topic": "álgebra", "difficulty_level": "x' OR 1=1 //"}
+    assert "OR 1=1" not in call["query"]
+    assert "[:REQUIRES*0..3]" in call["query"]
+    assert call["routing"] == RoutingControl.READ
+    assert call["database"] == "atomia"
+
+
+def test_writes_go_to_the_leader():
+    graph = make_graph([{"atom_id": "a1"}])
+
+    created = asyncio.run(graph.create_learning_atom({"id": "a1", "title": "Átomo"}))
+
+    assert created == "a1"
+    assert graph._driver.calls[0]["routing"] == RoutingControl.WRITE
+
+
+def test_schema_is_initialized_once_and_the_pool_is_closed():
+    graph = make_graph()
+
+    async def lifecycle():
+        async with graph:
+            await graph.initialize()
+
+    asyncio.run(lifecycle())
+
+    statements = [call["query"] for call in graph._driver.calls]
+    assert sum("CREATE INDEX" in q for q in statements) == 4
+    assert sum("CREATE CONSTRAINT" in q for q in statements) == 2
+    assert graph._driver.closed
@@ -0,0 +1,202 @@
+"""
+Tests de la caché en memoria del grafo de prerrequisitos
+"""
+
+import asyncio
+import random
+
+from src.infrastructure.database import prerequisite_graph
+from src.infrastructure.database.neo4j_repository import Neo4jPlanningRepository, PREREQUISITE_EDGES_QUERY
+from src.infrastructure.database.prerequisite_graph import GraphChanges, PrerequisiteGraph, PrerequisiteGraphCache
+
+
+def atom(atom_id, *tags):
+    return {"id": atom_id, "title": atom_id.upper(), "difficulty_level": "básico",
+            "estimated_time_minutes": 10, "tags": list(tags)}
+
+
+def sample_changes(version=100):
+    # d → c → b → a, e → b; x aislado
+    return GraphChanges(
+        atoms=[atom("a"), atom("b"), atom("c", "álgebra"), atom("d"), atom("e", "geometría"), atom("x", "álgebra")],
+        edges=[("b", "a"), ("c", "b"), ("d", "c"), ("e", "b"), ("c", "b")],
+        version=version,
+    )
+
+
+def test_ancestor_and_descendant_closures():
+    graph = PrerequisiteGraph.from_changes(sample_changes())
+
+    assert graph.edge_count == 4
+    assert graph.ancestors(["d"]) == ["a", "b", "c"]
+    assert graph.ancestors(["d"], max_depth=1) == ["c"]
+    assert graph.ancestors(["d", "c"]) == ["a", "b", "c"]
+    assert graph.descendants(["b"]) == ["c", "d", "e"]
+    assert graph.descendants(["b"], include_self=True) == ["b", "c", "d", "e"]
+    assert graph.ancestors(["desconocido"]) == []
+
+
+def test_learning_paths_match_the_repository_format():
+    graph = PrerequisiteGraph.from_changes(sample_changes())
+
+    path = graph.learning_paths(["álgebra"])
+
+    assert [a["id"] for a in path] == ["a", "b", "c", "x"]
+    assert path[2] == {"id": "c", "title": "C", "difficulty_level": "básico",
+                       "estimated_time_minutes": 10, "dependencies": ["b"]}
+
+
+def test_incremental_changes_are_applied_without_reload():
+    graph = PrerequisiteGraph.from_changes(sample_changes())
+
+    added = graph.apply(GraphChanges(
+        atoms=[atom("f", "álgebra"), atom("a", "aritmética")],
+        edges=[("f", "d"), ("b", "a"), ("a", "z")],
+        version=200,
+    ))
+
+    assert added == 2
+    assert graph.version == 200
+    assert graph.ancestors(["f"]) == ["a", "b", "c", "d", "z"]
+    assert graph.descendants(["z"]) == ["a", "b", "c", "d", "e", "f"]
+    assert graph.atoms_for_goals(["aritmética"]) == ["a"]
+    graph.compact()
+    assert graph.prerequisites.pending == {}
+    assert graph.ancestors(["f"]) == ["a", "b", "c", "d", "z"]
+    assert graph.descendants(["z"]) == ["a", "b", "c", "d", "e", "f"]
+
+
+def test_cycles_terminate():
+    graph = PrerequisiteGraph.from_changes(GraphChanges(edges=[("a", "b"), ("b", "c"), ("c", "a")]))
+
+    assert graph.ancestors(["a"]) == ["a", "b", "c"]
+    assert graph.descendants(["b"], max_depth=1) == ["a"]
+
+
+def test_delta_is_compacted_when_it_grows(monkeypatch):
+    monkeypatch.setattr(prerequisite_graph, "COMPACT_MIN_EDGES", 2)
+    graph = PrerequisiteGraph.from_changes(sample_changes())
+
+    graph.apply(GraphChanges(edges=[("p", "q"), ("q", "r"), ("r", "s")]))
+
+    assert graph.prerequisites.pending_count == 0
+    assert graph.edge_count == 7
+    assert graph.ancestors(["p"]) == ["q", "r", "s"]
+
+
+class FakeGraphRepository:
+    def __init__(self):
+        self.loads = []
+        self.path_queries = 0
+        self.pending = GraphChanges()
+
+    async def load_prerequisite_graph(self, since=None):
+        self.loads.append(since)
+        if since is None:
+            return sample_changes()
+        return self.pending
+
+    async def get_learning_paths_for_goals(self, goals):
+        self.path_queries += 1
+        return []
+
+
+def test_cache_answers_locally_and_refreshes_from_the_last_version():
+    repository = FakeGraphRepository()
+    cache = PrerequisiteGraphCache(repository, refresh_lag_ms=30)
+
+    asyncio.run(cache.load())
+    repository.pending = GraphChanges(atoms=[atom("g", "álgebra")], edges=[("g", "e")], version=150)
+    changes = asyncio.run(cache.refresh())
+    path = asyncio.run(cache.get_learning_paths_for_goals(["álgebra", "geometría"]))
+
+    assert repository.loads == [None, 70]
+    assert changes == 2
+    assert repository.path_queries == 0
+    assert [a["id"] for a in path] == ["a", "b", "c", "e", "g", "x"]
+    assert cache.descendants(["e"]) == ["g"]
+
+
+def test_refresh_rereads_changes_committed_after_a_newer_stamp():
+    repository = FakeGraphRepository()
+    cache = PrerequisiteGraphCache(repository, refresh_lag_ms=60)
+    asyncio.run(cache.load())
+    repository.pending = GraphChanges(edges=[("g", "e")], version=150)
+    asyncio.run(cache.refresh())
+
+    # Transacción sellada en 120 que confirmó después del refresco anterior
+    repository.pending = GraphChanges(edges=[("g", "e"), ("h", "e")], version=120)
+    asyncio.run(cache.refresh())
+
+    assert repository.loads == [None, 40, 90]
+    assert cache.graph.version == 150
+    assert cache.descendants(["e"]) == ["g", "h"]
+
+
+def test_refresh_loop_reloads_everything_periodically():
+    repository = FakeGraphRepository()
+    cache = PrerequisiteGraphCache(repository, full_reload_seconds=0)
+    asyncio.run(cache.load())
+
+    async def run_briefly():
+        task = asyncio.create_task(cache.run_refresh_loop(0))
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run_briefly())
+    assert set(repository.loads) == {None}
+    assert len(repository.loads) > 1
+    assert not PrerequisiteGraphCache(repository, full_reload_seconds=None).full_reload_due()
+
+
+class StampedDriver:
+    """Driver falso: átomos y aristas como los deja el servicio de atomización"""
+
+    def __init__(self):
+        self.parameters = []
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work):
+        return work(self)
+
+    def run(self, query, **parameters):
+        self.parameters.append(parameters)
+        if "atom_data" in query:
+            return [{"atom_data": atom("h", "álgebra"), "stamp": 300}]
+        # Arista creada con un MERGE sin sello
+        return [{"atom_id": "h", "prerequisite_id": "c", "stamp": None}]
+
+
+def test_refresh_picks_up_unstamped_edges_of_changed_atoms():
+    repository = Neo4jPlanningRepository("bolt://localhost:7687", "neo4j", "test")
+    repository._driver = StampedDriver()
+
+    changes = asyncio.run(repository.load_prerequisite_graph(since=250))
+    graph = PrerequisiteGraph.from_changes(sample_changes())
+    graph.apply(changes)
+
+    assert repository._driver.parameters == [{"since": 250}, {"since": 250}]
+    assert "changed)-[relation:REQUIRES]-(" in PREREQUISITE_EDGES_QUERY
+    assert changes.version == 300
+    assert graph.ancestors(["h"]) == ["a", "b", "c"]
+
+
+def test_large_closures_reach_every_node():
+    rng = random.Random(2)
+    size = 20_000
+    edges = [(f"n{i}", f"n{rng.randrange(i)}") for i in range(1, size) for _ in range(2)]
+    graph = PrerequisiteGraph.from_changes(GraphChanges(edges=edges))
+
+    ancestors = graph.ancestors([f"n{size - 1}"])
+    descendants = graph.descendants(["n0"])
+
+    assert "n0" in ancestors
+    assert len(descendants) == size - 1
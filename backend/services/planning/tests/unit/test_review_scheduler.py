@@ -0,0 +1,114 @@
+"""
+Tests del planificador de revisiones con capacidad diaria
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.infrastructure.algorithms.fsrs import AdvancedFSRS, Card, FSRSAlgorithm, State
+from src.infrastructure.algorithms.fsrs_batch import CardBatch
+from src.infrastructure.algorithms.fsrs_storage import to_epoch_us
+from src.infrastructure.algorithms.review_scheduler import ReviewScheduler, fuzz_delta
+
+
+NOW = datetime(2025, 3, 3, 9, 30)
+
+
+def review_card(due: datetime, stability: float = 10.0, interval: int = 10) -> Card:
+    return Card(due=due, stability=stability, difficulty=5.0, elapsed_days=0, scheduled_days=interval,
+                reps=3, lapses=0, state=State.REVIEW, last_review=due - timedelta(days=interval))
+
+
+def test_overflow_spills_forward_instead_of_being_dropped():
+    cards = [review_card(NOW - timedelta(days=2), interval=1) for _ in range(25)]
+
+    plan = ReviewScheduler(daily_limit=10, load_balance=False).plan_cards(cards, days_ahead=7, now=NOW)
+
+    assert plan.loads == [10, 10, 5, 0, 0, 0, 0, 0]
+    assert len(plan.overflow) == 0
+
+
+def test_priority_within_a_day_prefers_overdue_then_unstable_cards():
+    cards = [
+        review_card(NOW + timedelta(hours=1), stability=30, interval=1),
+        review_card(NOW - timedelta(days=3), stability=50, interval=1),
+        review_card(NOW + timedelta(hours=1), stability=2, interval=1),
+    ]
+
+    plan = ReviewScheduler(daily_limit=2, load_balance=False).plan_cards(cards, now=NOW)
+
+    assert plan.days[0].tolist() == [1, 2]
+    assert plan.days[1].tolist() == [0]
+
+
+def test_only_available_study_days_receive_reviews():
+    scheduler = ReviewScheduler(daily_limit=5, available_days_per_week=3, load_balance=False)
+    cards = [review_card(NOW, interval=1) for _ in range(40)]
+
+    plan = scheduler.plan_cards(cards, days_ahead=13, now=NOW)
+
+    assert scheduler.study_days(7).nonzero()[0].tolist() == [0, 3, 5]
+    assert [day for day, load in enumerate(plan.loads) if load] == [0, 3, 5, 7, 10, 12]
+    assert len(plan.overflow) == 40 - 6 * 5
+
+
+def test_cards_due_after_the_horizon_are_left_out():
+    cards = [review_card(NOW + timedelta(days=30))]
+
+    plan = ReviewScheduler().plan_cards(cards, days_ahead=7, now=NOW)
+
+    assert sum(plan.loads) == 0 and len(plan.overflow) == 0
+
+
+def test_fuzz_flattens_review_peaks():
+    cards = [review_card(NOW + timedelta(days=10), interval=60) for _ in range(60)]
+
+    flat = ReviewScheduler(daily_limit=100).plan_cards(cards, days_ahead=20, now=NOW)
+    peaked = ReviewScheduler(daily_limit=100, load_balance=False).plan_cards(cards, days_ahead=20, now=NOW)
+
+    delta = int(fuzz_delta(np.array([60]))[0])
+    assert peaked.loads[10] == 60
+    assert max(flat.loads) <= -(-60 // (2 * delta + 1))
+    assert all(abs(day - 10) <= delta for day, load in enumerate(flat.loads) if load)
+    assert fuzz_delta(np.array([1, 2])).tolist() == [0, 0]
+
+
+def test_advanced_fsrs_schedule_keeps_every_due_card():
+    fsrs = AdvancedFSRS()
+    cards = [fsrs.create_new_card(f"atom_{i}") for i in range(30)]
+    for card in cards:
+        card.due = NOW
+
+    schedule = asyncio.run(fsrs.generate_review_schedule(cards, days_ahead=7, daily_limit=10, now=NOW))
+
+    assert list(schedule)[0] == "2025-03-03"
+    assert [len(day) for day in schedule.values()] == [10, 10, 10, 0, 0, 0, 0, 0]
+
+
+def test_legacy_wrapper_schedules_all_atoms_on_study_days():
+    wrapper = FSRSAlgorithm({})
+    atoms = [f"atom_{i}" for i in range(35)]
+
+    schedule = asyncio.run(wrapper.generate_review_schedule(atoms, available_days_per_week=2))
+
+    assert list(schedule) == [1, 2, 3, 4]
+    assert sorted(a for day in schedule.values() for a in day) == sorted(atoms)
+
+
+def test_large_decks_respect_the_daily_limit():
+    rng = np.random.default_rng(5)
+    size = 100_000
+    batch = CardBatch.empty(size, AdvancedFSRS(), now=NOW)
+    batch.state[:] = State.REVIEW.value
+    batch.due[:] = to_epoch_us(NOW) + rng.integers(-5, 60, size) * 86_400_000_000
+    batch.stability[:] = rng.uniform(1, 100, size)
+    batch.scheduled_days[:] = rng.integers(1, 120, size)
+    scheduler = ReviewScheduler(daily_limit=2_000, available_days_per_week=5)
+
+    plan = scheduler.plan_batch(batch, days_ahead=30, now=NOW)
+
+    assert max(plan.loads) <= 2_000
+    assert sum(plan.loads) + len(plan.overflow) == int((batch.due < to_epoch_us(NOW) + 31 * 86_400_000_000).sum())
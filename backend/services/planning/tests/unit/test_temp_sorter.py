@@ -0,0 +1,147 @@
+"""
+Tests del orden topológico con desempate pedagógico y ruptura de ciclos
+"""
+
+import asyncio
+import random
+
+from src.domain.services.agentic_planning_service import AgenticPlanningService
+from src.domain.services.temp_sorter import (
+    build_dependency_graph, build_priorities, pedagogical_priority, sort_atoms, tarjan_scc,
+    topological_sort_atoms
+)
+from src.infrastructure.algorithms.zdp import ZDPAlgorithm
+from src.schemas import CreatePlanRequest, DifficultyLevel, LearningContext
+
+
+def assert_respects(order, graph, ignored=()):
+    position = {atom: i for i, atom in enumerate(order)}
+    for atom, dependencies in graph.items():
+        for dependency in dependencies:
+            if dependency in position and (dependency, atom) not in ignored:
+                assert position[dependency] < position[atom], (dependency, atom)
+
+
+def test_prerequisites_come_before_dependents():
+    atoms = [
+        {"id": "a3", "dependencies": ["a2"]},
+        {"id": "a2", "dependencies": ["a1"]},
+        {"id": "a1", "dependencies": []},
+    ]
+
+    order, has_cycle = topological_sort_atoms(build_dependency_graph(atoms))
+
+    assert order == ["a1", "a2", "a3"]
+    assert not has_cycle
+
+
+def test_ties_are_broken_by_zdp_then_difficulty_then_time():
+    atoms = [
+        {"id": "largo", "difficulty": "básico", "estimated_duration_minutes": 30},
+        {"id": "avanzado", "difficulty": "avanzado", "estimated_duration_minutes": 5},
+        {"id": "corto", "difficulty": "básico", "estimated_duration_minutes": 10},
+        {"id": "zdp", "difficulty": "avanzado", "zdp_score": 0.9},
+        {"id": "después", "dependencies": ["avanzado"], "difficulty": 1},
+    ]
+
+    result = sort_atoms(build_dependency_graph(atoms), build_priorities(atoms))
+
+    assert result.order == ["zdp", "corto", "largo", "avanzado", "después"]
+    assert pedagogical_priority({"difficulty": 2.5}) == (-0.0, 2.5, 0.0)
+
+
+def test_learning_path_breaks_ties_with_zdp_for_the_learner_level():
+    service = AgenticPlanningService(
+        planning_repository=None, graph_repository=None, agentic_orchestrator=None,
+        atomization_client=None, evaluation_client=None, fsrs_algorithm=None,
+        zdp_algorithm=ZDPAlgorithm(0.2),
+    )
+    atoms = [
+        {"id": "fácil", "difficulty_level": "básico", "dependencies": []},
+        {"id": "reto", "difficulty": 2.3, "dependencies": []},
+        {"id": "después", "difficulty_level": "básico", "dependencies": ["reto"]},
+    ]
+    request = CreatePlanRequest(
+        user_id="user_1", learning_goals=["álgebra"], time_available_hours=2,
+        context=LearningContext(current_level=DifficultyLevel.INTERMEDIO),
+    )
+
+    path = asyncio.run(service._generate_learning_path({}, atoms, request))
+
+    assert path.phases[0].atoms == ["reto", "fácil", "después"]
+    # Sin scores ZDP, a igualdad gana la menor dificultad
+    assert sort_atoms(build_dependency_graph(atoms), build_priorities(atoms)).order[0] == "fácil"
+
+
+def test_missing_dependencies_are_ignored():
+    result = sort_atoms({"a": ["dominado"], "b": ["a"]})
+
+    assert result.order == ["a", "b"]
+    assert not result.has_cycle
+
+
+def test_cycles_are_reported_and_broken_with_few_edges():
+    graph = {
+        "base": [],
+        "x": ["base", "z"],
+        "y": ["x"],
+        "z": ["y"],
+        "solo": ["solo"],
+        "fin": ["z"],
+    }
+
+    result = sort_atoms(graph)
+
+    assert sorted(map(sorted, result.cycles)) == [["solo"], ["x", "y", "z"]]
+    assert len(result.removed_edges) == 2
+    assert ("solo", "solo") in result.removed_edges
+    assert sorted(result.order) == sorted(graph)
+    assert_respects(result.order, graph, ignored=set(result.removed_edges))
+
+
+def test_removed_edge_set_is_minimal():
+    rng = random.Random(3)
+    nodes = [f"n{i}" for i in range(60)]
+    graph = {node: rng.sample(nodes, 3) for node in nodes}
+
+    result = sort_atoms(graph)
+
+    assert result.has_cycle
+    assert_respects(result.order, graph, ignored=set(result.removed_edges))
+    # Volver a añadir cualquiera de las aristas eliminadas cierra un ciclo
+    for source, target in result.removed_edges:
+        restored = {atom: [d for d in deps if (d, atom) not in result.removed_edges or (d, atom) == (source, target)]
+                    for atom, deps in graph.items()}
+        assert sort_atoms(restored).has_cycle
+
+
+def test_tarjan_finds_strongly_connected_components():
+    successors = [[1], [2], [0, 3], [4], [3], []]
+
+    components = sorted(sorted(c) for c in tarjan_scc(successors))
+
+    assert components == [[0, 1, 2], [3, 4], [5]]
+
+
+def test_large_cyclic_graphs_lose_a_single_edge():
+    rng = random.Random(1)
+    size = 100_000
+    atoms = [
+        {
+            "id": f"atom_{i}",
+            "dependencies": [f"atom_{rng.randrange(i)}" for _ in range(min(i, 3))],
+            "difficulty": rng.choice(["básico", "intermedio", "avanzado"]),
+            "estimated_duration_minutes": rng.randint(5, 60),
+            "zdp_score": rng.random(),
+        }
+        for i in range(size)
+    ]
+    graph = build_dependency_graph(atoms)
+    priorities = build_priorities(atoms)
+    graph["atom_10"] = graph["atom_10"] + ["atom_50000"]  # Un ciclo largo
+
+    result = sort_atoms(graph, priorities)
+
+    assert len(result.order) == size
+    assert len(result.removed_edges) == 1
+    assert_respects(result.order, graph, ignored=set(result.removed_edges))
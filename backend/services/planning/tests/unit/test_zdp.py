@@ -0,0 +1,82 @@
+"""
+Tests del cálculo ZDP por lotes
+"""
+
+import asyncio
+
+import numpy as np
+
+from src.infrastructure.algorithms.zdp import ZDPAlgorithm, calibrate_difficulty
+
+
+def test_vectorized_score_matches_scalar_formula():
+    zdp = ZDPAlgorithm(0.2)
+    difficulty = np.linspace(0.5, 3.5, 301)
+
+    scores = zdp.score(difficulty, "intermedio")
+
+    expected = [zdp._calculate_zdp_score(2.0, d) for d in difficulty]
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_optimize_returns_atoms_by_score_without_mutating_them():
+    zdp = ZDPAlgorithm(0.2)
+    atoms = [
+        {"id": "fácil", "difficulty": "básico"},
+        {"id": "justo", "difficulty": 2.3},
+        {"id": "difícil", "difficulty": "avanzado"},
+        {"id": "medio", "difficulty": "intermedio"},
+    ]
+
+    ordered = asyncio.run(zdp.optimize_difficulty_progression(atoms, "intermedio"))
+
+    assert [atom["id"] for atom in ordered] == ["justo", "difícil", "fácil", "medio"]
+    assert all("zdp_score" not in atom for atom in atoms)
+
+
+def test_zones_group_atoms():
+    zdp = ZDPAlgorithm()
+    atoms = [{"id": str(d), "difficulty": d} for d in (1.0, 1.9, 2.0, 2.5, 2.6, 3.0)]
+
+    groups = zdp.group_atoms_by_zdp(atoms, 2.0)
+
+    assert [a["difficulty"] for a in groups["below_zdp"]] == [1.0, 1.9]
+    assert [a["difficulty"] for a in groups["in_zdp"]] == [2.0, 2.5]
+    assert [a["difficulty"] for a in groups["above_zdp"]] == [2.6, 3.0]
+    assert zdp.zones(zdp.encode(atoms), 2.0).counts() == {"below_zdp": 2, "in_zdp": 2, "above_zdp": 2}
+
+
+def test_calibration_moves_difficulty_with_evidence():
+    zdp = ZDPAlgorithm()
+    atoms = [{"id": "a", "difficulty": "intermedio"}, {"id": "b", "difficulty": "intermedio"},
+             {"id": "c", "difficulty": "avanzado"}]
+
+    few = zdp.encode(atoms, {"a": [0.0], "b": [1.0]})
+    many = zdp.encode(atoms, {"a": [0.0] * 100, "b": [1.0] * 100})
+
+    assert few[0] > 2.0 > few[1] and few[2] == 3.0
+    assert many[0] > few[0] and many[1] < few[1]
+    assert 1.0 <= many.min() and many.max() <= 3.0
+    np.testing.assert_allclose(calibrate_difficulty([2.0], [0.5], [50]), [2.0])
+
+
+def test_rank_with_limit_matches_full_rank():
+    zdp = ZDPAlgorithm()
+    difficulty = np.round(np.random.default_rng(0).uniform(1.0, 3.0, 5_000), 1)
+
+    full = zdp.rank(difficulty, 1.5)
+
+    np.testing.assert_array_equal(zdp.rank(difficulty, 1.5, limit=50), full[:50])
+    assert len(zdp.rank(difficulty, 1.5, limit=0)) == 0
+
+
+def test_large_batches_are_ranked_and_partitioned():
+    zdp = ZDPAlgorithm()
+    difficulty = np.random.default_rng(1).uniform(1.0, 3.0, 100_000)
+
+    order = zdp.rank(difficulty, "intermedio")
+    zones = zdp.zones(difficulty, "intermedio")
+
+    scores = zdp.score(difficulty, "intermedio")
+    assert np.all(np.diff(scores[order]) <= 0)
+    assert zones.below.sum() + zones.inside.sum() + zones.above.sum() == len(difficulty)
@@ -2,9 +2,10 @@
 Dependencias para el servicio de preguntas
 """
 import httpx
+import json
 import structlog
 from functools import lru_cache
-from typing import Optional
+from typing import Optional, AsyncIterator, Callable, Any
 
 from .config import settings
 from ..domain.services.agentic_question_service import AgenticQuestionService
@@ -24,21 +25,44 @@ class OrchestratorClient:
         self.base_url = base_url.rstrip("/")
         self.client = httpx.AsyncClient(timeout=30.0)
     
-    async def process_educational_task(self, task: dict):
+    async def stream_educational_task(self, task: dict) -> AsyncIterator[dict]:
+        """Procesa una tarea educativa emitiendo los eventos NDJSON del agente a medida que llegan"""
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/agent/process/stream",
+            json=task,
+            timeout=30.0
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise httpx.HTTPStatusError(
+                    f"Orchestrator error {response.status_code}",
+                    request=response.request,
+                    response=response
+                )
+            
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+    
+    async def process_educational_task(self, task: dict, on_token: Optional[Callable[[str], Any]] = None):
         """Procesa una tarea educativa usando el agente"""
         try:
-            response = await self.client.post(
-                f"{self.base_url}/agent/process",
-                json=task,
-                timeout=30.0
-            )
+            result = None
+            async for event in self.stream_educational_task(task):
+                event_type = event.pop("type", None)
+                if event_type == "token":
+                    if on_token is not None:
+                        on_token(event.get("content", ""))
+                elif event_type == "final":
+                    result = event
+                elif event_type == "error":
+                    logger.error("Orchestrator error", error=event.get("error"))
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error("Orchestrator error", status=response.status_code, text=response.text)
-                # Fallback con respuesta simulada
-                return self._create_fallback_response(task)
+            if result is not None:
+                return result
+            # Fallback con respuesta simulada
+            return self._create_fallback_response(task)
                 
         except Exception as e:
             logger.error("Orchestrator communication failed", error=str(e))